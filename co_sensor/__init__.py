@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+CO 气体传感器多串口采集（电脑端）
+- protocol：9字节帧的命令、解析和流式重组
+- service：asyncio 多串口采集服务，按批发布到 MQTT
+- simulator：基于 pty 的多传感器仿真
+"""
+
+from co_sensor.protocol import (CMD_SET_ACTIVE, CMD_SET_PASSIVE, CMD_READ, FRAME_LEN, FrameReassembler,
+                                decode_frame, make_frame)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+CO 传感器9字节帧协议（与 read_co.py 相同）
+帧格式：0xFF | 命令 | 6字节数据 | 校验和（索引1～7求和取反加1）
+- 主动上报帧命令为 0x19，浓度在索引4、5；读取命令(0x86)的响应浓度在索引6、7
+- FrameReassembler：从字节流中重组帧，起始字节或校验和错误时跳过一个字节重新同步
+"""
+
+from read_co import calculate_checksum
+
+FRAME_LEN = 9
+START_BYTE = 0xFF
+CMD_ACTIVE_UPLOAD = 0x19
+CMD_READ_CO = 0x86
+
+CMD_SET_ACTIVE = bytes([0xFF, 0x01, 0x78, 0x40, 0x00, 0x00, 0x00, 0x00, 0x47])
+CMD_SET_PASSIVE = bytes([0xFF, 0x01, 0x78, 0x41, 0x00, 0x00, 0x00, 0x00, 0x46])
+CMD_READ = bytes([0xFF, 0x01, 0x86, 0x00, 0x00, 0x00, 0x00, 0x00, 0x79])
+
+
+def make_frame(cmd, data):
+    """组帧：data 为6字节数据"""
+    frame = bytearray([START_BYTE, cmd]) + bytearray(data)
+    frame.append(calculate_checksum(frame + b'\x00'))
+    return bytes(frame)
+
+
+def decode_frame(frame):
+    """返回帧中的CO浓度（ppm），校验失败返回None（不打印，供批量处理使用）"""
+    if len(frame) != FRAME_LEN or frame[0] != START_BYTE or calculate_checksum(frame) != frame[8]:
+        return None
+    if frame[1] == CMD_ACTIVE_UPLOAD:
+        return (frame[4] << 8) | frame[5]
+    return (frame[6] << 8) | frame[7]
+
+
+class FrameReassembler:
+    """9字节帧流式重组"""
+    def __init__(self):
+        self.buf = bytearray()
+        self.frames = 0  # 校验通过的帧数
+        self.resyncs = 0  # 起始字节后校验失败、跳过重新同步的次数
+        self.dropped_bytes = 0  # 丢弃的非帧字节数
+
+    def feed(self, data):
+        """追加收到的数据，返回其中的 [CO浓度(ppm), ...]"""
+        buf = self.buf
+        buf.extend(data)
+        readings = []
+        pos = 0
+        while True:
+            start = buf.find(START_BYTE, pos)
+            if start < 0:
+                self.dropped_bytes += len(buf) - pos
+                pos = len(buf)
+                break
+            self.dropped_bytes += start - pos
+            if len(buf) - start < FRAME_LEN:
+                pos = start
+                break
+            ppm = decode_frame(buf[start:start + FRAME_LEN])
+            if ppm is None:
+                self.resyncs += 1
+                self.dropped_bytes += 1
+                pos = start + 1
+                continue
+            readings.append(ppm)
+            self.frames += 1
+            pos = start + FRAME_LEN
+        del buf[:pos]
+        return readings
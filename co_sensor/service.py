@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CO 传感器多串口采集服务（asyncio）
+功能：
+- 一个进程内并发管理 N 个串口，每个串口独立配置主动上报或被动查询模式
+- 字节流按9字节帧重组，起始字节或校验和错误时重新同步（co_sensor.protocol.FrameReassembler）
+- 读数按批发布到 MQTT，与跌倒检测数据同在 up/<站点ID> 主题下，事件类型为 CO_DATA
+- POSIX 下串口用事件循环的 add_reader 读取，Windows 下按 POLL_INTERVAL 轮询
+
+用法示例：
+    python -m co_sensor.service --port /dev/ttyUSB0 --port /dev/ttyUSB1:passive:2
+    python -m co_sensor.service --port COM4 --port COM5:passive --site 862701086120524 --no-mqtt
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import serial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from co_sensor.protocol import CMD_SET_ACTIVE, CMD_SET_PASSIVE, CMD_READ, FrameReassembler
+
+# ====== 用户配置区 ======
+MQTT_BROKER = "120.27.250.30"  # MQTT服务器地址
+MQTT_PORT = 1883
+SITE_ID = "862701086120524"  # 站点ID，与跌倒检测设备的IMEI一致时读数发布到同一主题
+BAUD_RATE = 9600
+READ_INTERVAL = 2.0  # 被动模式默认查询间隔（秒）
+BATCH_SIZE = 50  # 每批最多读数条数
+BATCH_INTERVAL = 5.0  # 未满一批时的最长发布间隔（秒）
+POLL_INTERVAL = 0.01  # 不支持 add_reader 时的轮询间隔（秒）
+# =======================
+
+
+class PortConfig:
+    """单个串口的配置"""
+    def __init__(self, path, mode='active', interval=READ_INTERVAL, baudrate=BAUD_RATE, name=None):
+        if mode not in ('active', 'passive'):
+            raise ValueError("mode 必须是 'active' 或 'passive'")
+        self.path = path
+        self.mode = mode
+        self.interval = interval
+        self.baudrate = baudrate
+        self.name = name or os.path.basename(path)
+
+    @classmethod
+    def parse(cls, spec):
+        """解析 路径[:模式[:间隔]]，如 /dev/ttyUSB1:passive:2"""
+        parts = spec.split(':')
+        # Windows 串口名不含冒号，路径中的冒号只出现在模式之前
+        path = parts[0]
+        mode = parts[1] if len(parts) > 1 and parts[1] else 'active'
+        interval = float(parts[2]) if len(parts) > 2 else READ_INTERVAL
+        return cls(path, mode, interval)
+
+
+class ReadingBatcher:
+    """收集各串口读数，满 batch_size 条或超过 batch_interval 秒时发布一批"""
+    def __init__(self, publish, site_id, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL):
+        self.publish = publish  # publish(主题, 载荷bytes)
+        self.topic = f"up/{site_id}"
+        self.site_id = site_id
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.pending = []
+        self.batches = 0
+        self.published_readings = 0
+
+    def add(self, port, ppm, ts):
+        self.pending.append({'timestamp': ts, 'port': port, 'co_ppm': ppm})
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        payload = json.dumps({'event': 'CO_DATA', 'site': self.site_id, 'data': self.pending})
+        self.publish(self.topic, payload.encode('utf-8'))
+        self.batches += 1
+        self.published_readings += len(self.pending)
+        self.pending = []
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            self.flush()
+
+
+class SensorPort:
+    """一个串口上的CO传感器"""
+    def __init__(self, config, batcher):
+        self.config = config
+        self.batcher = batcher
+        self.reassembler = FrameReassembler()
+        self.readings = 0
+        self.last_ppm = None
+        self.queries = 0
+        self.errors = 0  # 读串口出错次数
+        self.failure = None  # 串口打开、读取或写入失败时的异常，该串口停止采集
+        self.ser = None
+        self.fd = None  # 用 add_reader 读取时的文件描述符
+        self.read_error = None  # run() 中创建的 Future，读串口出错时以异常为结果，通知 run() 关闭串口
+
+    def _on_readable(self):
+        try:
+            if self.fd is not None:
+                # 直接读文件描述符：pyserial 的 read 内部用 select()，描述符超过1024时出错
+                data = os.read(self.fd, 4096)
+                if not data:
+                    # 可读却读不到数据：设备已断开（与 pyserial 的 read 相同的判断）
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+            else:
+                data = self.ser.read(self.ser.in_waiting)
+        except (OSError, serial.SerialException) as e:
+            # 断开的串口一直可读，继续监听会反复回调空转：停止读取，由 run() 关闭串口并记录失败
+            self.errors += 1
+            self._stop_reading(e)
+            return
+        if not data:
+            return
+        ts = time.strftime('%Y-%m-%d %H:%M:%S')
+        for ppm in self.reassembler.feed(data):
+            self.readings += 1
+            self.last_ppm = ppm
+            self.batcher.add(self.config.name, ppm, ts)
+
+    def _stop_reading(self, error):
+        if self.fd is not None:
+            asyncio.get_running_loop().remove_reader(self.fd)
+            self.fd = None
+        if not self.read_error.done():
+            self.read_error.set_result(error)
+
+    async def _poll_reader(self):
+        while not self.read_error.done():
+            self._on_readable()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _sleep(self, seconds):
+        """等待 seconds 秒，期间读串口出错时抛出该异常"""
+        await asyncio.wait((self.read_error,), timeout=seconds)
+        if self.read_error.done():
+            raise self.read_error.result()
+
+    async def run(self):
+        config = self.config
+        loop = asyncio.get_running_loop()
+        self.read_error = loop.create_future()
+        try:
+            # write_timeout=0：写入不等待发送完成，9字节命令不会阻塞事件循环
+            self.ser = serial.Serial(config.path, config.baudrate, timeout=0, write_timeout=0)
+        except (OSError, serial.SerialException) as e:
+            self.failure = e
+            print(f"❌ 无法打开串口 {config.path}: {e}")
+            return
+        poller = None
+        try:
+            self.ser.write(CMD_SET_ACTIVE if config.mode == 'active' else CMD_SET_PASSIVE)
+            await asyncio.sleep(0.5)  # 等待模组处理模式设置指令
+            self.ser.reset_input_buffer()
+            try:
+                loop.add_reader(self.ser.fileno(), self._on_readable)
+                self.fd = self.ser.fileno()
+            except (NotImplementedError, AttributeError):
+                poller = asyncio.ensure_future(self._poll_reader())
+            while True:
+                if config.mode == 'passive':
+                    self.ser.write(CMD_READ)
+                    self.queries += 1
+                    await self._sleep(config.interval)
+                else:
+                    await self._sleep(3600)
+        except (OSError, serial.SerialException) as e:
+            self.failure = e
+            print(f"❌ 串口 {config.path} 读写失败，停止采集: {e}")
+        finally:
+            if poller is not None:
+                poller.cancel()
+            elif self.fd is not None:
+                loop.remove_reader(self.fd)
+                self.fd = None
+            self.ser.close()
+
+
+class CoService:
+    """多串口采集服务"""
+    def __init__(self, configs, publish, site_id=SITE_ID, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL):
+        self.batcher = ReadingBatcher(publish, site_id, batch_size, batch_interval)
+        self.ports = [SensorPort(config, self.batcher) for config in configs]
+
+    async def run(self, duration=None):
+        """运行 duration 秒（None 表示一直运行），结束时发布剩余读数"""
+        tasks = [asyncio.ensure_future(port.run()) for port in self.ports]
+        tasks.append(asyncio.ensure_future(self.batcher.run()))
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.batcher.flush()
+
+    def stats(self):
+        """[(名称, 模式, 读数, 最新浓度, 重新同步次数, 丢弃字节数)]"""
+        return [(p.config.name, p.config.mode, p.readings, p.last_ppm, p.reassembler.resyncs,
+                 p.reassembler.dropped_bytes) for p in self.ports]
+
+
+def mqtt_publisher(broker, port):
+    """返回 publish(主题, 载荷) 函数，paho 在自己的线程中发送，不阻塞事件循环"""
+    import paho.mqtt.client as mqtt
+    client = mqtt.Client(client_id=f"co_service_{os.getpid()}", callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+    client.connect_async(broker, port, keepalive=60)
+    client.loop_start()
+
+    def publish(topic, payload):
+        client.publish(topic, payload, qos=0)
+    return publish
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CO 传感器多串口采集服务")
+    parser.add_argument("--port", action="append", required=True, help="串口[:active|passive[:查询间隔秒]]，可重复")
+    parser.add_argument("--site", default=SITE_ID, help="站点ID（MQTT主题 up/<站点ID>）")
+    parser.add_argument("--broker", default=MQTT_BROKER, help="MQTT服务器地址")
+    parser.add_argument("--mqtt-port", type=int, default=MQTT_PORT, help="MQTT端口")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批最多读数条数")
+    parser.add_argument("--batch-interval", type=float, default=BATCH_INTERVAL, help="最长发布间隔（秒）")
+    parser.add_argument("--duration", type=float, default=None, help="运行时长（秒），缺省一直运行")
+    parser.add_argument("--no-mqtt", action="store_true", help="不连接MQTT，只打印每批的读数条数")
+    args = parser.parse_args()
+
+    if args.no_mqtt:
+        def publish(topic, payload):
+            print(f"[{topic}] {len(json.loads(payload)['data'])} 条读数，{len(payload)} 字节")
+    else:
+        publish = mqtt_publisher(args.broker, args.mqtt_port)
+    service = CoService([PortConfig.parse(spec) for spec in args.port], publish, args.site,
+                        args.batch_size, args.batch_interval)
+    try:
+        asyncio.run(service.run(args.duration))
+    except KeyboardInterrupt:
+        print("\n🛑 用户中断程序")
+    for name, mode, readings, last_ppm, resyncs, dropped in service.stats():
+        print(f"{name} [{mode}] 读数 {readings}，最新 {last_ppm} ppm，重新同步 {resyncs}，丢弃字节 {dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CO 传感器多路仿真器（Linux pty，asyncio）
+功能：
+- 每个传感器一对 pty，从端路径交给 co_sensor.service 或 read_co.py 当作串口使用
+- 响应模式设置指令（0x78 0x40 主动上报 / 0x78 0x41 被动查询），主动模式按周期发送 0x19 上报帧，
+  被动模式对读取命令(0x86)返回浓度帧
+- 浓度在基准值附近随机游走；可注入帧间杂散字节和校验和错误，用于检验重新同步
+
+用法示例：
+    python -m co_sensor.simulator --count 8
+    python -m co_sensor.simulator --count 32 --period 0.2 --noise-rate 0.05 --bad-checksum-rate 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import pty
+import random
+import sys
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from co_sensor.protocol import FRAME_LEN, START_BYTE, CMD_ACTIVE_UPLOAD, CMD_READ_CO, make_frame
+from read_co import calculate_checksum
+
+CMD_SET_MODE = 0x78
+MODE_ACTIVE = 0x40
+MODE_PASSIVE = 0x41
+
+
+class SimulatedSensor:
+    """一个 pty 上的CO传感器"""
+    def __init__(self, base_ppm=20, period=1.0, mode='active', noise_rate=0.0, bad_checksum_rate=0.0, seed=None):
+        self.ppm = base_ppm
+        self.base_ppm = base_ppm
+        self.period = period  # 主动上报周期（秒）
+        self.mode = mode
+        self.noise_rate = noise_rate  # 每帧前插入杂散字节的概率
+        self.bad_checksum_rate = bad_checksum_rate
+        self.random = random.Random(seed)
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.path = os.ttyname(self.slave_fd)
+        self.buf = bytearray()
+        self.sent_frames = 0
+        self.requests = 0
+        self.injected_noise = 0
+        self.injected_bad_checksums = 0
+        self.overruns = 0  # 对端不读取、pty缓冲区满而丢弃的帧
+
+    def next_ppm(self):
+        self.ppm = max(0, min(5000, self.ppm + self.random.randint(-2, 2)))
+        return self.ppm
+
+    def send(self, frame):
+        data = frame
+        if self.random.random() < self.bad_checksum_rate:
+            self.injected_bad_checksums += 1
+            data = frame[:-1] + bytes([frame[-1] ^ 0x5A])
+        if self.random.random() < self.noise_rate:
+            # 杂散字节中带一个起始字节，迫使接收端在错误位置开始组帧
+            self.injected_noise += 1
+            data = bytes([START_BYTE, self.random.randint(0, 0xFE)]) + data
+        try:
+            os.write(self.master_fd, data)
+            self.sent_frames += 1
+        except BlockingIOError:
+            self.overruns += 1
+
+    def active_frame(self):
+        ppm = self.next_ppm()
+        return make_frame(CMD_ACTIVE_UPLOAD, [0x04, 0x00, ppm >> 8, ppm & 0xFF, 0x13, 0x88])
+
+    def read_response(self):
+        ppm = self.next_ppm()
+        return make_frame(CMD_READ_CO, [0x00, 0x00, 0x00, 0x00, ppm >> 8, ppm & 0xFF])
+
+    def on_readable(self):
+        try:
+            self.buf.extend(os.read(self.master_fd, 256))
+        except (BlockingIOError, OSError):
+            return
+        buf = self.buf
+        while len(buf) >= FRAME_LEN:
+            if buf[0] != START_BYTE or calculate_checksum(buf[:FRAME_LEN]) != buf[8]:
+                del buf[0]
+                continue
+            frame = bytes(buf[:FRAME_LEN])
+            del buf[:FRAME_LEN]
+            self.requests += 1
+            if frame[2] == CMD_SET_MODE:
+                self.mode = 'active' if frame[3] == MODE_ACTIVE else 'passive'
+            elif frame[2] == CMD_READ_CO:
+                self.send(self.read_response())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.master_fd, self.on_readable)
+        try:
+            while True:
+                await asyncio.sleep(self.period)
+                if self.mode == 'active':
+                    self.send(self.active_frame())
+        finally:
+            loop.remove_reader(self.master_fd)
+
+    def close(self):
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+class SensorBank:
+    """N 路仿真传感器，在同一个事件循环中运行"""
+    def __init__(self, count, period=1.0, noise_rate=0.0, bad_checksum_rate=0.0, seed=None):
+        rng = random.Random(seed)
+        self.sensors = [SimulatedSensor(rng.randint(5, 60), period, 'active', noise_rate, bad_checksum_rate,
+                                        rng.random()) for _ in range(count)]
+        self.tasks = []
+
+    @property
+    def paths(self):
+        return [sensor.path for sensor in self.sensors]
+
+    def start(self):
+        self.tasks = [asyncio.ensure_future(sensor.run()) for sensor in self.sensors]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for sensor in self.sensors:
+            sensor.close()
+
+
+async def run_bank(bank, duration):
+    bank.start()
+    for i, path in enumerate(bank.paths):
+        print(f"传感器 {i}: {path}")
+    try:
+        await asyncio.sleep(duration if duration is not None else 1e9)
+    finally:
+        await bank.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CO 传感器多路仿真器（pty）")
+    parser.add_argument("--count", type=int, default=4, help="传感器数量")
+    parser.add_argument("--period", type=float, default=1.0, help="主动上报周期（秒）")
+    parser.add_argument("--noise-rate", type=float, default=0.0, help="帧前插入杂散字节的概率")
+    parser.add_argument("--bad-checksum-rate", type=float, default=0.0, help="校验和错误的概率")
+    parser.add_argument("--duration", type=float, default=None, help="运行时长（秒），缺省一直运行")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+
+    bank = SensorBank(args.count, args.period, args.noise_rate, args.bad_checksum_rate, args.seed)
+    try:
+        asyncio.run(run_bank(bank, args.duration))
+    except KeyboardInterrupt:
+        pass
+    for i, sensor in enumerate(bank.sensors):
+        print(f"传感器 {i} [{sensor.mode}] 发送 {sensor.sent_frames} 帧，收到指令 {sensor.requests}，"
+              f"注入杂散字节 {sensor.injected_noise}，校验和错误 {sensor.injected_bad_checksums}")
+
+
+if __name__ == "__main__":
+    main()
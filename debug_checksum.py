@@ -44,7 +44,7 @@ print(f"\n打包后的帧长度: {len(frame)}字节")
 print(f"帧内容 (十六进制): {' '.join(f'{b:02X}' for b in frame)}")
 
 # 从帧中提取校验和
-frame_checksum = frame[3 + len(data_bytes)]  # 2字节帧头 + 1字节命令 + 2字节长度 + 数据长度
+frame_checksum = frame[5 + len(data_bytes)]  # 2字节帧头 + 1字节命令 + 2字节长度 + 数据长度
 print(f"帧中的校验和: 0x{frame_checksum:02X}")
 
 # 验证打包后的校验和是否正确
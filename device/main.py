@@ -25,6 +25,11 @@ import pm
 import log
 import sim
 import dataCall
+import gc
+from stm32_protocol import (CMD_UP_DATA_UPLOAD, CMD_UP_CONFIG_REPLY, CMD_UP_HEARTBEAT, CMD_UP_RESET_REPLY,
+                            CMD_DOWN_CONFIG_SET, CMD_DOWN_HEARTBEAT_REPLY, CMD_DOWN_RESET,
+                            FrameReassembler, SAMPLE_FORMAT, checksum, pack_frame, unpack_frame,
+                            split_samples, unpack_samples)
 
 # 初始化 RTC
 rtc = RTC()
@@ -43,6 +48,19 @@ WATCHDOG_INTERVAL = 30  # 看门狗喂狗间隔（秒）
 STM32_TIMEOUT_INTERVAL = 600  # STM32数据超时检测间隔（秒）
 APP_VERSION = 1001  # 应用程序版本号，从1001开始编码
 UPLOAD_INTERVAL = 1  # 数据上传间隔（秒）
+SIM_RETRY_MAX = 30  # SIM卡检测最大重试次数（每次间隔1秒）
+NET_WAIT_TIMEOUT = 20  # 网络注册等待超时（秒）
+TIME_SYNC_TIMEOUT = 30  # 基站时间同步超时（秒）
+BOOT_BACKLOG_MAX_SAMPLES = 1500  # 网络就绪前缓存的最大样本数，超过后丢弃最旧的批次
+LOG_LEVEL = "INFO"  # 日志级别：DEBUG/INFO/WARN/ERROR/OFF，可通过下行命令 {"log_level": "..."} 修改
+LOG_RING_SIZE = 64  # 内存中保留的最近日志条数，可通过下行命令 {"log_dump": N} 上报
+LOG_RATE_LIMIT_MS = 5000  # 同一日志键的最小输出间隔（毫秒），期间的重复日志只计数
+LOOP_STATS_INTERVAL = 60  # 主循环耗时统计输出间隔（秒）
+GC_COLLECT_THRESHOLD = 64 * 1024  # 已分配堆内存超过该值时，在发布后的串口空闲窗口主动回收（字节），0表示不主动回收
+UPLINK_BUFFER_SIZE = 24 * 1024  # 传感器数据上行报文缓冲区初始大小（字节），批次超出时自动扩大
+SOCKET_WRITE_TIMEOUT_MS = 5000  # 发送一个上行报文的最长时间（毫秒），socket 发送缓冲区持续满时超时视为发布失败
+SOCKET_WRITE_RETRY_MS = 20  # socket 发送缓冲区满（write 返回 None）时重试的间隔（毫秒）
+UART_READ_CHUNK = 512  # 每轮从串口读取的最大字节数，未读完的数据下一轮再读，未收齐的帧由 FrameReassembler 保留
 
 # 设备IMEI号，用于确保MQTT客户端唯一性
 import modem
@@ -52,25 +70,187 @@ except Exception as e:
     print("获取IMEI失败: %s" % e)
     IMEI = "123456789012345"  # 默认值
 
+# 命令码、帧格式和传感器样本结构定义在 stm32_protocol 中，与电脑端模拟器、校验脚本共用
+
+# =============================================================================
+# 日志级别定义
+# =============================================================================
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARN = 30
+LOG_ERROR = 40
+LOG_OFF = 100
+LOG_LEVEL_NAMES = {'DEBUG': LOG_DEBUG, 'INFO': LOG_INFO, 'WARN': LOG_WARN, 'ERROR': LOG_ERROR, 'OFF': LOG_OFF}
+
+
+# =============================================================================
+# 网关日志类
+# 分级输出、按日志键限流，并在内存环形缓冲区中保留最近的日志供下行命令导出。
+# 控制台是低速串口，热路径调用前先判断 logger.level，关闭时不产生格式化开销
+# =============================================================================
+class GatewayLogger:
+    """网关日志类 - Quectel专用"""
+    def __init__(self, level, ring_size, rate_limit_ms):
+        self.level = LOG_INFO
+        self.set_level(level)
+        self.console = True  # 是否输出到控制台串口
+        self._ring = [None] * ring_size
+        self._ring_pos = 0
+        self._rate_limit_ms = rate_limit_ms
+        self._rate_state = {}  # 日志键 -> [上次输出的ticks_ms, 期间被抑制的条数]
+
+    def set_level(self, level):
+        """设置日志级别，支持级别名（不区分大小写）或数值，返回是否设置成功"""
+        if isinstance(level, str):
+            level = LOG_LEVEL_NAMES.get(level.upper())
+        if not isinstance(level, int):
+            return False
+        self.level = level
+        return True
+
+    def level_name(self):
+        """当前日志级别名"""
+        for name, value in LOG_LEVEL_NAMES.items():
+            if value == self.level:
+                return name
+        return str(self.level)
+
+    def log(self, level, msg, args=None, key=None):
+        """输出一条日志；key 不为空时同一键在限流间隔内只输出一次"""
+        if level < self.level:
+            return
+        now = utime.ticks_ms()
+        suppressed = 0
+        if key is not None:
+            state = self._rate_state.get(key)
+            if state is not None:
+                if utime.ticks_diff(now, state[0]) < self._rate_limit_ms:
+                    state[1] += 1
+                    return
+                suppressed = state[1]
+                state[0] = now
+                state[1] = 0
+            else:
+                self._rate_state[key] = [now, 0]
+        if args is not None:
+            msg = msg % args
+        if suppressed:
+            msg = "%s (期间另有 %d 条被抑制)" % (msg, suppressed)
+        self._ring[self._ring_pos] = (now, level, msg)
+        self._ring_pos = (self._ring_pos + 1) % len(self._ring)
+        if self.console:
+            print(msg)
+
+    def debug(self, msg, args=None, key=None):
+        if self.level <= LOG_DEBUG:
+            self.log(LOG_DEBUG, msg, args, key)
+
+    def info(self, msg, args=None, key=None):
+        if self.level <= LOG_INFO:
+            self.log(LOG_INFO, msg, args, key)
+
+    def warn(self, msg, args=None, key=None):
+        if self.level <= LOG_WARN:
+            self.log(LOG_WARN, msg, args, key)
+
+    def error(self, msg, args=None, key=None):
+        if self.level <= LOG_ERROR:
+            self.log(LOG_ERROR, msg, args, key)
+
+    def dump(self, count=None):
+        """按时间顺序返回最近 count 条日志，每条为 [ticks_ms, 级别, 内容]"""
+        size = len(self._ring)
+        entries = []
+        for i in range(size):
+            entry = self._ring[(self._ring_pos + i) % size]
+            if entry is not None:
+                entries.append([entry[0], entry[1], entry[2]])
+        if count is not None and count < len(entries):
+            entries = entries[len(entries) - count:]
+        return entries
+
+
+logger = GatewayLogger(LOG_LEVEL, LOG_RING_SIZE, LOG_RATE_LIMIT_MS)
+
+
 # =============================================================================
-# 命令码定义（明确区分上行和下行）
+# 主循环耗时统计类
+# 记录每轮主循环的处理耗时（不含休眠），用于评估日志、GC等对串口服务间隔的影响
 # =============================================================================
-# 上行命令（STM32 → 4G → 云端）
-CMD_UP_DATA_UPLOAD = 0x01      # 传感器数据上传
-CMD_UP_CONFIG_REPLY = 0x03     # 配置参数回复
-CMD_UP_HEARTBEAT = 0x04        # 心跳包
-CMD_UP_RESET_REPLY = 0x07      # 复位命令回复
+class LoopStats:
+    """主循环耗时统计"""
+    def __init__(self):
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.window_max_us = 0  # 本统计周期内的最大耗时
+
+    def record(self, elapsed_us):
+        self.count += 1
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        if elapsed_us > self.window_max_us:
+            self.window_max_us = elapsed_us
+
+    def avg_us(self):
+        return self.total_us // self.count if self.count else 0
+
+
+loop_stats = LoopStats()
 
-# 下行命令（云端 → 4G → STM32）
-CMD_DOWN_CONFIG_SET = 0x02     # 配置参数设置
-CMD_DOWN_HEARTBEAT_REPLY = 0x05  # 心跳包回复
-CMD_DOWN_RESET = 0x06          # 复位命令
 
 # =============================================================================
-# 帧格式常量
+# 堆内存统计类
+# 记录空闲/已分配内存水位、主动GC的次数和耗时，以及平均每帧分配的字节数。
+# gc.mem_free()/gc.mem_alloc() 需要扫描分配表，只在发布后的空闲窗口和统计输出时采样
 # =============================================================================
-FRAME_HEADER = b'\xAA\x55'
-FRAME_TAIL = b'\x55\xAA'
+class HeapStats:
+    """堆内存统计与GC调度"""
+    def __init__(self):
+        self.min_free = -1  # 空闲内存最低水位
+        self.max_alloc = 0  # 已分配内存最高水位
+        self.collections = 0  # 主动回收次数
+        self.collect_total_us = 0
+        self.collect_max_us = 0
+        self.frames = 0  # 自上次主动回收以来处理的帧数
+        self.bytes_per_frame = 0  # 最近一次回收前统计的平均每帧分配字节数
+        self._alloc_after_collect = gc.mem_alloc()
+
+    def sample(self):
+        """采样当前堆内存并更新水位，返回已分配字节数"""
+        free = gc.mem_free()
+        alloc = gc.mem_alloc()
+        if self.min_free < 0 or free < self.min_free:
+            self.min_free = free
+        if alloc > self.max_alloc:
+            self.max_alloc = alloc
+        return alloc
+
+    def collect_if_needed(self, threshold):
+        """已分配内存超过阈值时主动回收，返回是否执行了回收"""
+        alloc = self.sample()
+        if threshold <= 0 or alloc < threshold:
+            return False
+        # 两次主动回收之间如发生过自动回收，已分配内存会变小，此时不更新每帧分配量
+        if self.frames and alloc > self._alloc_after_collect:
+            self.bytes_per_frame = (alloc - self._alloc_after_collect) // self.frames
+        start_us = utime.ticks_us()
+        gc.collect()
+        elapsed_us = utime.ticks_diff(utime.ticks_us(), start_us)
+        self.collections += 1
+        self.collect_total_us += elapsed_us
+        if elapsed_us > self.collect_max_us:
+            self.collect_max_us = elapsed_us
+        self._alloc_after_collect = gc.mem_alloc()
+        self.frames = 0
+        return True
+
+    def avg_collect_us(self):
+        return self.collect_total_us // self.collections if self.collections else 0
+
+
+heap_stats = HeapStats()
 
 
 # =============================================================================
@@ -84,16 +264,17 @@ class STM32Communication:
         self.baudrate = baudrate
         self.ser = None
         self.is_connected = False
+        self.reassembler = FrameReassembler()
 
     def connect(self):
         """连接串口"""
         try:
             self.ser = UART(self.port, self.baudrate, 8, 0, 1, 0)
             self.is_connected = True
-            print("串口连接成功")
+            logger.info("串口连接成功")
             return True
         except Exception as e:
-            print("串口连接失败: %s" % e)
+            logger.warn("串口连接失败: %s", (e,))
             self.is_connected = False
             return False
 
@@ -102,99 +283,35 @@ class STM32Communication:
         if self.ser:
             self.ser = None
             self.is_connected = False
-            print("串口已断开")
+            logger.info("串口已断开")
 
     def calculate_checksum(self, cmd, data_len, data):
         """计算校验和（异或校验）"""
-        checksum = cmd
-        checksum ^= (data_len >> 8) & 0xFF
-        checksum ^= data_len & 0xFF
-        for byte in data:
-            checksum ^= byte
-        return checksum
+        return checksum(cmd, data_len, data)
 
     def pack_frame(self, cmd, data=b''):
         """打包数据帧"""
-        data_len = len(data)
-        checksum = self.calculate_checksum(cmd, data_len, data)
-        frame = (
-            FRAME_HEADER +
-            struct.pack('B', cmd) +
-            struct.pack('H', data_len) +
-            data +
-            struct.pack('B', checksum) +
-            FRAME_TAIL
-        )
-        return frame
+        return pack_frame(cmd, data)
 
     def unpack_frame(self, frame):
         """解包数据帧"""
-        try:
-            # 验证帧头和帧尾
-            if frame[:2] != FRAME_HEADER or frame[-2:] != FRAME_TAIL:
-                return None, None, None
-
-            # 解析命令码和数据长度
-            cmd = struct.unpack('B', frame[2:3])[0]
-            data_len = struct.unpack('H', frame[3:5])[0]
-
-            # 验证数据长度
-            if data_len != len(frame[5:-3]):
-                return None, None, None
-
-            # 验证校验和
-            checksum = struct.unpack('B', frame[5 + data_len:6 + data_len])[0]
-            calculated_checksum = self.calculate_checksum(cmd, data_len, frame[5:-3])
-            if checksum != calculated_checksum:
-                return None, None, None
-
-            # 返回命令码和数据域
-            return cmd, data_len, frame[5:-3]
-        except Exception as e:
-            print("帧解析失败: %s" % e)
-            return None, None, None
+        return unpack_frame(frame)
 
     def read_frame(self):
-        """读取完整数据帧 - 轻量级版本，降低资源消耗"""
+        """读取串口数据，返回其中完整的数据帧 [(命令码, 数据长度, 数据域), ...]
+
+        跨越多次读取的帧由 FrameReassembler 拼接，每轮最多读 UART_READ_CHUNK 字节
+        """
         if not self.is_connected or not self.ser:
             return []
 
         try:
-            if self.ser.any() == 0:
+            count = self.ser.any()
+            if count == 0:
                 return []
-                
-            # 读取少量数据，避免内存消耗过大
-            raw_data = self.ser.read(128)  # 限制读取字节数
-            
-            frames = []
-            buffer = raw_data
-            while True:
-                header_pos = buffer.find(FRAME_HEADER)
-                if header_pos == -1:
-                    break
-
-                buffer = buffer[header_pos:]
-
-                if len(buffer) < 8:
-                    break
-
-                data_len = struct.unpack('H', buffer[3:5])[0]
-                total_frame_length = 2 + 1 + 2 + data_len + 1 + 2
-
-                if len(buffer) < total_frame_length:
-                    break
-
-                if buffer[total_frame_length - 2:total_frame_length] == FRAME_TAIL:
-                    frame = buffer[:total_frame_length]
-                    cmd, data_len, data = self.unpack_frame(frame)
-                    frames.append((cmd, data_len, data))
-                    buffer = buffer[total_frame_length:]
-                else:
-                    buffer = buffer[1:]
-                    
-            return frames
-                
+            return self.reassembler.feed(self.ser.read(min(count, UART_READ_CHUNK)))
         except Exception as e:
+            logger.warn("读取串口数据失败: %s", (e,), key='uart_rx')
             return []
 
     def send_frame(self, cmd, data=b''):
@@ -207,7 +324,7 @@ class STM32Communication:
             self.ser.write(frame)
             return True
         except Exception as e:
-            print("发送帧失败: %s" % e)
+            logger.warn("发送帧失败: %s", (e,), key='uart_tx')
             return False
 
     def format_timestamp(self, timestamp=None):
@@ -220,24 +337,33 @@ class STM32Communication:
                 rtc_time[4], rtc_time[5], rtc_time[6]
             )
         except Exception as e:
-            print("时间格式化失败: %s" % e)
+            logger.warn("时间格式化失败: %s", (e,), key='format_time')
             return str(timestamp)
 
+    def split_sensor_samples(self, data):
+        """将传感器数据上传帧的数据域按样本切分，返回原始样本字节列表（首字节为包序）
+
+        主循环只保存原始样本，上传时由 SensorBatchEncoder 直接编码，
+        避免为每个样本创建字典
+        """
+        samples = split_samples(data)
+        if not samples:
+            logger.warn("传感器数据长度 %d 不是样本长度的整数倍", (len(data),), key='decode')
+        return samples
+
     def parse_sensor_data(self, data):
         """解析传感器数据上传帧 - 轻量级版本"""
         sensor_data_list = []
-        sample_length = 47
 
-        if len(data) % sample_length != 0:
+        try:
+            samples = unpack_samples(data)
+        except ValueError:
             return sensor_data_list
 
         formatted_time = self.format_timestamp()
-        
-        sample_count = len(data) // sample_length
-        for i in range(sample_count):
-            sample_data = data[i * sample_length:(i + 1) * sample_length]
+
+        for i, sensor_data in enumerate(samples):
             try:
-                sensor_data = struct.unpack('<BhhhhhhhhhhhIfdd', sample_data)
                 # 确保经度和纬度保留足够的精度（至少8位小数）
                 # 处理高度参数的精度问题
                 altitude = sensor_data[13]
@@ -282,13 +408,10 @@ class STM32Communication:
                 # print("=" * 60)
                 
             except Exception as e:
-                print("解析第 %d 组传感器数据失败: %s" % (i+1, e))
-                import sys
-                print("错误类型: %s" % type(e))
-                print("错误信息: %s" % e)
-                print("错误位置: %s" % sys.exc_info()[2])
+                logger.warn("解析第 %d 组传感器数据失败: %s", (i+1, e), key='decode')
 
-        print("传感器数据解析完成，共成功解析 %d 组数据" % len(sensor_data_list))
+        if logger.level <= LOG_DEBUG:
+            logger.log(LOG_DEBUG, "传感器数据解析完成，共成功解析 %d 组数据", (len(sensor_data_list),), key='parse')
         return sensor_data_list
 
     def parse_config_data(self, data):
@@ -301,7 +424,7 @@ class STM32Communication:
             }
             return config
         except Exception as e:
-            print("解析配置参数失败: %s" % e)
+            logger.warn("解析配置参数失败: %s", (e,))
             return None
 
     def parse_heartbeat_data(self, data):
@@ -310,7 +433,7 @@ class STM32Communication:
             status = struct.unpack('B', data[0:1])[0]
             return status
         except Exception as e:
-            print("解析心跳包失败: %s" % e)
+            logger.warn("解析心跳包失败: %s", (e,))
             return None
 
     def parse_reset_data(self, data):
@@ -319,10 +442,91 @@ class STM32Communication:
             reset_type = struct.unpack('B', data[0:1])[0]
             return reset_type
         except Exception as e:
-            print("解析复位命令失败: %s" % e)
+            logger.warn("解析复位命令失败: %s", (e,))
             return None
 
 
+# =============================================================================
+# 传感器数据流式编码
+# 样本记录为 [原始样本字节, 时间戳秒数]。编码器在预分配的缓冲区中先预留MQTT报头，
+# 逐个样本写入JSON片段，最后在载荷前补写报头，整个PUBLISH报文一次写入socket，
+# 不再生成字典列表、完整JSON字符串及其编码副本
+# =============================================================================
+SENSOR_JSON_HEAD = ('{"packet_order":%d,"accel_x":%d,"accel_y":%d,"accel_z":%d,'
+                    '"gyro_x":%d,"gyro_y":%d,"gyro_z":%d,"angle_x":%d,"angle_y":%d,"angle_z":%d,'
+                    '"attitude1":%d,"attitude2":%d,"pressure":%d,')
+SENSOR_JSON_TAIL = '"timestamp":"%s","version":%d}'
+SENSOR_JSON_FORMAT = SENSOR_JSON_HEAD + '"altitude":%.2f,"longitude":%.8f,"latitude":%.8f,' + SENSOR_JSON_TAIL
+# 浮点数为NaN/Inf时使用的格式，对应字段输出null，保证JSON合法
+SENSOR_JSON_FORMAT_NULLABLE = SENSOR_JSON_HEAD + '"altitude":%s,"longitude":%s,"latitude":%s,' + SENSOR_JSON_TAIL
+
+
+def _json_float(value, fmt):
+    """格式化JSON浮点数，NaN/Inf 输出 null"""
+    return fmt % value if value - value == 0 else 'null'
+
+
+def encode_sensor_sample(raw, epoch):
+    """将一个原始样本编码为JSON对象字符串，字段与 parse_sensor_data 的结果一致"""
+    v = struct.unpack(SAMPLE_FORMAT, raw)
+    # x - x 对NaN/Inf不为0
+    if v[13] - v[13] == 0 and v[14] - v[14] == 0 and v[15] - v[15] == 0:
+        return SENSOR_JSON_FORMAT % (v + (format_epoch(epoch), APP_VERSION))
+    return SENSOR_JSON_FORMAT_NULLABLE % (v[:13] + (_json_float(v[13], '%.2f'), _json_float(v[14], '%.8f'),
+                                                    _json_float(v[15], '%.8f'), format_epoch(epoch), APP_VERSION))
+
+
+class SensorBatchEncoder:
+    """传感器数据批次编码器 - 直接生成QoS0的MQTT PUBLISH报文"""
+    def __init__(self, topic, capacity):
+        self.topic = topic.encode('utf-8')
+        # 固定报头(1) + 剩余长度(最多4) + 主题长度(2) + 主题
+        self._reserve = 1 + 4 + 2 + len(self.topic)
+        self.buf = bytearray(capacity)
+        self._pos = 0
+        self._payload_head = b'{"event":"SENSOR_DATA","data":['
+        self._payload_tail = ('],"version":%d}' % APP_VERSION).encode('utf-8')
+        self.grow_count = 0  # 缓冲区扩大次数
+
+    def _put(self, data):
+        end = self._pos + len(data)
+        if end > len(self.buf):
+            self.buf.extend(bytearray(max(end - len(self.buf), len(self.buf) // 2)))
+            self.grow_count += 1
+        self.buf[self._pos:end] = data
+        self._pos = end
+
+    def encode(self, records):
+        """编码一批样本记录，返回 (报文起始位置, 载荷起始位置, 结束位置)"""
+        self._pos = self._reserve
+        self._put(self._payload_head)
+        first = True
+        for raw, epoch in records:
+            if not first:
+                self._put(b',')
+            first = False
+            self._put(encode_sensor_sample(raw, epoch).encode('utf-8'))
+        self._put(self._payload_tail)
+
+        # 在载荷前补写报头
+        remaining = 2 + len(self.topic) + self._pos - self._reserve
+        header = bytearray(b'\x30')  # PUBLISH，QoS0，不保留
+        while True:
+            byte = remaining & 0x7F
+            remaining >>= 7
+            if remaining:
+                header.append(byte | 0x80)
+            else:
+                header.append(byte)
+                break
+        header.append(len(self.topic) >> 8)
+        header.append(len(self.topic) & 0xFF)
+        header.extend(self.topic)
+        start = self._reserve - len(header)
+        self.buf[start:self._reserve] = header
+        return start, self._reserve, self._pos
+
+
 # =============================================================================
 # MQTT客户端类
 # 负责与云端MQTT服务器的连接、数据发布和订阅功能
@@ -346,6 +550,8 @@ class MyMQTTClient:
         self.connection_check_interval = 30  # 连接状态检查间隔（秒）
         self.__nw_flag = True  # 网络状态标志
         self.mp_lock = _thread.allocate_lock()  # 创建互斥锁
+        self.pending_log_dump = 0  # 下行命令请求导出的日志条数，由主循环发布
+        self.uplink_encoder = SensorBatchEncoder(self.topic_up, UPLINK_BUFFER_SIZE)
 
     def _cleanup_connection(self):
         """清理旧的MQTT连接"""
@@ -353,7 +559,7 @@ class MyMQTTClient:
             try:
                 self.client.close()  # 使用close释放socket资源，而不是disconnect
             except Exception as e:
-                print("清理旧连接时出错: %s" % e)
+                logger.warn("清理旧连接时出错: %s", (e,))
             finally:
                 self.client = None
                 self.is_connected = False
@@ -369,7 +575,7 @@ class MyMQTTClient:
             self.client.connect(clean_session=True)
             self.client.set_callback(self.on_message)
             self.client.subscribe(self.topic_down.encode('utf-8'))
-            print("MQTT连接成功")
+            logger.info("MQTT连接成功")
             self.is_connected = True
             self.reconnect_attempts = 0  # 重置重连次数
             self.last_connection_check = utime.time()
@@ -377,7 +583,7 @@ class MyMQTTClient:
             dataCall.setCallback(self.nw_cb)
             return True
         except Exception as e:
-            print("MQTT连接失败: %s" % e)
+            logger.warn("MQTT连接失败: %s", (e,), key='connect_fail')
             self._cleanup_connection()
             return False
 
@@ -386,17 +592,17 @@ class MyMQTTClient:
         nw_sta = args[1]
         if nw_sta == 1:
             # 网络连接
-            print("*** 网络连接成功！ ***")
+            logger.info("*** 网络连接成功！ ***")
             self.__nw_flag = True
         else:
             # 网络断线
-            print("*** 网络连接断开！ ***")
+            logger.info("*** 网络连接断开！ ***")
             self.__nw_flag = False
             self.is_connected = False
 
     def _attempt_reconnect(self):
         """尝试重连MQTT服务器"""
-        print("正在尝试重新连接MQTT服务器...")
+        logger.info("正在尝试重新连接MQTT服务器...", key='reconnect')
         
         # 检查锁是否已经被获取
         if self.mp_lock.locked():
@@ -409,7 +615,7 @@ class MyMQTTClient:
             try:
                 self.client.close()
             except Exception as e:
-                print("关闭旧连接失败: %s" % e)
+                logger.warn("关闭旧连接失败: %s", (e,))
         
         # 重置连接状态
         self.client = None
@@ -436,19 +642,19 @@ class MyMQTTClient:
                         utime.sleep(5)
                         return False
                 except Exception as e:
-                    print("重连MQTT失败: %s" % e)
+                    logger.warn("重连MQTT失败: %s", (e,), key='reconnect_fail')
                     self.mp_lock.release()
                     utime.sleep(5)
                     return False
             else:
                 # 网络未恢复，等待恢复
-                print("网络拨号未激活，等待恢复...")
+                logger.warn("网络拨号未激活，等待恢复...", key='reconnect_net')
                 self.mp_lock.release()
                 utime.sleep(10)
                 return False
         else:
             # 网络未注册，等待恢复
-            print("网络未注册，等待恢复...")
+            logger.warn("网络未注册，等待恢复...", key='reconnect_net')
             self.mp_lock.release()
             utime.sleep(10)
             return False
@@ -465,7 +671,7 @@ class MyMQTTClient:
                     self.client.ping()
                     return True
                 except Exception as e:
-                    print("MQTT连接检查失败: %s" % e)
+                    logger.warn("MQTT连接检查失败: %s", (e,), key='ping')
                     self.is_connected = False
                     return False
             else:
@@ -474,62 +680,83 @@ class MyMQTTClient:
     def ensure_connected(self):
         """确保MQTT连接处于活动状态"""
         if not self.is_connected or not self.client:
-            print("MQTT未连接，尝试重连...")
+            logger.info("MQTT未连接，尝试重连...", key='reconnect_check')
             return self._attempt_reconnect()
         else:
             return True
 
     def on_message(self, topic, msg):
         """下行消息接收回调"""
-        print("收到下行控制消息: %s -> %s" % (topic.decode('utf-8'), msg.decode('utf-8')))
+        logger.info("收到下行控制消息: %s -> %s", (topic.decode('utf-8'), msg.decode('utf-8')))
         # 这里可以添加对下行命令的处理逻辑
         try:
             payload = ujson.loads(msg.decode('utf-8'))
             # 根据消息内容处理不同的下行命令
             if 'config' in payload:
-                print("收到配置参数设置命令")
+                logger.info("收到配置参数设置命令")
             elif 'reset' in payload:
-                print("收到复位命令")
+                logger.info("收到复位命令")
+            if 'log_level' in payload:
+                if logger.set_level(payload['log_level']):
+                    print("日志级别已设置为 %s" % logger.level_name())
+                else:
+                    logger.warn("无效的日志级别: %s", (payload['log_level'],))
+            if 'log_dump' in payload:
+                # 在监听线程中只记录请求，发布由主循环完成，避免与上行发布并发使用socket
+                self.pending_log_dump = int(payload['log_dump']) or LOG_RING_SIZE
         except Exception as e:
-            print("解析下行消息失败: %s" % e)
-
-    def publish_up_sensor_data(self, sensor_data_list):
-        """发布上行传感器数据到云端"""
+            logger.warn("解析下行消息失败: %s", (e,))
+
+    def _write_sensor_packet(self, start, payload_start, end):
+        """发送编码器缓冲区中的PUBLISH报文
+
+        umqtt 的QoS0发布只是把报文写入socket，有 sock 时直接写入整个报文；
+        否则退回 publish()，载荷以 memoryview 传入，不产生副本。
+        部分写入时继续写剩余字节；发送缓冲区满（write 返回 None）时间隔 SOCKET_WRITE_RETRY_MS 重试，
+        超过 SOCKET_WRITE_TIMEOUT_MS 仍未写完则抛出 OSError，由调用方按发布失败处理
+        """
+        mv = memoryview(self.uplink_encoder.buf)
+        sock = getattr(self.client, 'sock', None)
+        if sock is None:
+            self.client.publish(self.topic_up.encode('utf-8'), mv[payload_start:end], qos=0)
+            return
+        pos = start
+        start_ticks = utime.ticks_ms()
+        while pos < end:
+            n = sock.write(mv[pos:end])
+            if n is None:
+                if utime.ticks_diff(utime.ticks_ms(), start_ticks) > SOCKET_WRITE_TIMEOUT_MS:
+                    raise OSError("socket write timeout, %d of %d bytes sent" % (pos - start, end - start))
+                utime.sleep_ms(SOCKET_WRITE_RETRY_MS)
+                continue
+            if n <= 0:
+                raise OSError("socket write failed")
+            pos += n
+
+    def publish_up_sensor_records(self, records):
+        """发布上行传感器数据到云端（样本记录为 [原始样本字节, 时间戳秒数]）"""
         if not self.ensure_connected():
             return False
 
+        start, payload_start, end = self.uplink_encoder.encode(records)
         try:
-            # 为每个传感器数据添加版本字段
-            data_with_version = []
-            for sensor_data in sensor_data_list:
-                sensor_data['version'] = APP_VERSION
-                data_with_version.append(sensor_data)
-                
-            payload = ujson.dumps({
-                'event': 'SENSOR_DATA',
-                'data': data_with_version,
-                'version': APP_VERSION
-            })
-            self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上行传感器数据，共 %d 个样本，主题: %s" % (len(data_with_version), self.topic_up))
+            self._write_sensor_packet(start, payload_start, end)
+            if logger.level <= LOG_DEBUG:
+                logger.log(LOG_DEBUG, "已发布上行传感器数据，共 %d 个样本，%d 字节，主题: %s",
+                           (len(records), end - payload_start, self.topic_up), key='publish')
             return True
         except Exception as e:
-            print("发布上行传感器数据失败: %s" % e)
+            logger.warn("发布上行传感器数据失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
-                # 重连成功后再次尝试发布
+                # 重连成功后再次发送缓冲区中的报文
                 try:
-                    payload = ujson.dumps({
-                        'event': 'SENSOR_DATA',
-                        'data': data_with_version,
-                        'version': APP_VERSION
-                    })
-                    self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，共 %d 个样本，主题: %s" % (len(data_with_version), self.topic_up))
+                    self._write_sensor_packet(start, payload_start, end)
+                    logger.info("重连后发布成功，共 %d 个样本，主题: %s", (len(records), self.topic_up))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
 
@@ -541,10 +768,10 @@ class MyMQTTClient:
         try:
             payload = ujson.dumps({'status': status, 'version': APP_VERSION, 'event': 'HEARTBEAT'})
             self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上行心跳包，状态: %d，主题: %s" % (status, self.topic_up))
+            logger.debug("已发布上行心跳包，状态: %d，主题: %s", (status, self.topic_up), key='publish_heartbeat')
             return True
         except Exception as e:
-            print("发布上行心跳包失败: %s" % e)
+            logger.warn("发布上行心跳包失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
@@ -552,10 +779,10 @@ class MyMQTTClient:
                 try:
                     payload = ujson.dumps({'status': status, 'version': APP_VERSION, 'event': 'HEARTBEAT'})
                     self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，状态: %d，主题: %s" % (status, self.topic_up))
+                    logger.info("重连后发布成功，状态: %d，主题: %s", (status, self.topic_up))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
 
@@ -570,10 +797,10 @@ class MyMQTTClient:
             config_with_version['event'] = 'CONFIG_REPLY'
             payload = ujson.dumps(config_with_version)
             self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上行配置参数回复，配置: %s，主题: %s" % (str(config_with_version), self.topic_up))
+            logger.info("已发布上行配置参数回复，配置: %s，主题: %s", (str(config_with_version), self.topic_up))
             return True
         except Exception as e:
-            print("发布上行配置参数回复失败: %s" % e)
+            logger.warn("发布上行配置参数回复失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
@@ -584,10 +811,10 @@ class MyMQTTClient:
                     config_with_version['event'] = 'CONFIG_REPLY'
                     payload = ujson.dumps(config_with_version)
                     self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，配置: %s，主题: %s" % (str(config_with_version), self.topic_up))
+                    logger.info("重连后发布成功，配置: %s，主题: %s", (str(config_with_version), self.topic_up))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
 
@@ -599,10 +826,10 @@ class MyMQTTClient:
         try:
             payload = ujson.dumps({'reset_status': reset_status, 'version': APP_VERSION, 'event': 'RESET_REPLY'})
             self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上行复位命令回复，状态: %d，主题: %s" % (reset_status, self.topic_up))
+            logger.info("已发布上行复位命令回复，状态: %d，主题: %s", (reset_status, self.topic_up))
             return True
         except Exception as e:
-            print("发布上行复位命令回复失败: %s" % e)
+            logger.warn("发布上行复位命令回复失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
@@ -610,10 +837,10 @@ class MyMQTTClient:
                 try:
                     payload = ujson.dumps({'reset_status': reset_status, 'version': APP_VERSION, 'event': 'RESET_REPLY'})
                     self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，状态: %d，主题: %s" % (reset_status, self.topic_up))
+                    logger.info("重连后发布成功，状态: %d，主题: %s", (reset_status, self.topic_up))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
             
@@ -627,7 +854,7 @@ class MyMQTTClient:
                 rtc_time[4], rtc_time[5], rtc_time[6]
             )
         except Exception as e:
-            print("时间格式化失败: %s" % e)
+            logger.warn("时间格式化失败: %s", (e,), key='format_time')
             return str(timestamp)
 
     def publish_up_exception_event(self, event_type, description):
@@ -643,10 +870,10 @@ class MyMQTTClient:
                 'version': APP_VERSION
             })
             self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上行异常事件，类型: %s，描述: %s，主题: %s" % (event_type, description, self.topic_up))
+            logger.info("已发布上行异常事件，类型: %s，描述: %s，主题: %s", (event_type, description, self.topic_up))
             return True
         except Exception as e:
-            print("发布上行异常事件失败: %s" % e)
+            logger.warn("发布上行异常事件失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
@@ -659,10 +886,10 @@ class MyMQTTClient:
                         'version': APP_VERSION
                     })
                     self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，类型: %s，描述: %s，主题: %s" % (event_type, description, self.topic_up))
+                    logger.info("重连后发布成功，类型: %s，描述: %s，主题: %s", (event_type, description, self.topic_up))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
             
@@ -679,10 +906,10 @@ class MyMQTTClient:
                 'imei': self.imei
             })
             self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-            print("已发布上电事件，主题: %s" % self.topic_up)
+            logger.info("已发布上电事件，主题: %s", (self.topic_up,))
             return True
         except Exception as e:
-            print("发布上电事件失败: %s" % e)
+            logger.warn("发布上电事件失败: %s", (e,), key='publish_fail')
             self.is_connected = False
             # 尝试重连
             if self._attempt_reconnect():
@@ -695,17 +922,37 @@ class MyMQTTClient:
                         'imei': self.imei
                     })
                     self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
-                    print("重连后发布成功，主题: %s" % self.topic_up)
+                    logger.info("重连后发布成功，主题: %s", (self.topic_up,))
                     return True
                 except Exception as e2:
-                    print("重连后发布仍失败: %s" % e2)
+                    logger.error("重连后发布仍失败: %s", (e2,))
                     self.is_connected = False
             return False
  
+    def publish_up_log_dump(self, entries):
+        """发布内存中的最近日志到云端"""
+        if not self.ensure_connected():
+            return False
+
+        try:
+            payload = ujson.dumps({
+                'event': 'LOG_DUMP',
+                'level': logger.level_name(),
+                'entries': entries,
+                'version': APP_VERSION
+            })
+            self.client.publish(self.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
+            logger.info("已发布日志导出，共 %d 条，主题: %s", (len(entries), self.topic_up))
+            return True
+        except Exception as e:
+            logger.warn("发布日志导出失败: %s", (e,), key='publish_fail')
+            self.is_connected = False
+            return False
+
     def disconnect(self):
         """断开MQTT连接"""
         self._cleanup_connection()
-        print("MQTT连接已断开")
+        logger.info("MQTT连接已断开")
 
     def loop_forever(self):
         """启动MQTT消息监听线程"""
@@ -717,12 +964,12 @@ class MyMQTTClient:
                         continue
                     self.client.wait_msg()
                 except OSError as e:
-                    print("MQTT监听异常: %s" % e)
+                    logger.warn("MQTT监听异常: %s", (e,), key='listen')
                     # 任何OSError都直接触发重连
                     self._attempt_reconnect()
                     utime.sleep(1)
                 except Exception as e:
-                    print("MQTT监听线程异常: %s" % e)
+                    logger.warn("MQTT监听线程异常: %s", (e,), key='listen')
                     self.is_connected = False
                     utime.sleep(1)
 
@@ -740,7 +987,7 @@ class MyMQTTClient:
                     self.client.ping()
                     return True
                 except Exception as e:
-                    print("MQTT连接检查失败: %s" % e)
+                    logger.warn("MQTT连接检查失败: %s", (e,), key='ping')
                     self.is_connected = False
                     return False
             else:
@@ -759,12 +1006,13 @@ class Watchdog:
         self.callback = callback
         self.timer = None
         self.is_alive = False
-        self.last_feed_time = utime.time()
+        # 使用单调计时，后台时间同步修改RTC时不会误触发超时
+        self.last_feed_time = utime.ticks_ms()
 
     def start(self):
         """启动看门狗"""
         self.is_alive = True
-        self.last_feed_time = utime.time()
+        self.last_feed_time = utime.ticks_ms()
         self._schedule_timer()
         print("看门狗已启动")
 
@@ -778,7 +1026,7 @@ class Watchdog:
     def feed(self):
         """喂狗"""
         if self.is_alive:
-            self.last_feed_time = utime.time()
+            self.last_feed_time = utime.ticks_ms()
             
 
     def _schedule_timer(self):
@@ -789,7 +1037,7 @@ class Watchdog:
     def _timer_thread(self):
         while self.is_alive:
             # 检查距离上次喂狗的时间
-            if utime.time() - self.last_feed_time > self.timeout:
+            if utime.ticks_diff(utime.ticks_ms(), self.last_feed_time) > self.timeout * 1000:
                 self._on_timeout()
                 break
             utime.sleep(1)  # 每秒检查一次
@@ -800,22 +1048,245 @@ class Watchdog:
         self.callback()
 
 
+# =============================================================================
+# 时间工具函数
+# 以RTC为准的时间换算，用于对时完成后回填缓存样本的时间戳
+# =============================================================================
+def rtc_epoch():
+    """读取RTC当前时间，返回秒数"""
+    t = rtc.datetime()
+    return utime.mktime((t[0], t[1], t[2], t[4], t[5], t[6], 0, 0))
+
+
+def format_epoch(secs):
+    """将秒数格式化为 yyyy-mm-dd hh:mm:ss 格式的字符串"""
+    t = utime.localtime(secs)
+    return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(t[0], t[1], t[2], t[3], t[4], t[5])
+
+
+def backfill_timestamps(rx_ticks, batches):
+    """按接收时刻回填对时前解析的样本时间戳，返回回填的样本数
+
+    rx_ticks 为 {id(样本记录): 接收时的ticks_ms}，batches 为仍待上传的样本记录列表（积压批次和缓冲区），
+    样本记录 [原始样本, 时间戳秒数] 被原地修改。
+    """
+    now_ticks = utime.ticks_ms()
+    now_epoch = rtc_epoch()
+    count = 0
+    for records in batches:
+        for record in records:
+            ticks = rx_ticks.get(id(record))
+            if ticks is not None:
+                record[1] = now_epoch - utime.ticks_diff(now_ticks, ticks) // 1000
+                count += 1
+    return count
+
+
+# =============================================================================
+# 后台附网类
+# 在独立线程中完成SIM卡检测、网络注册、基站对时和MQTT连接，
+# 主循环无需等待，上电即可开始接收并缓存STM32数据
+# =============================================================================
+class NetworkBringup:
+    """后台附网流程 - Quectel专用"""
+    def __init__(self, mqtt_client):
+        self.mqtt_client = mqtt_client
+        self.sim_ok = False
+        self.net_ok = False
+        self.time_synced = False
+        self.mqtt_ok = False
+        self.done = False  # 附网流程结束（无论成功与否），主循环据此开始上传
+
+    def start(self):
+        """启动附网线程"""
+        _thread.start_new_thread(self._run, ())
+
+    def _run(self):
+        try:
+            self.sim_ok = self._check_sim()
+            self._print_ids()
+            if self.sim_ok:
+                self.net_ok = self._wait_network()
+            self._print_network_info()
+            self.time_synced = self._sync_time()
+            self._print_rtc()
+
+            if self.mqtt_client.connect():
+                self.mqtt_ok = True
+                print("MQTT订阅主题: %s" % self.mqtt_client.topic_down)
+                self.mqtt_client.publish_up_power_on_event()
+            else:
+                print("MQTT连接失败，将在上传数据时重试")
+            self.mqtt_client.loop_forever()  # 启动MQTT监听线程
+        except Exception as e:
+            print("附网流程异常: %s" % e)
+        finally:
+            self.done = True
+            print("=" * 50)
+
+    def _check_sim(self):
+        """检查SIM卡状态"""
+        print("1 - 正在检测SIM卡状态...")
+        sim_retry = 0
+        while True:
+            sim_retry += 1
+            if sim_retry > SIM_RETRY_MAX:
+                print("SIM卡检测超时！")
+                return False
+
+            try:
+                simnum = sim.getImsi()  # 获取SIM卡IMSI
+                if simnum and '460' in str(simnum):
+                    print("SIM卡状态正常")
+                    print("IMSI:", simnum)
+                    return True
+                else:
+                    print("SIM卡状态异常，重试中...")
+            except Exception as e:
+                print("获取SIM卡信息失败: %s" % e)
+
+            utime.sleep(1)  # 等待1秒
+
+    def _print_ids(self):
+        """打印ICCID和IMEI"""
+        if self.sim_ok:
+            try:
+                iccid = sim.getIccid()
+                if iccid and iccid != "":
+                    print("ICCID:", iccid)
+                else:
+                    print("ICCID获取失败！")
+            except Exception as e:
+                print("获取ICCID失败: %s" % e)
+
+        try:
+            imei = modem.getDevImei()
+            if imei and imei != "":
+                print("IMEI:", imei)
+            else:
+                print("IMEI获取失败！")
+        except Exception as e:
+            print("获取IMEI失败: %s" % e)
+
+    def _wait_network(self):
+        """等待网络注册和PDP激活"""
+        print("\n2 - 正在检测网络注册状态...")
+        print("stagecode说明: 1-SIM卡检测; 2-网络注册; 3-PDP Context激活")
+        print("subcode说明: stage=3时，1表示激活成功; stage=2时，1表示注册成功")
+
+        stagecode, subcode = checkNet.wait_network_connected(NET_WAIT_TIMEOUT)
+        print("\r\nstagecode = %d, subcode = %d" % (stagecode, subcode))
+        if stagecode == 3 and subcode == 1:
+            print("网络连接正常，可以进行数据传输")
+            return True
+        print("网络连接失败")
+        return False
+
+    def _print_network_info(self):
+        """网络信息打印"""
+        print("\n3 - 网络状态信息:")
+        try:
+            print("网络状态:", net.getState())
+            print("信号强度:", net.csqQueryPoll())
+            print("运营商:", net.operatorName())
+        except Exception as e:
+            print("获取网络信息失败: %s" % e)
+
+    def _sync_time(self):
+        """从基站获取时间并更新 RTC（带超时）"""
+        print("\n4 - 正在从基站获取时间...")
+        start_sync_ticks = utime.ticks_ms()
+
+        while utime.ticks_diff(utime.ticks_ms(), start_sync_ticks) < TIME_SYNC_TIMEOUT * 1000:
+            try:
+                nt_result = net.nitzTime()
+                print("net.nitzTime() 返回值:", nt_result)  # 打印原始返回值，用于调试
+
+                if isinstance(nt_result, tuple) and len(nt_result) > 0:
+                    time_str = nt_result[0]
+                    print("解析到的时间字符串:", repr(time_str))  # 打印原始时间字符串，用于调试
+
+                    if time_str.strip() != "":
+                        date_str, time_str, tz_str, _ = time_str.split()
+
+                        year = int(date_str[0:2]) + 2000
+                        month = int(date_str[3:5])
+                        day = int(date_str[-2:])
+
+                        hour = int(time_str[0:2])
+                        minute = int(time_str[3:5])
+                        second = int(time_str[-2:])
+
+                        timezone_offset = int(tz_str)
+                        hour += timezone_offset
+
+                        week = 0
+                        microsecond = 0
+
+                        if year != 2000:
+                            ret = rtc.datetime([year, month, day, week, hour, minute, second, microsecond])
+                            if ret == 0:
+                                # 打印获取到的时间
+                                print("时间同步成功，获取到的时间: %04d-%02d-%02d %02d:%02d:%02d" % (year, month, day, hour, minute, second))
+                                return True
+                            else:
+                                print("时间同步失败，重试中...")
+                        else:
+                            print("时间错误，重试中...")
+                    else:
+                        print("时间字符串为空，重试中...")
+                else:
+                    print("获取基站时间失败，重试中...")
+
+                utime.sleep(2)  # 等待2秒后重试
+            except Exception as e:
+                print("获取时间失败: %s，重试中..." % e)
+                utime.sleep(2)
+
+        print("时间同步超时（%d秒），使用默认时间" % TIME_SYNC_TIMEOUT)
+        return False
+
+    def _print_rtc(self):
+        """打印当前RTC时间，验证同步结果"""
+        try:
+            current_time = rtc.datetime()
+            print("当前RTC时间: %04d-%02d-%02d %02d:%02d:%02d" % (
+                current_time[0], current_time[1], current_time[2],
+                current_time[4], current_time[5], current_time[6]
+            ))
+        except Exception as e:
+            print("读取RTC时间失败: %s" % e)
+
+
 # =============================================================================
 # 主函数
 # 程序入口，负责初始化各种组件并启动主循环
 # =============================================================================
 def main():
     """主函数 - Quectel专用"""
-    # 记录程序启动时间
-    start_time = utime.time()
+    # 上电时刻（单调计时，RTC在后台对时时会跳变，所有间隔判断均使用ticks）
+    boot_ticks = utime.ticks_ms()
+    # 记录最后一次喂狗时间
+    last_feed_ticks = boot_ticks
     # 记录最后一次收到STM32数据的时间
-    last_stm32_data_time = utime.time()
+    last_stm32_data_ticks = boot_ticks
     # 标记是否已上报过超时异常
     timeout_event_reported = False
     # 数据收集缓冲区（按包序存储）
     data_buffer = {}
     # 记录最后一次数据上传时间
-    last_upload_time = utime.time()
+    last_upload_ticks = boot_ticks
+    # 待上传批次（每批为按包序排序后的样本列表），网络就绪前或发布失败时在此积压
+    backlog = []
+    backlog_samples = 0
+    # 对时完成前收到且仍待上传的样本的接收时刻，{id(样本记录): ticks_ms}，用于回填时间戳
+    # （样本被缓冲区中同包序的新样本覆盖或随积压批次丢弃时同时移除）
+    untimed_ticks = {}
+    timestamps_fixed = False
+    first_sample_logged = False
+    first_publish_logged = False
+    # 主循环耗时统计输出时间
+    last_stats_ticks = boot_ticks
 
     def restart_program():
         """重启程序"""
@@ -831,156 +1302,15 @@ def main():
     print("=" * 50)
     print("应急跌落事件监控系统 - 启动中")
     print("=" * 50)
-    
-    # 检查SIM卡状态
-    print("1 - 正在检测SIM卡状态...")
-    sim_retry = 0
-    SIM_RETRY_MAX = 30
-    sim_ok = False
-    while True:
-        sim_retry += 1
-        if sim_retry > SIM_RETRY_MAX:
-            print("SIM卡检测超时！")
-            break
-        
-        try:
-            simnum = sim.getImsi()  # 获取SIM卡IMSI
-            if simnum and '460' in str(simnum):
-                print("SIM卡状态正常")
-                print("IMSI:", simnum)
-                sim_ok = True
-                break
-            else:
-                print("SIM卡状态异常，重试中...")
-        except Exception as e:
-            print("获取SIM卡信息失败: %s" % e)
-            
-        utime.sleep(1)  # 等待1秒
-    
-    # 获取ICCID
-    if sim_ok:
-        try:
-            iccid = sim.getIccid()
-            if iccid and iccid != "":
-                print("ICCID:", iccid)
-            else:
-                print("ICCID获取失败！")
-        except Exception as e:
-            print("获取ICCID失败: %s" % e)
-    
-    # 获取IMEI
-    try:
-        imei = modem.getDevImei()
-        if imei and imei != "":
-            print("IMEI:", imei)
-        else:
-            print("IMEI获取失败！")
-    except Exception as e:
-            print("获取IMEI失败: %s" % e)
-    
-    # 网络注册状态
-    print("\n2 - 正在检测网络注册状态...")
-    print("stagecode说明: 1-SIM卡检测; 2-网络注册; 3-PDP Context激活")
-    print("subcode说明: stage=3时，1表示激活成功; stage=2时，1表示注册成功")
-    
-    netstatus = [0, 0]  # [SIM卡状态, 网络状态]
-    if sim_ok:
-        stagecode, subcode = checkNet.wait_network_connected(20)
-        print("\r\nstagecode = %d, subcode = %d" % (stagecode, subcode))
-        
-        if stagecode == 3 and subcode == 1:
-            print("网络连接正常，可以进行数据传输")
-            netstatus[1] = 1
-        else:
-            print("网络连接失败")
-            netstatus[1] = 0
-        utime.sleep(1)
-    
-    # 网络信息打印
-    print("\n3 - 网络状态信息:")
-    try:
-        print("网络状态:", net.getState())
-        print("信号强度:", net.csqQueryPoll())
-        print("运营商:", net.operatorName())
-    except Exception as e:
-            print("获取网络信息失败: %s" % e)
-    
-    # 从基站获取时间并更新 RTC（增加超时机制）
-    print("\n4 - 正在从基站获取时间...")
-    time_sync_success = False
-    time_sync_timeout = 30  # 时间同步超时时间（秒）
-    start_sync_time = utime.time()
-    
-    while utime.time() - start_sync_time < time_sync_timeout:
-        try:
-            nt_result = net.nitzTime()
-            print("net.nitzTime() 返回值:", nt_result)  # 打印原始返回值，用于调试
-            
-            if isinstance(nt_result, tuple) and len(nt_result) > 0:
-                time_str = nt_result[0]
-                print("解析到的时间字符串:", repr(time_str))  # 打印原始时间字符串，用于调试
-                
-                if time_str.strip() != "":
-                    date_str, time_str, tz_str, _ = time_str.split()
-                    
-                    year = int(date_str[0:2]) + 2000
-                    month = int(date_str[3:5])
-                    day = int(date_str[-2:])
-                    
-                    hour = int(time_str[0:2])
-                    minute = int(time_str[3:5])
-                    second = int(time_str[-2:])
-                    
-                    timezone_offset = int(tz_str)
-                    hour += timezone_offset
-                    
-                    week = 0
-                    microsecond = 0
-                    
-                    if year != 2000:
-                        ret = rtc.datetime([year, month, day, week, hour, minute, second, microsecond])
-                        if ret == 0:
-                            # 打印获取到的时间
-                            print("时间同步成功，获取到的时间: %04d-%02d-%02d %02d:%02d:%02d" % (year, month, day, hour, minute, second))
-                            time_sync_success = True
-                            break
-                        else:
-                            print("时间同步失败，重试中...")
-                    else:
-                        print("时间错误，重试中...")
-                else:
-                    print("时间字符串为空，重试中...")
-            else:
-                print("获取基站时间失败，重试中...")
-                
-            utime.sleep(2)  # 等待2秒后重试
-        except Exception as e:
-            print("获取时间失败: %s，重试中..." % e)
-            utime.sleep(2)
-    
-    if not time_sync_success:
-        print("时间同步超时（%d秒），使用默认时间" % time_sync_timeout)
-        
-    # 打印当前RTC时间，验证同步结果
-    try:
-        current_time = rtc.datetime()
-        print("当前RTC时间: %04d-%02d-%02d %02d:%02d:%02d" % (
-            current_time[0], current_time[1], current_time[2],
-            current_time[4], current_time[5], current_time[6]
-        ))
-    except Exception as e:
-        print("读取RTC时间失败: %s" % e)
-    
-    print("=" * 50)
-    
-    # 初始化STM32通信
+
+    # 先打开串口，STM32上电即开始发送数据，附网期间的数据也要缓存下来
     stm32 = STM32Communication(SERIAL_PORT, BAUD_RATE)
     if not stm32.connect():
         print("无法连接到STM32，程序退出")
         watchdog.stop()
         return
 
-    # 初始化MQTT客户端（使用稳定实现）
+    # 初始化MQTT客户端（使用稳定实现），连接在后台附网线程中完成
     mqtt_client = MyMQTTClient(
         MQTT_BROKER,
         MQTT_PORT,
@@ -988,48 +1318,53 @@ def main():
         MQTT_PASSWORD,
         IMEI
     )
-    if not mqtt_client.connect():
-        print("无法连接到MQTT服务器，程序退出")
-        stm32.disconnect()
-        watchdog.stop()
-        return
-    
-    print("MQTT订阅主题: %s" % mqtt_client.topic_down)
-    mqtt_client.publish_up_power_on_event()
-    mqtt_client.loop_forever()  # 启动MQTT监听线程
+    bringup = NetworkBringup(mqtt_client)
+    bringup.start()
 
     # 不再主动发送下行心跳包，仅在收到STM32的心跳包时回复
     try:
         while True:
+            now = utime.ticks_ms()
+            loop_start_us = utime.ticks_us()
             # 定期喂狗（防止长时间没有数据导致超时）
-            if utime.time() - start_time > WATCHDOG_INTERVAL / 2:
+            if utime.ticks_diff(now, last_feed_ticks) > WATCHDOG_INTERVAL * 1000 // 2:
                 watchdog.feed()
-                start_time = utime.time()
+                last_feed_ticks = now
 
             # 读取STM32发送的数据帧（上行）
             frames = stm32.read_frame()
+            heap_stats.frames += len(frames)
 
             for cmd, data_len, data in frames:
                 # 更新最后一次收到STM32数据的时间
-                last_stm32_data_time = utime.time()
+                last_stm32_data_ticks = now
                 # 重置超时事件上报标记
                 timeout_event_reported = False
 
                 # 根据命令码处理数据
                 if cmd == CMD_UP_DATA_UPLOAD:
-                    # 解析STM32上传的传感器数据（上行）
-                    sensor_data_list = stm32.parse_sensor_data(data)
-                    if sensor_data_list:
-                        # 将数据存入缓冲区（按包序存储）
-                        for sensor_data in sensor_data_list:
-                            packet_order = sensor_data['packet_order']
-                            data_buffer[packet_order] = sensor_data
+                    # 切分STM32上传的传感器样本（上行），保存为 [原始样本, 时间戳秒数]，上传时再编码
+                    samples = stm32.split_sensor_samples(data)
+                    if samples:
+                        if not first_sample_logged:
+                            first_sample_logged = True
+                            print("上电到首个样本缓存耗时: %d ms" % utime.ticks_diff(now, boot_ticks))
+                        epoch = rtc_epoch()
+                        # 将数据存入缓冲区（按包序存储，包序为样本首字节）
+                        for raw in samples:
+                            record = [raw, epoch]
+                            if not timestamps_fixed:
+                                replaced = data_buffer.get(raw[0])
+                                if replaced is not None:
+                                    untimed_ticks.pop(id(replaced), None)
+                                untimed_ticks[id(record)] = now
+                            data_buffer[raw[0]] = record
                     # 喂狗
                     watchdog.feed()
                 elif cmd == CMD_UP_CONFIG_REPLY:
                     # 解析STM32回复的配置参数（上行）
                     config = stm32.parse_config_data(data)
-                    if config:
+                    if config and bringup.done:
                         mqtt_client.publish_up_config_reply(config)
                     # 喂狗
                     watchdog.feed()
@@ -1038,13 +1373,14 @@ def main():
                     status = stm32.parse_heartbeat_data(data)
                     if status is not None:
                         stm32.send_frame(CMD_DOWN_HEARTBEAT_REPLY, struct.pack('B', status))
-                        mqtt_client.publish_up_heartbeat(status)
+                        if bringup.done:
+                            mqtt_client.publish_up_heartbeat(status)
                     # 喂狗
                     watchdog.feed()
                 elif cmd == CMD_UP_RESET_REPLY:
                     # 解析STM32回复的复位命令（上行）
                     reset_status = stm32.parse_reset_data(data)
-                    if reset_status is not None:
+                    if reset_status is not None and bringup.done:
                         mqtt_client.publish_up_reset_reply(reset_status)
                     # 喂狗
                     watchdog.feed()
@@ -1052,22 +1388,47 @@ def main():
                     # 喂狗
                     watchdog.feed()
 
-            # 检查是否需要上传数据（减少频率）
-            if utime.time() - last_upload_time >= UPLOAD_INTERVAL and data_buffer:
-                sorted_packet_orders = sorted(data_buffer.keys())
-                sorted_sensor_data = [data_buffer[order] for order in sorted_packet_orders]
-                
-                if mqtt_client.publish_up_sensor_data(sorted_sensor_data):
+            # 附网流程结束后，按接收时刻回填对时前样本的时间戳
+            if not timestamps_fixed and bringup.done:
+                if bringup.time_synced and untimed_ticks:
+                    count = backfill_timestamps(untimed_ticks, backlog + [data_buffer.values()])
+                    print("已回填 %d 个对时前样本的时间戳" % count)
+                untimed_ticks = {}
+                timestamps_fixed = True
+
+            # 每个上传间隔将缓冲区数据按包序排序后转入待上传批次
+            if utime.ticks_diff(now, last_upload_ticks) >= UPLOAD_INTERVAL * 1000:
+                if data_buffer:
+                    sorted_packet_orders = sorted(data_buffer.keys())
+                    backlog.append([data_buffer[order] for order in sorted_packet_orders])
+                    backlog_samples += len(data_buffer)
                     data_buffer.clear()
-                
-                last_upload_time = utime.time()
-            
-            # 定期检查MQTT连接状态
-            mqtt_client.check_connection()
+                    while backlog_samples > BOOT_BACKLOG_MAX_SAMPLES and len(backlog) > 1:
+                        dropped = backlog.pop(0)
+                        backlog_samples -= len(dropped)
+                        for record in dropped:
+                            untimed_ticks.pop(id(record), None)
+                        logger.warn("待上传数据超出上限，丢弃最旧的 %d 个样本", (len(dropped),), key='backlog_drop')
+                last_upload_ticks = now
+
+            # 附网完成后上传积压批次，每轮最多上传一批，避免长时间占用串口处理
+            if backlog and bringup.done:
+                if mqtt_client.publish_up_sensor_records(backlog[0]):
+                    backlog_samples -= len(backlog.pop(0))
+                    if not first_publish_logged:
+                        first_publish_logged = True
+                        print("上电到首次发布耗时: %d ms" % utime.ticks_diff(utime.ticks_ms(), boot_ticks))
+                    # 发布后串口无待读数据时主动回收，避免堆满时在帧处理中途触发自动回收
+                    if stm32.ser.any() == 0:
+                        heap_stats.collect_if_needed(GC_COLLECT_THRESHOLD)
+
+            if bringup.done:
+                # 定期检查MQTT连接状态
+                mqtt_client.check_connection()
             # 检测STM32数据超时
-            if utime.time() - last_stm32_data_time > STM32_TIMEOUT_INTERVAL:
-                if not timeout_event_reported:
-                    print("STM32数据超时，上报异常事件")
+            if utime.ticks_diff(now, last_stm32_data_ticks) > STM32_TIMEOUT_INTERVAL * 1000:
+                if not timeout_event_reported and bringup.done:
+                    logger.warn("STM32数据超时，上报异常事件")
                     mqtt_client.publish_up_exception_event(
                         event_type="SENSOR_REPORT_TIMEOUT",
                         description="超过%d秒未收到STM32数据" % STM32_TIMEOUT_INTERVAL
@@ -1076,6 +1437,23 @@ def main():
                 # 即使超时也要喂狗，防止程序重启
                 watchdog.feed()
 
+            # 处理下行命令请求的日志导出
+            if mqtt_client.pending_log_dump and bringup.done:
+                mqtt_client.publish_up_log_dump(logger.dump(mqtt_client.pending_log_dump))
+                mqtt_client.pending_log_dump = 0
+
+            # 统计本轮处理耗时（不含休眠），定期输出
+            loop_stats.record(utime.ticks_diff(utime.ticks_us(), loop_start_us))
+            if utime.ticks_diff(now, last_stats_ticks) >= LOOP_STATS_INTERVAL * 1000:
+                logger.info("主循环耗时: 平均 %d us，周期内最大 %d us，累计最大 %d us",
+                            (loop_stats.avg_us(), loop_stats.window_max_us, loop_stats.max_us))
+                loop_stats.window_max_us = 0
+                heap_stats.sample()
+                logger.info("堆内存: 最低空闲 %d，最高已分配 %d，主动GC %d 次（平均 %d us，最大 %d us），每帧分配约 %d 字节",
+                            (heap_stats.min_free, heap_stats.max_alloc, heap_stats.collections,
+                             heap_stats.avg_collect_us(), heap_stats.collect_max_us, heap_stats.bytes_per_frame))
+                last_stats_ticks = now
+
             # 短暂休眠，提高响应速度
             utime.sleep_ms(10)
 
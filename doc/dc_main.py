@@ -17,13 +17,20 @@ import _thread
 import dataCall
 import cellLocator
 import app_fota
+from modbus_rtu.crc import crc16
+from modbus_rtu.rtu import RtuReceiver
+from modbus_rtu.planner import PollScheduler, plan_writes
+from modbus_rtu.report import ChangeReporter
+from nmea import GnssParser, LocationService
 
 
 ################################# USR CONFIG#######################################
 USR_CONFIG_UART_RX_TIMEOUT_MS = 500
 USR_CONFIG_SW_VERSION = 1014           #app程序也就是本文件main.py的版本，！！！不要去改变这个变量的名称，因为云端服务器会提取这个变量的值用于FOTA版本判断
 USR_CONFIG_BASE_LOC_TIMEOUT_SEC =10    #基站定位等待超时时间，单位秒
+USR_CONFIG_LOC_MAX_AGE_SEC =900        #缓存的定位超过该时长未更新，loc_state上报为V，单位秒
 USR_CONFIG_LOWPOWER_MODE =1            #低功耗模式，1开启，0关闭
+USR_CONFIG_REPORT_FULL_CYCLES =10      #每多少个上报周期上报一次全量参数，其余周期只上报超出死区的变化值
 USR_CONFIG_DEFAULT_IMEI = '999999999999999'
 ################################## MODBUS #########################################
 # 功能码
@@ -130,7 +137,7 @@ REG_ADDR_INPUT_CURRENT_STATUS_BITS = 0x310F   # 各功能部分当前状态(位)
 REG_ADDR_INPUT_FAULT_CODE = 0x3110            # 故障码
 # ... 0x3110 至 0x301F 为备用显示参数1~16，
 
-#定义保持寄存器参数字典
+#定义保持寄存器参数字典，保持寄存器只在上电和下发写入后读取，不定期轮询
 g_modbus_hold_paras_dic = {
     0x3000: {"name": "power_onoff_total", "unit": None, "value": 0,"setflag":False},
     0x3001: {"name": "power_onoff_dc", "unit": None, "value": 0,"setflag":False},
@@ -140,14 +147,15 @@ g_modbus_hold_paras_dic = {
     0x3005: {"name": "led_brightness", "unit": "%", "value": 0,"setflag":False},
 }
 
-#定义输入寄存器参数字典
+#定义输入寄存器参数字典，period为轮询周期(秒)，版本号等静态参数轮询间隔长，变化快的参数间隔短
+#deadband为上报绝对死区，deadband_pct为相对上次上报值的百分比死区，变化不超过死区的不上报，缺省为0
 g_modbus_input_paras_dic = {
-    0x3100: {"name": "firmware_version", "unit": "N/A", "value": 0},
-    0x3101: {"name": "charging_power", "unit": "W", "value": 0},
-    0x3102: {"name": "full_charge_duration", "unit": "HHMM", "value": 0},
-    0x3103: {"name": "discharge_power", "unit": "W", "value": 0},
-    0x3104: {"name": "discharge_duration", "unit": "HHMM", "value": 0},
-    0x3105: {"name": "current_battery_level", "unit": "%", "value": 0},
+    0x3100: {"name": "firmware_version", "unit": "N/A", "value": 0, "period": 3600},
+    0x3101: {"name": "charging_power", "unit": "W", "value": 0, "period": 30, "deadband": 5, "deadband_pct": 5},
+    0x3102: {"name": "full_charge_duration", "unit": "HHMM", "value": 0, "period": 30, "deadband": 5},
+    0x3103: {"name": "discharge_power", "unit": "W", "value": 0, "period": 30, "deadband": 5, "deadband_pct": 5},
+    0x3104: {"name": "discharge_duration", "unit": "HHMM", "value": 0, "period": 30, "deadband": 5},
+    0x3105: {"name": "current_battery_level", "unit": "%", "value": 0, "period": 30},
     #经纬度由EC800M内部获取，不需要经过modbus，读的时候注意这里寄存器地址的非连续
     # 0x3106: {"name": "latitude_sign", "unit": "N/A", "value": 0}, #EC800M模块内部获取，不需要modbus
     # 0x3107: {"name": "latitude_data_part1", "unit": "N/A", "value": 0},
@@ -157,17 +165,26 @@ g_modbus_input_paras_dic = {
     # 0x310B: {"name": "longitude_data_part1", "unit": "N/A", "value": 0},
     # 0x310C: {"name": "longitude_data_part2", "unit": "N/A", "value": 0},
     # 0x310D: {"name": "longitude_data_part3", "unit": "N/A", "value": 0},
-    0x310E: {"name": "led_brightness_status", "unit": "%", "value": 0},
-    0x310F: {"name": "current_status_bits", "unit": "N/A", "value": 0},
-    0x3110: {"name": "fault_code", "unit": "N/A", "value": 0},
+    0x310E: {"name": "led_brightness_status", "unit": "%", "value": 0, "period": 30},
+    0x310F: {"name": "current_status_bits", "unit": "N/A", "value": 0, "period": 30},
+    0x3110: {"name": "fault_code", "unit": "N/A", "value": 0, "period": 30},
 #     0x3111: {"name":"reserved1","unit":"N/A","value":0},
 #     0x3112: {"name":"reserved2","unit":"N/A","value":0},
 #     0x3113: {"name":"reserved3","unit":"N/A","value":0}, 
 }
-#声明经度纬度变量
-longitude=0
-latitude=0
-loc_state='V' #V表示没有定位，A表示GPS定位成功，B表示基站定位成功
+#参数名到保持寄存器地址的索引，下发命令按名称查找
+g_hold_name_index = {params['name']: reg_addr for reg_addr, params in g_modbus_hold_paras_dic.items()}
+#经纬度由定位服务线程维护，见LocationService，loc_state：V表示没有定位，A表示GPS定位成功，B表示基站定位成功
+#上报的定位参数，经纬度死区0.0001度约11米
+g_loc_paras_dic = {
+    "latitude": {"value": 0, "deadband": 0.0001},
+    "longitude": {"value": 0, "deadband": 0.0001},
+    "loc_state": {"value": 'V'},
+}
+#按变化上报，寄存器和定位参数超出死区才上报，每USR_CONFIG_REPORT_FULL_CYCLES个周期全量上报一次
+reporter = ChangeReporter((g_modbus_hold_paras_dic, g_modbus_input_paras_dic), USR_CONFIG_REPORT_FULL_CYCLES)
+for _name in ("latitude", "longitude", "loc_state"):
+    reporter.add(_name, g_loc_paras_dic[_name])
 #参数被mqtt下发控制更改标志
 hold_reg_change_flag=False
 #rtc全局变量
@@ -184,6 +201,7 @@ pack_sn=0
 class ModbusInit:
     def __init__(self, uartport, baudrate, databits, parity, stopbit, flowctl):
         self.uart = UART(uartport, baudrate, databits, parity, stopbit, flowctl)
+        self.receiver = RtuReceiver(self.uart, baudrate)  # 按响应长度和3.5字符静默间隔接收完整帧
 
     @staticmethod
     def divmod_low_high(addr):  # 分离高低字节
@@ -191,19 +209,9 @@ class ModbusInit:
         # Grey_log.debug("addr:0x{:04X}  high:0x{:02X}  low:0x{:02X}".format(addr, high, low))
         return high, low
 
-    def calc_crc(self, string_byte):  # 生成CRC
-        crc = 0xFFFF
-        for pos in string_byte:
-            crc ^= pos
-            for i in range(8):
-                if (crc & 1) != 0:
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        gen_crc = hex(((crc & 0xff) << 8) + (crc >> 8))
-        int_crc = int(gen_crc, 16)
-        return self.divmod_low_high(int_crc)
+    def calc_crc(self, string_byte):  # 生成CRC，返回按发送顺序的(低字节, 高字节)
+        crc = crc16(string_byte)
+        return crc & 0xFF, crc >> 8
 
     @staticmethod
     def split_return_bytes(ret_bytes):  # 转换二进制
@@ -228,42 +236,21 @@ class ModbusInit:
     #     print('UART接收数据(HEX): ' + hex_str)
         
     #     return ret_list
-    def read_uart(self, timeout_ms):
+    def read_response(self, slave_id, cmd, timeout_ms):
         """
-        UART接收数据，增加超时参数。
-        
+        接收从机响应，收到完整且CRC正确的帧立即返回。
+
         :param timeout_ms: 超时时间，单位为毫秒
-        :return: 接收到的数据列表
+        :return: 响应帧，超时返回None
         """
-        start_time = utime.ticks_ms()  # 获取当前的毫秒时间
-        num = 0
-        rx_data = []
-        
-        # 超时循环，等待数据
-        while utime.ticks_diff(utime.ticks_ms(), start_time) < timeout_ms:
-            num = self.uart.any()  # 检查是否有数据可读
-            if num > 0:
-                break  # 如果有数据，跳出循环
-            utime.sleep_ms(1)  # 减少CPU占用，每次检查间隔1ms
-
-        if num > 0:
-            msg = self.uart.read(num)  # 读取数据
-            # 将数据转换为十六进制字符串
-            hex_str = ' '.join(['{:02X}'.format(byte) for byte in msg])
-            
-            
-            # 等待1ms读取剩余数据
-            utime.sleep_ms(1)
-            additional_num = self.uart.any()
-            if additional_num > 0:
-                # 如果还有数据，追加到msg
-                msg.extend(self.uart.read(additional_num))
-            print('UART接收数据(HEX): ' + hex_str)
-            
-            return msg
-        else:
+        msg = self.receiver.receive(slave_id, cmd, timeout_ms)
+        if msg is None:
             print("Timeout occurred, no data received.")
-            return rx_data
+            return None
+        # 将数据转换为十六进制字符串
+        hex_str = ' '.join(['{:02X}'.format(byte) for byte in msg])
+        print('UART接收数据(HEX): ' + hex_str)
+        return msg
 
     def write_coils(self, slave, const, start, coil_qty):  # UART发送
         start_h, start_l = self.divmod_low_high(start)
@@ -294,6 +281,7 @@ class ModbusInit:
         crc = self.calc_crc(data)
         for num in crc:
             data.append(num)
+        self.receiver.flush()
         self.uart.write(data)
         # 使用列表推导式和 format 函数将每个字节转换为十六进制格式，并用空格分隔
         hex_str = ' '.join(['{:02X}'.format(byte) for byte in data])
@@ -301,7 +289,7 @@ class ModbusInit:
         print('UART发送数据(HEX): ' + hex_str)
         
         # 等待并读取响应, 正常响应数据和发送数据一样，异常时返回命令为0x80+cmd
-        response = self.read_uart(USR_CONFIG_UART_RX_TIMEOUT_MS)
+        response = self.read_response(slave, cmd, USR_CONFIG_UART_RX_TIMEOUT_MS)
         if response:
             # 解析响应数据
             #返回指令判断
@@ -330,6 +318,41 @@ class ModbusInit:
         else:
             print("No response received from UART.")
         
+    def write_multiple_holds(self, slave, start_address, values):
+        """
+        写多个连续的保持寄存器(0x10)，正常响应回送起始地址和寄存器数量。
+
+        :param values: 寄存器值列表，从start_address开始连续
+        :return: 0-成功，-1-无响应或响应不符，从机返回异常响应时返回异常码
+        """
+        start_h, start_l = self.divmod_low_high(start_address)
+        quantity_h, quantity_l = self.divmod_low_high(len(values))
+        data = bytearray([slave, WRITE_MULTIPLE_REGISTERS, start_h, start_l, quantity_h, quantity_l, len(values) * 2])
+        for value in values:
+            value_h, value_l = self.divmod_low_high(value)
+            data.append(value_h)
+            data.append(value_l)
+        crc = self.calc_crc(data)
+        for num in crc:
+            data.append(num)
+        self.receiver.flush()
+        self.uart.write(data)
+        hex_str = ' '.join(['{:02X}'.format(byte) for byte in data])
+        print('UART发送数据(HEX): ' + hex_str)
+
+        response = self.read_response(slave, WRITE_MULTIPLE_REGISTERS, USR_CONFIG_UART_RX_TIMEOUT_MS)
+        if not response:
+            print("No response received from UART.")
+            return -1
+        if response[1] != WRITE_MULTIPLE_REGISTERS:
+            print("write holds fail! exception code=0x{:02X}".format(response[2]))
+            return response[2]
+        ack_addr = (response[2] << 8) + response[3]
+        ack_quantity = (response[4] << 8) + response[5]
+        if ack_addr != start_address or ack_quantity != len(values):
+            print("write holds: ack check fail! addr 0x{:04X} quantity {}".format(ack_addr, ack_quantity))
+            return -1
+        return 0
         
     def query_multiple_registers(self, slave_id, cmd, start_address, quantity):
         """
@@ -357,6 +380,7 @@ class ModbusInit:
         for num in crc:
             data.append(num)
         #data.extend(crc)  # 将CRC值附加到数据末尾
+        self.receiver.flush()
         self.uart.write(data)
 #         print("query_multiple_registers send:\r\n")   
         # 使用列表推导式和 format 函数将每个字节转换为十六进制格式，并用空格分隔
@@ -365,25 +389,13 @@ class ModbusInit:
         # 打印转换后的十六进制字符串
         print('UART发送数据(HEX): ' + hex_str)
         
-        # 等待并读取响应
-        response = self.read_uart(USR_CONFIG_UART_RX_TIMEOUT_MS)
+        # 等待并读取响应，接收器只返回地址、功能码匹配且CRC正确的帧
+        response = self.read_response(slave_id, cmd, USR_CONFIG_UART_RX_TIMEOUT_MS)
         if response:
-            # 解析响应数据
-            # ADDR对比
-            if response[0] != slave_id:
-                print("addr error! Get uart again!")
-                response = self.read_uart(USR_CONFIG_UART_RX_TIMEOUT_MS)
-                if response is None:
-                    return None
-            # cmd 对比
+            # 异常响应
             if response[1] != cmd:
-                print("cmd error! Get uart again!")
-                response = self.read_uart(USR_CONFIG_UART_RX_TIMEOUT_MS)
-                if response is None:
-                    return None
-                if response[1] != cmd:
-                    print("cmd error! return!")
-                    return None
+                print("exception response! code=0x{:02X}".format(response[2]))
+                return None
                 
             # response_length = (response[3] << 8) + response[4]  # 响应数据的长度，不包括CRC校验
             response_length = response[2]
@@ -426,14 +438,29 @@ _stopbit = 1  # 停止位
 _flowctl = 0  # 流控
 
 SLAVE_ID =0X0F #电池从机地址
-HOLD_REG_CNT= 6 #保持寄存器数量
-HOLD_REG_ADDR_START = REG_ADDR_HOLD_POWER_ONOFF_TOTAL #保持寄存器起始地址
-
-INPUT_REG_CNT1=6 #第一段输入寄存器数量，因为中间有一部分是经纬度寄存器，从机不支持读取，所以输入寄存器被分成了两段
-INPUT_REG_ADDR_START1 = REG_ADDR_INPUT_FIRMWARE_VERSION #第一段输入寄存器起始地址
 
-INPUT_REG_CNT2=3 #第二段输入寄存器数量
-INPUT_REG_ADDR_START2 = REG_ADDR_INPUT_LED_BRIGHTNESS_STATUS #第二段输入寄存器起始地址
+#从机可读的寄存器地址区间(含两端)。中间的经纬度寄存器从机不支持读取，所以输入寄存器分成了两段，读请求不会跨越区间
+MODBUS_READABLE_RANGES = {
+    READ_HOLDING_REGISTERS: ((REG_ADDR_HOLD_POWER_ONOFF_TOTAL, REG_ADDR_HOLD_LED_BRIGHTNESS),),
+    READ_INPUT_REGISTERS: ((REG_ADDR_INPUT_FIRMWARE_VERSION, REG_ADDR_INPUT_CURRENT_BATTERY_LEVEL),
+                           (REG_ADDR_INPUT_LED_BRIGHTNESS_STATUS, REG_ADDR_INPUT_FAULT_CODE)),
+}
+MODBUS_READ_MAX_GAP = 8 #为合并读请求允许多读的寄存器数，多读1个寄存器只多2字节，远小于一次请求/响应的开销
+
+#按寄存器轮询周期合并读请求
+reg_scheduler = PollScheduler({READ_HOLDING_REGISTERS: g_modbus_hold_paras_dic,
+                               READ_INPUT_REGISTERS: g_modbus_input_paras_dic},
+                              MODBUS_READABLE_RANGES, MODBUS_READ_MAX_GAP)
+
+#上电以来的秒数，基于ticks_ms累加，不受RTC对时影响
+_uptime_ticks = utime.ticks_ms()
+_uptime_ms = 0
+def uptime_sec():
+    global _uptime_ticks, _uptime_ms
+    now = utime.ticks_ms()
+    _uptime_ms += utime.ticks_diff(now, _uptime_ticks)
+    _uptime_ticks = now
+    return _uptime_ms // 1000
 
 ###################外部中断###############################################
 def Extfun(args):#外部中断，进行项目停止的
@@ -560,10 +587,8 @@ else:
     #获取失败返回-1
     print("get base time fail or NITZ time is not a tuple.")
     
-#基站定位，0-成功，-1-失败
+#基站定位，成功返回(经度, 纬度)，失败返回None。会阻塞到USR_CONFIG_BASE_LOC_TIMEOUT_SEC，只在定位服务线程中调用
 def loc_by_base():
-    global longitude,latitude,loc_state
-    ret=0
     base_loc=cellLocator.getLocation("www.queclocator.com", 80, "1Aj721iw35y0j842", USR_CONFIG_BASE_LOC_TIMEOUT_SEC,1)
 #     print("cellLocator.getLocation ret:{}".format(base_loc))
     if isinstance(base_loc, tuple) : #判断是否为元组
@@ -572,21 +597,18 @@ def loc_by_base():
             # 解析元组中的参数
             longitude = base_loc[0]  # 经度
             latitude = base_loc[1]   # 纬度
+            error = -1
             if len(base_loc) >= 3: #存在第3个元素才解析误差
                 error = base_loc[2]      # 误差
-            loc_state = 'B' #B表示基站定位成功
             print("基站定位成功，坐标：(",longitude,",",latitude,"),误差：",error,"米")
-            ret= 0
+            return longitude, latitude
         else: #没值，获取失败
-            loc_state = 'V'
             print("基站定位失败，没有获取到坐标！ret={}".format(base_loc))
-            ret= -1
     else:  #基站定位也失败了
-        loc_state='V'
         print("基站定位失败，模块返回错误！ret={}".format(base_loc))
-        ret= -1
         
-    return ret
+    return None
+
 #########################MQTT自定义类以及上电后需要运行的代码#####################################
 
 # 调用disconnect后会通过该状态回收线程资源
@@ -755,12 +777,9 @@ class MqttClient():
     def loop_forever(self):
         _thread.start_new_thread(self.__listen, ())
         
-    # 发布数据到MQTT服务器
-    def publish_data_to_mqtt(self):
+    # 发布数据到MQTT服务器，full为True时上报全量参数，否则只上报超出死区的变化值，没有变化时不上报
+    def publish_data_to_mqtt(self, full=False):
         global pack_sn
-        pack_sn+=1
-        if pack_sn >= 255:
-            pack_sn=1
         # 创建MQTT客户端
     #     client = umqtt.MQTTClient(client_id=MQTT_CLIENT_ID, server=MQTT_SERVER, port=MQTT_PORT,
     #                               user=MQTT_USER, password=MQTT_PASSWORD)
@@ -775,44 +794,37 @@ class MqttClient():
     #     client.subscribe('test/topic_cmd', qos=0)
         
         
-        # 定义上报数据的函数
+        # 定义上报数据的函数，没有需要上报的数据时返回None
         def prepare_data():
-            # 组合保持寄存器和输入寄存器的值
-    #         data = {}
-    #         data.update(g_modbus_hold_paras_dic)  # 更新字典
-    #         data.update(g_modbus_input_paras_dic)  # 更新字典
-            global latitude,longitude,imei_str,pack_sn #声明引入全局变量
-            # 假设 g_modbus_hold_paras_dic 和 g_modbus_input_paras_dic 是已经存在的字典
-            hold_registers = g_modbus_hold_paras_dic
-            input_registers = g_modbus_input_paras_dic
-
-            # 提取所需的字段
-            hold_data = {params['name']: params['value'] for name, params in hold_registers.items()}
-            input_data = {params['name']: params['value'] for name, params in input_registers.items()}
-
-            # 合并两个字典,Python3.5以上才支持**hold_data方式解包字典
-    #         combined_data = {**hold_data, **input_data}
-            combined_data={}
-            combined_data.update(hold_data)
-            combined_data.update(input_data)
-            
-            #添加经纬度
-            combined_data['latitude'] = latitude
-            combined_data['longitude'] = longitude
-            combined_data['loc_state'] = loc_state
+            global imei_str,pack_sn #声明引入全局变量
+            #更新定位参数，读取定位服务的缓存，不等待定位
+            longitude, latitude, loc_state, loc_age = location.get_fix()
+            g_loc_paras_dic['latitude']['value'] = latitude
+            g_loc_paras_dic['longitude']['value'] = longitude
+            g_loc_paras_dic['loc_state']['value'] = loc_state
+
+            #寄存器和定位参数由reporter比较死区，返回的字典原地复用，不每次重建
+            is_full, changed = reporter.collect(full)
+            if not changed:
+                return None
+            #本次上报附带的字段，不写入reporter的快照，不参与变化比较
+            extras = {}
+            if is_full or 'latitude' in changed or 'longitude' in changed or 'loc_state' in changed:
+                extras['loc_age'] = loc_age #定位距今时长，单位秒，-1表示从未定位
+            #全量标志，1为全量参数，0为只有变化的参数
+            extras['full'] = 1 if is_full else 0
             #添加app软件版本
-            combined_data['sw_ver'] = USR_CONFIG_SW_VERSION
+            extras['sw_ver'] = USR_CONFIG_SW_VERSION
             #添加包序
-            combined_data['pack_sn'] = pack_sn
+            pack_sn+=1
+            if pack_sn >= 255:
+                pack_sn=1
+            extras['pack_sn'] = pack_sn
             #添加imei
-            combined_data['imei'] = imei_str
-
-            # 将合并后的字典转换为JSON格式
-    #         json_data = ujson.dumps(combined_data)
+            extras['imei'] = imei_str
 
-            
             # 将字典转换为JSON字符串进行上报
-            return ujson.dumps(combined_data).encode('utf-8')
+            return ujson.dumps(reporter.payload(changed, extras)).encode('utf-8')
         
 
         # 发布数据到MQTT服务器之前，检查client是否为None
@@ -822,6 +834,9 @@ class MqttClient():
             try:
                 # 定义上报数据的函数
                 data_to_publish = prepare_data()
+                if data_to_publish is None:
+                    print("No parameter changed, skip publish.")
+                    return
                 if imei_str == USR_CONFIG_DEFAULT_IMEI:
                     print("\r\n#####IMEI usr default: {}.#######\r\n".format(USR_CONFIG_DEFAULT_IMEI))
                 topic_up='topic_up/{}'.format(imei_str)
@@ -831,6 +846,8 @@ class MqttClient():
                 print(data_to_publish)
             except Exception as e:
                 print("Failed to publish data to MQTT broker:", e)
+                #变化值已记为上报，发布失败时下次全量上报，避免云端丢失变化
+                reporter.request_full()
             
         # 等待消息（如果有订阅）
         # client.wait_msg()
@@ -855,22 +872,24 @@ def process_mqtt_message(json_str):
         
         # 遍历解析后的字典中的每个参数
         for name, value in message_dict.items():
-            # 遍历g_modbus_hold_paras_dic字典以找到寄存器地址
-            for reg_addr, params in g_modbus_hold_paras_dic.items():
-                if params['name'] == name:
-                    # 检查值是否与当前值不同
-                    if params['value'] != value:
-                        # 打印更新信息
-                        print("参数 '%s' 更新为 %d" % (name,value))
-                        # 更新字典中的值
-                        g_modbus_hold_paras_dic[reg_addr]['value'] = value
-                        g_modbus_hold_paras_dic[reg_addr]['setflag'] = True#置位配置标志
-                        hold_reg_change_flag=True
-                        # 这里添加您的控制代码，例如发送更新到硬件等
-                        # update_hardware(reg_addr, value)
-                    break  # 找到匹配项后退出循环
-            else:
+            #云端请求全量参数，{"report_all": 1}，下次上报周期全量上报
+            if name == 'report_all':
+                reporter.request_full()
+                continue
+            # 按名称索引找到寄存器地址
+            reg_addr = g_hold_name_index.get(name)
+            if reg_addr is None:
                 print("未找到参数 '%s'" % name)
+                continue
+            params = g_modbus_hold_paras_dic[reg_addr]
+            # 检查值是否与当前值不同
+            if params['value'] != value:
+                # 打印更新信息
+                print("参数 '%s' 更新为 %d" % (name,value))
+                # 更新字典中的值
+                params['value'] = value
+                params['setflag'] = True#置位配置标志，主循环中合并写入从机
+                hold_reg_change_flag=True
 
     except json.JSONDecodeError as e:
         print("解析JSON失败: '%s'" % e)
@@ -904,6 +923,14 @@ else:
     MQTT_CLIENT_ID = 'quectel_client'  # 客户端ID，应该是唯一的
 MQTT_USER = ''  # MQTT用户名，如果不需要认证则留空
 MQTT_PASSWORD = ''  # MQTT密码，如果不需要认证则留空
+
+################定位服务######################
+#上报读取定位缓存，须在MQTT客户端建立前创建；读到gps开关状态后再启动线程，gps关闭时启动即进行一次基站定位
+GPS_ITV_SEC = 15 #读GPS状态间隔，单位秒
+BASE_LOC_ITV_SEC = 300 #GPS无效时两次基站定位的最小间隔，单位秒
+location = LocationService(GPS_ITV_SEC, BASE_LOC_ITV_SEC, USR_CONFIG_LOC_MAX_AGE_SEC,
+                           lambda: get_gps_coordinates(quecgnss), loc_by_base)
+
 c = MqttClient(MQTT_CLIENT_ID, MQTT_SERVER, MQTT_PORT, reconn=False)
 # 设置消息回调
 c.set_callback(sub_cb)
@@ -957,77 +984,16 @@ def gps_off():
         print('GNSS stop failed.')
         return -1
     
-#gps解析函数
-def parse_gnrmc(data):
-    """
-    解析GNRMC语句并返回GPS信息。
-    
-    :param data: 包含GNRMC语句的字符串。
-    :return: 一个包含GPS信息的字典或者在未找到GNRMC语句时返回None。
-    """
-#     print("get gps string.")
-    # 查找GNRMC语句
-    gnrmc_prefix = 'GNRMC,'
-    if gnrmc_prefix in data:
-        # 字符串中只包含一个元组，我们需要取出其中的字符串部分
-        gps_data_str = data
-        # 使用split方法找到第一个$GNRMC
-        start_index = gps_data_str.rfind('$GNRMC')
-
-        if start_index != -1:
-            #从$GNRMC开始，截取到字符串末尾
-            gnrmc_sentence = gps_data_str[start_index:]
-
-            # 现在我们需要找到这个语句的结束位置，即\r\n
-            end_index = gnrmc_sentence.find('\r\n')
-
-            # 如果找到了\r\n，就截取$GNRMC语句
-            if end_index != -1:
-                gnrmc_sentence = gnrmc_sentence[:end_index]
-                print(gnrmc_sentence)
-            else:
-                print("End of GNRMC sentence not found.")
-        else:
-            print("Start of GNRMC sentence not found.")
-            
-        gnrmc_data = gnrmc_sentence.split(gnrmc_prefix)[1]  # 切分数据获取GNRMC部分
-        fields = gnrmc_data.split(',')  # 按逗号分割字段,这里filelds从第一个时间开始了，没有GNRMC字符串
-
-        # 检查数据字段是否足够
-        if len(fields) >= 12:
-            # 解析字段
-            gps_info = {
-                'validity': fields[1],  # 'A'表示有效定位，'V'表示无效定位
-                'latitude': None if fields[2] == '' else float(fields[2]),#纬度
-                'lat_dir': fields[3] if fields[3] != '' else None,#N_S
-                'longitude': None if fields[4] == '' else float(fields[4]),#经度
-                'lon_dir': fields[5] if fields[5] != '' else None,#W_E
-                'speed': None if fields[6] == '' else float(fields[6]),
-                'course': None if fields[7] == '' else float(fields[7]),
-                'date': fields[8] if fields[8] != '' else None,  # 日期格式为DDMMYY
-                'time': fields[0] if fields[0] != '' else None,  # 时间格式为HHMMSS
-                'mode': fields[11] if fields[11] != '' else None  # 定位模式：A=自主定位, D=差分定位, E=估算, N=未定位, S=模拟/仿真
-            }
-            if gps_info['validity'] == 'A': #定位成功才打印
-                for key, value in gps_info.items():
-    #                 print(f"{key}: {value}")#python3.6以前版本不支持这个语法
-                    print("{}: {}".format(key, value))
-            
-            return gps_info
-        else:
-            print("gps len ={}, <12!".format(len(fields)))
-    else:
-        print("NO GNRMC message!")
-        
-    return None
+#gps流式解析，不完整的语句保留到下次读取时拼接，校验和错误的语句丢弃
+gnss_parser = GnssParser()
 
 #定义GPS获取函数并返回解析结果
 def get_gps_coordinates(quecgnss):
     """
-    获取GPS坐标并返回经度和纬度。
+    读取GPS数据送入流式解析器。
     
     :param quecgnss: GPS模块的实例，提供get_state和read方法。
-    :return: 一个包含经度和纬度的元组，如果未定位成功则返回None。
+    :return: 本次读取解析到新的RMC语句时返回定位记录GnssFix（经纬度已转换为度），否则返回None。
     """
     # 检查GPS状态
     if quecgnss.get_state() == 2:
@@ -1037,56 +1003,21 @@ def get_gps_coordinates(quecgnss):
         if isinstance(data,tuple):
 #             if data[0] != 0:
 #                 print(data)
-            gps_string=data[1]
-            gps_ret=parse_gnrmc(gps_string) #返回gps_info字典，包含所有需要的信息包括经纬度，速度等
-            return gps_ret
+            rmc_count = gnss_parser.fix.rmc_count
+            gnss_parser.feed(data[1])
+            fix = gnss_parser.fix
+            if fix.rmc_count != rmc_count:
+                if fix.valid: #定位成功才打印
+                    print("GNSS: lon {} lat {} alt {} sats {} hdop {} time {} date {}".format(
+                        fix.longitude, fix.latitude, fix.altitude, fix.satellites, fix.hdop, fix.time, fix.date))
+                return fix
+            print("NO RMC message!")
         else:
             print("无GPS数据响应！")
         
     # 如果没有成功获取坐标，返回None
     return None
 
-#定义GPS经纬度处理函数，转化为度
-def convert_latitude(latitude, lat_dir):
-    # 步骤1: 将纬度除以100，得到整数部分和小数部分
-    lat_int = int(latitude // 100)  # 整数部分，度
-    lat_dec = latitude % 100 /60 # 小数部分，转换为浮点数度
-
-    # 步骤4: 合并整体度数
-    total_latitude = lat_int + lat_dec
-
-    # 步骤5: 根据lat_dir控制latitude的正负值
-    if lat_dir.upper() == 'S':  # 如果纬度方向是南纬，取负值
-        total_latitude = -abs(total_latitude)
-    else:  # 否则，取正值
-        total_latitude = abs(total_latitude)
-
-    return total_latitude
-
-
-def convert_longitude(longitude, long_dir):
-    """
-    Convert longitude to a floating point number with decimal degrees and sign.
-
-    :param longitude: The longitude value in the format ddmm.mmmmm
-    :param long_dir: The direction of the longitude, 'E' for East, 'W' for West
-    :return: The converted longitude as a floating point number
-    """
-    # 步骤1: 将经度除以100，得到整数部分和小数部分
-    long_int = int(longitude // 100)  # 整数部分，度
-    long_dec = longitude % 100 / 60.0  # 小数部分，转换为分再转换为度
-
-    # 步骤4: 合并整体度数
-    total_longitude = long_int + long_dec
-
-    # 步骤5: 根据long_dir控制longitude的正负值
-    if long_dir.upper() == 'W':  # 如果经度方向是西经，取负值
-        total_longitude = -total_longitude
-    else:  # 否则，取正值
-        total_longitude = total_longitude
-
-    return total_longitude
-
 def update_rtc_by_gps(date,time):
     global rtc 
     global day,month,year,hour,minute,second
@@ -1121,51 +1052,69 @@ def update_rtc_by_gps(date,time):
 ##########################自定义modbus读从机接口###################################
 
 #定义读取保持寄存器参数接口
+#执行读请求并回写参数字典，返回值有变化的寄存器[(功能码, 地址), ...]
+def poll_registers(requests):
+    changed = []
+    now = uptime_sec()
+    for fc, start, count in requests:
+        register_values = modbus.query_multiple_registers(SLAVE_ID, fc, start, count)
+        print("Read 0x{:02X} 0x{:04X}+{} values:".format(fc, start, count), register_values)
+        if register_values:
+            for reg_addr in reg_scheduler.update(fc, start, register_values, now):
+                changed.append((fc, reg_addr))
+    return changed
+
 def read_all_hold_regs():
     print("Read hold registers:")
-    register_values = modbus.query_multiple_registers(SLAVE_ID, READ_HOLDING_REGISTERS, HOLD_REG_ADDR_START, HOLD_REG_CNT)
-    print("Register values:", register_values)
-    cur_hold_values=register_values
-    # 更新保持寄存器参数字典 g_modbus_hold_paras_dic
-    if register_values:
-        for i, value in enumerate(register_values):
-            reg_addr = HOLD_REG_ADDR_START + i
-            g_modbus_hold_paras_dic[reg_addr]['value'] = value
+    poll_registers(reg_scheduler.all_requests(READ_HOLDING_REGISTERS))
     print("\r\n")
     
 #定义读取输入寄存器参数接口    
 def read_all_input_regs():
-    print("Read input registers part1:")
-    register_values = modbus.query_multiple_registers(SLAVE_ID, READ_INPUT_REGISTERS, INPUT_REG_ADDR_START1, INPUT_REG_CNT1)
-    print("Register values:", register_values)
-    # 更新输入寄存器参数字典 g_modbus_input_paras_dic
-    if register_values:
-        for i, value in enumerate(register_values):
-            reg_addr = INPUT_REG_ADDR_START1 + i
-            g_modbus_input_paras_dic[reg_addr]['value'] = value
-    print("\r\n")
-    
-    print("Read input registers part2:")
-    register_values = modbus.query_multiple_registers(SLAVE_ID, READ_INPUT_REGISTERS, INPUT_REG_ADDR_START2, INPUT_REG_CNT2)
-    print("Register values:", register_values)
-    # 更新输入寄存器参数字典 g_modbus_input_paras_dic
-    if register_values:
-        for i, value in enumerate(register_values):
-            reg_addr = INPUT_REG_ADDR_START2 + i
-            g_modbus_input_paras_dic[reg_addr]['value'] = value
+    print("Read input registers:")
+    poll_registers(reg_scheduler.all_requests(READ_INPUT_REGISTERS))
     print("\r\n")
 
+#写保持寄存器，连续地址合并为一次0x10写入，写完读回本组校验，并以从机的实际值更新参数字典
+#values为{地址: 值}，返回校验失败的组数
+hold_write_multiple_ok = True #从机不支持0x10时改为逐个0x06写入
+def write_hold_regs(values):
+    global hold_write_multiple_ok
+    fail_cnt = 0
+    for start, run in plan_writes(values):
+        if len(run) > 1 and hold_write_multiple_ok:
+            ret = modbus.write_multiple_holds(SLAVE_ID, start, run)
+            if ret == ILLEGAL_FUNCTION:
+                print("slave does not support 0x10, write one by one.")
+                hold_write_multiple_ok = False
+        if len(run) == 1 or not hold_write_multiple_ok:
+            for i, value in enumerate(run):
+                print("Write hold : %d ,value=%d " % (start + i, value))
+                modbus.write_hold(SLAVE_ID, WRITE_SINGLE_REGISTER, start + i, value)
+        register_values = modbus.query_multiple_registers(SLAVE_ID, READ_HOLDING_REGISTERS, start, len(run))
+        if register_values is None:
+            print("write hold 0x{:04X}+{}: verify read fail!".format(start, len(run)))
+            fail_cnt += 1
+            continue
+        if register_values != run:
+            print("write hold 0x{:04X}+{}: verify fail! want {} got {}".format(start, len(run), run, register_values))
+            fail_cnt += 1
+        reg_scheduler.update(READ_HOLDING_REGISTERS, start, register_values, uptime_sec())
+    return fail_cnt
+
+#读取到期的寄存器，主循环每轮调用
+def poll_due_regs():
+    requests = reg_scheduler.due_requests(uptime_sec())
+    if requests:
+        return poll_registers(requests)
+    return []
+
 #开机读取所有参数
 print("delay 2s to wait for slave device poweron.")
 utime.sleep(2)#等2秒，等从机起来
 read_all_hold_regs()
 read_all_input_regs()
 
-#开机上报一次参数
-if c is not None:
-    print("Poweron event!")
-    c.publish_data_to_mqtt()
-    
 ################# FOTA 初始化########################
 fota = app_fota.new()
 
@@ -1179,19 +1128,21 @@ pm.autosleep(USR_CONFIG_LOWPOWER_MODE)
 ################GPS初始化######################
 if g_modbus_hold_paras_dic[REG_ADDR_HOLD_GPS_ONOFF]['value'] == 1:
     gpsinit()#上电读从机gps开关状态，以决定是否开启gps
-else:
-    loc_by_base()#基站定位
 ####### while大循环 ############################
 mqtt_send_cnt=0
 read_itv_ctr_cnt=0
-gps_itv_ctr_cnt =0
 fota_itv_ctr_cnt =0
-baseloc_itv_ctr_cnt=0
 MAIN_LOOP_DELAY_ITV_SEC = 1
-READ_ITV_SEC = 30 #读从机输入寄存器间隔，单位秒
-GPS_ITV_SEC = 15 #读GPS状态间隔，单位秒
-gps_fail_cnt=0 #gps定位失败次数统计，用于激活基站定位
-BASE_LOC_ITV_SEC = 300 #如果GPS失败超过XXX，执行一次基站定位
+READ_ITV_SEC = 30 #上报间隔，单位秒，寄存器轮询周期见参数字典的period
+
+################启动定位服务######################
+location.gps_enabled = g_modbus_hold_paras_dic[REG_ADDR_HOLD_GPS_ONOFF]['value'] == 1
+location.start()
+
+#开机上报一次全量参数，定位为定位服务启动时的缓存
+if c is not None:
+    print("Poweron event!")
+    c.publish_data_to_mqtt(True)
 
 FOTA_ITV_SEC = 60 # FOTA判断间隔，单位秒
 
@@ -1220,6 +1171,8 @@ try:
         # utime.sleep_ms(1000)
         # Grey_log.info('User Code End\r\n\r\n')
         ########################读从机状态和参数########################
+        #按各寄存器的轮询周期读取到期的寄存器，合并成尽量少的请求
+        poll_due_regs()
         read_itv_ctr_cnt+=1
         itv=READ_ITV_SEC/MAIN_LOOP_DELAY_ITV_SEC
         if read_itv_ctr_cnt%itv == 0:
@@ -1227,10 +1180,7 @@ try:
             print("USR APP VER: {}".format(USR_CONFIG_SW_VERSION))
             rtc_date = rtc.datetime()
             print("{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(rtc_date[0], rtc_date[1], rtc_date[2], rtc_date[4], rtc_date[5], rtc_date[6]))
-
-            print("read itv [%d]sec! read all input regs."%READ_ITV_SEC)
-            read_all_input_regs()        
-            c.publish_data_to_mqtt()
+            c.publish_data_to_mqtt() #只上报变化值，每USR_CONFIG_REPORT_FULL_CYCLES次全量上报
             
         if False:    
             print("********************************")
@@ -1252,11 +1202,12 @@ try:
             # 打印保持寄存器参数字典的JSON字符串
             print("Hold Registers Parameters Dictionary JSON:")
             print(ujson.dumps(g_modbus_hold_paras_dic))
-            #改变的参数写入从机
+            #改变的参数写入从机，连续地址一次写入并读回校验
+            write_values = {}
             for reg_addr, params in g_modbus_hold_paras_dic.items():
                 if params['setflag'] == True:
-                    print("Write hold : %d ,value=%d " % (reg_addr,params['value']))
-                    modbus.write_hold(SLAVE_ID, WRITE_SINGLE_REGISTER, reg_addr, params['value'])
+                    write_values[reg_addr] = params['value']
+            write_hold_regs(write_values)
             
             #gps 开关在本机控制，特殊处理
             if g_modbus_hold_paras_dic[REG_ADDR_HOLD_GPS_ONOFF]['setflag'] == True:
@@ -1268,10 +1219,7 @@ try:
             for reg_addr, params in g_modbus_hold_paras_dic.items():
                 if params['setflag'] == True:
                     params['setflag'] = False
-            #写完了读一下
-            utime.sleep(1)
-            read_all_hold_regs()
-            #上报最新状态
+            #上报最新状态，写入的寄存器已在write_hold_regs中读回
             c.publish_data_to_mqtt()
             
         if False:
@@ -1302,46 +1250,8 @@ try:
         
         
         #######################GPS FUNCTION############################
-        if True:
-            #gps get,gps_onoff=1
-            if g_modbus_hold_paras_dic[REG_ADDR_HOLD_GPS_ONOFF]['value'] == 1:
-                gps_itv_ctr_cnt+=1
-                itv=GPS_ITV_SEC/MAIN_LOOP_DELAY_ITV_SEC
-                if gps_itv_ctr_cnt%itv == 0:
-                    print("\r\n----GPS update event! 上电时长：{}秒.----".format(utime.time()))
-                    print("USR APP VER: {}".format(USR_CONFIG_SW_VERSION))
-                    rtc_date = rtc.datetime()
-                    print("{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(rtc_date[0], rtc_date[1], rtc_date[2], rtc_date[4], rtc_date[5], rtc_date[6]))               
-                    print("gps itv [%d]sec! read gps." % GPS_ITV_SEC)
-                    gps=get_gps_coordinates(quecgnss)
-                    if gps:
-                        if gps['validity'] == 'A': #有合法值
-                            gps_fail_cnt=0 #清除计数器
-                            loc_state='A' #A表示GPS定位成功
-                            longitude = round(convert_longitude(gps['longitude'], gps['lon_dir']), 8)
-                            latitude = round(convert_latitude(gps['latitude'], gps['lat_dir']), 8)
-                            print("GPS经纬度: (", longitude, ", ", latitude, ")")
-    #                         update_rtc_by_gps(gps['date'],gps['time'])
-                        else: #没有定位成功                       
-                            gps_fail_cnt+=1
-                            print("GPS搜星中或定位失败！[{}]".format(gps_fail_cnt))
-                            gitv=BASE_LOC_ITV_SEC//GPS_ITV_SEC #计算需要进入gps采样多少次满足基站定位间隔
-                            if gps_fail_cnt%gitv == 0:
-                                loc_by_base()
-                    else: #没有gps_info结果返回                   
-                        gps_fail_cnt+=1
-                        print("GPS获取失败！[{}]".format(gps_fail_cnt))
-                        gitv=BASE_LOC_ITV_SEC//GPS_ITV_SEC #计算需要进入gps采样多少次满足基站定位间隔
-                        if gps_fail_cnt%gitv == 0:
-                            loc_by_base()
-            #gps_onoff=0,使用基站定位
-            else:
-                baseloc_itv_ctr_cnt+=1
-                itv=BASE_LOC_ITV_SEC//MAIN_LOOP_DELAY_ITV_SEC
-                if baseloc_itv_ctr_cnt % itv == 0:
-                    rtc_date = rtc.datetime()
-                    print("{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(rtc_date[0], rtc_date[1], rtc_date[2], rtc_date[4], rtc_date[5], rtc_date[6]))
-                    loc_by_base()
+        #定位在LocationService线程中完成，这里只同步gps开关状态
+        location.gps_enabled = g_modbus_hold_paras_dic[REG_ADDR_HOLD_GPS_ONOFF]['value'] == 1
                 
         ###################### FOTA ###########################
         if True:
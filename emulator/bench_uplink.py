@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+传感器数据上行编码内存对比
+- 旧方式：parse_sensor_data 生成字典列表，用 ujson.dumps 序列化后再 encode 发布（原 publish_up_sensor_data，
+  设备程序已不再使用，保留在本脚本中作为对比基准）
+- 新方式：保存 [原始样本, 时间戳秒数] 记录，publish_up_sensor_records 由 SensorBatchEncoder
+  直接在预分配的PUBLISH报文缓冲区中编码
+使用 tracemalloc 统计发布过程中的内存峰值（CPython下的数值，用于对比两种方式的相对大小）
+
+用法示例：
+    python emulator/bench_uplink.py --samples 500
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emulator.run_device import SAMPLE_FORMAT, make_sample, load_device_main
+
+
+class NullSocket:
+    """丢弃写入数据的socket"""
+    def write(self, buf):
+        return len(buf)
+
+
+class NullClient:
+    """丢弃发布数据的MQTT客户端"""
+    def __init__(self, with_sock):
+        self.sock = NullSocket() if with_sock else None
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        pass
+
+
+def publish_dicts(device, client, sensor_data_list):
+    """旧方式：为每个样本字典添加版本字段，整批 ujson.dumps 后发布（原 publish_up_sensor_data）"""
+    for sensor_data in sensor_data_list:
+        sensor_data['version'] = device.APP_VERSION
+    payload = device.ujson.dumps({
+        'event': 'SENSOR_DATA',
+        'data': sensor_data_list,
+        'version': device.APP_VERSION
+    })
+    client.client.publish(client.topic_up.encode('utf-8'), payload.encode('utf-8'), qos=0)
+
+
+def measure(func, *args):
+    """返回 (函数执行期间新增内存的峰值, 耗时ms)"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    func(*args)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak, elapsed_ms
+
+
+def resident_size(func):
+    """返回 func() 生成并保留的对象占用的内存"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    obj = func()
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器数据上行编码内存对比")
+    parser.add_argument("--samples", type=int, default=500, help="批次样本数")
+    args = parser.parse_args()
+
+    device = load_device_main()
+    device.logger.console = False
+    raw = b''.join(struct.pack(SAMPLE_FORMAT, *make_sample(i)) for i in range(args.samples))
+    stm32 = device.STM32Communication(None, 115200)
+    epoch = 1760000000
+
+    client = device.MyMQTTClient("127.0.0.1", 1883, "", "", "861197065268692")
+    client.is_connected = True
+
+    dicts, dicts_size = resident_size(lambda: stm32.parse_sensor_data(raw))
+    client.client = NullClient(with_sock=False)
+    old_peak, old_ms = measure(publish_dicts, device, client, dicts)
+
+    records, records_size = resident_size(lambda: [[s, epoch] for s in stm32.split_sensor_samples(raw)])
+    client.client = NullClient(with_sock=True)
+    # 首次编码按批次大小扩大缓冲区，之后复用
+    client.publish_up_sensor_records(records)
+    start, payload_start, end = client.uplink_encoder.encode(records)
+    new_peak, new_ms = measure(client.publish_up_sensor_records, records)
+
+    print("=" * 50)
+    print("批次样本数: %d，JSON载荷: %d 字节" % (args.samples, end - payload_start))
+    print("待发送数据: 字典列表 %d 字节，样本记录 %d 字节" % (dicts_size, records_size))
+    print("旧方式发布峰值: %d 字节，耗时 %.1f ms" % (old_peak, old_ms))
+    print("新方式发布峰值: %d 字节，耗时 %.1f ms（另有常驻报文缓冲区 %d 字节）" %
+          (new_peak, new_ms, len(client.uplink_encoder.buf)))
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+电池从机 Modbus RTU 仿真器（Linux pty）
+功能：
+- 创建一对 pty，在主端按 modbus_rtu.slave_sim.ModbusSlave 的寄存器表应答 0x03/0x04/0x06/0x10 请求，
+  从端路径可交给 machine.SerialLink（仿真运行 doc/dc_main.py）或其他串口工具使用
+- 寄存器表可用 JSON 文件配置，缺省为网关 doc/dc_main.py 中的电池寄存器（经纬度寄存器不可读）
+- 故障注入：应答延时、按字节数分片发送及分片间隔、CRC错误、异常响应（从机忙）、不应答
+- --drift 时放电功率、电量、放电时长随时间变化，用于观察按变化上报
+
+用法示例：
+    python emulator/modbus_slave.py --latency-ms 5 --fragment 4 --crc-error-rate 0.05
+    python emulator/modbus_slave.py --map battery.json --exception-rate 0.02 --drift
+"""
+
+import argparse
+import json
+import os
+import pty
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modbus_rtu.crc import append_crc, check_crc
+from modbus_rtu.rtu import silent_interval_us
+from modbus_rtu.slave_sim import ModbusSlave
+
+SLAVE_ID = 0x0F
+SERVER_DEVICE_BUSY = 0x06
+
+# 缺省寄存器表，与 doc/dc_main.py 一致
+DEFAULT_HOLDING = {0x3000: 1, 0x3001: 1, 0x3002: 0, 0x3003: 1, 0x3004: 1, 0x3005: 80}
+DEFAULT_INPUTS = {0x3100: 1014, 0x3101: 0, 0x3102: 0, 0x3103: 150, 0x3104: 800, 0x3105: 80,
+                  0x310E: 80, 0x310F: 0x15, 0x3110: 0}
+
+
+def load_register_map(path):
+    """读取寄存器表JSON：{"slave_id": 15, "holding": {"0x3000": 1, ...}, "inputs": {...}}"""
+    with open(path) as f:
+        config = json.load(f)
+    holding = dict((int(k, 0), v) for k, v in config.get("holding", {}).items())
+    inputs = dict((int(k, 0), v) for k, v in config.get("inputs", {}).items())
+    return config.get("slave_id", SLAVE_ID), holding, inputs
+
+
+def request_length(buf):
+    """根据已收到的请求推算请求帧长度，信息不足返回0，无法推算返回-1"""
+    if len(buf) < 2:
+        return 0
+    fc = buf[1]
+    if fc in (0x03, 0x04, 0x06):
+        return 8
+    if fc == 0x10:
+        if len(buf) < 7:
+            return 0
+        return 9 + buf[6]
+    return -1
+
+
+class PtyModbusSlave(threading.Thread):
+    """在pty上运行的 Modbus RTU 从机"""
+    def __init__(self, slave, baudrate=115200, latency_ms=5.0, fragment_size=0, fragment_gap_ms=0.0,
+                 crc_error_rate=0.0, exception_rate=0.0, drop_rate=0.0, seed=None):
+        super().__init__(daemon=True)
+        self.slave = slave
+        self.char_time = 11.0 / baudrate
+        self.t35 = silent_interval_us(baudrate) / 1000000.0
+        self.latency = latency_ms / 1000.0
+        self.fragment_size = fragment_size  # 每片字节数，0表示整帧发送
+        self.fragment_gap = fragment_gap_ms / 1000.0  # 分片之间额外的间隔
+        self.crc_error_rate = crc_error_rate
+        self.exception_rate = exception_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.path = os.ttyname(self.slave_fd)
+        self.running = True
+        self.requests = 0  # 收到的完整请求帧数
+        self.bad_requests = 0  # CRC错误或无法解析的请求
+        self.injected_crc_errors = 0
+        self.injected_exceptions = 0
+        self.dropped = 0
+        self.response_times = []  # 收到请求到响应发送完成的耗时（秒）
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        buf = bytearray()
+        last_rx = time.monotonic()
+        while self.running:
+            ready, _, _ = select.select([self.master_fd], [], [], self.t35 if buf else 0.1)
+            now = time.monotonic()
+            if ready:
+                buf.extend(os.read(self.master_fd, 256))
+                last_rx = now
+            while buf:
+                length = request_length(buf)
+                if 0 < length <= len(buf):
+                    frame = bytes(buf[:length])
+                    del buf[:length]
+                    self.serve(frame)
+                elif not ready and now - last_rx >= self.t35:
+                    # 不完整或无法解析的数据，静默间隔后丢弃
+                    self.bad_requests += 1
+                    del buf[:]
+                else:
+                    break
+
+    def serve(self, frame):
+        start = time.monotonic()
+        self.requests += 1
+        if frame[0] != self.slave.slave_id:
+            return
+        if not check_crc(frame):
+            self.bad_requests += 1
+            return
+        if self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        if self.random.random() < self.exception_rate:
+            self.injected_exceptions += 1
+            response = bytes(append_crc(bytearray([self.slave.slave_id, frame[1] | 0x80, SERVER_DEVICE_BUSY])))
+        else:
+            response = self.slave.handle(frame)
+            if response is None:
+                return
+        if self.random.random() < self.crc_error_rate:
+            self.injected_crc_errors += 1
+            response = response[:-1] + bytes([response[-1] ^ 0xFF])
+        # 请求在pty上是瞬间到达的，这里补上请求的传输时间和从机处理延时
+        time.sleep(len(frame) * self.char_time + self.latency)
+        size = self.fragment_size or len(response)
+        for i in range(0, len(response), size):
+            chunk = response[i:i + size]
+            os.write(self.master_fd, chunk)
+            delay = len(chunk) * self.char_time
+            if i + size < len(response):
+                delay += self.fragment_gap
+            time.sleep(delay)
+        self.response_times.append(time.monotonic() - start)
+
+
+class BatteryDrift(threading.Thread):
+    """放电状态：放电功率在150W附近波动，每分钟电量减1%，放电时长(HHMM)按电量折算"""
+    def __init__(self, slave, seed=None):
+        super().__init__(daemon=True)
+        self.slave = slave
+        self.random = random.Random(seed)
+        self.running = True
+
+    def run(self):
+        start = time.monotonic()
+        inputs = self.slave.inputs
+        level = inputs.get(0x3105, 80)
+        while self.running:
+            minutes = int(time.monotonic() - start) // 60
+            battery = max(level - minutes, 0)
+            inputs[0x3103] = 150 + self.random.randint(-4, 4)
+            inputs[0x3105] = battery
+            remain = battery * 6
+            inputs[0x3104] = remain // 60 * 100 + remain % 60
+            time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电池从机 Modbus RTU 仿真器（pty）")
+    parser.add_argument("--map", default=None, help="寄存器表JSON文件，缺省为网关的电池寄存器")
+    parser.add_argument("--baud", type=int, default=115200, help="波特率（用于传输时间和静默间隔）")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="从机处理延时（毫秒）")
+    parser.add_argument("--fragment", type=int, default=0, help="响应分片字节数，0表示整帧发送")
+    parser.add_argument("--fragment-gap-ms", type=float, default=0.0, help="分片之间额外的间隔（毫秒）")
+    parser.add_argument("--crc-error-rate", type=float, default=0.0, help="响应CRC错误的概率")
+    parser.add_argument("--exception-rate", type=float, default=0.0, help="返回异常响应（从机忙）的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="不应答的概率")
+    parser.add_argument("--drift", action="store_true", help="模拟放电过程中寄存器值的变化")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+
+    if args.map:
+        slave_id, holding, inputs = load_register_map(args.map)
+    else:
+        slave_id, holding, inputs = SLAVE_ID, DEFAULT_HOLDING, DEFAULT_INPUTS
+    server = PtyModbusSlave(ModbusSlave(slave_id, holding, inputs), args.baud, args.latency_ms, args.fragment,
+                            args.fragment_gap_ms, args.crc_error_rate, args.exception_rate, args.drop_rate,
+                            args.seed)
+    server.start()
+    if args.drift:
+        BatteryDrift(server.slave, args.seed).start()
+    print("从机地址 0x%02X，串口: %s（Ctrl+C 退出）" % (slave_id, server.path))
+    try:
+        while True:
+            time.sleep(10)
+            print("请求 %d，事务 %d，注入CRC错误 %d，异常响应 %d，不应答 %d" %
+                  (server.requests, server.slave.transactions, server.injected_crc_errors,
+                   server.injected_exceptions, server.dropped))
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+MicroPython 堆行为模型（仿真用）
+
+CPython 使用引用计数，垃圾会立即释放，也没有 gc.mem_free()/gc.mem_alloc()。
+为了在电脑上观察 GC 调度对主循环的影响，这里按 MicroPython 的方式建模：
+- 已分配 = 常驻数据 + 自上次回收以来产生的垃圾
+- 仿真串口读、MQTT发布时按数据量登记分配（系数为估算值）
+- 堆满时自动回收，回收耗时与已分配字节数成正比，在触发分配的位置阻塞
+install() 启用模型并返回仿真用的 gc 模块（MicroPython 的 mem_alloc/mem_free/collect/threshold 由模型提供），
+由加载设备程序的一方放入被加载模块的命名空间，不修改 CPython 自身的 gc 模块。
+"""
+
+import gc as _gc
+import time as _time
+import types as _types
+
+# 模型参数（估算值，可由仿真器修改）
+HEAP_SIZE = 256 * 1024  # 堆大小（字节）
+LIVE_BYTES = 48 * 1024  # 常驻数据（字节）
+GC_MS_PER_KB = 0.06  # 每KB已分配内存的回收耗时（毫秒）
+UART_ALLOC_FACTOR = 12  # 每个串口字节引起的分配（切片、解包、样本字典）
+PUBLISH_ALLOC_FACTOR = 3  # 每个发布字节引起的分配（字典列表、JSON字符串、编码副本）
+
+enabled = False
+garbage = 0
+auto_collections = 0
+explicit_collections = 0
+auto_max_stall_ms = 0.0  # 自动回收（发生在读串口/发布的途中）的最大停顿
+explicit_max_stall_ms = 0.0  # 主动回收的最大停顿
+
+def mem_alloc():
+    return LIVE_BYTES + garbage
+
+
+def mem_free():
+    return HEAP_SIZE - mem_alloc()
+
+
+def _sweep():
+    """回收全部垃圾，按模型阻塞并返回停顿时长（毫秒）"""
+    global garbage
+    stall_ms = mem_alloc() / 1024.0 * GC_MS_PER_KB
+    _time.sleep(stall_ms / 1000.0)
+    garbage = 0
+    return stall_ms
+
+
+def collect():
+    global explicit_collections, explicit_max_stall_ms
+    if enabled:
+        explicit_collections += 1
+        explicit_max_stall_ms = max(explicit_max_stall_ms, _sweep())
+
+
+def threshold(amount=None):
+    return -1
+
+
+def alloc(nbytes):
+    """登记一次分配，堆满时触发自动回收"""
+    global garbage, auto_collections, auto_max_stall_ms
+    if not enabled:
+        return
+    if mem_alloc() + nbytes > HEAP_SIZE:
+        auto_collections += 1
+        auto_max_stall_ms = max(auto_max_stall_ms, _sweep())
+    garbage += nbytes
+
+
+def fake_gc():
+    """仿真用的 gc 模块：其余属性取自 CPython 的 gc，MicroPython 接口由模型提供"""
+    module = _types.ModuleType("gc", "MicroPython gc（堆行为模型）")
+    module.__dict__.update((name, getattr(_gc, name)) for name in dir(_gc) if not name.startswith('__'))
+    module.mem_alloc = mem_alloc
+    module.mem_free = mem_free
+    module.collect = collect
+    module.threshold = threshold
+    return module
+
+
+def install():
+    """启用模型，返回仿真用的 gc 模块"""
+    global enabled
+    enabled = True
+    return fake_gc()
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""QuecPython app_fota 模块的Linux仿真实现，download() 总是返回-1（没有新版本）"""
+
+
+class _Fota:
+    def __init__(self):
+        self.downloads = 0
+
+    def download(self, url, path):
+        self.downloads += 1
+        return -1
+
+    def set_update_flag(self):
+        pass
+
+
+def new():
+    return _Fota()
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""QuecPython cellLocator 模块的Linux仿真实现，DELAY_S 模拟基站定位耗时，FIX 为 None 时返回失败"""
+import utime
+
+DELAY_S = 0.0
+FIX = (104.7463432, 31.4627341, 550)  # (经度, 纬度, 误差米)
+requests = 0
+
+
+def getLocation(server, port, token, timeout, profile):
+    global requests
+    requests += 1
+    if DELAY_S:
+        utime.sleep(min(DELAY_S, timeout))
+    if FIX is None or DELAY_S > timeout:
+        return -1
+    return FIX
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""QuecPython checkNet 模块的Linux仿真实现，CONNECT_AFTER_S 秒后网络就绪"""
+import utime
+
+CONNECT_AFTER_S = 0.0
+
+
+def wait_network_connected(timeout):
+    deadline = utime.ticks_ms() + timeout * 1000
+    while utime.ticks_ms() < CONNECT_AFTER_S * 1000:
+        if utime.ticks_ms() >= deadline:
+            return 2, 0
+        utime.sleep_ms(50)
+    return 3, 1
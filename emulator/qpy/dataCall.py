@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""QuecPython dataCall 模块的Linux仿真实现"""
+
+_callback = None
+
+
+def setCallback(cb):
+    global _callback
+    _callback = cb
+    return 0
+
+
+def getInfo(profile_id, ip_type):
+    return (1, 0, [1, 0, "10.0.0.2", "0.0.0.0", "0.0.0.0"])
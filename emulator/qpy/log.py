@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""QuecPython log 模块的Linux仿真实现"""
+import logging as _logging
+
+DEBUG = _logging.DEBUG
+INFO = _logging.INFO
+WARNING = _logging.WARNING
+ERROR = _logging.ERROR
+CRITICAL = _logging.CRITICAL
+
+
+def basicConfig(level=INFO):
+    _logging.basicConfig(level=level)
+
+
+def getLogger(name):
+    return _logging.getLogger(name)
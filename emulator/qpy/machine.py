@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+QuecPython machine 模块的Linux仿真实现
+- UART：每个端口对应一个链路对象，默认是内存链路 MemoryLink，
+  仿真器通过 link(port).feed() 注入"STM32发来的"字节，通过 drain() 取走设备写出的字节
+- SerialLink：连接到串口设备或pty（如 emulator/modbus_slave.py 创建的从机），用 set_link() 替换端口链路
+- RTC：读写 utime 中的仿真RTC
+- Pin/ExtInt：只记录电平和使能状态，ExtInt.trigger() 模拟触发中断
+- UART.read 按读到的字节数向 _heapmodel 登记堆分配
+"""
+
+import threading
+import calendar
+import fcntl
+import os
+import struct
+import termios
+import tty
+import utime
+import _heapmodel
+
+
+class MemoryLink:
+    """内存串口链路：rx 为设备可读的数据，tx 为设备写出的数据"""
+    def __init__(self):
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._lock = threading.Lock()
+        self.rx_total = 0
+
+    def feed(self, data):
+        """向设备侧注入数据（模拟对端发送）"""
+        with self._lock:
+            self._rx.extend(data)
+            self.rx_total += len(data)
+
+    def drain(self):
+        """取走设备侧写出的全部数据"""
+        with self._lock:
+            data = bytes(self._tx)
+            del self._tx[:]
+            return data
+
+    def any(self):
+        with self._lock:
+            return len(self._rx)
+
+    def read(self, n=-1):
+        with self._lock:
+            if n is None or n < 0 or n > len(self._rx):
+                n = len(self._rx)
+            data = bytes(self._rx[:n])
+            del self._rx[:n]
+            return data
+
+    def write(self, data):
+        with self._lock:
+            self._tx.extend(data)
+        return len(data)
+
+
+class SerialLink:
+    """串口设备链路：以非阻塞方式打开 path，设置为原始模式（不转换换行、不回显）"""
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.fd)
+        self.rx_total = 0
+
+    def any(self):
+        return struct.unpack('i', fcntl.ioctl(self.fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.any()
+        if n <= 0:
+            return b''
+        try:
+            data = os.read(self.fd, n)
+        except BlockingIOError:
+            return b''
+        self.rx_total += len(data)
+        return data
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+    def close(self):
+        os.close(self.fd)
+
+
+_links = {}
+
+
+def link(port):
+    """获取（必要时创建）端口对应的链路对象"""
+    if port not in _links:
+        _links[port] = MemoryLink()
+    return _links[port]
+
+
+def set_link(port, obj):
+    """替换端口的链路实现（需提供 any/read/write）"""
+    _links[port] = obj
+
+
+class UART:
+    UART0 = 0
+    UART1 = 1
+    UART2 = 2
+    UART3 = 3
+
+    def __init__(self, port, baudrate=115200, bits=8, parity=0, stop=1, flowctl=0):
+        self.port = port
+        self.baudrate = baudrate
+        self._link = link(port)
+
+    def any(self):
+        return self._link.any()
+
+    def read(self, n=-1):
+        data = self._link.read(n)
+        _heapmodel.alloc(len(data) * _heapmodel.UART_ALLOC_FACTOR)
+        return data
+
+    def write(self, data):
+        return self._link.write(bytes(data))
+
+    def close(self):
+        pass
+
+
+class RTC:
+    def datetime(self, *args):
+        if not args:
+            t = utime.localtime()
+            # (year, month, day, week, hour, minute, second, microsecond)
+            return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+        v = args[0] if len(args) == 1 else args
+        try:
+            epoch = calendar.timegm((v[0], v[1], v[2], v[4], v[5], v[6], 0, 0, 0))
+        except Exception:
+            return -1
+        utime._rtc_set(epoch)
+        return 0
+
+
+class Pin:
+    OUT = 1
+    IN = 0
+    PULL_DISABLE = 0
+    PULL_PU = 1
+    PULL_PD = 2
+
+    def __init__(self, gpio, direction=IN, pull=PULL_DISABLE, level=0):
+        self.gpio = gpio
+        self.level = level
+
+    def write(self, value):
+        self.level = value
+        return 0
+
+    def read(self):
+        return self.level
+
+
+class ExtInt:
+    IRQ_RISING = 0
+    IRQ_FALLING = 1
+    IRQ_RISING_FALLING = 2
+    PULL_DISABLE = 0
+    PULL_PU = 1
+    PULL_PD = 2
+
+    def __init__(self, gpio, mode, pull, callback):
+        self.gpio = gpio
+        self.mode = mode
+        self.callback = callback
+        self.enabled = False
+
+    def enable(self):
+        self.enabled = True
+        return 0
+
+    def disable(self):
+        self.enabled = False
+        return 0
+
+    def trigger(self):
+        """仿真器模拟触发一次中断"""
+        if self.enabled:
+            self.callback([self.gpio, self.mode])
+
+
+# GPIO编号常量（Pin.GPIO1 ~ Pin.GPIO40，ExtInt同）
+for _i in range(1, 41):
+    setattr(Pin, "GPIO%d" % _i, _i)
+    setattr(ExtInt, "GPIO%d" % _i, _i)
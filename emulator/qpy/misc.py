@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""QuecPython misc 模块的Linux仿真实现"""
+
+
+class Power:
+    restart_requested = 0
+
+    @staticmethod
+    def powerRestart():
+        Power.restart_requested += 1
+        print("[emulator] Power.powerRestart() 被调用")
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""QuecPython modem 模块的Linux仿真实现"""
+
+IMEI = "861197065268692"
+
+
+def getDevImei():
+    return IMEI
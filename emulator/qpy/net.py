@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""QuecPython net 模块的Linux仿真实现，NITZ_AFTER_S 秒后可获取基站时间"""
+import time as _time
+import utime
+
+NITZ_AFTER_S = 0.0
+
+
+def getState():
+    return ([0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0])
+
+
+def csqQueryPoll():
+    return 25
+
+
+def operatorName():
+    return ("CHINA MOBILE", "CMCC", "460", "00")
+
+
+def nitzTime():
+    if utime.ticks_ms() < NITZ_AFTER_S * 1000:
+        return ("", "", 0)
+    # 返回UTC时间及时区(单位：小时，与设备代码的解析方式一致)
+    t = _time.gmtime()
+    s = "%02d/%02d/%02d %02d:%02d:%02d +8 0" % (t.tm_year % 100, t.tm_mon, t.tm_mday,
+                                                t.tm_hour, t.tm_min, t.tm_sec)
+    return (s, "", 0)
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""QuecPython pm 模块的Linux仿真实现"""
+
+
+def create_wakelock(name, size):
+    return 1
+
+
+def autosleep(mode):
+    return 0
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+QuecPython quecgnss 模块的Linux仿真实现
+init() 后 get_state() 为2（定位中），read() 循环返回 NMEA 数据流，
+默认数据为 nmea.bench_nmea.SAMPLE_STREAM（dc_main.get_gps_coordinates 中的样例）
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from nmea.bench_nmea import SAMPLE_STREAM
+
+STREAM = SAMPLE_STREAM
+_state = 0
+_pos = 0
+
+
+def init():
+    global _state
+    _state = 2
+    return 0
+
+
+def gnssEnable(on):
+    global _state
+    _state = 2 if on else 0
+    return 0
+
+
+def get_state():
+    return _state
+
+
+def read(size):
+    """返回 (长度, 数据)，数据从上次读取的位置接着取"""
+    global _pos
+    data = ''
+    while len(data) < size:
+        chunk = STREAM[_pos:_pos + size - len(data)]
+        data += chunk
+        _pos = (_pos + len(chunk)) % len(STREAM)
+    return (len(data), data)
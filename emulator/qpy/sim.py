@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""QuecPython sim 模块的Linux仿真实现，READY_AFTER_S 秒后SIM卡就绪"""
+import utime
+
+READY_AFTER_S = 0.0
+IMSI = "460001234567890"
+ICCID = "89860000000000000000"
+
+
+def _ready():
+    return utime.ticks_ms() >= READY_AFTER_S * 1000
+
+
+def getImsi():
+    return IMSI if _ready() else -1
+
+
+def getIccid():
+    return ICCID if _ready() else -1
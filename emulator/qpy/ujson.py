@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+"""QuecPython ujson 模块的Linux仿真实现"""
+from json import *  # noqa: F401,F403
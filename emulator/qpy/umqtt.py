@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+QuecPython umqtt 模块的Linux仿真实现
+不连接真实服务器，publish 的消息记录在 MQTTClient.published 中，
+CONNECT_DELAY_S 可模拟建连耗时；publish 按消息长度向 _heapmodel 登记堆分配。
+连接后提供 sock 属性，直接写入的QoS0 PUBLISH报文会被解码并同样记录。
+"""
+import threading
+import utime
+import _heapmodel
+
+CONNECT_DELAY_S = 0.0
+
+
+class _PacketSocket:
+    """仿真socket：解码写入的PUBLISH报文（每次写入一个完整报文）"""
+    def __init__(self, client):
+        self._client = client
+
+    def write(self, buf, n=None):
+        data = bytes(buf if n is None else buf[:n])
+        if not self._client._connected:
+            raise OSError("not connected")
+        if data[0] & 0xF0 != 0x30:
+            return len(data)
+        pos, remaining, shift = 1, 0, 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            remaining |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        if len(data) - pos != remaining:
+            raise ValueError("incomplete PUBLISH packet")
+        topic_len = (data[pos] << 8) | data[pos + 1]
+        topic = data[pos + 2:pos + 2 + topic_len]
+        msg = data[pos + 2 + topic_len:]
+        # 编码器每个样本产生一个JSON片段及其编码副本
+        _heapmodel.alloc(len(msg) * 2)
+        MQTTClient.published.append((utime.ticks_ms(), topic, msg))
+        return len(data)
+
+
+class MQTTClient:
+    published = []  # [(ticks_ms, topic, msg)]，所有实例共享，便于仿真器统计
+
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0,
+                 ssl=False, ssl_params={}, reconn=True):
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.cb = None
+        self._err_cb = None
+        self._connected = False
+        self.sock = None
+        self._inbox = []
+        self._event = threading.Event()
+
+    def connect(self, clean_session=True):
+        if CONNECT_DELAY_S:
+            utime.sleep(CONNECT_DELAY_S)
+        self._connected = True
+        self.sock = _PacketSocket(self)
+        return 0
+
+    def set_callback(self, cb):
+        self.cb = cb
+
+    def error_register_cb(self, func):
+        self._err_cb = func
+
+    def subscribe(self, topic, qos=0):
+        return 0
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        if not self._connected:
+            raise OSError("not connected")
+        _heapmodel.alloc(len(msg) * _heapmodel.PUBLISH_ALLOC_FACTOR)
+        MQTTClient.published.append((utime.ticks_ms(), topic, bytes(msg)))
+
+    def ping(self):
+        if not self._connected:
+            raise OSError("not connected")
+
+    def inject(self, topic, msg):
+        """仿真器向设备投递一条下行消息"""
+        self._inbox.append((topic, msg))
+        self._event.set()
+
+    def wait_msg(self):
+        self._event.wait(1)
+        self._event.clear()
+        while self._inbox:
+            topic, msg = self._inbox.pop(0)
+            if self.cb:
+                self.cb(topic, msg)
+
+    def get_mqttsta(self):
+        return 0 if self._connected else -1
+
+    def close(self):
+        self._connected = False
+        self.sock = None
+
+    def disconnect(self):
+        self._connected = False
+        self.sock = None
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+"""QuecPython ustruct 模块的Linux仿真实现"""
+from struct import *  # noqa: F401,F403
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+QuecPython utime 模块的Linux仿真实现
+- ticks_* 基于单调时钟，从模块导入（即"上电"）时刻开始计数
+- time()/localtime() 基于仿真RTC，RTC未设置时从2000-01-01开始走时
+"""
+
+import time as _time
+
+_BOOT = _time.monotonic()
+# 仿真RTC：RTC时间 = _rtc_base + (单调时钟 - _rtc_set_at)
+_rtc_base = 946684800  # 2000-01-01 00:00:00
+_rtc_set_at = _BOOT
+
+
+def _rtc_set(epoch):
+    """由 machine.RTC 调用，设置RTC时间（秒）"""
+    global _rtc_base, _rtc_set_at
+    _rtc_base = epoch
+    _rtc_set_at = _time.monotonic()
+
+
+def _rtc_now():
+    return _rtc_base + (_time.monotonic() - _rtc_set_at)
+
+
+def ticks_ms():
+    return int((_time.monotonic() - _BOOT) * 1000)
+
+
+def ticks_us():
+    return int((_time.monotonic() - _BOOT) * 1000000)
+
+
+def ticks_diff(new, old):
+    return new - old
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def sleep(seconds):
+    _time.sleep(seconds)
+
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000.0)
+
+
+def sleep_us(us):
+    _time.sleep(us / 1000000.0)
+
+
+def time():
+    return int(_rtc_now())
+
+
+def localtime(secs=None):
+    """返回 (year, month, mday, hour, minute, second, weekday, yearday)"""
+    if secs is None:
+        secs = _rtc_now()
+    t = _time.gmtime(int(secs))
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, t.tm_wday, t.tm_yday)
+
+
+def mktime(t):
+    import calendar
+    return calendar.timegm((t[0], t[1], t[2], t[3], t[4], t[5], 0, 0, 0))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+4G模块程序 Linux 仿真运行器
+功能：
+- 使用 emulator/qpy 下的 QuecPython 仿真模块，在电脑上直接运行 device/main.py
+- 模拟STM32从上电开始按固定频率发送传感器数据帧
+- 可配置SIM卡就绪、网络注册、基站对时、MQTT建连的耗时
+- 运行结束后统计上电到首个样本、首次发布的耗时及发布的样本数
+- 可模拟低速控制台串口（--console-baud），对比不同日志级别下的主循环耗时
+- 按 MicroPython 方式模拟堆（emulator/qpy/_heapmodel.py），对比主动GC调度前后的主循环最大停顿
+- --capture 时录制设备 UART2 每次读到和写出的原始字节（stm32_protocol/capture.py 格式），可用于回放
+
+用法示例：
+    python emulator/run_device.py --duration 20 --net-delay 8 --nitz-delay 12
+    python emulator/run_device.py --quiet --console-baud 115200 --log-level DEBUG
+    python emulator/run_device.py --quiet --rate 50 --gc-threshold 0
+    python emulator/run_device.py --quiet --rate 100 --per-frame 5 --capture uart2.ucap
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QPY_DIR = os.path.join(ROOT, "emulator", "qpy")
+sys.path.insert(0, ROOT)
+
+from stm32_protocol import SAMPLE_FORMAT, pack_sensor_frame
+
+
+def make_sample(order):
+    """生成一个静止状态的传感器样本"""
+    return (order % 256, 59 + random.randint(-2, 2), -2, 72, -10, -14, -5, -10, -14, -5,
+            -3, -409, 96314, 425.75, 104.7463432, 31.4627341)
+
+
+def load_device_main():
+    """以仿真模块为依赖加载 device/main.py"""
+    if QPY_DIR not in sys.path:
+        sys.path.insert(0, QPY_DIR)
+    # 设备程序使用 MicroPython 的 gc.mem_free()/gc.mem_alloc()：只在加载期间把仿真 gc 放入 sys.modules，
+    # 设备程序的 import gc 绑定到仿真模块，加载后恢复，CPython 自身的 gc 不受影响
+    import _heapmodel
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("device_main", os.path.join(ROOT, "device", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    real_gc = sys.modules['gc']
+    sys.modules['gc'] = _heapmodel.install()
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.modules['gc'] = real_gc
+    return module
+
+
+class SlowConsole:
+    """模拟低速控制台串口：每次写入按波特率阻塞相应时间"""
+    def __init__(self, stream, baud):
+        self.stream = stream
+        self.byte_time = 10.0 / baud  # 每字节10位（起始位+8数据位+停止位）
+
+    def write(self, text):
+        self.stream.write(text)
+        time.sleep(len(text.encode('utf-8')) * self.byte_time)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class STM32Feeder(threading.Thread):
+    """模拟STM32：上电即按 rate 个样本/秒发送，每帧 per_frame 个样本"""
+    def __init__(self, link, rate, per_frame):
+        super().__init__(daemon=True)
+        self.link = link
+        self.rate = rate
+        self.per_frame = per_frame
+        self.sent_samples = 0
+        self.running = True
+
+    def run(self):
+        order = 0
+        interval = self.per_frame / float(self.rate)
+        next_time = time.monotonic()
+        while self.running:
+            samples = [make_sample(order + i) for i in range(self.per_frame)]
+            order += self.per_frame
+            self.link.feed(pack_sensor_frame(samples))
+            self.sent_samples += self.per_frame
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="device/main.py Linux 仿真运行器")
+    parser.add_argument("--duration", type=float, default=20.0, help="运行时长（秒）")
+    parser.add_argument("--rate", type=int, default=10, help="STM32样本速率（个/秒）")
+    parser.add_argument("--per-frame", type=int, default=1, help="每帧样本数")
+    parser.add_argument("--sim-delay", type=float, default=2.0, help="SIM卡就绪耗时（秒）")
+    parser.add_argument("--net-delay", type=float, default=8.0, help="网络注册耗时（秒）")
+    parser.add_argument("--nitz-delay", type=float, default=12.0, help="基站时间可用耗时（秒）")
+    parser.add_argument("--mqtt-delay", type=float, default=0.5, help="MQTT建连耗时（秒）")
+    parser.add_argument("--quiet", action="store_true", help="屏蔽设备程序的打印输出")
+    parser.add_argument("--console-baud", type=int, default=0, help="模拟控制台串口波特率，0表示不限速")
+    parser.add_argument("--log-level", default=None, help="设备日志级别（DEBUG/INFO/WARN/ERROR/OFF）")
+    parser.add_argument("--gc-threshold", type=int, default=None, help="主动GC阈值（字节），0表示只依赖自动回收")
+    parser.add_argument("--heap-size", type=int, default=None, help="仿真堆大小（字节）")
+    parser.add_argument("--capture", default=None, help="录制 UART2 原始字节的抓包文件")
+    args = parser.parse_args()
+
+    sys.path.insert(0, QPY_DIR)
+    import sim
+    import checkNet
+    import net
+    import umqtt
+    import machine
+    import utime
+    import _heapmodel
+    if args.heap_size:
+        _heapmodel.HEAP_SIZE = args.heap_size
+    sim.READY_AFTER_S = args.sim_delay
+    checkNet.CONNECT_AFTER_S = args.net_delay
+    net.NITZ_AFTER_S = args.nitz_delay
+    umqtt.CONNECT_DELAY_S = args.mqtt_delay
+
+    device = load_device_main()
+    if args.log_level:
+        device.logger.set_level(args.log_level)
+    if args.gc_threshold is not None:
+        device.GC_COLLECT_THRESHOLD = args.gc_threshold
+    feeder = STM32Feeder(machine.link(machine.UART.UART2), args.rate, args.per_frame)
+    writer = None
+    if args.capture:
+        from stm32_protocol.capture import CaptureTap, CaptureWriter
+        writer = CaptureWriter(args.capture)
+        machine.set_link(machine.UART.UART2, CaptureTap(feeder.link, writer))
+    feeder.start()
+
+    real_stdout = sys.stdout
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+    if args.console_baud:
+        sys.stdout = SlowConsole(sys.stdout, args.console_baud)
+    threading.Thread(target=device.main, daemon=True).start()
+    time.sleep(args.duration)
+    feeder.running = False
+    sys.stdout = real_stdout
+    if writer:
+        writer.close()
+
+    published = umqtt.MQTTClient.published
+    sensor_msgs = []
+    for ticks, topic, msg in published:
+        payload = json.loads(msg)
+        if payload.get('event') == 'SENSOR_DATA':
+            sensor_msgs.append((ticks, payload))
+    samples = sum(len(p['data']) for _, p in sensor_msgs)
+    print("=" * 50)
+    print("仿真统计（运行 %.1f 秒）" % args.duration)
+    print("STM32发送样本数: %d" % feeder.sent_samples)
+    print("发布传感器消息数: %d，样本数: %d" % (len(sensor_msgs), samples))
+    if sensor_msgs:
+        first_ticks, first_payload = sensor_msgs[0]
+        print("上电到首次发布: %d ms" % first_ticks)
+        print("首批首个样本时间戳: %s" % first_payload['data'][0]['timestamp'])
+    stats = device.loop_stats
+    print("日志级别: %s" % device.logger.level_name())
+    print("主循环: %d 轮，平均耗时 %d us，最大耗时 %.1f ms" % (stats.count, stats.avg_us(), stats.max_us / 1000.0))
+    heap = device.heap_stats
+    print("堆: 阈值 %d，最低空闲 %d，最高已分配 %d，每帧分配约 %d 字节" %
+          (device.GC_COLLECT_THRESHOLD, heap.min_free, heap.max_alloc, heap.bytes_per_frame))
+    print("GC: 主动 %d 次（模型停顿最大 %.1f ms，实测最大 %d us），帧处理途中自动回收 %d 次（模型停顿最大 %.1f ms）" %
+          (heap.collections, _heapmodel.explicit_max_stall_ms, heap.collect_max_us,
+           _heapmodel.auto_collections, _heapmodel.auto_max_stall_ms))
+    print("当前仿真RTC时间: %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(utime.time())))
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
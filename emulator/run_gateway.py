@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+电池网关程序 Linux 仿真运行器
+功能：
+- 使用 emulator/qpy 下的 QuecPython 仿真模块，在电脑上直接运行 doc/dc_main.py
+- 网关的 Modbus 串口（UART2）通过 pty 连接到 emulator/modbus_slave.py 的电池从机仿真，
+  可注入应答延时、分片、CRC错误、异常响应和不应答
+- 统计每次 Modbus 事务和每轮轮询（同一主循环周期内连续的事务）的耗时、超时数，以及MQTT上报的条数和字节数
+- 可在指定时间投递一条下行命令，观察写寄存器和上报
+
+用法示例：
+    python emulator/run_gateway.py --duration 40 --quiet
+    python emulator/run_gateway.py --quiet --fragment 4 --fragment-gap-ms 1 --crc-error-rate 0.1
+    python emulator/run_gateway.py --quiet --downlink '{"power_onoff_ac": 1, "power_onoff_light": 0}' --downlink-at 10
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QPY_DIR = os.path.join(ROOT, "emulator", "qpy")
+sys.path.insert(0, ROOT)
+
+from emulator.modbus_slave import (PtyModbusSlave, BatteryDrift, DEFAULT_HOLDING, DEFAULT_INPUTS, SLAVE_ID,
+                                   load_register_map)
+from modbus_rtu import rtu
+from modbus_rtu.slave_sim import ModbusSlave
+
+BURST_GAP_S = 0.2  # 间隔小于该值的连续事务算作同一轮轮询
+
+
+class TransactionTimer:
+    """记录 RtuReceiver.receive 每次调用的开始、结束时间和结果"""
+    def __init__(self):
+        self.records = []  # [(开始, 结束, 是否收到响应)]
+
+    def install(self):
+        receive = rtu.RtuReceiver.receive
+        records = self.records
+
+        def timed_receive(receiver, slave_id, cmd, timeout_ms):
+            start = time.monotonic()
+            frame = receive(receiver, slave_id, cmd, timeout_ms)
+            records.append((start, time.monotonic(), frame is not None))
+            return frame
+        rtu.RtuReceiver.receive = timed_receive
+
+    def bursts(self):
+        """按间隔把事务分组为轮询周期，返回每轮的 (事务数, 耗时)"""
+        result = []
+        group = []
+        for record in self.records:
+            if group and record[0] - group[-1][1] > BURST_GAP_S:
+                result.append((len(group), group[-1][1] - group[0][0]))
+                group = []
+            group.append(record)
+        if group:
+            result.append((len(group), group[-1][1] - group[0][0]))
+        return result
+
+
+def load_gateway_main():
+    """以仿真模块为依赖加载 doc/dc_main.py，模块顶层即是主循环，只在线程中调用"""
+    if QPY_DIR not in sys.path:
+        sys.path.insert(0, QPY_DIR)
+    spec = importlib.util.spec_from_file_location("dc_main", os.path.join(ROOT, "doc", "dc_main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["dc_main"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_gateway(server):
+    """把网关的 UART2 连接到从机pty，在后台线程运行 dc_main，返回 sys.modules 中的模块"""
+    if QPY_DIR not in sys.path:
+        sys.path.insert(0, QPY_DIR)
+    import machine
+    machine.set_link(machine.UART.UART2, machine.SerialLink(server.path))
+    threading.Thread(target=load_gateway_main, daemon=True).start()
+    while "dc_main" not in sys.modules:
+        time.sleep(0.01)
+    return sys.modules["dc_main"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="doc/dc_main.py Linux 仿真运行器")
+    parser.add_argument("--duration", type=float, default=40.0, help="运行时长（秒）")
+    parser.add_argument("--map", default=None, help="从机寄存器表JSON文件")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="从机处理延时（毫秒）")
+    parser.add_argument("--fragment", type=int, default=0, help="响应分片字节数，0表示整帧发送")
+    parser.add_argument("--fragment-gap-ms", type=float, default=0.0, help="分片之间额外的间隔（毫秒）")
+    parser.add_argument("--crc-error-rate", type=float, default=0.0, help="响应CRC错误的概率")
+    parser.add_argument("--exception-rate", type=float, default=0.0, help="异常响应的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="不应答的概率")
+    parser.add_argument("--drift", action="store_true", help="模拟放电过程中寄存器值的变化")
+    parser.add_argument("--downlink", default=None, help="下行命令JSON")
+    parser.add_argument("--downlink-at", type=float, default=10.0, help="投递下行命令的时间（秒）")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+    parser.add_argument("--quiet", action="store_true", help="屏蔽网关程序的打印输出")
+    args = parser.parse_args()
+
+    if args.map:
+        slave_id, holding, inputs = load_register_map(args.map)
+    else:
+        slave_id, holding, inputs = SLAVE_ID, DEFAULT_HOLDING, DEFAULT_INPUTS
+    server = PtyModbusSlave(ModbusSlave(slave_id, holding, inputs), 115200, args.latency_ms, args.fragment,
+                            args.fragment_gap_ms, args.crc_error_rate, args.exception_rate, args.drop_rate,
+                            args.seed)
+    server.start()
+    if args.drift:
+        BatteryDrift(server.slave, args.seed).start()
+    timer = TransactionTimer()
+    timer.install()
+
+    real_stdout = sys.stdout
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+    start = time.monotonic()
+    gateway = start_gateway(server)
+    import umqtt
+    if args.downlink:
+        time.sleep(max(args.downlink_at - (time.monotonic() - start), 0))
+        gateway.c.client.inject(b"topic_down", args.downlink.encode())
+    time.sleep(max(args.duration - (time.monotonic() - start), 0))
+    sys.stdout = real_stdout
+
+    records = list(timer.records)
+    ok_times = [end - begin for begin, end, ok in records if ok]
+    bursts = timer.bursts()
+    published = [msg for _, topic, msg in umqtt.MQTTClient.published if topic.startswith(b"topic_up/")]
+    print("=" * 50)
+    print("仿真统计（运行 %.1f 秒）" % args.duration)
+    print("从机: 请求 %d，应答事务 %d，注入CRC错误 %d，异常响应 %d，不应答 %d" %
+          (server.requests, server.slave.transactions, server.injected_crc_errors,
+           server.injected_exceptions, server.dropped))
+    print("Modbus事务: %d 次，超时 %d 次，丢弃帧 %d" %
+          (len(records), len(records) - len(ok_times), gateway.modbus.receiver.discarded_frames))
+    if ok_times:
+        print("事务耗时: 平均 %.1f ms，最大 %.1f ms" %
+              (sum(ok_times) * 1000 / len(ok_times), max(ok_times) * 1000))
+    if bursts:
+        print("轮询周期: %d 轮，每轮平均 %.1f 个事务，平均 %.1f ms，最大 %.1f ms" %
+              (len(bursts), float(sum(n for n, _ in bursts)) / len(bursts),
+               sum(t for _, t in bursts) * 1000 / len(bursts), max(t for _, t in bursts) * 1000))
+    print("MQTT上报: %d 条，%d 字节" % (len(published), sum(len(m) for m in published)))
+    if published:
+        print("最后一条: %s" % published[-1].decode())
+    print("从机保持寄存器: %s" % json.dumps(dict(("0x%04X" % k, v) for k, v in sorted(server.slave.holding.items()))))
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+设备车队仿真（电脑端，asyncio）
+- mqtt：MQTT 3.1.1 最小实现，单进程维持数千个连接
+- broker：本地测试用 MQTT 代理，可与 MQTT 5 客户端互通，支持共享订阅 $share/<组名>/<过滤器>
+- simulator：数千台虚拟设备按目标总速率向 up/<IMEI> 发布与 device/main.py 一致的载荷
+"""
+
+from fleet.mqtt import (MQTT_V5, MQTT_V311, AsyncMqttClient, MqttError, decode_publish, encode_connect, encode_publish,
+                        encode_subscribe, read_packet, topic_matches)
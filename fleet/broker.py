@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+本地测试用 MQTT 代理（asyncio，MQTT 3.1.1 / 5，QoS0）
+没有安装 mosquitto 时供车队仿真和单元测试使用：接受连接、按主题过滤器把 PUBLISH 转发给订阅者，
+统计收到的消息数和字节数。不保存会话和保留消息，订阅的 QoS 一律按 0 授予；MQTT 5 的属性只跳过。
+
+共享订阅 $share/<组名>/<过滤器>：每条匹配的消息只转发给组内一个订阅者。
+- round_robin：组内轮流（与 mosquitto 相同），同一设备的消息分散到各订阅者，不保证设备内顺序
+- hash：按主题哈希固定到一个订阅者（类似 EMQX 的 hash_topic），组成员不变时同一设备的消息按序到达同一订阅者
+
+用法示例：
+    python -m fleet.broker --port 1883
+    python -m fleet.broker --port 1883 --share-strategy hash
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fleet.mqtt import (CONNACK, CONNECT, DISCONNECT, MQTT_V5, PINGREQ, PINGRESP_PACKET, PUBLISH, SUBACK, SUBSCRIBE,
+                        MqttError, connect_protocol_level, decode_length, decode_publish, encode_length,
+                        encode_publish, read_packet, topic_matches)
+
+SHARE_STRATEGIES = ('round_robin', 'hash')
+
+
+class ShareGroup:
+    """共享订阅组：同一组名和过滤器的订阅者"""
+    __slots__ = ('topic_filter', 'members', 'next')
+
+    def __init__(self, topic_filter):
+        self.topic_filter = topic_filter
+        self.members = []
+        self.next = 0
+
+
+class MiniBroker:
+    """最小 MQTT 代理"""
+    def __init__(self, host='127.0.0.1', port=1883, share_strategy='round_robin'):
+        if share_strategy not in SHARE_STRATEGIES:
+            raise ValueError("unknown share strategy: %s" % share_strategy)
+        self.host = host
+        self.port = port
+        self.share_strategy = share_strategy
+        self.server = None
+        self.subscriptions = {}  # {writer: [主题过滤器]}
+        self.versions = {}  # {writer: 协议级别}
+        self.shared = {}  # {(组名, 过滤器): ShareGroup}
+        # 不含通配符的过滤器按主题直接查找，含通配符的逐个匹配（设备各自订阅 down/<IMEI> 时不必遍历全部订阅）
+        self.exact = {}  # {主题: set(writer)}
+        self.wildcard = {}  # {writer: [含通配符的过滤器]}
+        self.connections = 0  # 累计连接数
+        self.active = 0  # 当前连接数
+        self.received = 0  # 收到的 PUBLISH 数
+        self.received_bytes = 0  # 收到的 PUBLISH 载荷字节数
+        self.forwarded = 0  # 转发给订阅者的消息数
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        # port 为0时取实际监听的端口
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for writer in list(self.subscriptions):
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            ptype, _, body = await read_packet(reader)
+            if ptype != CONNECT:
+                return
+            v5 = connect_protocol_level(body) == MQTT_V5
+            # MQTT 5 的 CONNACK 多一个属性长度字节
+            writer.write(bytes((CONNACK, 3, 0, 0, 0)) if v5 else bytes((CONNACK, 2, 0, 0)))
+            self.connections += 1
+            self.active += 1
+            self.subscriptions[writer] = []
+            self.versions[writer] = MQTT_V5 if v5 else 4
+            while True:
+                ptype, flags, body = await read_packet(reader)
+                if ptype == PUBLISH:
+                    self._route(flags, body, v5)
+                elif ptype == SUBSCRIBE:
+                    self._subscribe(writer, body, v5)
+                elif ptype == PINGREQ:
+                    writer.write(PINGRESP_PACKET)
+                elif ptype == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, MqttError):
+            pass
+        finally:
+            filters = self.subscriptions.pop(writer, None)
+            if filters is not None:
+                self.active -= 1
+                for topic_filter in filters:
+                    subscribers = self.exact.get(topic_filter)
+                    if subscribers is not None:
+                        subscribers.discard(writer)
+                        if not subscribers:
+                            del self.exact[topic_filter]
+                self.wildcard.pop(writer, None)
+                self.versions.pop(writer, None)
+                for key, group in list(self.shared.items()):
+                    if writer in group.members:
+                        group.members.remove(writer)
+                        if not group.members:
+                            del self.shared[key]
+            writer.close()
+
+    def _subscribe(self, writer, body, v5=False):
+        packet_id = body[:2]
+        pos = 2
+        if v5:
+            length, pos = decode_length(body, pos)
+            pos += length
+        granted = bytearray()
+        while pos < len(body):
+            length = (body[pos] << 8) | body[pos + 1]
+            topic_filter = body[pos + 2:pos + 2 + length].decode('utf-8')
+            pos += 3 + length
+            granted.append(0)
+            if topic_filter.startswith('$share/'):
+                _, group_name, shared_filter = topic_filter.split('/', 2)
+                group = self.shared.get((group_name, shared_filter))
+                if group is None:
+                    group = self.shared[(group_name, shared_filter)] = ShareGroup(shared_filter)
+                if writer not in group.members:
+                    group.members.append(writer)
+                continue
+            self.subscriptions[writer].append(topic_filter)
+            if '+' in topic_filter or '#' in topic_filter:
+                self.wildcard.setdefault(writer, []).append(topic_filter)
+            else:
+                self.exact.setdefault(topic_filter, set()).add(writer)
+        # MQTT 5 的 SUBACK 在报文标识符后有属性长度
+        variable = packet_id + (b'\x00' if v5 else b'') + bytes(granted)
+        writer.write(bytes((SUBACK, )) + encode_length(len(variable)) + variable)
+
+    def _route(self, flags, body, v5=False):
+        topic, payload = decode_publish(flags, body, v5)
+        self.received += 1
+        self.received_bytes += len(payload)
+        targets = set(self.exact.get(topic, ()))
+        for writer, filters in self.wildcard.items():
+            if writer not in targets and any(topic_matches(f, topic) for f in filters):
+                targets.add(writer)
+        for group in self.shared.values():
+            if topic_matches(group.topic_filter, topic):
+                members = group.members
+                if self.share_strategy == 'hash':
+                    targets.add(members[zlib.crc32(topic.encode('utf-8')) % len(members)])
+                else:
+                    targets.add(members[group.next % len(members)])
+                    group.next += 1
+        if not targets:
+            return
+        packets = {}
+        for writer in targets:
+            version = self.versions.get(writer, 4)
+            packet = packets.get(version)
+            if packet is None:
+                packet = packets[version] = encode_publish(topic, payload, v5=version == MQTT_V5)
+            writer.write(packet)
+        self.forwarded += len(targets)
+
+
+async def serve(host, port, share_strategy='round_robin'):
+    broker = await MiniBroker(host, port, share_strategy).start()
+    print("MQTT代理监听 %s:%d（Ctrl+C 退出）" % (host, broker.port))
+    last = broker.received
+    while True:
+        await asyncio.sleep(10)
+        print("%s 连接 %d，收到 %d 条（%.0f 条/秒），转发 %d 条" %
+              (time.strftime("%H:%M:%S"), broker.active, broker.received, (broker.received - last) / 10.0,
+               broker.forwarded))
+        last = broker.received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地测试用 MQTT 代理")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--share-strategy", choices=SHARE_STRATEGIES, default="round_robin",
+                        help="共享订阅的分发策略")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.share_strategy))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
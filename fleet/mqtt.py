@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+MQTT 3.1.1 最小实现（asyncio）
+只支持车队仿真和本地测试代理需要的报文：CONNECT/CONNACK、QoS0 PUBLISH、SUBSCRIBE/SUBACK、
+PINGREQ/PINGRESP、DISCONNECT。每个连接只有一个 StreamReader/StreamWriter，不为每个客户端创建线程，
+一个进程内可维持数千个连接。
+本地代理还需要与 MQTT 5 客户端（paho MQTTv5，共享订阅）互通，PUBLISH 编解码可按 MQTT 5 格式处理属性字段
+（只跳过，不解析）。
+"""
+
+import asyncio
+import struct
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+SUBSCRIBE = 0x80
+SUBACK = 0x90
+PINGREQ = 0xC0
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+MQTT_V311 = 4  # CONNECT 中的协议级别
+MQTT_V5 = 5
+
+PINGREQ_PACKET = b'\xC0\x00'
+PINGRESP_PACKET = b'\xD0\x00'
+DISCONNECT_PACKET = b'\xE0\x00'
+HIGH_WATER = 64 * 1024  # 发送缓冲区超过该字节数时等待写出
+
+
+class MqttError(Exception):
+    """连接被拒绝或报文格式错误"""
+
+
+def encode_length(n):
+    """剩余长度的变长编码"""
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_string(s):
+    if isinstance(s, str):
+        s = s.encode('utf-8')
+    return struct.pack('!H', len(s)) + s
+
+
+def encode_connect(client_id, keepalive=60, username=None, password=None, clean_session=True):
+    flags = 0x02 if clean_session else 0
+    payload = encode_string(client_id)
+    if username:
+        flags |= 0x80
+        payload += encode_string(username)
+        if password:
+            flags |= 0x40
+            payload += encode_string(password)
+    body = encode_string('MQTT') + struct.pack('!BBH', 4, flags, keepalive) + payload
+    return bytes((CONNECT, )) + encode_length(len(body)) + body
+
+
+def decode_length(buf, pos):
+    """从 buf[pos] 起解码变长整数，返回 (值, 之后的位置)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 21:
+            raise MqttError("malformed variable byte integer")
+
+
+def encode_publish(topic, payload, retain=False, v5=False):
+    """QoS0 PUBLISH 报文；v5 为 True 时按 MQTT 5 格式带空属性"""
+    topic = encode_string(topic)
+    if v5:
+        topic += b'\x00'
+    return (bytes((PUBLISH | (1 if retain else 0), )) + encode_length(len(topic) + len(payload)) + topic +
+            payload)
+
+
+def encode_subscribe(packet_id, topics):
+    """topics: [(主题过滤器, QoS)]"""
+    body = struct.pack('!H', packet_id) + b''.join(encode_string(t) + bytes((qos, )) for t, qos in topics)
+    return bytes((SUBSCRIBE | 0x02, )) + encode_length(len(body)) + body
+
+
+def decode_publish(flags, body, v5=False):
+    """返回 (主题, 载荷)，QoS>0 时跳过报文标识符，v5 为 True 时跳过属性"""
+    topic_len = struct.unpack_from('!H', body)[0]
+    topic = body[2:2 + topic_len].decode('utf-8')
+    pos = 2 + topic_len
+    if flags & 0x06:
+        pos += 2
+    if v5:
+        length, pos = decode_length(body, pos)
+        pos += length
+    return topic, body[pos:]
+
+
+def connect_protocol_level(body):
+    """CONNECT 报文体中的协议级别（3.1.1 为4，MQTT 5 为5）"""
+    name_len = struct.unpack_from('!H', body)[0]
+    return body[2 + name_len]
+
+
+def topic_matches(topic_filter, topic):
+    """主题过滤器匹配，支持 + 和 # 通配符"""
+    if topic_filter == topic:
+        return True
+    parts = topic_filter.split('/')
+    levels = topic.split('/')
+    for i, part in enumerate(parts):
+        if part == '#':
+            return True
+        if i >= len(levels) or (part != '+' and part != levels[i]):
+            return False
+    return len(parts) == len(levels)
+
+
+async def read_packet(reader):
+    """读取一个报文，返回 (报文类型, 标志位, 报文体)，连接关闭时抛出 asyncio.IncompleteReadError"""
+    # 报文至少2字节（固定报头+剩余长度），先一次读出，剩余长度超过127时再逐字节读
+    first, byte = await reader.readexactly(2)
+    length = byte & 0x7F
+    shift = 7
+    while byte & 0x80:
+        if shift > 21:
+            raise MqttError("malformed remaining length")
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        shift += 7
+    body = await reader.readexactly(length) if length else b''
+    return first & 0xF0, first & 0x0F, body
+
+
+class AsyncMqttClient:
+    """asyncio MQTT 客户端：QoS0 发布、订阅，按 keepalive 发送心跳"""
+    def __init__(self, client_id, keepalive=60, username=None, password=None, on_message=None):
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.username = username
+        self.password = password
+        self.on_message = on_message  # on_message(主题, 载荷)
+        self.reader = None
+        self.writer = None
+        self.connected = False
+        self.bytes_sent = 0
+        self.drain_waits = 0  # 发送缓冲区超过 HIGH_WATER 后等待写出的次数
+        self._tasks = []
+        self._packet_id = 0
+        self._suback = None
+
+    async def connect(self, host, port, timeout=10.0):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        self.writer.write(encode_connect(self.client_id, self.keepalive, self.username, self.password))
+        ptype, _, body = await asyncio.wait_for(read_packet(self.reader), timeout)
+        if ptype != CONNACK or len(body) < 2 or body[1] != 0:
+            self.writer.close()
+            raise MqttError("connection refused: %r" % (body, ))
+        self.connected = True
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._read_loop()))
+        if self.keepalive:
+            self._tasks.append(loop.create_task(self._ping_loop()))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                ptype, flags, body = await read_packet(self.reader)
+                if ptype == PUBLISH and self.on_message:
+                    self.on_message(*decode_publish(flags, body))
+                elif ptype == SUBACK and self._suback is not None and not self._suback.done():
+                    self._suback.set_result(body)
+        except (asyncio.IncompleteReadError, ConnectionError, MqttError):
+            self.connected = False
+
+    async def _ping_loop(self):
+        while self.connected:
+            await asyncio.sleep(self.keepalive * 0.75)
+            self._write(PINGREQ_PACKET)
+
+    def _write(self, packet):
+        self.writer.write(packet)
+        self.bytes_sent += len(packet)
+
+    async def publish(self, topic, payload, retain=False):
+        """QoS0 发布，发送缓冲区过大时等待写出（代理处理不过来时表现为此处变慢）"""
+        if not self.connected:
+            raise ConnectionError("not connected")
+        self._write(encode_publish(topic, payload, retain))
+        if self.writer.transport.get_write_buffer_size() > HIGH_WATER:
+            self.drain_waits += 1
+            await self.writer.drain()
+
+    async def subscribe(self, topics, timeout=10.0):
+        """topics: [(主题过滤器, QoS)]，等待 SUBACK"""
+        self._packet_id = self._packet_id % 0xFFFF + 1
+        self._suback = asyncio.get_running_loop().create_future()
+        self._write(encode_subscribe(self._packet_id, topics))
+        return await asyncio.wait_for(self._suback, timeout)
+
+    async def close(self):
+        if self.writer is None:
+            return
+        if self.connected:
+            try:
+                self._write(DISCONNECT_PACKET)
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+        self.connected = False
+        for task in self._tasks:
+            task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+跌落监测设备车队仿真（asyncio）
+功能：
+- 一个进程内运行数千台虚拟设备，每台设备一个MQTT连接（客户端ID为IMEI），也可按 --processes 分片到多个进程
+- 每台设备有独立的IMEI、包序、运动状态（静止/步行/跌落，样本取自 SensorDataGenerator 的运动场景）
+  和带抖动的上传计划
+- 上线发布 POWER_ON，按周期发布 HEARTBEAT，偶尔模拟STM32停发数据并在超时后发布 SENSOR_REPORT_TIMEOUT，
+  载荷格式与 device/main.py 一致，发布到 up/<IMEI>，订阅 down/<IMEI>
+- --rate 为全体设备 SENSOR_DATA 消息的目标总速率（条/秒），每台设备的上传间隔为 设备数/速率
+- 结束时汇总实际速率、各类事件条数、发布时刻相对计划的滞后分布和发送缓冲区等待次数，
+  用于找出 MqttThread、mqtt_listener、DatabaseManager 跟不上的消息速率
+
+用法示例：
+    python -m fleet.simulator --devices 2000 --rate 2000 --duration 60
+    python -m fleet.simulator --devices 5000 --rate 10000 --processes 4 --host 192.168.1.10
+    python -m fleet.simulator --local-broker --devices 500 --rate 1000 --duration 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fleet.mqtt import AsyncMqttClient, MqttError
+
+# ====== 用户配置区 ======
+MQTT_BROKER = "127.0.0.1"  # 本地代理地址
+MQTT_PORT = 1883
+APP_VERSION = 1001  # 与 device/main.py 一致
+IMEI_TAC = "86119706"  # IMEI前8位（型号核准号码），后6位为设备序号，最后一位为Luhn校验位
+SAMPLES_PER_UPLOAD = 10  # 每条 SENSOR_DATA 的样本数（设备10Hz采样、每秒上传一次）
+SAMPLE_RATE = 10.0  # 设备采样率（Hz），决定运动场景的时间轴
+HEARTBEAT_INTERVAL = 60.0  # 心跳间隔（秒），与 device/main.py 一致
+STM32_TIMEOUT = 600.0  # STM32停发数据多久后上报超时事件（秒），与 device/main.py 一致
+JITTER = 0.1  # 上传间隔的相对抖动
+CONNECT_RATE = 500.0  # 每秒新建连接数，避免上线时集中建连
+KEEPALIVE = 60
+LAG_SAMPLES = 20000  # 滞后分布保留的样本数
+# =======================
+
+# 单个样本的JSON，与 device/main.py 的 SENSOR_JSON_FORMAT 一致
+SENSOR_JSON_FORMAT = ('{"packet_order":%d,"accel_x":%d,"accel_y":%d,"accel_z":%d,'
+                      '"gyro_x":%d,"gyro_y":%d,"gyro_z":%d,"angle_x":%d,"angle_y":%d,"angle_z":%d,'
+                      '"attitude1":%d,"attitude2":%d,"pressure":%d,'
+                      '"altitude":%.2f,"longitude":%.8f,"latitude":%.8f,"timestamp":"%s","version":%d}')
+SENSOR_DATA_TAIL = '],"version":%d}' % APP_VERSION
+MOTION_FIELDS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'angle_x', 'angle_y', 'angle_z',
+                 'attitude1', 'attitude2', 'pressure', 'altitude')
+EVENTS = ('POWER_ON', 'SENSOR_DATA', 'HEARTBEAT', 'SENSOR_REPORT_TIMEOUT')
+
+
+def make_imei(index, tac=IMEI_TAC):
+    """第 index 台设备的IMEI：型号核准号码 + 6位序号 + Luhn校验位"""
+    body = "%s%06d" % (tac, index % 1000000)
+    total = 0
+    for i, ch in enumerate(body):
+        digit = int(ch)
+        if i % 2 == 1:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return body + str((10 - total % 10) % 10)
+
+
+def build_motion_clips(seed=0, sample_rate=SAMPLE_RATE, seconds=4.0):
+    """
+    预先生成各运动场景一个周期的样本（除包序、经纬度外的字段），所有设备共用，
+    设备按自己的相位取用，避免每个样本都调用一次生成器
+    """
+    from stm32_simulation_test import MOTION_PROFILES, SensorDataGenerator
+    generator = SensorDataGenerator(seed)
+    clips = {}
+    for profile in MOTION_PROFILES:
+        samples = [generator.generate_motion_sample(profile, i / sample_rate) for i in range(int(seconds * sample_rate))]
+        clips[profile] = [tuple(s[name] for name in MOTION_FIELDS) for s in samples]
+    return clips
+
+
+class VirtualDevice:
+    """一台虚拟设备的状态：IMEI、包序、运动状态和位置"""
+    def __init__(self, index, clips, rng, samples_per_upload=SAMPLES_PER_UPLOAD, fall_prob=0.001):
+        self.index = index
+        self.imei = make_imei(index)
+        self.topic_up = "up/%s" % self.imei
+        self.topic_down = "down/%s" % self.imei
+        self.clips = clips
+        self.rng = rng
+        self.samples_per_upload = samples_per_upload
+        self.fall_prob = fall_prob
+        self.packet_order = rng.randrange(256)
+        self.state = "idle"
+        self.clip_pos = rng.randrange(len(clips["idle"]))
+        self.longitude = 104.06 + rng.uniform(-0.05, 0.05)
+        self.latitude = 30.66 + rng.uniform(-0.05, 0.05)
+        self.falls = 0
+
+    def _next_state(self):
+        """每次上传前按概率切换运动状态，跌落播放完一个周期后回到静止"""
+        rnd = self.rng.random()
+        if self.state != "freefall" and rnd < self.fall_prob:
+            self.state, self.clip_pos = "freefall", 0
+            self.falls += 1
+        elif self.state == "idle" and rnd > 0.95:
+            self.state = "walking"
+        elif self.state == "walking" and rnd > 0.9:
+            self.state = "idle"
+
+    def sensor_payload(self, timestamp):
+        """生成一条 SENSOR_DATA 载荷（bytes），timestamp 为 yyyy-mm-dd hh:mm:ss"""
+        self._next_state()
+        parts = []
+        for _ in range(self.samples_per_upload):
+            clip = self.clips[self.state]
+            if self.clip_pos >= len(clip):
+                if self.state == "freefall":
+                    self.state = "idle"
+                    clip = self.clips["idle"]
+                self.clip_pos = 0
+            if self.state == "walking":
+                self.longitude += 1.4e-6
+            parts.append(SENSOR_JSON_FORMAT % ((self.packet_order, ) + clip[self.clip_pos] +
+                                               (self.longitude, self.latitude, timestamp, APP_VERSION)))
+            self.clip_pos += 1
+            self.packet_order = (self.packet_order + 1) & 0xFF
+        return ('{"event":"SENSOR_DATA","data":[' + ','.join(parts) + SENSOR_DATA_TAIL).encode('utf-8')
+
+    def power_on_payload(self, timestamp):
+        return ('{"event":"POWER_ON","timestamp":"%s","version":%d,"imei":"%s"}' %
+                (timestamp, APP_VERSION, self.imei)).encode('utf-8')
+
+    def heartbeat_payload(self):
+        return ('{"status":%d,"version":%d,"event":"HEARTBEAT"}' % (1, APP_VERSION)).encode('utf-8')
+
+    def timeout_payload(self, timestamp, stm32_timeout):
+        return ('{"event":"SENSOR_REPORT_TIMEOUT","description":"超过%d秒未收到STM32数据","timestamp":"%s","version":%d}' %
+                (stm32_timeout, timestamp, APP_VERSION)).encode('utf-8')
+
+
+class FleetSimulator:
+    """车队仿真：每台设备一个协程和一个MQTT连接"""
+    def __init__(self, devices, rate, host=MQTT_BROKER, port=MQTT_PORT, first_index=0,
+                 samples_per_upload=SAMPLES_PER_UPLOAD, heartbeat_interval=HEARTBEAT_INTERVAL, jitter=JITTER,
+                 timeout_prob=0.0, stm32_timeout=STM32_TIMEOUT, fall_prob=0.001, connect_rate=CONNECT_RATE,
+                 subscribe=True, seed=None):
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        clips = build_motion_clips(0 if seed is None else seed)
+        self.devices = [VirtualDevice(first_index + i, clips, random.Random(self.rng.random()), samples_per_upload,
+                                      fall_prob) for i in range(devices)]
+        self.rate = rate
+        self.upload_interval = devices / float(rate)
+        self.heartbeat_interval = heartbeat_interval
+        self.jitter = jitter
+        self.timeout_prob = timeout_prob  # 每次上传后STM32开始停发数据的概率
+        self.stm32_timeout = stm32_timeout
+        self.connect_rate = connect_rate
+        self.subscribe = subscribe
+        self.counts = dict((event, 0) for event in EVENTS)
+        self.bytes = 0
+        self.samples = 0
+        self.connected = 0
+        self.connect_failures = 0
+        self.connect_errors = {}  # {异常类型: 次数}
+        self.disconnected = 0
+        self.down_received = 0
+        self.drain_waits = 0
+        self.lags = []
+        self.lag_count = 0
+        self.lag_max = 0.0
+        self._timestamp = (0, "")
+        self.end = 0.0
+        self.publish_start = None
+        self.steady_start = None  # 全部设备都已开始上传的时刻
+        self.steady_sensor = 0  # 此后发布的 SENSOR_DATA 条数，用于计算实际速率
+
+    def timestamp(self):
+        """当前时间 yyyy-mm-dd hh:mm:ss，同一秒内复用"""
+        now = int(time.time())
+        if self._timestamp[0] != now:
+            self._timestamp = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+        return self._timestamp[1]
+
+    def _record_lag(self, lag):
+        self.lag_count += 1
+        if lag > self.lag_max:
+            self.lag_max = lag
+        if len(self.lags) < LAG_SAMPLES:
+            self.lags.append(lag)
+        else:
+            i = self.rng.randrange(self.lag_count)
+            if i < LAG_SAMPLES:
+                self.lags[i] = lag
+
+    def _on_down(self, topic, payload):
+        self.down_received += 1
+
+    async def _publish(self, client, device, event, payload):
+        await client.publish(device.topic_up, payload)
+        self.counts[event] += 1
+        self.bytes += len(payload)
+
+    async def _run_device(self, device, start_at):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(start_at - loop.time(), 0))
+        client = AsyncMqttClient(device.imei, KEEPALIVE, on_message=self._on_down)
+        phase = "CONNECT"
+        try:
+            await client.connect(self.host, self.port)
+            if self.subscribe:
+                phase = "SUBSCRIBE"
+                await client.subscribe([(device.topic_down, 0)])
+        except (OSError, asyncio.TimeoutError, ConnectionError, MqttError) as e:
+            self.connect_failures += 1
+            reason = "%s %s" % (phase, type(e).__name__)
+            self.connect_errors[reason] = self.connect_errors.get(reason, 0) + 1
+            await client.close()
+            return
+        self.connected += 1
+        rng = device.rng
+        try:
+            await self._publish(client, device, 'POWER_ON', device.power_on_payload(self.timestamp()))
+            now = loop.time()
+            # 首次上传和心跳在一个周期内均匀错开
+            next_upload = max(now, self.publish_start) + rng.uniform(0, self.upload_interval)
+            next_heartbeat = now + rng.uniform(0, self.heartbeat_interval)
+            timeout_at = None
+            while True:
+                due = min(next_upload, next_heartbeat, timeout_at or next_upload)
+                if due >= self.end:
+                    break
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._record_lag(loop.time() - due)
+                if due == timeout_at:
+                    await self._publish(client, device, 'SENSOR_REPORT_TIMEOUT',
+                                        device.timeout_payload(self.timestamp(), self.stm32_timeout))
+                    timeout_at = None
+                elif due == next_heartbeat:
+                    await self._publish(client, device, 'HEARTBEAT', device.heartbeat_payload())
+                    next_heartbeat += self.heartbeat_interval * (1 + rng.uniform(-self.jitter, self.jitter))
+                else:
+                    await self._publish(client, device, 'SENSOR_DATA', device.sensor_payload(self.timestamp()))
+                    self.samples += device.samples_per_upload
+                    if due >= self.steady_start:
+                        self.steady_sensor += 1
+                    next_upload += self.upload_interval * (1 + rng.uniform(-self.jitter, self.jitter))
+                    if self.timeout_prob and rng.random() < self.timeout_prob:
+                        # STM32停发数据：超时后上报事件，再过一个上传间隔恢复
+                        timeout_at = due + self.stm32_timeout
+                        next_upload = timeout_at + self.upload_interval
+        except ConnectionError:
+            self.disconnected += 1
+        finally:
+            self.drain_waits += client.drain_waits
+            await client.close()
+
+    async def run(self, duration):
+        """运行 duration 秒（从全部设备开始建连算起），返回汇总"""
+        loop = asyncio.get_running_loop()
+        cpu_start = time.process_time()
+        start = loop.time()
+        ramp = len(self.devices) / float(self.connect_rate) if self.connect_rate else 0.0
+        # 建连期间只发 POWER_ON，全部上线后才按速率上传，速率统计从此刻开始
+        self.publish_start = start + ramp
+        self.end = start + duration
+        self.steady_start = self.publish_start + self.upload_interval * (1 + self.jitter)
+        tasks = [loop.create_task(self._run_device(device, start + i / float(self.connect_rate or 1e12)))
+                 for i, device in enumerate(self.devices)]
+        await asyncio.gather(*tasks)
+        elapsed = max(self.end - self.publish_start, 1e-9)
+        return {
+            'devices': len(self.devices),
+            'connected': self.connected,
+            'connect_failures': self.connect_failures,
+            'connect_errors': dict(self.connect_errors),
+            'disconnected': self.disconnected,
+            'duration': elapsed,
+            'target_rate': self.rate,
+            'steady_sensor': self.steady_sensor,
+            'steady_duration': max(self.end - self.steady_start, 1e-9),
+            'counts': dict(self.counts),
+            'messages': sum(self.counts.values()),
+            'bytes': self.bytes,
+            'samples': self.samples,
+            'falls': sum(d.falls for d in self.devices),
+            'down_received': self.down_received,
+            'drain_waits': self.drain_waits,
+            'lags': self.lags,
+            'lag_max': self.lag_max,
+            'cpu': time.process_time() - cpu_start,
+        }
+
+
+def _run_shard(kwargs):
+    duration = kwargs.pop('duration')
+    return asyncio.run(FleetSimulator(**kwargs).run(duration))
+
+
+def run_sharded(processes, devices, rate, duration, **kwargs):
+    """按设备序号分片到多个进程，每个进程承担 1/processes 的设备和速率，合并各进程的汇总"""
+    shards = []
+    for p in range(processes):
+        count = devices // processes + (1 if p < devices % processes else 0)
+        first = sum(s['devices'] for s in shards)
+        shard = dict(kwargs, devices=count, rate=rate * count / float(devices), first_index=first, duration=duration)
+        if shard.get('seed') is not None:
+            shard['seed'] += p
+        shards.append(shard)
+    shards = [s for s in shards if s['devices']]
+    if processes == 1:
+        return merge_summaries([_run_shard(dict(shards[0]))])
+    with multiprocessing.Pool(len(shards)) as pool:
+        return merge_summaries(pool.map(_run_shard, [dict(s) for s in shards]))
+
+
+def merge_summaries(summaries):
+    merged = dict(summaries[0])
+    merged['counts'] = dict(merged['counts'])
+    merged['connect_errors'] = dict(merged['connect_errors'])
+    for s in summaries[1:]:
+        for key in ('devices', 'connected', 'connect_failures', 'disconnected', 'target_rate', 'steady_sensor',
+                    'messages', 'bytes', 'samples', 'falls', 'down_received', 'drain_waits', 'cpu'):
+            merged[key] += s[key]
+        for event, n in s['counts'].items():
+            merged['counts'][event] += n
+        for reason, n in s['connect_errors'].items():
+            merged['connect_errors'][reason] = merged['connect_errors'].get(reason, 0) + n
+        merged['lags'] = merged['lags'] + s['lags']
+        merged['lag_max'] = max(merged['lag_max'], s['lag_max'])
+        merged['duration'] = max(merged['duration'], s['duration'])
+        merged['steady_duration'] = min(merged['steady_duration'], s['steady_duration'])
+    lags = sorted(merged.pop('lags'))
+    pick = lambda q: lags[min(int(q * len(lags)), len(lags) - 1)] if lags else 0.0
+    merged['lag_p50'] = pick(0.5)
+    merged['lag_p99'] = pick(0.99)
+    merged['processes'] = len(summaries)
+    # 各设备首次上传错开在一个上传间隔内，实际速率只按全部设备都已开始上传后的区间计算
+    merged['sensor_rate'] = merged['steady_sensor'] / merged['steady_duration']
+    return merged
+
+
+def print_summary(summary):
+    print("=" * 50)
+    print("车队仿真统计（%d 个进程，上线后运行 %.1f 秒）" % (summary['processes'], summary['duration']))
+    print("设备: %d，已连接 %d，连接失败 %d，中途断开 %d" %
+          (summary['devices'], summary['connected'], summary['connect_failures'], summary['disconnected']))
+    if summary['connect_errors']:
+        print("连接失败原因: %s" % "，".join("%s %d" % item for item in sorted(summary['connect_errors'].items())))
+    print("消息: %s" % "，".join("%s %d" % (event, summary['counts'][event]) for event in EVENTS))
+    print("SENSOR_DATA 速率: 目标 %.0f 条/秒，实际 %.0f 条/秒（%d 个样本，%d 次跌落）" %
+          (summary['target_rate'], summary['sensor_rate'], summary['samples'], summary['falls']))
+    print("合计 %d 条，%.1f MB，%.0f 条/秒" %
+          (summary['messages'], summary['bytes'] / 1e6, summary['messages'] / summary['duration']))
+    print("发布滞后: 中位 %.1f ms，P99 %.1f ms，最大 %.1f ms；发送缓冲区等待 %d 次" %
+          (summary['lag_p50'] * 1000, summary['lag_p99'] * 1000, summary['lag_max'] * 1000, summary['drain_waits']))
+    print("仿真进程CPU: %.1f 秒，收到下行消息 %d 条" % (summary['cpu'], summary['down_received']))
+    print("=" * 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跌落监测设备车队仿真")
+    parser.add_argument("--host", default=MQTT_BROKER, help="MQTT代理地址")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="MQTT代理端口")
+    parser.add_argument("--devices", type=int, default=1000, help="虚拟设备数")
+    parser.add_argument("--rate", type=float, default=1000.0, help="SENSOR_DATA 目标总速率（条/秒）")
+    parser.add_argument("--duration", type=float, default=30.0, help="运行时长（秒）")
+    parser.add_argument("--samples", type=int, default=SAMPLES_PER_UPLOAD, help="每条 SENSOR_DATA 的样本数")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL, help="心跳间隔（秒）")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="上传间隔的相对抖动")
+    parser.add_argument("--timeout-prob", type=float, default=0.0, help="每次上传后STM32停发数据的概率")
+    parser.add_argument("--stm32-timeout", type=float, default=STM32_TIMEOUT, help="停发多久后上报超时事件（秒）")
+    parser.add_argument("--fall-prob", type=float, default=0.001, help="每次上传前发生跌落的概率")
+    parser.add_argument("--connect-rate", type=float, default=CONNECT_RATE, help="每秒新建连接数")
+    parser.add_argument("--processes", type=int, default=1, help="分片进程数")
+    parser.add_argument("--no-subscribe", action="store_true", help="不订阅 down/<IMEI>")
+    parser.add_argument("--local-broker", action="store_true", help="在子进程中启动 fleet.broker 作为代理")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+
+    broker = None
+    if args.local_broker:
+        broker = subprocess.Popen([sys.executable, "-m", "fleet.broker", "--host", args.host, "--port", str(args.port)],
+                                  cwd=ROOT)
+        time.sleep(1.0)
+    try:
+        summary = run_sharded(args.processes, args.devices, args.rate, args.duration, host=args.host, port=args.port,
+                              samples_per_upload=args.samples, heartbeat_interval=args.heartbeat, jitter=args.jitter,
+                              timeout_prob=args.timeout_prob, stm32_timeout=args.stm32_timeout,
+                              fall_prob=args.fall_prob, connect_rate=args.connect_rate / args.processes,
+                              subscribe=not args.no_subscribe, seed=args.seed)
+    finally:
+        if broker:
+            broker.terminate()
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+MQTT 上行数据接收与存储（电脑端）
+- codec：载荷按字段类型直接解码为按列顺序的行元组（msgspec / orjson / json）
+- columnar：按列（NumPy 数组）存放的样本批，Qt 上位机的写库、图表和总览表直接使用
+- store：按日期和行数轮转的 CSV 追加存储，xlsx 只在定时、轮转或按需时以 write_only 模式生成
+- pipeline：有界消息队列和批处理工作线程，把解码、显示和存储移出 paho 网络线程
+- dashboard：按固定帧率重绘的终端仪表盘（各设备速率、丢包、最后收到时间和最新值）
+- devices：按列存放的设备接收状态表，订阅 up/+ 时数千台设备共用
+- sqlite：每个接收进程一个 SQLite（WAL）数据库，结束后合并并按包序检出丢失和乱序
+- worker：N 个进程以共享订阅 $share/<组名>/up/+ 分担接收（python -m ingest.worker）
+"""
+
+from ingest.codec import BACKENDS, PayloadDecoder, SensorBatch
+from ingest.columnar import BatchList, ColumnBatch, RollingSeries, y_axis_range
+from ingest.dashboard import Dashboard, display_width
+from ingest.devices import DeviceTable, is_imei
+from ingest.pipeline import OVERFLOW_POLICIES, BoundedQueue, WorkerPool
+from ingest.sqlite import SqliteSink, merge_databases
+from ingest.store import PartitionedStore, RowStore, XlsxExporter, export_all, export_xlsx
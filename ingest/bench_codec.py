@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+载荷解码速度对比，载荷取自 log/*.log 中记录的实际上行消息
+- Qt 上位机：原 MqttThread._on_message（json.loads、逐样本 copy 并加 event/version）+ 原 DatabaseManager.save_data
+  （每样本 21 次 .get()、逐行 execute）与 PayloadDecoder + executemany（消息级字段每批一份）
+- mqtt_listener：原 json.loads + 逐字段 .get() 组行 与 PayloadDecoder 直接得到按 FIELD_ORDER 的行
+每种方式分别用 msgspec / orjson / json 后端（已安装的）测试，数据库为内存 SQLite。
+
+用法示例：
+    python -m ingest.bench_codec
+    python -m ingest.bench_codec --repeat 5 --logs log/*.log
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ingest.codec import BACKENDS, PayloadDecoder
+from ingest.dashboard import pad
+from mqtt_listener import FIELD_ORDER
+
+
+def load_qt_config():
+    """qt/config.py（不依赖 PySide6）"""
+    spec = importlib.util.spec_from_file_location("qt_config", os.path.join(ROOT, "qt", "config.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+QT_CONFIG = load_qt_config()
+SAMPLE_COLUMNS = QT_CONFIG.SAMPLE_COLUMNS
+DB_COLUMNS = ['timestamp', 'version', 'packet_order', 'event', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y',
+              'gyro_z', 'angle_x', 'angle_y', 'angle_z', 'attitude1', 'attitude2', 'pressure', 'altitude', 'longitude',
+              'latitude', 'imei', 'received_time']
+INSERT_COLUMNS = ['event', 'version', 'imei', 'received_time'] + SAMPLE_COLUMNS
+
+
+def read_payloads(patterns):
+    """log 文件中“内容: ”行的载荷"""
+    payloads = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(ROOT, pattern))):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('内容: '):
+                        payloads.append(line[4:].rstrip('\n').encode('utf-8'))
+    return payloads
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE sensor_data (id INTEGER PRIMARY KEY AUTOINCREMENT, %s)" % ", ".join(DB_COLUMNS))
+    return conn
+
+
+def old_qt_decode(payload):
+    """原 MqttThread._on_message 的解析部分"""
+    data = json.loads(payload.decode('utf-8'))
+    if isinstance(data, dict) and "data" in data:
+        event_type = data.get("event", "")
+        version = data.get("version", "")
+        enhanced_data = []
+        for item in data["data"]:
+            item_with_event = item.copy()
+            item_with_event["event"] = event_type
+            item_with_event["version"] = version
+            enhanced_data.append(item_with_event)
+        return enhanced_data
+    if isinstance(data, list):
+        return [item if "event" in item else dict(item, event="SENSOR_DATA") for item in data]
+    return [data]
+
+
+def old_qt_save(conn, data_list, imei):
+    """原 DatabaseManager.save_data"""
+    cursor = conn.cursor()
+    for data in data_list:
+        row_data = [data.get(field, '') for field in DB_COLUMNS[:19]] + [
+            imei, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')]
+        cursor.execute("INSERT INTO sensor_data (%s) VALUES (%s)" % (", ".join(DB_COLUMNS), ", ".join("?" * 21)),
+                       row_data)
+    conn.commit()
+
+
+def new_qt_save(conn, batch, imei, sql):
+    head = (batch.event, batch.version, imei, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+    with conn:
+        conn.executemany(sql, [head + row for row in batch.rows])
+
+
+def old_listener_rows(payload):
+    """原 mqtt_listener：json.loads 后逐字段 .get() 组行"""
+    data = json.loads(payload.decode('utf-8'))
+    if isinstance(data, dict) and data.get('event') == 'SENSOR_DATA':
+        data = data.get('data') or []
+    if isinstance(data, list):
+        return [[item.get(field, '') for field in FIELD_ORDER] for item in data]
+    return None
+
+
+def timed(func, payloads, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payloads)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="载荷解码速度对比")
+    parser.add_argument("--logs", nargs="+", default=["log/*.log"], help="原始数据log文件（glob）")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    payloads = read_payloads(args.logs)
+    if not payloads:
+        print("没有找到载荷")
+        return
+    samples = sum(len(PayloadDecoder(FIELD_ORDER, 'json').decode(p)) for p in payloads)
+    print(f"{len(payloads)} 条消息，{samples} 个样本（{sum(map(len, payloads)) / 1e6:.1f} MB），可用后端 {BACKENDS}")
+
+    def report(name, elapsed, base=None):
+        speedup = f"，{base / elapsed:.1f} 倍" if base else ""
+        print(f"  {pad(name, 36)} {elapsed / len(payloads) * 1e6:7.1f} µs/条 "
+              f"{elapsed / samples * 1e6:6.2f} µs/样本{speedup}")
+
+    print("Qt 上位机 解析：")
+    base = timed(lambda ps: [old_qt_decode(p) for p in ps], payloads, args.repeat)
+    report("原 json.loads + copy", base)
+    for backend in BACKENDS:
+        decoder = PayloadDecoder(SAMPLE_COLUMNS, backend)
+        report("PayloadDecoder(%s)" % backend, timed(lambda ps: [decoder.decode(p) for p in ps], payloads,
+                                                      args.repeat), base)
+
+    print("Qt 上位机 解析 + 写入数据库：")
+
+    def run_old(ps):
+        conn = make_db()
+        for p in ps:
+            old_qt_save(conn, old_qt_decode(p), "861197065268692")
+        conn.close()
+    base = timed(run_old, payloads, args.repeat)
+    report("原 解析 + save_data", base)
+    sql = "INSERT INTO sensor_data (%s) VALUES (%s)" % (", ".join(INSERT_COLUMNS),
+                                                        ", ".join("?" * len(INSERT_COLUMNS)))
+    for backend in BACKENDS:
+        decoder = PayloadDecoder(SAMPLE_COLUMNS, backend)
+
+        def run_new(ps):
+            conn = make_db()
+            for p in ps:
+                new_qt_save(conn, decoder.decode(p), "861197065268692", sql)
+            conn.close()
+        report("PayloadDecoder(%s) + executemany" % backend, timed(run_new, payloads, args.repeat), base)
+    # 两种方式写入的内容一致
+    old_conn, new_conn = make_db(), make_db()
+    decoder = PayloadDecoder(SAMPLE_COLUMNS)
+    for p in payloads:
+        old_qt_save(old_conn, old_qt_decode(p), "1")
+        new_qt_save(new_conn, decoder.decode(p), "1", sql)
+    query = "SELECT %s FROM sensor_data ORDER BY id" % ", ".join(DB_COLUMNS[:20])
+    same = old_conn.execute(query).fetchall() == new_conn.execute(query).fetchall()
+    print(f"  写入内容一致: {same}")
+
+    print("mqtt_listener 解析为行：")
+    base = timed(lambda ps: [old_listener_rows(p) for p in ps], payloads, args.repeat)
+    report("原 json.loads + .get()", base)
+    for backend in BACKENDS:
+        decoder = PayloadDecoder(FIELD_ORDER, backend)
+        report("PayloadDecoder(%s)" % backend, timed(lambda ps: [decoder.decode(p).rows for p in ps], payloads,
+                                                      args.repeat), base)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Qt 上位机界面线程每 1000 个样本的耗时：原样本字典路径 与 按列（ColumnBatch）路径，载荷取自 log/*.log
+- 原路径：save_data(SensorBatch) → list(batch) 生成样本字典 → 逐单元格 QTableWidgetItem → 逐行 setRowHidden 筛选
+  → 逐点 QLineSeries.append → 逐点 at(i) 移除超出范围的点、计算 Y 轴范围
+- 按列路径：save_data(ColumnBatch) → SampleTableModel.append_batch（代理模型筛选新增的行）
+  → RollingSeries 追加、截取并整段替换曲线 → 数组 min/max 计算 Y 轴范围
+两条路径都包括写库（内存 SQLite）、按内容调整列宽、滚动到最后一行和处理一次界面事件（绘制）。
+ColumnBatch.from_batch 在 MQTT 线程中执行，单独列出，不计入界面线程。
+每条消息的图表时间按 --interval 递增；表格行数随消息增加，分别给出全部消息和最后 --tail 条消息的平均值。
+需要 PySide6（含 QtCharts，QXYSeries.replaceNp），没有显示器时使用 offscreen 平台。
+
+用法示例：
+    python -m ingest.bench_columnar
+    python -m ingest.bench_columnar --messages 2000 --tail 200
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "qt"))
+
+from ingest.bench_codec import DB_COLUMNS, INSERT_COLUMNS, SAMPLE_COLUMNS, read_payloads
+from ingest.codec import PayloadDecoder, SensorBatch
+from ingest.columnar import ColumnBatch, RollingSeries, y_axis_range
+
+try:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import PySide6
+    from PySide6.QtCharts import QChart, QLineSeries, QValueAxis
+    from PySide6.QtCore import Qt
+    from PySide6.QtWidgets import QApplication, QTableView, QTableWidget, QTableWidgetItem
+except ImportError:
+    QApplication = None
+
+CHART_DISPLAY_DURATION = 10
+CHART_MAX_DATA_POINTS = 3000
+CHART_Y_AXIS_MARGIN = 0.1
+# 各图表的字段、换算除数和 Y 轴最小范围（与 main_window.init_chart_curves 相同）
+CHARTS = [(('accel_x', 'accel_y', 'accel_z'), 1, 100), (('gyro_x', 'gyro_y', 'gyro_z'), 1, 100),
+          (('attitude1', ), 1, 100), (('attitude2', ), 1, 100), (('pressure', ), 1000.0, 10),
+          (('altitude', ), 1, 1000)]
+INSERT_SQL = "INSERT INTO sensor_data (%s) VALUES (%s)" % (", ".join(INSERT_COLUMNS),
+                                                           ", ".join("?" * len(INSERT_COLUMNS)))
+IMEI = "861197065268692"
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE sensor_data (id INTEGER PRIMARY KEY AUTOINCREMENT, %s)" % ", ".join(DB_COLUMNS))
+    return conn
+
+
+def make_charts():
+    """各图表的 X/Y 轴和曲线"""
+    charts = []
+    for fields, divisor, min_span in CHARTS:
+        chart, axis_x, axis_y = QChart(), QValueAxis(), QValueAxis()
+        axis_x.setRange(0, CHART_DISPLAY_DURATION)
+        chart.addAxis(axis_x, Qt.AlignBottom)
+        chart.addAxis(axis_y, Qt.AlignLeft)
+        series = []
+        for field in fields:
+            line = QLineSeries()
+            chart.addSeries(line)
+            line.attachAxis(axis_x)
+            line.attachAxis(axis_y)
+            series.append((field, line))
+        charts.append((chart, axis_x, axis_y, divisor, min_span, series))
+    return charts
+
+
+class DictPath:
+    """原 on_sensor_data_received（图表部分只保留一条曲线的写法，各图表相同）"""
+
+    def __init__(self, app, fields, event_types):
+        self.app, self.fields, self.event_types = app, fields, event_types
+        self.conn = make_db()
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(fields))
+        self.table.show()
+        self.charts = make_charts()
+
+    def handle(self, batch, time_diff):
+        head = (batch.event, batch.version, IMEI, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, [head + row for row in batch.rows])
+        data_list = list(batch)
+        table = self.table
+        for data in data_list:
+            row = table.rowCount()
+            table.insertRow(row)
+            for col, field in enumerate(self.fields):
+                if field == 'event':
+                    value = self.event_types.get(data.get(field, ''), data.get(field, ''))
+                elif field == 'pressure':
+                    pressure_value = data.get(field, '')
+                    value = f"{float(pressure_value) / 1000.0:.2f}" if pressure_value else ''
+                elif data.get('event', '') in ['POWER_ON', 'SENSOR_REPORT_TIMEOUT'] and field not in [
+                        'timestamp', 'version', 'packet_order', 'event']:
+                    value = ''
+                else:
+                    value = data.get(field, '')
+                item = QTableWidgetItem(str(value))
+                item.setTextAlignment(Qt.AlignCenter)
+                table.setItem(row, col, item)
+        for chart, axis_x, axis_y, divisor, min_span, series in self.charts:
+            for data in data_list:
+                if all(field in data for field, _ in series):
+                    for field, line in series:
+                        line.append(time_diff, float(data[field]) / divisor)
+            if time_diff > CHART_DISPLAY_DURATION:
+                axis_x.setRange(time_diff - CHART_DISPLAY_DURATION, time_diff)
+                for _, line in series:
+                    self.remove_old_data_points(line, time_diff - CHART_DISPLAY_DURATION)
+            values = [line.at(i).y() for _, line in series for i in range(line.count())
+                      if axis_x.min() <= line.at(i).x() <= axis_x.max()]
+            if values:
+                y_min, y_max = min(values), max(values)
+                margin = (y_max - y_min) * CHART_Y_AXIS_MARGIN
+                axis_y.setRange(y_min - margin, y_max + margin)
+        for row in range(table.rowCount()):
+            table.setRowHidden(row, False)
+        table.resizeColumnsToContents()
+        if data_list:
+            table.scrollToItem(table.item(table.rowCount() - 1, 0))
+        self.app.processEvents()
+
+    @staticmethod
+    def remove_old_data_points(series, min_time):
+        for i in reversed([i for i in range(series.count()) if series.at(i).x() < min_time]):
+            series.remove(i)
+        if series.count() > CHART_MAX_DATA_POINTS:
+            for i in reversed(range(series.count() - CHART_MAX_DATA_POINTS)):
+                series.remove(i)
+
+
+class ColumnPath:
+    """按列路径（与 main_window.on_sensor_data_received 相同）"""
+
+    def __init__(self, app):
+        from table_model import EventFilterProxy, SampleTableModel
+        self.app = app
+        self.conn = make_db()
+        self.model = SampleTableModel()
+        self.proxy = EventFilterProxy()
+        self.proxy.setSourceModel(self.model)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
+        self.table.show()
+        self.charts = [(chart, axis_x, axis_y, divisor, min_span,
+                        [(field, line, RollingSeries(CHART_MAX_DATA_POINTS)) for field, line in series])
+                       for chart, axis_x, axis_y, divisor, min_span, series in make_charts()]
+
+    def handle(self, batch, time_diff):
+        head = (batch.event, batch.version, IMEI, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, [head + row for row in batch.rows(SAMPLE_COLUMNS)])
+        self.model.append_batch(batch)
+        for chart, axis_x, axis_y, divisor, min_span, curves in self.charts:
+            for field, _, points in curves:
+                column = batch.numeric(field)
+                if column is not None:
+                    points.extend_at(time_diff, column / divisor)
+            if time_diff > CHART_DISPLAY_DURATION:
+                axis_x.setRange(time_diff - CHART_DISPLAY_DURATION, time_diff)
+                for _, _, points in curves:
+                    points.trim(time_diff - CHART_DISPLAY_DURATION)
+            for _, line, points in curves:
+                line.replaceNp(points.x, points.y)
+            y_range = y_axis_range([points for _, _, points in curves], axis_x.min(), axis_x.max(),
+                                   CHART_Y_AXIS_MARGIN, min_span)
+            if y_range:
+                axis_y.setRange(*y_range)
+        self.table.resizeColumnsToContents()
+        if len(batch):
+            self.table.scrollToBottom()
+        self.app.processEvents()
+
+
+def run(path, batches, interval):
+    """逐条处理，返回每条消息的耗时"""
+    elapsed = []
+    for i, batch in enumerate(batches):
+        start = time.perf_counter()
+        path.handle(batch, i * interval)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qt 上位机界面线程耗时对比（样本字典 / 按列）")
+    parser.add_argument("--logs", nargs="+", default=["log/*.log"], help="原始数据log文件（glob）")
+    parser.add_argument("--messages", type=int, default=1000, help="处理的消息数")
+    parser.add_argument("--tail", type=int, default=200, help="单独统计最后几条消息（表格行数最多时）")
+    parser.add_argument("--interval", type=float, default=1.0, help="相邻消息的图表时间间隔（秒）")
+    args = parser.parse_args()
+
+    if QApplication is None:
+        print("需要 PySide6（含 QtCharts）")
+        return
+    app = QApplication.instance() or QApplication([])
+    from config import EVENT_TYPES, FIELD_ORDER
+
+    decoder = PayloadDecoder(SAMPLE_COLUMNS)
+    batches = [batch for batch in map(decoder.decode, read_payloads(args.logs)) if isinstance(batch, SensorBatch)]
+    batches = batches[:args.messages]
+    if not batches:
+        print("没有找到载荷")
+        return
+    start = time.perf_counter()
+    columnar = [ColumnBatch.from_batch(batch, IMEI) for batch in batches]
+    convert = time.perf_counter() - start
+    samples = sum(map(len, batches))
+    tail_samples = sum(map(len, batches[-args.tail:]))
+    print(f"PySide6 {PySide6.__version__}，Python {sys.version.split()[0]}；{len(batches)} 条消息，{samples} 个样本")
+    print(f"  ColumnBatch.from_batch（MQTT 线程）: {convert / samples * 1e6 * 1000:8.1f} µs/1000 样本")
+
+    results = {}
+    for name, path in (("样本字典", DictPath(app, FIELD_ORDER, EVENT_TYPES)), ("按列", ColumnPath(app))):
+        elapsed = run(path, batches if name == "样本字典" else columnar, args.interval)
+        results[name] = (sum(elapsed) / samples * 1000, sum(elapsed[-args.tail:]) / tail_samples * 1000)
+    base = results["样本字典"]
+    for name, (total, tail) in results.items():
+        print(f"  界面线程 {name}: 全部 {total * 1e3:8.2f} ms/1000 样本（{base[0] / total:4.1f} 倍），"
+              f"最后 {args.tail} 条 {tail * 1e3:8.2f} ms/1000 样本（{base[1] / tail:4.1f} 倍）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+mqtt_listener 显示方式吞吐量对比：逐样本表格输出 与 仪表盘模式
+输出写入一个 pty（后台线程读走，模拟终端），统计工作线程处理全部消息的耗时和写到终端的字节数。
+两种方式都包含 JSON 解码和 CSV 存储，差别只在显示。
+
+用法示例：
+    python -m ingest.bench_dashboard
+    python -m ingest.bench_dashboard --messages 20000 --devices 50 --fps 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mqtt_listener as listener
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import Dashboard, RowStore
+
+
+class PtySink:
+    """pty 从端作为输出，后台线程读走主端数据并计数"""
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        self.out = io.TextIOWrapper(os.fdopen(self.slave, 'wb', buffering=0), encoding='utf-8', line_buffering=True)
+        self.bytes = 0
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            self.bytes += len(data)
+
+    def close(self):
+        self.out.close()
+        self.thread.join(1)
+        os.close(self.master)
+
+
+def make_messages(count, devices, samples):
+    clips = build_motion_clips(1)
+    rng = random.Random(1)
+    fleet = [VirtualDevice(i, clips, rng, samples_per_upload=samples) for i in range(devices)]
+    return [("up/" + fleet[i % devices].imei, fleet[i % devices].sensor_payload("2026-01-16 08:16:11"))
+            for i in range(count)]
+
+
+def run_case(messages, directory, use_dashboard, args):
+    """返回 (处理耗时, 终端字节数, 仪表盘帧数)"""
+    sink = PtySink()
+    listener.store = RowStore(directory, "dashboard" if use_dashboard else "table", listener.FIELD_ORDER,
+                              export_interval=0, export_on_rotate=False)
+    listener.STATS_INTERVAL = 0
+    listener.SHOW_TABLE = not use_dashboard
+    listener.dashboard = Dashboard(args.fps, out=sink.out) if use_dashboard else None
+    frames = 0
+    with contextlib.redirect_stdout(sink.out):
+        if use_dashboard:
+            listener.dashboard.start()
+        start = time.perf_counter()
+        for i in range(0, len(messages), args.batch_size):
+            listener.handle_batch(messages[i:i + args.batch_size])
+        elapsed = time.perf_counter() - start
+        if use_dashboard:
+            listener.dashboard.stop()
+            frames = listener.dashboard.frames
+    listener.store.close(export=False)
+    listener.dashboard = None
+    sink.close()
+    return elapsed, sink.bytes, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐样本表格与仪表盘模式的吞吐量对比")
+    parser.add_argument("--messages", type=int, default=5000, help="消息数")
+    parser.add_argument("--devices", type=int, default=20, help="设备数")
+    parser.add_argument("--samples", type=int, default=10, help="每条消息的样本数")
+    parser.add_argument("--batch-size", type=int, default=200, help="工作线程每批消息数")
+    parser.add_argument("--fps", type=float, default=2.0, help="仪表盘每秒重绘次数")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.devices, args.samples)
+    samples = args.messages * args.samples
+    print("%d 台设备，%d 条消息，%d 个样本，输出到 pty" % (args.devices, args.messages, samples))
+    directory = tempfile.mkdtemp(prefix="bench_dashboard_")
+    try:
+        results = {}
+        for name, use_dashboard in (("逐样本表格", False), ("仪表盘", True)):
+            elapsed, written, frames = run_case(messages, directory, use_dashboard, args)
+            results[name] = elapsed
+            print("%s: %.2f 秒，%.0f 样本/秒，终端输出 %.1f MB%s" %
+                  (name, elapsed, samples / elapsed, written / 1e6, "，%d 帧" % frames if use_dashboard else ""))
+        print("仪表盘模式吞吐量为逐样本表格的 %.1f 倍" % (results["逐样本表格"] / results["仪表盘"]))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+车队模式接收能力测试：fleet.simulator 的数千台虚拟设备经本地 fleet.broker 发布，mqtt_listener 车队模式
+用一个连接订阅 up/+，按 IMEI 分区写入 CSV。
+代理和仿真各在独立进程中运行，本进程只有监听器（paho 网络线程 + 工作线程），统计收到和写入的数据是否齐全、
+队列最大深度、丢弃数和监听器 CPU 时间。
+
+用法示例：
+    python -m ingest.bench_fleet
+    python -m ingest.bench_fleet --devices 5000 --rate 2000 --duration 30 --workers 2
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mqtt_listener as listener
+from fleet.simulator import run_sharded
+from ingest import DeviceTable, PartitionedStore
+
+
+def free_port():
+    with contextlib.closing(socket.socket()) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_broker(port):
+    broker = subprocess.Popen([sys.executable, "-m", "fleet.broker", "--port", str(port)], cwd=ROOT,
+                              stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return broker
+        except OSError:
+            time.sleep(0.1)
+    broker.terminate()
+    raise RuntimeError("broker did not start")
+
+
+def start_listener(port, directory, args):
+    """按车队模式配置 mqtt_listener，返回已订阅 up/+ 的 paho 客户端"""
+    listener.FLEET_MODE = True
+    listener.SHOW_TABLE = False
+    listener.STATS_INTERVAL = 0
+    listener.devices = DeviceTable()
+    listener.store = PartitionedStore(directory, listener.DATA_PREFIX, listener.FIELD_ORDER, max_open=args.max_open,
+                                      export_interval=0, export_on_rotate=False)
+    listener.QUEUE_SIZE, listener.QUEUE_POLICY = args.queue_size, "drop_oldest"
+    listener.WORKER_COUNT, listener.BATCH_SIZE = args.workers, args.batch_size
+    listener.init_workers()
+    subscribed = threading.Event()
+    client = mqtt.Client(client_id=listener.FLEET_CLIENT_ID, callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+    client.on_message = listener.on_message
+    client.on_subscribe = lambda *a: subscribed.set()
+    client.connect('127.0.0.1', port, keepalive=60)
+    client.subscribe(listener.FLEET_TOPIC)
+    client.loop_start()
+    if not subscribed.wait(10):
+        raise RuntimeError("subscribe timed out")
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="车队模式接收能力测试")
+    parser.add_argument("--devices", type=int, default=3000, help="虚拟设备数")
+    parser.add_argument("--rate", type=float, default=1000.0, help="SENSOR_DATA 总速率（条/秒）")
+    parser.add_argument("--duration", type=float, default=20.0, help="发布时长（秒）")
+    parser.add_argument("--samples", type=int, default=10, help="每条消息的样本数")
+    parser.add_argument("--workers", type=int, default=1, help="监听器工作线程数")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批最多消息数")
+    parser.add_argument("--queue-size", type=int, default=100000, help="监听器队列长度")
+    parser.add_argument("--max-open", type=int, default=256, help="同时打开的设备文件数上限")
+    args = parser.parse_args()
+
+    port = free_port()
+    directory = tempfile.mkdtemp(prefix="bench_fleet_")
+    broker = start_broker(port)
+    client = None
+    try:
+        client = start_listener(port, directory, args)
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        with multiprocessing.Pool(1) as pool:
+            summary = pool.apply(run_sharded, (1, args.devices, args.rate, args.duration),
+                                 dict(port=port, samples_per_upload=args.samples, subscribe=False, seed=1))
+        published = summary['messages']
+        deadline = time.monotonic() + 30
+        while listener.message_queue.enqueued + listener.message_queue.dropped < published and \
+                time.monotonic() < deadline:
+            time.sleep(0.1)
+        client.loop_stop()
+        listener.workers.stop()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        stats = listener.workers.stats()
+        count, messages, samples, lost, _ = listener.devices.totals()
+        expected_rows = summary['counts'].get('SENSOR_DATA', 0) * args.samples
+        print("仿真: %d 台设备连接，发布 %d 条（SENSOR_DATA %d 条，稳态 %.0f 条/秒）" %
+              (summary['connected'], published, summary['counts'].get('SENSOR_DATA', 0),
+               summary['steady_sensor'] / summary['steady_duration']))
+        print("监听器（1个连接，%d 个工作线程）: 收到 %d 条，%d 台设备，写入 %d 行（应为 %d），按包序丢失 %d，"
+              "队列最大深度 %d，丢弃 %d" % (args.workers, stats['enqueued'], count, listener.store.total_rows,
+                                   expected_rows, lost, stats['max_depth'], stats['dropped']))
+        print("监听器 CPU %.1f 秒 / %.1f 秒（%.0f µs/条），分区文件句柄关闭 %d 次" %
+              (cpu, elapsed, cpu / max(stats['processed'], 1) * 1e6, listener.store.suspends))
+    finally:
+        if client is not None:
+            client.disconnect()
+        broker.terminate()
+        broker.wait()
+        listener.store.close()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+突发消息下 mqtt_listener 网络线程占用对比（本地 MiniBroker + paho 客户端）
+- 原做法：on_message 内完成解码、表格输出和存储
+- 队列：on_message 只入队，工作线程按批处理
+向 up/<IMEI> 一次性发布若干条 SENSOR_DATA（模拟网关重连后补发积压数据），统计 on_message 累计和最长耗时、
+全部消息到达网络线程的时间和全部处理完的时间。表格输出写到 /dev/null，只计格式化开销。
+
+用法示例：
+    python -m ingest.bench_pipeline
+    python -m ingest.bench_pipeline --messages 20000 --queue-size 5000 --overflow drop_oldest
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mqtt_listener as listener
+from fleet import AsyncMqttClient
+from fleet.broker import MiniBroker
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import OVERFLOW_POLICIES, RowStore
+
+
+class BrokerThread:
+    """在后台线程的事件循环中运行 MiniBroker，并提供发布接口"""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.broker = self.loop.run_until_complete(MiniBroker(port=0).start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def publish_burst(self, topic, payloads):
+        async def burst():
+            client = AsyncMqttClient("bench_publisher", keepalive=0)
+            await client.connect('127.0.0.1', self.broker.port)
+            for payload in payloads:
+                await client.publish(topic, payload)
+            await client.close()
+        asyncio.run_coroutine_threadsafe(burst(), self.loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.broker.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def run_case(broker, payloads, topic, directory, queued, args):
+    """返回 (on_message 累计秒, on_message 最长秒, 收齐秒, 处理完秒, 写入行数, 丢弃数)"""
+    listener.store = RowStore(directory, "queued" if queued else "inline", listener.FIELD_ORDER, export_interval=0,
+                              export_on_rotate=False)
+    listener.STATS_INTERVAL = 0
+    if queued:
+        listener.QUEUE_SIZE, listener.QUEUE_POLICY = args.queue_size, args.overflow
+        listener.WORKER_COUNT, listener.BATCH_SIZE = args.workers, args.batch_size
+        listener.init_workers()
+        handler = listener.on_message
+    else:
+        def handler(client, userdata, msg):
+            listener.handle_batch([(msg.topic, msg.payload)])
+    count = len(payloads)
+    state = {'n': 0, 'busy': 0.0, 'max': 0.0, 'last': 0.0}
+    done = threading.Event()
+
+    def on_message(client, userdata, msg):
+        start = time.perf_counter()
+        handler(client, userdata, msg)
+        end = time.perf_counter()
+        state['busy'] += end - start
+        state['max'] = max(state['max'], end - start)
+        state['n'] += 1
+        if state['n'] == count:
+            state['last'] = end
+            done.set()
+
+    subscribed = threading.Event()
+    client = mqtt.Client(client_id="bench_listener", callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+    client.on_message = on_message
+    client.on_subscribe = lambda *a: subscribed.set()
+    client.connect('127.0.0.1', broker.broker.port)
+    client.subscribe(topic)
+    client.loop_start()
+    subscribed.wait(5)
+    rows = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        broker.publish_burst(topic, payloads)
+        done.wait(600)
+        if queued:
+            listener.workers.stop()
+        finished = time.perf_counter()
+        dropped = listener.message_queue.dropped if queued else 0
+        rows = listener.store.total_rows
+    client.loop_stop()
+    client.disconnect()
+    listener.store.close(export=False)
+    return state['busy'], state['max'], state['last'] - start, finished - start, rows, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="突发消息下网络线程占用对比")
+    parser.add_argument("--messages", type=int, default=5000, help="突发的消息数")
+    parser.add_argument("--samples", type=int, default=10, help="每条消息的样本数")
+    parser.add_argument("--workers", type=int, default=1, help="工作线程数")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批最多消息数")
+    parser.add_argument("--queue-size", type=int, default=10000, help="队列长度上限")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="drop_oldest", help="队列满时的策略")
+    args = parser.parse_args()
+
+    device = VirtualDevice(0, build_motion_clips(1), random.Random(1), samples_per_upload=args.samples)
+    payloads = [device.sensor_payload("2026-01-16 08:16:11") for _ in range(args.messages)]
+    topic = "up/" + device.imei
+    print("突发 %d 条消息，每条 %d 个样本（%.1f MB）" %
+          (len(payloads), args.samples, sum(len(p) for p in payloads) / 1e6))
+    directory = tempfile.mkdtemp(prefix="bench_pipeline_")
+    broker = BrokerThread()
+    try:
+        for name, queued in (("原做法（回调内处理）", False), ("队列+工作线程", True)):
+            busy, longest, received, finished, rows, dropped = run_case(broker, payloads, topic, directory,
+                                                                        queued, args)
+            print("%s: on_message 累计 %.3f 秒（平均 %.1f µs，最长 %.1f ms），收齐 %.2f 秒，处理完 %.2f 秒，"
+                  "写入 %d 行，丢弃 %d 条" % (name, busy, busy / len(payloads) * 1e6, longest * 1e3, received,
+                                       finished, rows, dropped))
+    finally:
+        broker.stop()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+每条消息写入耗时对比：原做法（load_workbook + 逐格写入 + save）与 RowStore 追加
+原做法每条消息都重新加载并保存整个工作簿，耗时随文件行数线性增长；RowStore 只追加 CSV，
+按段统计每条消息的耗时，应与已写入的行数无关。
+
+用法示例：
+    python -m ingest.bench_store
+    python -m ingest.bench_store --rows 1000000 --per-message 10 --excel-sizes 0,2000,10000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import RowStore, export_xlsx
+
+HEADER = ['时间戳', '版本', '包序', '加速度X', '加速度Y', '加速度Z', '角速度X', '角速度Y', '角速度Z', '角度X', '角度Y',
+          '角度Z', '姿态角1', '姿态角2', '气压', '高度', '经度', '纬度']
+
+
+def make_rows(count, start=0):
+    return [["2026-01-16 08:16:11", 1, (start + i) % 256, -16, 8, 1000, 3, -2, 1, 12, -5, 90, 0, 0, 96314,
+             425.75, 104.7463432, 31.4627341] for i in range(count)]
+
+
+def excel_append(path, rows):
+    """原 write_to_excel 的做法"""
+    wb = load_workbook(path)
+    ws = wb.active
+    next_row = ws.max_row + 1
+    for row in rows:
+        for col, value in enumerate(row, 1):
+            ws.cell(row=next_row, column=col, value=value)
+        next_row += 1
+    wb.save(path)
+
+
+def bench_excel(directory, sizes, per_message, messages):
+    """在已有 size 行的工作簿上追加 messages 条消息，返回每条消息平均耗时"""
+    result = []
+    for size in sizes:
+        path = os.path.join(directory, "excel_%d.xlsx" % size)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(HEADER)
+        for row in make_rows(size):
+            ws.append(row)
+        wb.save(path)
+        rows = make_rows(per_message)
+        start = time.perf_counter()
+        for _ in range(messages):
+            excel_append(path, rows)
+        result.append((size, (time.perf_counter() - start) / messages))
+    return result
+
+
+def bench_store(directory, total_rows, per_message, segments, max_rows):
+    """写入 total_rows 行，返回每段 [(段末行数, 每条消息平均耗时)] 和存储对象"""
+    store = RowStore(directory, "bench", HEADER, max_rows=max_rows, export_interval=0, export_on_rotate=False)
+    rows = make_rows(per_message)
+    messages = total_rows // per_message
+    per_segment = max(messages // segments, 1)
+    result = []
+    written = 0
+    while written < messages:
+        count = min(per_segment, messages - written)
+        start = time.perf_counter()
+        for _ in range(count):
+            store.append(rows)
+        result.append((store.total_rows, (time.perf_counter() - start) / count))
+        written += count
+    store.close(export=False)
+    return result, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每条消息写入耗时对比")
+    parser.add_argument("--rows", type=int, default=1000000, help="RowStore 写入的总行数")
+    parser.add_argument("--per-message", type=int, default=10, help="每条消息的样本数")
+    parser.add_argument("--segments", type=int, default=10, help="RowStore 分段统计的段数")
+    parser.add_argument("--max-rows", type=int, default=100000, help="RowStore 轮转行数")
+    parser.add_argument("--excel-sizes", default="0,1000,5000,20000", help="原做法测试时工作簿已有的行数")
+    parser.add_argument("--excel-messages", type=int, default=5, help="原做法每个行数下写入的消息数")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_store_")
+    try:
+        sizes = [int(s) for s in args.excel_sizes.split(',')]
+        print("原做法（load_workbook + save），每条消息 %d 行：" % args.per_message)
+        for size, seconds in bench_excel(directory, sizes, args.per_message, args.excel_messages):
+            print("  已有 %7d 行: %8.1f ms/条" % (size, seconds * 1e3))
+
+        print("RowStore 追加 %d 行（每 %d 行轮转）：" % (args.rows, args.max_rows))
+        start = time.perf_counter()
+        segments, store = bench_store(directory, args.rows, args.per_message, args.segments, args.max_rows)
+        total = time.perf_counter() - start
+        for rows, seconds in segments:
+            print("  至 %8d 行: %6.1f µs/条" % (rows, seconds * 1e6))
+        times = [seconds for _, seconds in segments]
+        print("  合计 %.1f 秒，%d 次轮转，各段最慢/最快 %.2f" % (total, store.rotations, max(times) / min(times)))
+
+        start = time.perf_counter()
+        rows = export_xlsx(store.path)
+        print("write_only 生成 xlsx（%d 行）: %.1f 秒" % (rows, time.perf_counter() - start))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
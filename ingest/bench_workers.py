@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+共享订阅接收吞吐测试：本地 fleet.broker 代理（独立进程），一个发布进程把预先生成的 SENSOR_DATA 消息
+（多台虚拟设备轮流）尽快发布到 up/<IMEI>，N 个 ingest.worker 接收进程以 $share/<组名>/up/+ 分担接收并写入
+各自的 SQLite，计时到全部样本写入为止；每轮结束后合并，统计乱序和分散在多个进程的设备数。
+
+接收进程数依次取 --workers 中的值，代理分配策略依次取 round_robin 和 hash。
+多进程能否提速取决于 CPU 核数（os.cpu_count()）：代理、发布和接收进程共用 CPU，核数不足时增加接收进程没有收益。
+
+用法示例：
+    python -m ingest.bench_workers
+    python -m ingest.bench_workers --workers 1 2 4 8 --messages 50000 --devices 1000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fleet.broker import SHARE_STRATEGIES
+from fleet.mqtt import DISCONNECT_PACKET, encode_connect, encode_publish
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest.bench_fleet import free_port
+from ingest.worker import WorkerGroup
+from mqtt_listener import FIELD_ORDER
+
+
+def start_broker(port, strategy):
+    broker = subprocess.Popen([sys.executable, "-m", "fleet.broker", "--port", str(port), "--share-strategy", strategy],
+                              cwd=ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return broker
+        except OSError:
+            time.sleep(0.1)
+    broker.terminate()
+    raise RuntimeError("broker did not start")
+
+
+def build_packets(devices, messages, samples):
+    """预先编码的 PUBLISH 报文，设备轮流发布，各设备包序连续"""
+    clips = build_motion_clips(1)
+    fleet = [VirtualDevice(i, clips, random.Random(i), samples_per_upload=samples) for i in range(devices)]
+    packets = []
+    for i in range(messages):
+        device = fleet[i % devices]
+        packets.append(encode_publish("up/" + device.imei, device.sensor_payload("2026-01-16 08:16:11")))
+    return packets
+
+
+def publish(port, packets, chunk=200):
+    """一个连接尽快发布全部报文"""
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.sendall(encode_connect("bench_publisher"))
+        sock.recv(4)
+        for i in range(0, len(packets), chunk):
+            sock.sendall(b''.join(packets[i:i + chunk]))
+        sock.sendall(DISCONNECT_PACKET)
+
+
+def run_round(port, workers, packets, expected, directory, timeout):
+    group = WorkerGroup(workers, '127.0.0.1', port, directory, FIELD_ORDER).start()
+    publisher = multiprocessing.Process(target=publish, args=(port, packets))
+    start = time.perf_counter()
+    publisher.start()
+    deadline = time.monotonic() + timeout
+    while group.rows < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    publisher.join()
+    stats = group.stop()
+    merged = group.merge()
+    return elapsed, stats, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享订阅接收吞吐测试")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="接收进程数")
+    parser.add_argument("--strategies", nargs="+", choices=SHARE_STRATEGIES, default=list(SHARE_STRATEGIES),
+                        help="代理的共享订阅分配策略")
+    parser.add_argument("--messages", type=int, default=20000, help="发布的消息数")
+    parser.add_argument("--devices", type=int, default=499,
+                        help="虚拟设备数（与进程数互质时 round_robin 会把同一设备分到各进程）")
+    parser.add_argument("--samples", type=int, default=10, help="每条消息的样本数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="每轮最长等待时间（秒）")
+    args = parser.parse_args()
+
+    packets = build_packets(args.devices, args.messages, args.samples)
+    expected = args.messages * args.samples
+    print(f"CPU {os.cpu_count()} 核；{args.devices} 台设备，{args.messages} 条消息，每条 {args.samples} 个样本"
+          f"（{sum(map(len, packets)) / 1e6:.1f} MB）")
+    for strategy in args.strategies:
+        for workers in args.workers:
+            port = free_port()
+            broker = start_broker(port, strategy)
+            directory = tempfile.mkdtemp(prefix="bench_workers_")
+            try:
+                elapsed, stats, merged = run_round(port, workers, packets, expected, directory, args.timeout)
+            finally:
+                broker.terminate()
+                broker.wait()
+                shutil.rmtree(directory)
+            rows = sum(item['rows'] for item in stats)
+            reordered = sum(item['reordered'] for item in merged.values())
+            split = sum(1 for item in merged.values() if item['workers'] > 1)
+            per_worker = "/".join(str(item['messages']) for item in stats)
+            print(f"{strategy:<11} {workers} 个进程: {rows}/{expected} 行，{elapsed:.2f} 秒，"
+                  f"{args.messages / elapsed:,.0f} 条/秒（{rows / elapsed:,.0f} 行/秒），各进程消息 {per_worker}，"
+                  f"合并后乱序 {reordered}，分散在多个进程的设备 {split}")
+
+
+if __name__ == "__main__":
+    main()
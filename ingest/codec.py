@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+上行载荷解码
+SENSOR_DATA 消息直接解码为 SensorBatch：样本按给定字段顺序转为行元组（可直接写入 CSV 或 executemany），
+消息级的事件和版本只在批上保存一份，不再为每个样本复制字典、逐字段 .get()。
+
+解码后端按可用性依次选择：
+- msgspec：按字段类型定义的 Struct 直接解码（忽略未知字段，缺失字段为 ''），不生成中间字典
+- orjson：解析为字典后用 itemgetter 按固定字段元组取值
+- json：标准库，以上都没有安装时使用
+类型不符（如数值以字符串上报、整数字段为小数）、裸样本数组和其他事件回退到通用解析，结果与标准库解析一致
+（msgspec 后端中浮点字段上报的整数会转为 float）。
+"""
+
+import json
+from operator import itemgetter
+from typing import Any
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SENSOR_EVENT = 'SENSOR_DATA'
+MISSING = ''  # 缺失字段的值，与原 data.get(field, '') 一致
+
+# 样本字段类型（device/main.py 的 SENSOR_JSON_FORMAT），其余字段不限类型
+FIELD_TYPES = {
+    'timestamp': str,
+    'version': int,
+    'packet_order': int,
+    'accel_x': int, 'accel_y': int, 'accel_z': int,
+    'gyro_x': int, 'gyro_y': int, 'gyro_z': int,
+    'angle_x': int, 'angle_y': int, 'angle_z': int,
+    'attitude1': int, 'attitude2': int,
+    'pressure': int,
+    'altitude': float, 'longitude': float, 'latitude': float,
+}
+
+BACKENDS = tuple(name for name, module in (('msgspec', msgspec), ('orjson', orjson), ('json', json)) if module)
+
+
+class SensorBatch:
+    """一条消息解码后的样本：事件、版本（消息级，只存一份）和按 fields 顺序的行元组"""
+    __slots__ = ('event', 'version', 'fields', 'rows', 'raw')
+
+    def __init__(self, event, version, fields, rows, raw=None):
+        self.event = event
+        self.version = version
+        self.fields = fields
+        self.rows = rows
+        self.raw = raw  # 非 SENSOR_DATA 事件（上电包、超时包）的原始字典
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        """第 index 个样本的字典，含事件和版本（只在显示等需要字典的地方按需生成）"""
+        if self.raw is not None:
+            return [self.raw][index]
+        sample = {field: value for field, value in zip(self.fields, self.rows[index]) if value is not MISSING}
+        sample['event'] = self.event
+        sample.setdefault('version', self.version)
+        return sample
+
+    def __iter__(self):
+        for index in range(len(self.rows)):
+            yield self[index]
+
+    def column(self, field):
+        """一个字段的所有值"""
+        position = self.fields.index(field)
+        return [row[position] for row in self.rows]
+
+
+class PayloadDecoder:
+    """按固定字段顺序解码上行载荷"""
+    def __init__(self, fields, backend=None):
+        self.fields = tuple(fields)
+        self.backend = backend or BACKENDS[0]
+        if self.backend not in BACKENDS:
+            raise ValueError("decoder backend not available: %s" % self.backend)
+        self.loads = orjson.loads if self.backend == 'orjson' else json.loads
+        self.getter = itemgetter(*self.fields)
+        self.struct_decoder = None
+        if self.backend == 'msgspec':
+            sample = msgspec.defstruct('Sample', [(field, FIELD_TYPES.get(field, Any), MISSING)
+                                                  for field in self.fields], gc=False)
+            envelope = msgspec.defstruct('SensorEnvelope', [('event', str, ''), ('data', list[sample], []),
+                                                            ('version', Any, MISSING)])
+            self.struct_decoder = msgspec.json.Decoder(envelope)
+            self.astuple = msgspec.structs.astuple
+
+    def rows_from(self, samples):
+        """样本字典列表转为行元组"""
+        if len(self.fields) == 1:
+            return [(sample.get(self.fields[0], MISSING), ) for sample in samples]
+        getter = self.getter
+        try:
+            return [getter(sample) for sample in samples]
+        except (KeyError, TypeError):
+            fields = self.fields
+            return [tuple(sample.get(field, MISSING) for field in fields) for sample in samples]
+
+    def decode(self, payload):
+        """
+        解码一条载荷（bytes 或 str）：传感器数据返回 SensorBatch（上电包、超时包等事件为只有一行的 SensorBatch），
+        其他 JSON 返回解析结果，不是 JSON 时抛出 ValueError
+        """
+        if self.struct_decoder is not None:
+            try:
+                envelope = self.struct_decoder.decode(payload)
+            except msgspec.ValidationError:
+                pass
+            else:
+                if envelope.event == SENSOR_EVENT:
+                    astuple = self.astuple
+                    return SensorBatch(SENSOR_EVENT, envelope.version, self.fields,
+                                       [astuple(sample) for sample in envelope.data])
+        return self.decode_object(self.loads(payload))
+
+    def decode_object(self, data):
+        """通用路径：已解析的 JSON 对象转为 SensorBatch"""
+        if isinstance(data, dict):
+            event = data.get('event')
+            if event == SENSOR_EVENT or (event is None and isinstance(data.get('data'), list)):
+                samples = data.get('data') or []
+                if isinstance(samples, list) and all(isinstance(sample, dict) for sample in samples):
+                    return SensorBatch(event or SENSOR_EVENT, data.get('version', MISSING), self.fields,
+                                       self.rows_from(samples))
+            elif event is not None:
+                return SensorBatch(event, data.get('version', MISSING), self.fields, self.rows_from([data]), data)
+        elif isinstance(data, list) and all(isinstance(sample, dict) for sample in data):
+            # 裸样本数组（旧格式）：没有消息级的事件和版本，取自样本（同一次上报的样本相同，按第一个样本），
+            # 样本中没有时为 SENSOR_DATA 和缺失值，与原逐样本写库一致
+            first = data[0] if data else {}
+            return SensorBatch(first.get('event', SENSOR_EVENT), first.get('version', MISSING), self.fields,
+                               self.rows_from(data))
+        return data
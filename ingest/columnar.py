@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+按列存放的样本批（NumPy）
+MqttThread 把每条消息解码后的 SensorBatch 转为一次 ColumnBatch：每个字段一个数组，事件、版本、IMEI 每批一份。
+此后写库、图表和总览表都直接使用这些数组：
+- 写库：rows() 按列 tolist() 后 zip 成行元组，一次 executemany
+- 图表：RollingSeries 保存每条曲线最近的点（float64 数组），整段交给 QLineSeries.replaceNp，
+  超出时间范围的点用 searchsorted 截掉，Y 轴范围用数组的 min/max 计算
+- 总览表：BatchList 按行号定位到批和批内下标，表格模型只为可见的单元格取值
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from ingest.codec import MISSING
+
+# 每批一份、未单独成列时由批补齐的字段
+BATCH_FIELDS = ('event', 'version')
+
+
+def to_array(values):
+    """一个字段的值转为数组：全为整数时 int64，整数和浮点混合时 float64，含缺失值或字符串时为 object"""
+    kinds = set(map(type, values))
+    try:
+        if kinds <= {int}:
+            return np.array(values, dtype=np.int64)
+        if kinds <= {int, float}:
+            return np.array(values, dtype=np.float64)
+    except OverflowError:
+        pass
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ColumnBatch:
+    """一批样本：fields 中每个字段一个数组，事件、版本、IMEI 每批一份（或作为逐行的列）"""
+    __slots__ = ('event', 'version', 'imei', 'fields', 'columns', 'size')
+
+    def __init__(self, event, version, columns, imei=MISSING):
+        self.event = event
+        self.version = version
+        self.imei = imei
+        self.fields = tuple(columns)
+        self.columns = columns
+        self.size = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_batch(cls, batch, imei=MISSING):
+        """由 SensorBatch 生成（每个字段一次转换）"""
+        values = list(zip(*batch.rows)) if batch.rows else [()] * len(batch.fields)
+        columns = {field: to_array(column) for field, column in zip(batch.fields, values)}
+        return cls(batch.event, batch.version, columns, imei)
+
+    @classmethod
+    def from_rows(cls, positions, rows):
+        """由查询结果生成，positions 为 {字段: 行元组中的下标}；事件、版本等逐行的字段也作为列"""
+        columns = {field: to_array([row[position] for row in rows]) for field, position in positions.items()}
+        return cls(None, None, columns)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, field):
+        """一个字段的数组；批级字段未单独成列时为重复的值，批中没有的字段为缺失值"""
+        array = self.columns.get(field)
+        if array is not None:
+            return array
+        return np.full(self.size, getattr(self, field) if field in BATCH_FIELDS else MISSING, dtype=object)
+
+    def value(self, field, index):
+        """第 index 行一个字段的值（表格按单元格取值，不生成整行）"""
+        array = self.columns.get(field)
+        if array is not None:
+            return array[index]
+        return getattr(self, field) if field in BATCH_FIELDS else MISSING
+
+    def last(self, field):
+        """最后一行一个字段的值，没有该字段或批为空时为缺失值"""
+        return self.value(field, -1) if self.size and field in self.columns else MISSING
+
+    def numeric(self, field):
+        """
+        字段的 float64 数组（图表用），批中没有该字段时返回 None；
+        以字符串上报的数值按 float() 转换，缺失或无法转换的值为 NaN，由调用方逐条曲线去掉
+        """
+        array = self.columns.get(field)
+        if array is None:
+            return None
+        if array.dtype.kind in 'iuf':
+            return array.astype(np.float64, copy=False)
+        try:
+            return array.astype(np.float64)
+        except (TypeError, ValueError):
+            return np.array([_to_float(value) for value in array.tolist()], dtype=np.float64)
+
+    def rows(self, fields):
+        """按 fields 顺序的行元组（写库用，值为 Python 的 int / float / str）"""
+        return zip(*(self.column(field).tolist() for field in fields))
+
+
+class BatchList:
+    """按到达顺序保存的批，按行号定位（总览表的数据源）"""
+
+    def __init__(self):
+        self.batches = []
+        self.starts = []  # 每批第一行的行号
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, batch):
+        if len(batch):
+            self.batches.append(batch)
+            self.starts.append(self.size)
+            self.size += len(batch)
+
+    def prepend(self, batch):
+        """在最前面插入一批（滚动到顶部时加载的历史数据）"""
+        if len(batch):
+            self.batches.insert(0, batch)
+            self.starts = [0] + [start + len(batch) for start in self.starts]
+            self.size += len(batch)
+
+    def clear(self):
+        self.batches, self.starts, self.size = [], [], 0
+
+    def locate(self, row):
+        """行号对应的 (批, 批内下标)"""
+        position = bisect_right(self.starts, row) - 1
+        return self.batches[position], row - self.starts[position]
+
+    def value(self, row, field):
+        batch, index = self.locate(row)
+        return batch.value(field, index)
+
+
+class RollingSeries:
+    """图表一条曲线最近的点：按 x 递增的 float64 数组，最多保留 max_points 个"""
+
+    def __init__(self, max_points):
+        self.max_points = max_points
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.x)
+
+    def extend(self, x, y):
+        """追加一批点（x 不小于已有的点）"""
+        self.x = np.concatenate((self.x, x))[-self.max_points:]
+        self.y = np.concatenate((self.y, y))[-self.max_points:]
+
+    def extend_at(self, x, y):
+        """在同一 x 处追加一组 y 值，NaN 和无穷大（缺失或非数值的样本）只在这条曲线上跳过"""
+        y = y[np.isfinite(y)]
+        if len(y):
+            self.extend(np.full(len(y), x, dtype=np.float64), y)
+
+    def trim(self, min_x):
+        """移除 x 小于 min_x 的点"""
+        start = int(np.searchsorted(self.x, min_x, 'left'))
+        if start:
+            self.x, self.y = self.x[start:], self.y[start:]
+
+    def clear(self):
+        self.x, self.y = self.x[:0], self.y[:0]
+
+    def y_values(self, x_min, x_max):
+        """x 在 [x_min, x_max] 内的点的 y 值"""
+        start = np.searchsorted(self.x, x_min, 'left')
+        end = np.searchsorted(self.x, x_max, 'right')
+        return self.y[start:end]
+
+
+def y_axis_range(series, x_min, x_max, margin, min_span):
+    """
+    几条曲线在 [x_min, x_max] 内的 Y 轴范围：上下各留 margin 比例的边距，范围不足 min_span 时以中点扩展，
+    没有点时返回 None
+    """
+    values = [rolling.y_values(x_min, x_max) for rolling in series]
+    values = [array for array in values if len(array)]
+    if not values:
+        return None
+    y_min = float(min(array.min() for array in values))
+    y_max = float(max(array.max() for array in values))
+    extra = (y_max - y_min) * margin
+    low, high = y_min - extra, y_max + extra
+    if high - low < min_span:
+        center = (y_min + y_max) / 2
+        low, high = center - min_span / 2, center + min_span / 2
+    return low, high
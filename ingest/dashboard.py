@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+终端实时仪表盘
+工作线程只更新设备状态表（DeviceTable：消息数、样本数、包序丢失、最后收到时间、最新样本），仪表盘线程按
+固定帧率整屏重绘一次，终端输出量与消息速率无关。
+
+列宽按东亚宽度计算（unicodedata.east_asian_width 为 W/F 的字符占2列），含中文的字符串（表头、单位）
+的显示宽度只计算一次，数值等纯 ASCII 字符串直接取长度。
+"""
+
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+
+from ingest.devices import DeviceTable
+
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+
+_width_cache = {}
+WIDTH_CACHE_SIZE = 10000
+
+
+def display_width(text):
+    """字符串在终端中的显示宽度（纯ASCII直接取长度，其余带缓存）"""
+    if text.isascii():
+        return len(text)
+    width = _width_cache.get(text)
+    if width is None:
+        width = 0
+        for ch in text:
+            width += 2 if unicodedata.east_asian_width(ch) in 'WF' else 1
+        if len(_width_cache) >= WIDTH_CACHE_SIZE:
+            _width_cache.clear()
+        _width_cache[text] = width
+    return width
+
+
+def format_value(fmt, value):
+    """按格式显示一个值；以字符串上报的数值等不符合格式的值按原样显示"""
+    if value is None:
+        return '-'
+    try:
+        return fmt % value
+    except (TypeError, ValueError):
+        return '%s' % (value, )
+
+
+def pad(text, width):
+    """右侧补空格到指定显示宽度"""
+    text = str(text)
+    return text + ' ' * (width - display_width(text))
+
+
+# 仪表盘最新值列：(字段, 表头, 格式)
+LATEST_COLUMNS = (
+    ('packet_order', '包序', '%s'),
+    ('accel_x', '加速度X', '%s'),
+    ('accel_y', '加速度Y', '%s'),
+    ('accel_z', '加速度Z', '%s'),
+    ('pressure', '气压', '%s'),
+    ('altitude', '高度', '%.2f'),
+    ('longitude', '经度', '%.6f'),
+    ('latitude', '纬度', '%.6f'),
+)
+
+
+class Dashboard:
+    """按固定帧率重绘的终端仪表盘"""
+    def __init__(self, fps=2.0, out=None, max_devices=30, footer=None, clock=time.monotonic, table=None):
+        """
+        max_devices: 最多显示的设备行数（按最后收到时间排序）
+        footer: 返回附加行列表的函数（如队列统计），每帧调用
+        table: 共用的 DeviceTable，不指定时自建
+        """
+        self.fps = fps
+        self.out = out or sys.stdout
+        self.max_devices = max_devices
+        self.footer = footer
+        self.clock = clock
+        self.table = table if table is not None else DeviceTable()
+        self.started = clock()
+        self.frames = 0
+        self.table.update_rates(self.started)
+        self._stop = threading.Event()
+        self._thread = None
+        self.header = ('  ' + pad('设备', 17) + pad('消息', 9) + pad('消息/秒', 9) + pad('样本/秒', 9) + pad('丢失', 7) +
+                       pad('乱序', 6) + pad('最后收到', 10) + ''.join(pad(title, 12) for _, title, _ in LATEST_COLUMNS))
+
+    def update(self, device, data_list=None, now=None):
+        """记录一条消息；data_list 为其中的传感器数据（非数据消息传 None）"""
+        self.table.update(device, data_list, self.clock() if now is None else now)
+
+    def render(self, now=None):
+        """生成一帧文本，并按两帧之间的增量更新各设备速率"""
+        if now is None:
+            now = self.clock()
+        table = self.table
+        table.update_rates(now)
+        self.frames += 1
+        # 工作线程加入新设备时各列逐个追加，持锁取出合计和要显示的行，格式化在锁外进行
+        with table.lock:
+            count = len(table.imeis)
+            totals = (sum(table.messages), sum(table.message_rate), sum(table.samples), sum(table.sample_rate))
+            rows = [(table.imeis[row], table.messages[row], table.message_rate[row], table.sample_rate[row],
+                     table.lost[row], table.out_of_order[row], table.last_seen[row], table.latest[row])
+                    for row in heapq.nlargest(self.max_devices, range(count), key=table.last_seen.__getitem__)]
+        lines = ["MQTT接收仪表盘  运行 %.0f 秒  设备 %d  消息 %d（%.1f/秒）  样本 %d（%.1f/秒）" %
+                 ((now - self.started, count) + totals),
+                 "", self.header]
+        for imei, messages, message_rate, sample_rate, lost, out_of_order, last_seen, latest in rows:
+            line = ('  ' + pad(imei[-15:], 17) + pad(messages, 9) + pad('%.1f' % message_rate, 9) +
+                    pad('%.1f' % sample_rate, 9) + pad(lost, 7) + pad(out_of_order, 6) +
+                    pad('%.1f秒前' % (now - last_seen), 10))
+            if latest:
+                for field, _, fmt in LATEST_COLUMNS:
+                    line += pad(format_value(fmt, latest.get(field)), 12)
+            lines.append(line)
+        if count > self.max_devices:
+            lines.append("  …… 另有 %d 台设备" % (count - self.max_devices))
+        if self.footer:
+            lines.append("")
+            lines.extend(self.footer())
+        return '\n'.join(lines)
+
+    def draw(self):
+        """清屏后一次写出整帧"""
+        self.out.write(CLEAR_SCREEN + self.render() + '\n')
+        self.out.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dashboard", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        while not self._stop.wait(interval):
+            try:
+                self.draw()
+            except Exception as e:
+                print("❌ 仪表盘刷新失败: %s" % e)
+
+    def stop(self):
+        """停止刷新并绘制最后一帧"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.draw()
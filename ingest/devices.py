@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+设备接收状态表
+订阅 up/+ 时同一连接上有数千台设备，每台设备的状态（消息数、样本数、按包序推算的丢失和乱序、最后包序、
+首次/最后收到时间、速率）按列存放在 array 中，IMEI 到行号用一个字典映射，每台设备只占百余字节。
+"""
+
+import array
+import threading
+
+NO_ORDER = -1  # 还没有收到带包序的样本
+
+
+def is_imei(text):
+    """是否为15位ASCII数字的IMEI（主题最后一级来自网络，按IMEI建目录、统计前检查）"""
+    return len(text) == 15 and text.isascii() and text.isdigit()
+
+
+class DeviceTable:
+    """按设备一行、按字段一列的接收状态表（线程安全）"""
+    def __init__(self):
+        self.index = {}  # IMEI → 行号
+        self.imeis = []
+        self.messages = array.array('q')
+        self.samples = array.array('q')
+        self.lost = array.array('q')  # 按包序推算的丢失样本数
+        self.out_of_order = array.array('q')  # 包序回退（重复或乱序）的次数
+        self.last_order = array.array('h')
+        self.first_seen = array.array('d')
+        self.last_seen = array.array('d')
+        self.message_rate = array.array('d')  # 最近一次 update_rates 计算的速率
+        self.sample_rate = array.array('d')
+        self.latest = []  # 每台设备最新一个样本
+        self.lock = threading.Lock()
+        self._mark_messages = array.array('q')
+        self._mark_samples = array.array('q')
+        self._mark_time = None
+
+    def __len__(self):
+        return len(self.imeis)
+
+    def _add_row(self, imei, now):
+        row = len(self.imeis)
+        self.index[imei] = row
+        self.imeis.append(imei)
+        for column in (self.messages, self.samples, self.lost, self.out_of_order, self._mark_messages,
+                       self._mark_samples):
+            column.append(0)
+        self.last_order.append(NO_ORDER)
+        self.first_seen.append(now)
+        self.last_seen.append(now)
+        self.message_rate.append(0.0)
+        self.sample_rate.append(0.0)
+        self.latest.append(None)
+        return row
+
+    def update(self, imei, data_list, now):
+        """记录 imei 的一条消息；data_list 为其中的传感器数据（样本字典列表或 SensorBatch，非数据消息传 None），返回行号"""
+        with self.lock:
+            row = self.index.get(imei)
+            if row is None:
+                row = self._add_row(imei, now)
+            self.messages[row] += 1
+            self.last_seen[row] = now
+            if not data_list:
+                return row
+            self.samples[row] += len(data_list)
+            last = self.last_order[row]
+            lost = 0
+            out_of_order = 0
+            # SensorBatch 直接取包序列，不生成样本字典
+            column = getattr(data_list, 'column', None)
+            orders = column('packet_order') if column is not None else [data.get('packet_order') for data in data_list]
+            for order in orders:
+                if not isinstance(order, int):
+                    continue
+                if last != NO_ORDER:
+                    gap = (order - last - 1) & 0xFF
+                    if gap >= 128:
+                        out_of_order += 1
+                    else:
+                        lost += gap
+                last = order
+            self.last_order[row] = last
+            self.lost[row] += lost
+            self.out_of_order[row] += out_of_order
+            self.latest[row] = data_list[-1]
+            return row
+
+    def update_rates(self, now):
+        """按上次调用以来的增量计算各设备的消息和样本速率"""
+        with self.lock:
+            elapsed = now - self._mark_time if self._mark_time is not None else 0
+            for row in range(len(self.imeis)):
+                if elapsed > 0:
+                    self.message_rate[row] = (self.messages[row] - self._mark_messages[row]) / elapsed
+                    self.sample_rate[row] = (self.samples[row] - self._mark_samples[row]) / elapsed
+                self._mark_messages[row] = self.messages[row]
+                self._mark_samples[row] = self.samples[row]
+            self._mark_time = now
+
+    def get(self, imei):
+        """一台设备的状态字典，没有该设备时返回 None"""
+        with self.lock:
+            row = self.index.get(imei)
+            if row is None:
+                return None
+            return {
+                'imei': imei,
+                'messages': self.messages[row],
+                'samples': self.samples[row],
+                'lost': self.lost[row],
+                'out_of_order': self.out_of_order[row],
+                'last_order': None if self.last_order[row] == NO_ORDER else self.last_order[row],
+                'first_seen': self.first_seen[row],
+                'last_seen': self.last_seen[row],
+                'message_rate': self.message_rate[row],
+                'sample_rate': self.sample_rate[row],
+                'latest': self.latest[row],
+            }
+
+    def totals(self):
+        """(设备数, 消息数, 样本数, 丢失数, 乱序数)"""
+        with self.lock:
+            return (len(self.imeis), sum(self.messages), sum(self.samples), sum(self.lost), sum(self.out_of_order))
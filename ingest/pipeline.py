@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+消息接收与处理解耦
+paho 网络线程的 on_message 只把原始载荷放入有界队列（微秒级返回，心跳和后续报文不再被阻塞），
+工作线程按批取出后完成解码、显示和存储。
+多个工作线程时，取批时按队列顺序分配序号，handler 并行执行，commit 按序号依次执行，
+需要保持收到顺序的处理（设备包序统计、追加存储）放在 commit 中。
+
+队列满时的策略：
+- drop_oldest：丢弃最早的消息，保留最新数据（默认，适合实时监视）
+- drop_newest：丢弃新到的消息
+- block：网络线程等待最多 block_timeout 秒，仍满时丢弃新消息（短时突发不丢，持续过载时不会无限期阻塞心跳）
+"""
+
+import collections
+import threading
+import time
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+class BoundedQueue:
+    """有界消息队列，记录深度和丢弃统计"""
+    def __init__(self, maxsize=10000, policy='drop_oldest', block_timeout=1.0):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError("unknown overflow policy: %s" % policy)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.max_depth = 0  # 最大深度
+        self.blocked_time = 0.0  # block 策略下网络线程累计等待时间（秒）
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        """放入一条消息，返回是否入队（丢弃最早的消息时新消息仍入队，返回 True）"""
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    self.items.popleft()
+                    self.dropped += 1
+                elif self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                else:
+                    start = time.monotonic()
+                    self.cond.wait_for(lambda: len(self.items) < self.maxsize or self.closed, self.block_timeout)
+                    self.blocked_time += time.monotonic() - start
+                    if len(self.items) >= self.maxsize:
+                        self.dropped += 1
+                        return False
+            self.items.append(item)
+            self.enqueued += 1
+            depth = len(self.items)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.cond.notify_all()
+            return True
+
+    def get_batch(self, max_items, timeout=None):
+        """取出最多 max_items 条消息；队列为空时等待最多 timeout 秒，关闭且为空时返回 None"""
+        with self.cond:
+            if not self.items:
+                self.cond.wait_for(lambda: self.items or self.closed, timeout)
+                if not self.items:
+                    return None if self.closed else []
+            items = self.items
+            count = min(max_items, len(items))
+            batch = [items.popleft() for _ in range(count)]
+            self.dequeued += count
+            if self.policy == 'block':
+                self.cond.notify_all()
+            return batch
+
+    def close(self):
+        """不再接收新消息，工作线程取完剩余消息后退出"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        return {
+            'depth': len(self.items),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'dequeued': self.dequeued,
+            'dropped': self.dropped,
+            'blocked_time': self.blocked_time,
+        }
+
+
+class WorkerPool:
+    """
+    从 BoundedQueue 按批取消息交给 handler(batch) 处理的工作线程
+    commit 不为 None 时，handler 的返回值按批出队的顺序交给 commit(result)，同一时刻只有一个 commit 在执行；
+    handler 失败的批跳过 commit，不阻塞后面的批
+    """
+    def __init__(self, handler, message_queue, workers=1, batch_size=200, batch_timeout=0.5, commit=None):
+        self.handler = handler
+        self.commit = commit
+        self.queue = message_queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.threads = []
+        self.batches = 0
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0  # handler 累计耗时（秒）
+        self.lock = threading.Lock()
+        self.take_lock = threading.Lock()  # 取批和分配序号
+        self.turn = threading.Condition()  # 按序号轮到的批执行 commit
+        self.next_ticket = 0
+        self.committed = 0  # 已轮过 commit 的批数
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name="ingest-worker-%d" % i, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def _run(self):
+        while True:
+            with self.take_lock:
+                batch = self.queue.get_batch(self.batch_size, self.batch_timeout)
+                ticket = self.next_ticket
+                if batch:
+                    self.next_ticket += 1
+            if batch is None:
+                return
+            if not batch:
+                continue
+            start = time.perf_counter()
+            ok, result = self._call(self.handler, batch)
+            elapsed = time.perf_counter() - start
+            if self.commit is not None:
+                with self.turn:
+                    self.turn.wait_for(lambda: self.committed == ticket)
+                    start = time.perf_counter()
+                    if ok:
+                        self._call(self.commit, result)
+                    elapsed += time.perf_counter() - start
+                    self.committed += 1
+                    self.turn.notify_all()
+            with self.lock:
+                self.batches += 1
+                self.processed += len(batch)
+                self.busy_time += elapsed
+
+    def _call(self, function, argument):
+        """返回 (是否成功, 返回值)，失败时计数并打印"""
+        try:
+            return True, function(argument)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            print("❌ 批处理失败: %s" % e)
+            return False, None
+
+    def stop(self, timeout=None):
+        """关闭队列并等待工作线程处理完剩余消息"""
+        self.queue.close()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def stats(self):
+        stats = self.queue.stats()
+        stats.update(batches=self.batches, processed=self.processed, errors=self.errors, busy_time=self.busy_time)
+        return stats
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储与合并
+共享订阅下每个接收进程写自己的数据库（WAL 模式，每批一个事务），进程之间不争用写锁；
+结束后 merge_databases 把各进程的数据库合并为一个，并按包序检查每台设备的数据。
+
+包序只有 0~255，合并时按收到时间顺序把每台设备的包序展开为递增序号（相邻两个包序之差按 -128~127 取值）：
+- 差小于等于 0：乱序或重复（round_robin 共享订阅时同一设备的消息分到不同进程，处理先后不再等于发布顺序）
+- 序号跨度内没有收到的序号：丢失（乱序晚到的样本补上后不再计为丢失）
+合并后的表按 (imei, seq) 排列，即恢复为设备上的采样顺序。
+"""
+
+import contextlib
+import os
+import sqlite3
+
+TABLE = "samples"
+META_COLUMNS = ('imei', 'received_at', 'idx')  # IMEI、收到时间（time.time()）、样本在消息中的位置
+
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+class SqliteSink:
+    """单个进程的 SQLite 写入端"""
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = list(fields)
+        self.columns = list(META_COLUMNS) + self.fields
+        self.rows = 0
+        self.transactions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS %s (%s)" % (TABLE, ", ".join(map(quote, self.columns))))
+        self.insert = "INSERT INTO %s VALUES (%s)" % (TABLE, ", ".join("?" * len(self.columns)))
+
+    def rows_from(self, imei, received_at, rows):
+        """一条消息的样本行（按 fields 顺序的元组，见 ingest/codec.py）前加 IMEI、收到时间和序号"""
+        head = (imei, received_at)
+        return [head + (idx, ) + row for idx, row in enumerate(rows)]
+
+    def append(self, rows):
+        """一个事务写入一批行"""
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(self.insert, rows)
+        self.rows += len(rows)
+        self.transactions += 1
+
+    def close(self):
+        self.conn.close()
+
+
+def unwrap_order(last, order):
+    """包序 order 相对上一个包序 last 的差（-128~127）"""
+    return ((order - last + 128) & 0xFF) - 128
+
+
+def merge_databases(paths, out_path):
+    """合并各进程的数据库到 out_path，返回 {imei: {'rows', 'lost', 'reordered', 'workers'}}
+
+    每台设备按收到时间排序后展开包序为 seq；没有包序的样本沿用上一个 seq。
+    paths 为空时返回空字典，不创建（也不删除已有的）out_path。
+    """
+    if not paths:
+        return {}
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    conn = sqlite3.connect(out_path)
+    try:
+        with contextlib.closing(sqlite3.connect(paths[0])) as first:
+            columns = [row[1] for row in first.execute("PRAGMA table_info(%s)" % TABLE)]
+        order_pos = columns.index('packet_order')
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TEMP TABLE arrived (worker, %s)" % ", ".join(map(quote, columns)))
+        for worker, path in enumerate(paths):
+            conn.execute("ATTACH DATABASE ? AS src", (path, ))
+            conn.execute("INSERT INTO arrived SELECT ?, * FROM src.%s" % TABLE, (worker, ))
+            conn.commit()
+            conn.execute("DETACH DATABASE src")
+
+        out_columns = ['seq', 'worker'] + columns
+        conn.execute("CREATE TEMP TABLE numbered (%s)" % ", ".join(map(quote, out_columns)))
+        insert = "INSERT INTO numbered VALUES (%s)" % ", ".join("?" * len(out_columns))
+        summary = {}
+        state = None
+        batch = []
+        cursor = conn.execute("SELECT * FROM arrived ORDER BY imei, received_at, worker, idx")
+        for row in cursor:
+            imei, order = row[1], row[1 + order_pos]
+            if state is None or state['imei'] != imei:
+                state = {'imei': imei, 'seq': -1, 'last': None, 'workers': set()}
+                summary[imei] = {'rows': 0, 'lost': 0, 'reordered': 0}
+                summary[imei]['workers'] = state['workers']
+            stats = summary[imei]
+            stats['rows'] += 1
+            state['workers'].add(row[0])
+            if isinstance(order, int):
+                if state['last'] is None:
+                    state['seq'] = order
+                else:
+                    delta = unwrap_order(state['last'], order)
+                    if delta <= 0:
+                        stats['reordered'] += 1
+                    state['seq'] += delta
+                state['last'] = order
+            batch.append((state['seq'], ) + row)
+            if len(batch) >= 10000:
+                conn.executemany(insert, batch)
+                batch = []
+        conn.executemany(insert, batch)
+
+        conn.execute("CREATE TABLE %s (%s)" % (TABLE, ", ".join(map(quote, out_columns))))
+        conn.execute("INSERT INTO %s SELECT * FROM numbered ORDER BY imei, seq, received_at" % TABLE)
+        conn.execute("CREATE INDEX idx_%s_imei_seq ON %s (imei, seq)" % (TABLE, TABLE))
+        conn.commit()
+        # 丢失数 = 序号跨度 - 收到的不同序号数（乱序到达的样本不重复计为丢失）
+        for imei, lost in conn.execute("SELECT imei, MAX(seq) - MIN(seq) + 1 - COUNT(DISTINCT seq) FROM %s "
+                                       "WHERE typeof(packet_order) = 'integer' GROUP BY imei" % TABLE):
+            summary[imei]['lost'] = lost
+    finally:
+        conn.close()
+    for stats in summary.values():
+        stats['workers'] = len(stats['workers'])
+    return summary
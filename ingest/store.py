@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+传感器数据追加存储
+每条消息的数据行追加到 CSV（只写文件末尾，耗时与已有数据量无关）；xlsx 由后台线程以 openpyxl write_only
+流式模式从 CSV 生成，只在定时、文件轮转、关闭或按需时进行，不再每条消息重新加载和保存整个工作簿。
+
+文件命名：<目录>/<前缀>_<YYYYMMDD>_<序号>.csv，对应的 xlsx 与之同名。
+跨过本地零点或当前文件达到 max_rows 行时轮转到下一个文件（xlsx 单个工作表最多约104万行）。
+PartitionedStore 按设备分区：<目录>/<IMEI>/<前缀>_<YYYYMMDD>_<序号>.csv。
+
+用法示例（按需生成目录下所有过期的 xlsx）：
+    python -m ingest.store sensor_data
+"""
+
+import argparse
+import collections
+import csv
+import glob
+import os
+import queue
+import threading
+import time
+
+from openpyxl import Workbook
+
+CSV_ENCODING = 'utf-8-sig'  # 带 BOM，Excel 直接打开 CSV 时中文表头不乱码
+SHEET_TITLE = "传感器数据"
+
+
+def _cell(text):
+    """CSV 文本还原为单元格值：空串为空单元格，数字转为 int/float，其余保留字符串"""
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def export_xlsx(csv_path, xlsx_path=None, limit=None):
+    """
+    以 write_only 模式把 CSV 流式写成 xlsx，返回写入的数据行数
+    limit: 只读取文件前 limit 字节（文件仍在追加时取已刷新的部分）
+    先写临时文件再替换，其他程序不会读到写了一半的 xlsx
+    """
+    if xlsx_path is None:
+        xlsx_path = os.path.splitext(csv_path)[0] + '.xlsx'
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_TITLE)
+    rows = 0
+    with open(csv_path, 'rb') as f:
+        data = f.read() if limit is None else f.read(limit)
+    reader = csv.reader(data.decode(CSV_ENCODING).splitlines())
+    header = next(reader, None)
+    if header is not None:
+        ws.append(header)
+    for row in reader:
+        ws.append([_cell(text) for text in row])
+        rows += 1
+    tmp_path = xlsx_path + '.tmp'
+    wb.save(tmp_path)
+    os.replace(tmp_path, xlsx_path)
+    return rows
+
+
+def export_all(directory, prefix='sensor_data', force=False):
+    """为目录（含按设备分区的子目录）下 xlsx 不存在或比 CSV 旧的文件生成 xlsx，返回 [(xlsx路径, 行数)]"""
+    result = []
+    for csv_path in sorted(glob.glob(os.path.join(directory, '**', prefix + '_*.csv'), recursive=True)):
+        xlsx_path = os.path.splitext(csv_path)[0] + '.xlsx'
+        if force or not os.path.exists(xlsx_path) or os.path.getmtime(xlsx_path) < os.path.getmtime(csv_path):
+            result.append((xlsx_path, export_xlsx(csv_path, xlsx_path)))
+    return result
+
+
+def _day_end(now):
+    """now 所在本地日期的下一个零点（时间戳）"""
+    t = time.localtime(now)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+
+class XlsxExporter:
+    """后台 xlsx 生成线程，可由多个 RowStore 共用"""
+    def __init__(self):
+        self.exports = 0  # 已完成的 xlsx 生成次数
+        self.errors = 0
+        self._jobs = queue.Queue()
+        self._pending = set()  # 已排队未完成的 CSV 路径，同一文件不重复排队
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, path, limit=None):
+        """排队生成 path 对应的 xlsx；limit 见 export_xlsx"""
+        with self._lock:
+            # 定时生成在同一文件已排队时跳过；轮转、关闭时的完整生成总是排队
+            if limit is not None and path in self._pending:
+                return
+            self._pending.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="xlsx-export", daemon=True)
+                self._thread.start()
+        self._jobs.put((path, limit))
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                path, limit = job
+                with self._lock:
+                    self._pending.discard(path)
+                try:
+                    export_xlsx(path, limit=limit)
+                    self.exports += 1
+                except Exception as e:
+                    self.errors += 1
+                    print("❌ 生成xlsx失败 %s: %s" % (path, e))
+            finally:
+                self._jobs.task_done()
+
+    def wait(self):
+        """等待已排队的 xlsx 生成完成"""
+        if self._thread is not None:
+            self._jobs.join()
+
+    def close(self):
+        """处理完已排队的任务后结束线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+
+
+class RowStore:
+    """按日期和行数轮转的 CSV 追加存储"""
+    def __init__(self, directory, prefix, header, max_rows=100000, export_interval=600.0, export_on_rotate=True,
+                 clock=time.time, exporter=None):
+        """
+        header: 表头（写入每个文件第一行）
+        max_rows: 单个文件的数据行数上限，达到后轮转
+        export_interval: 定时为当前文件生成 xlsx 的间隔（秒），0 表示不定时生成
+        export_on_rotate: 轮转和关闭时为写完的文件生成 xlsx
+        exporter: 共用的 XlsxExporter，不指定时自建一个并在 close 时结束
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.header = list(header)
+        self.max_rows = max_rows
+        self.export_interval = export_interval
+        self.export_on_rotate = export_on_rotate
+        self.clock = clock
+        self.exporter = exporter or XlsxExporter()
+        self._own_exporter = exporter is None
+        self.path = None
+        self.file = None
+        self.writer = None
+        self.rows = 0  # 当前文件数据行数
+        self.total_rows = 0  # 本次运行写入的行数
+        self.rotations = 0
+        self.closed = False
+        self._day_end = 0
+        self._next_export = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open(clock())
+
+    @property
+    def exports(self):
+        return self.exporter.exports
+
+    @property
+    def export_errors(self):
+        return self.exporter.errors
+
+    def _file_path(self, day, seq):
+        return os.path.join(self.directory, "%s_%s_%03d.csv" % (self.prefix, day, seq))
+
+    def _open(self, now):
+        """打开 now 所在日期的文件：当天最后一个文件未满时继续追加，否则新建下一个序号"""
+        day = time.strftime('%Y%m%d', time.localtime(now))
+        existing = sorted(glob.glob(os.path.join(self.directory, "%s_%s_*.csv" % (self.prefix, day))))
+        seq = 1
+        rows = 0
+        if existing:
+            last = existing[-1]
+            seq = int(os.path.splitext(last)[0].rsplit('_', 1)[1])
+            rows = _count_rows(last)
+            if rows >= self.max_rows:
+                seq += 1
+                rows = 0
+        self.path = self._file_path(day, seq)
+        self._reopen()
+        if self.file.tell() == 0:
+            self.writer.writerow(self.header)
+            self.file.flush()
+        self.rows = rows
+        self._day_end = _day_end(now)
+        self._next_export = now + self.export_interval
+
+    def _reopen(self):
+        self.file = open(self.path, 'a', encoding=CSV_ENCODING, newline='')
+        self.writer = csv.writer(self.file)
+
+    def suspend(self):
+        """暂时关闭文件句柄（保留行数等状态），下次 append 时重新打开；设备很多时限制同时打开的文件数"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def append(self, rows):
+        """追加数据行（每行按表头顺序），写入后刷新到操作系统"""
+        now = self.clock()
+        if self.file is None:
+            self._reopen()
+        if now >= self._day_end or self.rows >= self.max_rows:
+            self.rotate(now)
+        self.writer.writerows(rows)
+        self.file.flush()
+        count = len(rows)
+        self.rows += count
+        self.total_rows += count
+        if self.export_interval and now >= self._next_export:
+            self._next_export = now + self.export_interval
+            self.export(wait=False)
+
+    def rotate(self, now=None):
+        """关闭当前文件并打开下一个文件"""
+        if now is None:
+            now = self.clock()
+        finished = self.path
+        self.suspend()
+        self.rotations += 1
+        self._open(now)
+        if self.export_on_rotate and self.path != finished:
+            self.exporter.submit(finished)
+
+    def export(self, wait=True):
+        """为当前文件已写入的部分生成 xlsx；wait=False 时交给后台线程"""
+        if self.file is not None:
+            self.file.flush()
+        limit = os.path.getsize(self.path)
+        if wait:
+            self.exporter.wait()
+            export_xlsx(self.path, limit=limit)
+            self.exporter.exports += 1
+        else:
+            self.exporter.submit(self.path, limit)
+
+    def wait_exports(self):
+        """等待已排队的 xlsx 生成完成"""
+        self.exporter.wait()
+
+    def close(self, export=True):
+        """关闭文件；export 为 True 时为当前文件生成 xlsx，自建的生成线程等待生成结束后退出"""
+        if self.closed:
+            return
+        self.suspend()
+        self.closed = True
+        if export and self.export_on_rotate:
+            self.exporter.submit(self.path)
+        if self._own_exporter:
+            self.exporter.close()
+
+
+class PartitionedStore:
+    """按键（设备IMEI）分区的存储：每个键一个子目录和一个 RowStore，同时打开的文件数不超过 max_open"""
+    def __init__(self, directory, prefix, header, max_open=256, **kwargs):
+        """kwargs 传给每个分区的 RowStore（max_rows、export_interval 等），各分区共用一个 xlsx 生成线程"""
+        self.directory = directory
+        self.prefix = prefix
+        self.header = header
+        self.max_open = max_open
+        self.kwargs = kwargs
+        self.exporter = XlsxExporter()
+        self.stores = {}
+        self.opened = collections.OrderedDict()  # 打开着文件的分区，按最近写入排序
+        self.total_rows = 0
+        self.suspends = 0  # 因超过 max_open 关闭文件句柄的次数
+
+    def store(self, key):
+        store = self.stores.get(key)
+        if store is None:
+            # key 作为子目录名，不能是空串、"."、".." 或含路径分隔符（否则会写到其他目录）
+            if key in ('', '.', '..') or os.path.basename(key) != key or (os.altsep and os.altsep in key):
+                raise ValueError("invalid partition key: %r" % key)
+            store = self.stores[key] = RowStore(os.path.join(self.directory, key), self.prefix, self.header,
+                                                exporter=self.exporter, **self.kwargs)
+        return store
+
+    def append(self, key, rows):
+        """追加 key 分区的数据行"""
+        store = self.store(key)
+        store.append(rows)
+        self.total_rows += len(rows)
+        opened = self.opened
+        if key in opened:
+            opened.move_to_end(key)
+        else:
+            opened[key] = store
+            if len(opened) > self.max_open:
+                _, oldest = opened.popitem(last=False)
+                oldest.suspend()
+                self.suspends += 1
+
+    def close(self, export=False):
+        """关闭所有分区；export 为 True 时为各分区当前文件生成 xlsx（设备多时耗时较长）"""
+        for store in self.stores.values():
+            store.close(export)
+        self.opened.clear()
+        self.exporter.close()
+
+
+def _count_rows(path):
+    """文件中的数据行数（不含表头），续写已有文件时使用"""
+    lines = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            lines += chunk.count(b'\n')
+    return max(lines - 1, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为 CSV 数据文件生成 xlsx")
+    parser.add_argument("directory", help="数据目录")
+    parser.add_argument("--prefix", default="sensor_data", help="文件名前缀")
+    parser.add_argument("--force", action="store_true", help="xlsx 已是最新也重新生成")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    result = export_all(args.directory, args.prefix, args.force)
+    for path, rows in result:
+        print("✅ %s（%d 行）" % (path, rows))
+    print("共生成 %d 个文件，耗时 %.1f 秒" % (len(result), time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
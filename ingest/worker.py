@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+共享订阅接收进程
+N 个进程用 MQTT 5 共享订阅 $share/<组名>/up/+ 连接同一代理，代理把每条消息只投递给组内一个进程，
+接收和解码分摊到多个 CPU 核上。每个进程内仍是 paho 网络线程只入队、工作线程按批解码写入，
+写入各自的 SQLite 数据库（<目录>/worker_<序号>.db，WAL 模式），结束后合并为 merged.db。
+
+设备内顺序：
+- 代理按主题哈希分配（fleet.broker --share-strategy hash、EMQX hash_topic 等）时，同一设备始终由同一进程接收，
+  进程内按序处理，顺序不变
+- 代理轮流分配（mosquitto 及 fleet.broker 默认）时同一设备的消息分散在各进程，合并时按包序检出乱序，
+  并按包序展开后的序号恢复设备上的采样顺序（见 ingest/sqlite.py）
+
+用法示例：
+    python -m ingest.worker --host 127.0.0.1 --workers 4 --duration 60
+    python -m ingest.worker --merge-only --dir sensor_data/shared
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+import paho.mqtt.client as mqtt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ingest.codec import PayloadDecoder, SensorBatch
+from ingest.devices import DeviceTable
+from ingest.pipeline import BoundedQueue, WorkerPool
+from ingest.sqlite import SqliteSink, merge_databases
+
+SHARED_TOPIC = "$share/%s/up/+"  # 共享订阅主题，%s 为组名
+SHARE_GROUP = "ingest"
+MERGED_NAME = "merged.db"
+
+
+def worker_path(directory, index):
+    return os.path.join(directory, "worker_%02d.db" % index)
+
+
+def run_worker(index, host, port, group, directory, fields, stop, ready=None, counter=None, results=None,
+               queue_size=100000, batch_size=200):
+    """一个接收进程：共享订阅，按批写入自己的数据库，直到 stop 被设置"""
+    sink = SqliteSink(worker_path(directory, index), fields)
+    decoder = PayloadDecoder(fields)
+    table = DeviceTable()
+    message_queue = BoundedQueue(queue_size, 'block')
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由主进程处理，再通过 stop 通知各进程
+
+    def handle_batch(batch):
+        rows = []
+        for topic, payload, received_at in batch:
+            imei = topic.rsplit('/', 1)[-1]
+            try:
+                data = decoder.decode(payload)
+            except ValueError:
+                data = None
+            if not isinstance(data, SensorBatch) or data.raw is not None:
+                data = None
+            table.update(imei, data, received_at)
+            if data:
+                rows.extend(sink.rows_from(imei, received_at, data.rows))
+        sink.append(rows)
+        if counter is not None:
+            with counter.get_lock():
+                counter.value += len(rows)
+
+    pool = WorkerPool(handle_batch, message_queue, 1, batch_size).start()
+    client = mqtt.Client(client_id="ingest_%s_%d" % (group, index), protocol=mqtt.MQTTv5,
+                         callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = lambda c, userdata, flags, rc, properties: c.subscribe(SHARED_TOPIC % group)
+    if ready is not None:
+        client.on_subscribe = lambda *args: ready.release()
+    client.on_message = lambda c, userdata, msg: message_queue.put((msg.topic, msg.payload, time.time()))
+    client.connect(host, port, keepalive=60)
+    client.loop_start()
+    try:
+        stop.wait()
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        pool.stop()
+        sink.close()
+    if results is not None:
+        count, messages, samples, lost, out_of_order = table.totals()
+        stats = pool.stats()
+        results.put({'worker': index, 'devices': count, 'messages': messages, 'rows': sink.rows,
+                     'transactions': sink.transactions, 'gaps': lost, 'out_of_order': out_of_order,
+                     'max_depth': stats['max_depth'], 'dropped': stats['dropped']})
+
+
+class WorkerGroup:
+    """启动、停止 N 个接收进程并合并它们的数据库"""
+    def __init__(self, workers, host, port, directory, fields, group=SHARE_GROUP, **kwargs):
+        self.directory = directory
+        self.stop_event = multiprocessing.Event()
+        self.ready = multiprocessing.Semaphore(0)
+        self.counter = multiprocessing.Value('q', 0)  # 已写入的行数
+        self.results = multiprocessing.Queue()
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "worker_*.db*")):
+            os.remove(path)
+        self.processes = [multiprocessing.Process(
+            target=run_worker, args=(i, host, port, group, directory, fields, self.stop_event),
+            kwargs=dict(kwargs, ready=self.ready, counter=self.counter, results=self.results), daemon=True)
+            for i in range(workers)]
+
+    @property
+    def rows(self):
+        return self.counter.value
+
+    def start(self, timeout=30):
+        """启动各进程，等待全部订阅完成"""
+        for process in self.processes:
+            process.start()
+        deadline = time.monotonic() + timeout
+        for _ in self.processes:
+            if not self.ready.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                self.stop()
+                raise RuntimeError("worker subscribe timed out")
+        return self
+
+    def stop(self):
+        """停止各进程，返回每个进程的统计（按序号排列）"""
+        self.stop_event.set()
+        stats = []
+        for _ in self.processes:
+            try:
+                stats.append(self.results.get(timeout=30))
+            except queue.Empty:
+                break
+        for process in self.processes:
+            process.join()
+        return sorted(stats, key=lambda item: item['worker'])
+
+    def merge(self):
+        paths = [worker_path(self.directory, i) for i in range(len(self.processes))]
+        return merge_databases(paths, os.path.join(self.directory, MERGED_NAME))
+
+
+def print_merge(summary, path):
+    rows = sum(stats['rows'] for stats in summary.values())
+    lost = sum(stats['lost'] for stats in summary.values())
+    reordered = sum(stats['reordered'] for stats in summary.values())
+    split = sum(1 for stats in summary.values() if stats['workers'] > 1)
+    print(f"✅ 已合并到 {path}：{len(summary)} 台设备，{rows} 行，按包序丢失 {lost}，乱序 {reordered}，"
+          f"{split} 台设备的数据分散在多个进程")
+
+
+def run_workers(workers, host, port, directory, fields, group=SHARE_GROUP, duration=None):
+    """运行 N 个接收进程直到 duration 秒后或 Ctrl+C，然后合并"""
+    worker_group = WorkerGroup(workers, host, port, directory, fields, group).start()
+    print(f"🚀 {workers} 个接收进程已订阅 {SHARED_TOPIC % group}（按 Ctrl+C 停止）")
+    start = time.monotonic()
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 用户中断")
+    for stats in worker_group.stop():
+        print(f"📊 进程 {stats['worker']}: 消息 {stats['messages']}，设备 {stats['devices']}，写入 {stats['rows']} 行"
+              f"（{stats['transactions']} 个事务），队列最大深度 {stats['max_depth']}，丢弃 {stats['dropped']}")
+    summary = worker_group.merge()
+    print_merge(summary, os.path.join(directory, MERGED_NAME))
+    return summary
+
+
+def main():
+    from mqtt_listener import DATA_DIR, FIELD_ORDER, MQTT_BROKER, MQTT_PORT
+    parser = argparse.ArgumentParser(description="共享订阅接收进程")
+    parser.add_argument("--host", default=MQTT_BROKER, help="MQTT服务器地址")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="MQTT端口")
+    parser.add_argument("--workers", type=int, default=2, help="接收进程数")
+    parser.add_argument("--group", default=SHARE_GROUP, help="共享订阅组名")
+    parser.add_argument("--dir", default=os.path.join(DATA_DIR, "shared"), help="数据库目录")
+    parser.add_argument("--duration", type=float, default=None, help="运行时长（秒），默认直到 Ctrl+C")
+    parser.add_argument("--merge-only", action="store_true", help="只合并目录中已有的各进程数据库")
+    args = parser.parse_args()
+    if args.merge_only:
+        paths = sorted(glob.glob(os.path.join(args.dir, "worker_*.db")))
+        if not paths:
+            print(f"❌ {args.dir} 中没有 worker_*.db，无需合并")
+            return
+        out = os.path.join(args.dir, MERGED_NAME)
+        print_merge(merge_databases(paths, out), out)
+        return
+    run_workers(args.workers, args.host, args.port, args.dir, FIELD_ORDER, args.group, args.duration)
+
+
+if __name__ == "__main__":
+    main()
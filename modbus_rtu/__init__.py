@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Modbus RTU 公共模块
+网关程序（doc/dc_main.py，QuecPython）与电脑端工具共用，只使用 MicroPython 也支持的语法和模块。
+部署到模块时需将 modbus_rtu 目录与 main.py 一起上传到 /usr 下。
+"""
+
+from modbus_rtu.crc import CRC16_TABLE, crc16, crc16_bytes, append_crc, check_crc
+from modbus_rtu.rtu import RtuReceiver, expected_response_length, silent_interval_us
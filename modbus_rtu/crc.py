@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+CRC16/MODBUS 查表实现
+- 多项式 0xA001（0x8005 反射），初值 0xFFFF，低字节在前发送
+- 支持 bytes/bytearray/memoryview，MicroPython 与 CPython 通用
+"""
+
+
+def _make_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _make_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """计算CRC16/MODBUS，crc 可传入上一段数据的结果以分段计算"""
+    table = CRC16_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def crc16_bytes(data):
+    """返回按发送顺序排列的CRC两字节 (低字节, 高字节)"""
+    crc = crc16(data)
+    return bytes((crc & 0xFF, crc >> 8))
+
+
+def append_crc(frame):
+    """在 bytearray 帧末尾追加CRC，返回该帧"""
+    crc = crc16(frame)
+    frame.append(crc & 0xFF)
+    frame.append(crc >> 8)
+    return frame
+
+
+def check_crc(frame):
+    """校验带CRC的完整帧：对整帧（含末尾CRC）计算结果为0即正确"""
+    return len(frame) >= 4 and crc16(frame) == 0
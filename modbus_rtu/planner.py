@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+寄存器轮询规划
+- plan_reads：将待读寄存器合并为最少的读请求。相邻或间隔不超过 max_gap 的寄存器合并为一次读取，
+  合并范围不能跨越从机不支持读取的地址（只在同一可读区间内合并），单次读取不超过 max_count 个
+- PollScheduler：按每个寄存器的轮询周期选出到期的寄存器，规划读请求并回写读取结果
+- plan_writes：将待写寄存器按连续地址分组，每组用一次写多个寄存器(0x10)请求写入
+
+寄存器表沿用网关的参数字典格式：{功能码: {地址: {"name": ..., "value": ..., "period": 秒, "scale": 系数}}}，
+period 为0或缺省表示不定期轮询（只在 all_requests 时读取），scale 缺省为1（原始值）
+"""
+
+MAX_READ_COUNT = 125  # 0x03/0x04 单次最多读取的寄存器数
+MAX_WRITE_COUNT = 123  # 0x10 单次最多写入的寄存器数
+
+
+def _range_index(readable, addr):
+    for i, (start, end) in enumerate(readable):
+        if start <= addr <= end:
+            return i
+    return -1
+
+
+def plan_reads(addresses, readable, max_gap=8, max_count=MAX_READ_COUNT):
+    """
+    规划读请求。
+
+    :param addresses: 需要读取的寄存器地址
+    :param readable: 从机可读的地址区间 [(起始, 结束), ...]，包含两端
+    :param max_gap: 允许为合并请求而多读的连续寄存器数
+    :return: [(起始地址, 数量), ...]，按地址排序
+    """
+    requests = []
+    cur_start = cur_end = cur_range = -1
+    for addr in sorted(set(addresses)):
+        idx = _range_index(readable, addr)
+        if idx < 0:
+            raise ValueError("register 0x%04X is not readable" % addr)
+        if (cur_range == idx and addr - cur_end - 1 <= max_gap
+                and addr - cur_start + 1 <= max_count):
+            cur_end = addr
+            continue
+        if cur_range >= 0:
+            requests.append((cur_start, cur_end - cur_start + 1))
+        cur_start = cur_end = addr
+        cur_range = idx
+    if cur_range >= 0:
+        requests.append((cur_start, cur_end - cur_start + 1))
+    return requests
+
+
+def plan_writes(values, max_count=MAX_WRITE_COUNT):
+    """
+    规划写请求，写请求不能多写，只合并地址连续的寄存器。
+
+    :param values: {地址: 值}
+    :return: [(起始地址, [值, ...]), ...]，按地址排序
+    """
+    runs = []
+    for addr in sorted(values):
+        if runs and runs[-1][0] + len(runs[-1][1]) == addr and len(runs[-1][1]) < max_count:
+            runs[-1][1].append(values[addr])
+        else:
+            runs.append((addr, [values[addr]]))
+    return runs
+
+
+class PollScheduler:
+    """按寄存器轮询周期调度读请求"""
+    def __init__(self, register_map, readable, max_gap=8, max_count=MAX_READ_COUNT):
+        self.register_map = register_map
+        self.readable = readable
+        self.max_gap = max_gap
+        self.max_count = max_count
+        self.next_due = {}  # (功能码, 地址) -> 下次到期时间（秒），未读过的立即到期
+        self._plan_cache = {}  # (功能码, 到期地址元组) -> 读请求，到期组合有限，缓存规划结果
+
+    def _plan(self, fc, addresses):
+        key = (fc, tuple(addresses))
+        plan = self._plan_cache.get(key)
+        if plan is None:
+            plan = plan_reads(addresses, self.readable[fc], self.max_gap, self.max_count)
+            self._plan_cache[key] = plan
+        return plan
+
+    def due_requests(self, now):
+        """返回到期的读请求 [(功能码, 起始地址, 数量), ...]"""
+        requests = []
+        for fc, registers in self.register_map.items():
+            due = [addr for addr, params in registers.items()
+                   if params.get('period', 0) > 0 and self.next_due.get((fc, addr), 0) <= now]
+            if due:
+                due.sort()
+                for start, count in self._plan(fc, due):
+                    requests.append((fc, start, count))
+        return requests
+
+    def all_requests(self, fc=None):
+        """返回读取全部寄存器（或某一功能码的全部寄存器）的请求"""
+        requests = []
+        for map_fc, registers in self.register_map.items():
+            if fc is None or fc == map_fc:
+                for start, count in self._plan(map_fc, sorted(registers)):
+                    requests.append((map_fc, start, count))
+        return requests
+
+    def update(self, fc, start, values, now):
+        """回写一次读取的结果，并更新范围内寄存器的下次到期时间，返回值有变化的地址列表"""
+        registers = self.register_map[fc]
+        changed = []
+        for i, raw in enumerate(values):
+            addr = start + i
+            params = registers.get(addr)
+            if params is None:
+                continue  # 合并请求中多读的寄存器
+            scale = params.get('scale', 1)
+            value = raw if scale == 1 else raw * scale
+            if params['value'] != value:
+                params['value'] = value
+                changed.append(addr)
+            period = params.get('period', 0)
+            if period > 0:
+                self.next_due[(fc, addr)] = now + period
+        return changed
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+按变化上报（report by exception）
+- ChangeReporter：跟踪参数字典中各参数的 value，与上次上报的值比较，超出死区的才上报，
+  每 full_every 次上报（或请求时）上报一次全量快照
+- 死区在参数字典中配置：deadband 为绝对死区，deadband_pct 为相对上次上报值的百分比死区，
+  两者都配置时取较大者，缺省为0（值有任何变化都上报）；非数值参数只比较是否相等
+
+参数字典沿用网关的格式：{地址: {"name": ..., "value": ..., "deadband": ..., "deadband_pct": ...}}，
+寄存器以外的参数（如经纬度）用 add() 加入，调用方更新返回的参数字典中的 value 即可。
+每次上报附带的字段（包序、IMEI 等）不是参数，不放入快照，由 payload() 在生成上报数据时合并
+"""
+
+
+class ChangeReporter:
+    """按死区检测参数变化，生成增量或全量上报数据"""
+    def __init__(self, register_maps=(), full_every=10):
+        self.full_every = full_every  # 每多少次上报一次全量，0表示只在请求时全量上报
+        self.entries = []  # [名称, 参数字典, 上次上报值]，创建时排好序，每次上报只遍历这个列表
+        self.snapshot = {}  # 全量上报数据，名称 -> 上次上报值，原地更新
+        self.delta = {}  # 增量上报数据，每次上报前清空复用
+        self.message = {}  # payload() 合并附带字段后的上报数据，每次清空复用
+        self.cycles = 0
+        self.full_requested = True  # 首次上报为全量
+        for registers in register_maps:
+            for addr in sorted(registers):
+                self.add(registers[addr]['name'], registers[addr])
+
+    def add(self, name, params):
+        """加入一个参数，返回其参数字典"""
+        self.entries.append([name, params, None])
+        return params
+
+    def request_full(self):
+        """下次上报全量快照（云端请求或上报失败时调用）"""
+        self.full_requested = True
+
+    def exceeds(self, params, last, value):
+        """value 相对上次上报值 last 是否超出死区"""
+        if value == last:
+            return False
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return True
+        band = params.get('deadband', 0)
+        band_pct = abs(last) * params.get('deadband_pct', 0) / 100
+        return abs(value - last) > max(band, band_pct)
+
+    def collect(self, full=False):
+        """
+        生成本次上报数据，并把上报的值记为上次上报值。
+
+        :param full: 强制全量上报
+        :return: (是否全量, 上报数据字典)，增量上报且没有变化时数据字典为空。
+                 返回的字典在下次调用时会被修改，调用方应在本次上报内使用完，不要向其中添加字段（用 payload()）
+        """
+        self.cycles += 1
+        if full or self.full_requested or (self.full_every > 0 and self.cycles >= self.full_every):
+            full = True
+            self.cycles = 0
+            self.full_requested = False
+        self.delta.clear()
+        for entry in self.entries:
+            name, params, last = entry
+            value = params['value']
+            if full or self.exceeds(params, last, value):
+                entry[2] = value
+                self.snapshot[name] = value
+                if not full:
+                    self.delta[name] = value
+        return full, (self.snapshot if full else self.delta)
+
+    def payload(self, data, extras):
+        """
+        collect() 返回的数据与本次上报附带的字段 extras 合并为上报数据。
+
+        extras 不写入快照，不参与变化比较，也不会出现在以后的上报中；返回的字典在下次调用时会被修改
+        """
+        message = self.message
+        message.clear()
+        message.update(data)
+        message.update(extras)
+        return message
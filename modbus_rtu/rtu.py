@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Modbus RTU 响应帧接收
+- 按功能码和字节计数推算响应长度，收齐且CRC正确立即返回
+- 长度无法推算或数据不符时，以3.5个字符的静默间隔判断帧结束；帧头匹配但未收齐时不按静默间隔截断
+- 帧前有干扰字节时在帧内查找匹配的响应
+- 地址/功能码不符或CRC错误的帧被丢弃，在超时前继续等待下一帧
+"""
+
+from modbus_rtu.crc import check_crc
+from modbus_rtu.ticks import ticks_us, ticks_diff, sleep_ms
+
+# 固定长度的响应（地址+功能码+4字节+CRC）
+_FIXED_LEN_8 = (0x05, 0x06, 0x08, 0x0B, 0x0F, 0x10)
+# 第3字节为字节计数的响应
+_BYTE_COUNT = (0x01, 0x02, 0x03, 0x04, 0x0C, 0x11, 0x14, 0x15, 0x17)
+
+
+def expected_response_length(frame):
+    """根据已收到的帧头推算完整响应帧长度，信息不足返回0，无法推算返回-1"""
+    if len(frame) < 2:
+        return 0
+    fc = frame[1]
+    if fc & 0x80:
+        return 5  # 异常响应：地址+功能码+异常码+CRC
+    if fc in _FIXED_LEN_8:
+        return 8
+    if fc == 0x07:
+        return 5
+    if fc == 0x16:
+        return 10
+    if fc in _BYTE_COUNT:
+        if len(frame) < 3:
+            return 0
+        return 3 + frame[2] + 2
+    return -1
+
+
+def silent_interval_us(baudrate):
+    """3.5个字符时间（每字符11位），波特率高于19200时按规范固定为1750us"""
+    if baudrate > 19200:
+        return 1750
+    return 3500000 * 11 // baudrate
+
+
+class RtuReceiver:
+    """Modbus RTU 主站响应接收器"""
+    def __init__(self, uart, baudrate):
+        self.uart = uart
+        self.t35_us = silent_interval_us(baudrate)
+        self.discarded_frames = 0  # 被丢弃的帧数（CRC错误、地址或功能码不符）
+
+    def flush(self):
+        """丢弃接收缓冲区中的残留数据，发送请求前调用"""
+        n = self.uart.any()
+        while n:
+            self.uart.read(n)
+            n = self.uart.any()
+
+    def receive(self, slave_id, cmd, timeout_ms):
+        """
+        接收一帧来自 slave_id、功能码为 cmd（或其异常响应）的帧。
+
+        :param timeout_ms: 从调用开始等待完整响应的最长时间，单位毫秒
+        :return: CRC正确的完整帧（bytearray），超时返回None
+        """
+        start = ticks_us()
+        timeout_us = timeout_ms * 1000
+        buf = bytearray()
+        last_rx = start
+        while True:
+            n = self.uart.any()
+            now = ticks_us()
+            if n:
+                buf.extend(self.uart.read(n))
+                last_rx = now
+                expected = expected_response_length(buf)
+                if 0 < expected <= len(buf) and self._accept(buf[:expected], slave_id, cmd):
+                    return buf[:expected]
+            elif buf and ticks_diff(now, last_rx) >= self.t35_us and not self._incomplete(buf, slave_id, cmd):
+                # 静默间隔到达，当前帧结束。帧头匹配且未收齐时继续等待，兼容字符间有停顿的从机
+                frame = self._find_frame(buf, slave_id, cmd)
+                if frame is not None:
+                    return frame
+                self.discarded_frames += 1
+                buf = bytearray()
+            if ticks_diff(now, start) >= timeout_us:
+                return None
+            if not n:
+                sleep_ms(1)
+
+    @staticmethod
+    def _incomplete(buf, slave_id, cmd):
+        """buf 是否为地址、功能码匹配但还未收齐的响应"""
+        if buf[0] != slave_id:
+            return False
+        if len(buf) < 2:
+            return True
+        if (buf[1] & 0x7F) != cmd:
+            return False
+        expected = expected_response_length(buf)
+        return expected == 0 or expected > len(buf)
+
+    @staticmethod
+    def _accept(frame, slave_id, cmd):
+        return frame[0] == slave_id and (frame[1] & 0x7F) == cmd and check_crc(frame)
+
+    def _find_frame(self, buf, slave_id, cmd):
+        """在一段数据中查找完整的匹配响应，长度无法推算时整段作为一帧"""
+        for i in range(len(buf) - 3):
+            if buf[i] != slave_id or (buf[i + 1] & 0x7F) != cmd:
+                continue
+            expected = expected_response_length(buf[i:i + 3])
+            if expected < 0:
+                expected = len(buf) - i
+            if 0 < expected <= len(buf) - i and check_crc(buf[i:i + expected]):
+                return buf[i:i + expected]
+        return None
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Modbus RTU 从机仿真（电脑端）
+- ModbusSlave：保持/输入寄存器表，处理 0x03/0x04/0x06/0x10 请求，返回完整响应帧，
+  访问表中不存在的地址返回异常码 0x02，统计事务数和收发字节数
+- LoopbackUart：主站侧串口对象（any/read/write），写入的请求交给 ModbusSlave 处理，
+  响应按波特率的传输时间加从机处理延时后才可读
+"""
+
+import struct
+import time
+
+from modbus_rtu.crc import append_crc, check_crc
+
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+
+
+class ModbusSlave:
+    """Modbus RTU 从机"""
+    def __init__(self, slave_id, holding=None, inputs=None):
+        self.slave_id = slave_id
+        self.holding = dict(holding or {})  # 地址 -> 值
+        self.inputs = dict(inputs or {})
+        self.transactions = 0
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.registers_read = 0
+
+    def _exception(self, fc, code):
+        return bytes(append_crc(bytearray([self.slave_id, fc | 0x80, code])))
+
+    def handle(self, frame):
+        """处理一帧请求，返回响应帧；非本机地址或CRC错误时不响应，返回None"""
+        if len(frame) < 4 or frame[0] != self.slave_id or not check_crc(frame):
+            return None
+        self.transactions += 1
+        self.rx_bytes += len(frame)
+        response = self._dispatch(bytes(frame[:-2]))
+        self.tx_bytes += len(response)
+        return response
+
+    def _dispatch(self, pdu):
+        fc = pdu[1]
+        if fc in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            start, count = struct.unpack('>HH', pdu[2:6])
+            bank = self.holding if fc == READ_HOLDING_REGISTERS else self.inputs
+            if not 1 <= count <= 125:
+                return self._exception(fc, ILLEGAL_DATA_VALUE)
+            if any(addr not in bank for addr in range(start, start + count)):
+                return self._exception(fc, ILLEGAL_DATA_ADDRESS)
+            self.registers_read += count
+            data = b''.join(struct.pack('>H', bank[addr] & 0xFFFF) for addr in range(start, start + count))
+            return bytes(append_crc(bytearray([self.slave_id, fc, len(data)]) + data))
+        if fc == WRITE_SINGLE_REGISTER:
+            addr, value = struct.unpack('>HH', pdu[2:6])
+            if addr not in self.holding:
+                return self._exception(fc, ILLEGAL_DATA_ADDRESS)
+            self.holding[addr] = value
+            return bytes(append_crc(bytearray(pdu[:6])))
+        if fc == WRITE_MULTIPLE_REGISTERS:
+            start, count, byte_count = struct.unpack('>HHB', pdu[2:7])
+            if not 1 <= count <= 123 or byte_count != count * 2 or len(pdu) != 7 + byte_count:
+                return self._exception(fc, ILLEGAL_DATA_VALUE)
+            if any(addr not in self.holding for addr in range(start, start + count)):
+                return self._exception(fc, ILLEGAL_DATA_ADDRESS)
+            for i in range(count):
+                self.holding[start + i] = struct.unpack('>H', pdu[7 + i * 2:9 + i * 2])[0]
+            return bytes(append_crc(bytearray(pdu[:6])))
+        return self._exception(fc, ILLEGAL_FUNCTION)
+
+
+class LoopbackUart:
+    """连接到 ModbusSlave 的主站侧串口"""
+    def __init__(self, slave, baudrate=115200, latency_ms=5.0):
+        self.slave = slave
+        self.char_time = 11.0 / baudrate
+        self.latency = latency_ms / 1000.0
+        self._rx = bytearray()
+        self._ready_at = 0.0
+
+    def write(self, data):
+        response = self.slave.handle(bytes(data))
+        if response is not None:
+            self._rx.extend(response)
+            self._ready_at = time.monotonic() + (len(data) + len(response)) * self.char_time + self.latency
+        return len(data)
+
+    def any(self):
+        if self._rx and time.monotonic() >= self._ready_at:
+            return len(self._rx)
+        return 0
+
+    def read(self, n=-1):
+        if not self.any():
+            return b''
+        if n is None or n < 0 or n > len(self._rx):
+            n = len(self._rx)
+        data = bytes(self._rx[:n])
+        del self._rx[:n]
+        return data
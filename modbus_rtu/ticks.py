@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+计时接口：MicroPython 下使用 utime，CPython 下用 time 实现同名函数
+"""
+
+try:
+    from utime import ticks_ms, ticks_us, ticks_diff, sleep_ms
+except ImportError:
+    import time as _time
+
+    def ticks_ms():
+        return int(_time.monotonic() * 1000)
+
+    def ticks_us():
+        return int(_time.monotonic() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def sleep_ms(ms):
+        _time.sleep(ms / 1000.0)
@@ -4,19 +4,36 @@
 MQTT消息监听器
 功能：
 - 连接到指定的MQTT服务器
-- 订阅主题：up/861197065268692
+- 订阅主题：up/861197065268692；车队模式（--fleet）订阅 up/+，按主题中的IMEI把数据分别写入各设备的目录
 - 打印接收到的消息
 - 支持自动重连
-- 格式化输出传感器数据
-- 将数据写入Excel文件
+- 网络线程只把消息放入有界队列，工作线程按批解码、显示，设备状态和存储按收到顺序提交，队列满时按策略丢弃并统计
+- 载荷按字段类型直接解码为按列顺序的行（msgspec，未安装时用 orjson 或标准库 json），见 ingest/codec.py
+- 格式化输出传感器数据，或以仪表盘模式按固定帧率显示各设备速率、丢包和最新值
+- 将数据追加写入CSV，按日期和行数轮转，定时/轮转/退出时生成Excel文件
+- 共享订阅模式（--shared-workers N）：N 个进程以 MQTT 5 共享订阅 $share/<组名>/up/+ 分担接收，见 ingest/worker.py
+
+用法示例：
+    python mqtt_listener.py
+    python mqtt_listener.py --export-interval 300 --max-rows 200000
+    python mqtt_listener.py --workers 2 --queue-size 50000 --overflow block
+    python mqtt_listener.py --dashboard --fps 4     # 仪表盘模式，不逐样本打印
+    python mqtt_listener.py --fleet --dashboard --host 127.0.0.1   # 一个连接接收所有设备
+    python mqtt_listener.py --shared-workers 4 --host 127.0.0.1   # 4个进程共享订阅 up/+，写入SQLite后合并
+    python mqtt_listener.py --export          # 按需为所有CSV生成最新的xlsx后退出
 """
 
 import paho.mqtt.client as mqtt
-import json
-import time
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
+import argparse
 import os
+import threading
+import time
+
+from ingest import (OVERFLOW_POLICIES, BoundedQueue, Dashboard, DeviceTable, PartitionedStore, RowStore, WorkerPool,
+                    export_all, is_imei)
+from ingest.codec import PayloadDecoder, SensorBatch
+from ingest.dashboard import pad
+from ingest.worker import SHARE_GROUP, run_workers
 
 # =============================================================================
 # 配置参数
@@ -28,7 +45,20 @@ MQTT_PASSWORD = ""  # MQTT密码（不需要认证）
 IMEI = "862701086120524"  # 设备IMEI号
 MQTT_TOPIC = f"up/{IMEI}"  # 订阅的主题
 CLIENT_ID = f"windows_listener_{IMEI}"  # 客户端ID，确保唯一性
-EXCEL_FILE = "sensor_data.xlsx"  # 输出的Excel文件名
+FLEET_TOPIC = "up/+"  # 车队模式订阅的主题（所有设备）
+FLEET_CLIENT_ID = "windows_listener_fleet"  # 车队模式客户端ID
+FLEET_MAX_OPEN = 256  # 车队模式同时打开的设备数据文件数上限
+DATA_DIR = "sensor_data"  # 数据目录
+DATA_PREFIX = "sensor_data"  # 数据文件名前缀：<前缀>_<日期>_<序号>.csv/.xlsx
+ROTATE_MAX_ROWS = 100000  # 单个文件的行数上限，达到后轮转到新文件
+EXPORT_INTERVAL = 600  # 定时为当前文件生成xlsx的间隔（秒），0表示只在轮转和退出时生成
+QUEUE_SIZE = 10000  # 待处理消息队列长度上限
+QUEUE_POLICY = "drop_oldest"  # 队列满时的策略：drop_oldest / drop_newest / block
+WORKER_COUNT = 1  # 处理消息的工作线程数
+BATCH_SIZE = 200  # 工作线程每批最多处理的消息数
+STATS_INTERVAL = 60  # 打印队列统计的间隔（秒），0表示不打印
+SHOW_TABLE = True  # 逐条打印消息和逐样本表格（仪表盘模式下关闭）
+DASHBOARD_FPS = 2.0  # 仪表盘每秒重绘次数
 
 # 传感器数据字段定义（按照协议顺序）
 FIELD_ORDER = [
@@ -75,107 +105,59 @@ FIELD_NAMES = {
 }
 
 # =============================================================================
-# Excel文件操作函数
+# 数据存储函数
 # =============================================================================
-def init_excel():
-    """初始化Excel文件"""
-    if not os.path.exists(EXCEL_FILE):
-        try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "传感器数据"
-            
-            # 写入表头
-            for col, field in enumerate(FIELD_ORDER, 1):
-                ws[get_column_letter(col) + '1'] = FIELD_NAMES.get(field, field)
-                
-            wb.save(EXCEL_FILE)
-            print(f"✅ Excel文件已创建: {EXCEL_FILE}")
-        except Exception as e:
-            print(f"❌ 创建Excel文件失败: {e}")
-
-def write_to_excel(data_list):
-    """将数据写入Excel文件"""
-    max_retries = 3
-    retry_delay = 0.5
-    
-    for attempt in range(max_retries):
-        try:
-            # 检查文件是否存在且有效
-            if os.path.exists(EXCEL_FILE):
-                try:
-                    # 尝试加载文件
-                    wb = load_workbook(EXCEL_FILE)
-                    ws = wb.active
-                except Exception as e:
-                    print(f"❌ Excel文件损坏，将创建新文件: {e}")
-                    # 删除损坏的文件
-                    try:
-                        os.remove(EXCEL_FILE)
-                    except Exception as remove_e:
-                        print(f"❌ 无法删除损坏的文件: {remove_e}")
-                        time.sleep(retry_delay)
-                        continue
-                    # 创建新文件
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "传感器数据"
-                    
-                    # 写入表头
-                    for col, field in enumerate(FIELD_ORDER, 1):
-                        ws[get_column_letter(col) + '1'] = FIELD_NAMES.get(field, field)
-            else:
-                # 文件不存在，创建新文件
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "传感器数据"
-                
-                # 写入表头
-                for col, field in enumerate(FIELD_ORDER, 1):
-                    ws[get_column_letter(col) + '1'] = FIELD_NAMES.get(field, field)
-        
-            # 找到下一个可用行
-            next_row = ws.max_row + 1
-            
-            # 写入数据 
-            for data in data_list:
-                for col, field in enumerate(FIELD_ORDER, 1):
-                    value = data.get(field, '')
-                    ws[get_column_letter(col) + str(next_row)] = value
-                next_row += 1
-                
-            wb.save(EXCEL_FILE)
-            print(f"✅ 已写入 {len(data_list)} 条数据到Excel文件")
-            return  # 成功写入，返回
-        except Exception as e:
-            print(f"❌ 写入Excel文件失败（尝试 {attempt + 1}/{max_retries}）: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-            else:
-                print(f"❌ 多次尝试失败，将数据保存到临时文件")
-                # 尝试保存到临时文件
-                temp_file = f"{EXCEL_FILE}.tmp"
-                try:
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "传感器数据"
-                    
-                    # 写入表头
-                    for col, field in enumerate(FIELD_ORDER, 1):
-                        ws[get_column_letter(col) + '1'] = FIELD_NAMES.get(field, field)
-                        
-                    # 写入数据
-                    next_row = 2
-                    for data in data_list:
-                        for col, field in enumerate(FIELD_ORDER, 1):
-                            value = data.get(field, '')
-                            ws[get_column_letter(col) + str(next_row)] = value
-                        next_row += 1
-                        
-                    wb.save(temp_file)
-                    print(f"✅ 数据已保存到临时文件: {temp_file}")
-                except Exception as temp_e:
-                    print(f"❌ 保存临时文件失败: {temp_e}")
+store = None  # RowStore，main() 中创建
+store_lock = threading.Lock()  # 多个工作线程时串行写入存储
+
+
+def init_store():
+    """创建追加存储：数据写入CSV，xlsx按时、轮转和退出时生成；车队模式按设备分区"""
+    global store
+    header = [FIELD_NAMES.get(field, field) for field in FIELD_ORDER]
+    if FLEET_MODE:
+        # 设备多时不定时生成xlsx，轮转时生成，其余用 --export 按需生成
+        store = PartitionedStore(DATA_DIR, DATA_PREFIX, header, max_open=FLEET_MAX_OPEN, max_rows=ROTATE_MAX_ROWS,
+                                 export_interval=0)
+        print(f"✅ 数据目录: {DATA_DIR}/<IMEI>/")
+    else:
+        store = RowStore(DATA_DIR, DATA_PREFIX, header, max_rows=ROTATE_MAX_ROWS, export_interval=EXPORT_INTERVAL)
+        print(f"✅ 数据文件: {store.path}")
+
+
+def save_sensor_data(rows, device=None):
+    """将按 FIELD_ORDER 排列的行追加到存储（只写文件末尾，耗时不随数据量增长）；车队模式写入 device 的分区"""
+    try:
+        if device is None:
+            store.append(rows)
+            if SHOW_TABLE:
+                print(f"✅ 已写入 {len(rows)} 条数据（当前文件 {store.rows} 行）")
+        else:
+            store.append(device, rows)
+            if SHOW_TABLE:
+                print(f"✅ 已写入 {device} 的 {len(rows)} 条数据")
+    except Exception as e:
+        print(f"❌ 写入数据失败: {e}")
+
+# =============================================================================
+# 消息队列与工作线程
+# =============================================================================
+message_queue = None  # BoundedQueue，main() 中创建
+workers = None  # WorkerPool
+display_lock = threading.Lock()  # 多个工作线程时避免输出交错
+dashboard = None  # Dashboard，仪表盘模式下创建
+devices = DeviceTable()  # 各设备接收状态（包序、最后收到时间、速率），仪表盘共用
+FLEET_MODE = False  # 车队模式：订阅 up/+，按IMEI分区存储
+decoder = PayloadDecoder(FIELD_ORDER)  # 载荷直接解码为按 FIELD_ORDER 排列的行
+last_stats = 0.0
+rejected_topics = 0  # 车队模式下主题中不是IMEI而丢弃的消息数
+
+
+def init_workers():
+    """创建有界队列和工作线程"""
+    global message_queue, workers
+    message_queue = BoundedQueue(QUEUE_SIZE, QUEUE_POLICY)
+    workers = WorkerPool(decode_batch, message_queue, WORKER_COUNT, BATCH_SIZE, commit=commit_batch).start()
 
 # =============================================================================
 # 数据格式化输出函数
@@ -185,22 +167,9 @@ def format_sensor_data(data_list):
     if not data_list:
         return
         
-    # 计算字符显示宽度（中文字符占2个宽度，西文字符占1个）
-    def get_display_width(s):
-        width = 0
-        for char in str(s):
-            if '\u4e00' <= char <= '\u9fff' or char in '。，；：！？“”‘’（）《》【】':
-                width += 2
-            else:
-                width += 1
-        return width
-    
-    # 填充字符串到指定显示宽度
-    def pad_str(s, target_width):
-        current_width = get_display_width(s)
-        padding = target_width - current_width
-        return str(s) + ' ' * padding
-    
+    # 填充字符串到指定显示宽度（中文字符占2个宽度，含中文的字符串宽度只计算一次）
+    pad_str = pad
+
     # 定义每个字段的显示宽度（考虑中文字符）
     field_widths = [
         22,  # 时间戳：2026-01-16 08:16:111001 (19个字符，西文)
@@ -276,34 +245,102 @@ def on_connect(client, userdata, flags, rc, properties):
     else:
         print(f"❌ MQTT连接失败，错误码: {rc}")
 
-def on_message(client, userdata, msg):
-    """消息接收回调函数"""
+def decode_message(topic, payload):
+    """解码一条消息，返回 SensorBatch（样本已按 FIELD_ORDER 转为行）；其他消息打印后返回 None"""
     try:
-        # 解码消息
-        payload = msg.payload.decode('utf-8')
-        
-        # 尝试解析JSON格式消息
         try:
-            data = json.loads(payload)
-            
-            # 如果是传感器数据列表
-            if isinstance(data, list):
-                print(f"\n📩 收到 {len(data)} 条传感器数据")
-                format_sensor_data(data)
-                write_to_excel(data)
-            else:
-                # 其他类型的消息（如心跳包、配置参数等）
+            data = decoder.decode(payload)
+        except ValueError:
+            if SHOW_TABLE:
+                with display_lock:
+                    print(f"\n📩 收到非JSON格式消息:")
+                    print(f"   主题: {topic}")
+                    print(f"   内容: {payload.decode('utf-8', 'replace')}")
+            return None
+
+        # 传感器数据（设备上报的 SENSOR_DATA 事件或数据列表）
+        if isinstance(data, SensorBatch) and data.raw is None:
+            if SHOW_TABLE:
+                with display_lock:
+                    print(f"\n📩 收到 {len(data)} 条传感器数据")
+                    format_sensor_data(data)
+            return data
+
+        # 其他类型的消息（如心跳包、配置参数等）
+        if SHOW_TABLE:
+            with display_lock:
                 print(f"\n📩 收到消息:")
-                print(f"   主题: {msg.topic}")
-                print(f"   内容: {payload}")
-                
-        except json.JSONDecodeError:
-            print(f"\n📩 收到非JSON格式消息:")
-            print(f"   主题: {msg.topic}")
-            print(f"   内容: {payload}")
-            
+                print(f"   主题: {topic}")
+                print(f"   内容: {payload.decode('utf-8', 'replace')}")
     except Exception as e:
         print(f"\n❌ 消息处理失败: {e}")
+    return None
+
+
+def decode_batch(batch):
+    """
+    工作线程（可多个并行）：逐条解码显示，返回 [(设备, SensorBatch 或 None)]
+    车队模式下主题最后一级用作目录名，不是15位数字IMEI的消息不解码，设备为 None
+    """
+    decoded = []
+    for topic, payload in batch:
+        device = topic.rsplit('/', 1)[-1]
+        if FLEET_MODE and not is_imei(device):
+            decoded.append((None, None))
+        else:
+            decoded.append((device, decode_message(topic, payload)))
+    return decoded
+
+
+def commit_batch(decoded):
+    """按收到顺序执行（WorkerPool 的 commit）：更新设备状态表，整批数据一次写入存储（车队模式每台设备一次）"""
+    global last_stats, rejected_topics
+    now = time.monotonic()
+    rows = []
+    by_device = {}
+    for device, data in decoded:
+        if device is None:
+            rejected_topics += 1
+            continue
+        devices.update(device, data, now)
+        if data:
+            if FLEET_MODE:
+                by_device.setdefault(device, []).extend(data.rows)
+            else:
+                rows.extend(data.rows)
+    if rows or by_device:
+        with store_lock:
+            if rows:
+                save_sensor_data(rows)
+            for device, device_rows in by_device.items():
+                save_sensor_data(device_rows, device)
+    if dashboard is None and STATS_INTERVAL and now - last_stats >= STATS_INTERVAL:
+        last_stats = now
+        print_stats()
+
+
+def handle_batch(batch):
+    """在当前线程解码并提交一批消息"""
+    commit_batch(decode_batch(batch))
+
+
+def stats_line():
+    """队列深度、丢弃数和处理统计"""
+    stats = workers.stats()
+    count, _, samples, lost, _ = devices.totals()
+    return (f"📊 队列 {stats['depth']}/{message_queue.maxsize}（最大 {stats['max_depth']}），"
+            f"入队 {stats['enqueued']}，已处理 {stats['processed']}（{stats['batches']} 批），"
+            f"丢弃 {stats['dropped']}，处理耗时 {stats['busy_time']:.1f} 秒；"
+            f"设备 {count} 台，样本 {samples}，按包序丢失 {lost}，非法主题 {rejected_topics}")
+
+
+def print_stats():
+    print(stats_line())
+
+
+def on_message(client, userdata, msg):
+    """消息接收回调函数：在paho网络线程中运行，只把原始载荷放入队列"""
+    message_queue.put((msg.topic, msg.payload))
 
 def on_disconnect(client, userdata, rc, properties, reason_code):
     """断开连接回调函数 - API Version 2"""
@@ -349,8 +386,48 @@ def on_socket_unregister_write(client, userdata, sock):
 # =============================================================================
 def main():
     """主函数"""
-    # 初始化Excel文件
-    init_excel()
+    global ROTATE_MAX_ROWS, EXPORT_INTERVAL, QUEUE_SIZE, QUEUE_POLICY, WORKER_COUNT, SHOW_TABLE, dashboard
+    global MQTT_BROKER, MQTT_PORT, MQTT_TOPIC, CLIENT_ID, FLEET_MODE
+    parser = argparse.ArgumentParser(description="MQTT消息监听器")
+    parser.add_argument("--export", action="store_true", help="为数据目录下所有CSV生成最新的xlsx后退出")
+    parser.add_argument("--host", default=MQTT_BROKER, help="MQTT服务器地址")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="MQTT端口")
+    parser.add_argument("--fleet", action="store_true", help="车队模式：订阅 up/+，按IMEI分别存储")
+    parser.add_argument("--export-interval", type=float, default=EXPORT_INTERVAL,
+                        help="定时生成xlsx的间隔（秒），0表示只在轮转和退出时生成")
+    parser.add_argument("--max-rows", type=int, default=ROTATE_MAX_ROWS, help="单个文件的行数上限")
+    parser.add_argument("--workers", type=int, default=WORKER_COUNT, help="解码消息的工作线程数（设备状态和存储按收到顺序提交）")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="待处理消息队列长度上限")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default=QUEUE_POLICY, help="队列满时的策略")
+    parser.add_argument("--dashboard", action="store_true", help="仪表盘模式：按固定帧率显示各设备统计，不逐条打印")
+    parser.add_argument("--fps", type=float, default=DASHBOARD_FPS, help="仪表盘每秒重绘次数")
+    parser.add_argument("--no-table", action="store_true", help="不逐条打印消息和样本表格")
+    parser.add_argument("--shared-workers", type=int, default=0,
+                        help="共享订阅模式的接收进程数（MQTT 5，数据写入 <数据目录>/shared/ 下的SQLite）")
+    parser.add_argument("--group", default=SHARE_GROUP, help="共享订阅组名")
+    args = parser.parse_args()
+    if args.export:
+        for path, rows in export_all(DATA_DIR, DATA_PREFIX):
+            print(f"✅ {path}（{rows} 行）")
+        return
+    if args.shared_workers:
+        run_workers(args.shared_workers, args.host, args.port, os.path.join(DATA_DIR, "shared"), FIELD_ORDER,
+                    args.group)
+        return
+    EXPORT_INTERVAL = args.export_interval
+    ROTATE_MAX_ROWS = args.max_rows
+    WORKER_COUNT = args.workers
+    QUEUE_SIZE = args.queue_size
+    QUEUE_POLICY = args.overflow
+    SHOW_TABLE = not (args.dashboard or args.no_table)
+    MQTT_BROKER, MQTT_PORT = args.host, args.port
+    if args.fleet:
+        FLEET_MODE = True
+        MQTT_TOPIC, CLIENT_ID = FLEET_TOPIC, FLEET_CLIENT_ID
+
+    # 初始化数据存储和工作线程
+    init_store()
+    init_workers()
     
     print("=" * 60)
     print("MQTT消息监听器")
@@ -358,7 +435,8 @@ def main():
     print(f"服务器地址: {MQTT_BROKER}:{MQTT_PORT}")
     print(f"订阅主题: {MQTT_TOPIC}")
     print(f"客户端ID: {CLIENT_ID}")
-    print(f"Excel文件: {EXCEL_FILE}")
+    print(f"数据目录: {DATA_DIR}（每 {ROTATE_MAX_ROWS} 行或每天轮转，每 {EXPORT_INTERVAL:.0f} 秒生成xlsx）")
+    print(f"消息队列: {QUEUE_SIZE} 条，满时 {QUEUE_POLICY}，{WORKER_COUNT} 个工作线程")
     print("=" * 60)
     
     # 创建MQTT客户端 - 使用最新的API版本
@@ -388,6 +466,9 @@ def main():
         print(f"❌ 连接失败: {e}")
         return
     
+    if args.dashboard:
+        dashboard = Dashboard(args.fps, footer=lambda: [stats_line()], table=devices).start()
+
     # 保持连接并持续监听
     try:
         print("\n🚀 开始监听消息（按 Ctrl+C 停止）")
@@ -401,6 +482,15 @@ def main():
     finally:
         client.disconnect()
         print("🔌 已断开MQTT连接")
+        workers.stop()
+        if dashboard is not None:
+            dashboard.stop()
+        print_stats()
+        store.close()
+        if FLEET_MODE:
+            print(f"✅ 数据已保存到 {DATA_DIR}/<IMEI>/，用 --export 生成xlsx")
+        else:
+            print(f"✅ 数据已保存到 {store.path}，并已生成同名xlsx")
 
 if __name__ == "__main__":
     main()
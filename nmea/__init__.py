@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+NMEA 0183 解析公共模块
+网关程序（doc/dc_main.py，QuecPython）读取 quecgnss 数据使用，只使用 MicroPython 也支持的语法和模块。
+部署到模块时需将 nmea 目录与 main.py 一起上传到 /usr 下。
+"""
+
+from nmea.tokenizer import NmeaTokenizer, MAX_SENTENCE_LEN
+from nmea.gnss import GnssFix, GnssParser, parse_ddmm, parse_float
+from nmea.location import LocationService
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+NMEA 解析速度对比，MicroPython 与 CPython 均可运行
+- 旧方式：原 dc_main.parse_gnrmc + convert_latitude/convert_longitude，每次读取的数据中查找最后一条 $GNRMC
+- 新方式：GnssParser 流式解析，校验和校验后解析 RMC/GGA/VTG/GSA
+数据为 get_gps_coordinates 中的1024字节样例（首尾各有一条不完整的语句）
+
+用法示例：
+    python -m nmea.bench_nmea
+    micropython -c "import nmea.bench_nmea as b; b.main()"
+"""
+
+from nmea.gnss import GnssParser
+from modbus_rtu.ticks import ticks_us, ticks_diff
+
+# doc/dc_main.py get_gps_coordinates 中的 quecgnss.read(1024) 样例数据
+SAMPLE_STREAM = (
+    ',2,14,03,25,241,31,09,19,318,,16,78,336,,26,46,039,,0*6E\r\n'
+    '$GPGSV,4,3,14,28,17,089,,199,,,37,42,37,126,,50,33,121,40,0*6B\r\n'
+    '$GPGSV,4,4,14,40,25,246,,41,46,217,41,0*65\r\n'
+    '$GBGSV,5,1,19,07,56,175,31,10,47,188,39,19,06,166,37,22,45,204,45,0*7A\r\n'
+    '$GBGSV,5,2,19,29,24,132,41,01,32,123,,02,47,216,,04,19,111,,0*79\r\n'
+    '$GBGSV,5,3,19,05,29,243,,06,65,030,,08,01,193,,09,62,346,,0*7A\r\n'
+    '$GBGSV,5,4,19,13,08,204,,16,63,039,,21,45,286,,26,18,272,,0*7E\r\n'
+    '$GBGSV,5,5,19,30,21,073,,36,40,049,,03,,,38,0*7F\r\n'
+    '$GNVTG,,T,,M,0.199,N,0.368,K,A*31\r\n'
+    '$GNRMC,134832.00,A,3127.32492,N,10443.09311,E,0.339,,190824,,,A,V*15\r\n'
+    '$GNGGA,134832.00,3127.32492,N,10443.09311,E,1,10,1.45,599.4,M,,M,,*52\r\n'
+    '$GNGSA,A,3,08,27,03,04,31,,,,,,,,2.45,1.45,1.97,1*05\r\n'
+    '$GNGSA,A,3,07,10,19,22,29,,,,,,,,2.45,1.45,1.97,4*0D\r\n'
+    '$GPGSV,4,1,14,04,54,313,17,08,19,186,38,27,42,158,37,31,43,067,32,0*6D\r\n'
+    '$GPGSV,4,2,14,03,25,241,30,09,19,318,,16,78,336,,26,46,039,,0*6F\r\n'
+    '$GPGSV,4,3,14,28,17,089,,199,,,36,42,37,126,,50,33,121,40,0*6A\r\n'
+    '$GPGSV,4,4,14,40,25,246,,41,46,217,41,0*65\r\n'
+    '$GBGSV,5,1,1'
+)
+
+
+def parse_gnrmc(data):
+    """原 parse_gnrmc，去掉打印"""
+    gnrmc_prefix = 'GNRMC,'
+    if gnrmc_prefix in data:
+        start_index = data.rfind('$GNRMC')
+        gnrmc_sentence = data[start_index:]
+        end_index = gnrmc_sentence.find('\r\n')
+        if end_index != -1:
+            gnrmc_sentence = gnrmc_sentence[:end_index]
+        fields = gnrmc_sentence.split(gnrmc_prefix)[1].split(',')
+        if len(fields) >= 12:
+            return {
+                'validity': fields[1],
+                'latitude': None if fields[2] == '' else float(fields[2]),
+                'lat_dir': fields[3] if fields[3] != '' else None,
+                'longitude': None if fields[4] == '' else float(fields[4]),
+                'lon_dir': fields[5] if fields[5] != '' else None,
+                'speed': None if fields[6] == '' else float(fields[6]),
+                'course': None if fields[7] == '' else float(fields[7]),
+                'date': fields[8] if fields[8] != '' else None,
+                'time': fields[0] if fields[0] != '' else None,
+                'mode': fields[11] if fields[11] != '' else None
+            }
+    return None
+
+
+def old_read(data):
+    gps = parse_gnrmc(data)
+    if gps and gps['validity'] == 'A':
+        longitude = gps['longitude'] // 100 + gps['longitude'] % 100 / 60.0
+        latitude = gps['latitude'] // 100 + gps['latitude'] % 100 / 60
+        return longitude, latitude
+    return None
+
+
+def bench(func, arg, repeat):
+    start = ticks_us()
+    for _ in range(repeat):
+        func(arg)
+    return ticks_diff(ticks_us(), start) // repeat
+
+
+def main():
+    repeat = 200
+    parser = GnssParser()
+    old_us = bench(old_read, SAMPLE_STREAM, repeat)
+    new_us = bench(parser.feed, SAMPLE_STREAM, repeat)
+    fix = parser.fix
+    print("1024字节样例: 旧方式 %d us/次，新方式 %d us/次" % (old_us, new_us))
+    print("旧方式只解析RMC: %s" % (old_read(SAMPLE_STREAM),))
+    print("新方式: 经度 %.8f 纬度 %.8f 海拔 %s 卫星 %s HDOP %s 定位类型 %s" %
+          (fix.longitude, fix.latitude, fix.altitude, fix.satellites, fix.hdop, fix.fix_type))
+    tokenizer = parser.tokenizer
+    print("校验通过 %d 条，跳过 %d 条，校验失败 %d 条" %
+          (tokenizer.sentences, tokenizer.skipped, tokenizer.checksum_errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+GNSS 定位信息解析
+- GnssParser：用 NmeaTokenizer 切分语句，按类型分发给 RMC/GGA/VTG/GSA 解析函数，原地更新 GnssFix
+- parse_ddmm：ddmm.mmmm 格式的经纬度直接按字节转换为度，不生成中间字符串
+- parse_float：数值字段直接由 float() 解析 bytes，空字段或非法字段返回None
+"""
+
+from nmea.tokenizer import NmeaTokenizer
+
+
+def parse_float(field):
+    """解析数值字段（如 b'599.4'、b'-12.5'），空字段或非法字符返回None"""
+    if not field:
+        return None
+    try:
+        # float() 直接接受 bytes（MicroPython 按缓冲区解析），不逐字节循环
+        return float(field)
+    except ValueError:
+        return None
+
+
+def parse_ddmm(field, hemisphere):
+    """
+    ddmm.mmmm（经度为dddmm.mmmm）转换为度，南纬、西经为负。
+
+    整数运算得到度和分，最后只做一次除法，精度与原始字段一致。空字段或非法字符返回None
+    """
+    if not field:
+        return None
+    value = 0
+    scale = 1
+    frac = False
+    for c in field:
+        if c == 46:
+            frac = True
+            continue
+        if c < 48 or c > 57:
+            return None
+        value = value * 10 + c - 48
+        if frac:
+            scale *= 10
+    degrees = value // (100 * scale)
+    result = degrees + (value - degrees * 100 * scale) / (60 * scale)
+    if hemisphere == b'S' or hemisphere == b'W':
+        return -result
+    return result
+
+
+def _parse_int(field):
+    """解析整数字段，小数部分忽略（如时间 b'134832.00' -> 134832），空字段返回None"""
+    if not field:
+        return None
+    value = 0
+    for c in field:
+        if c == 46:
+            break
+        if c < 48 or c > 57:
+            return None
+        value = value * 10 + c - 48
+    return value
+
+
+class GnssFix:
+    """定位信息记录，各语句解析时原地更新对应字段，未收到的字段为None"""
+    def __init__(self):
+        self.valid = False  # RMC状态，A为有效
+        self.latitude = None  # 度，南纬为负
+        self.longitude = None  # 度，西经为负
+        self.altitude = None  # 海拔，米（GGA）
+        self.speed_knots = None  # 对地速度，节（RMC/VTG）
+        self.speed_kmh = None  # 对地速度，km/h（VTG）
+        self.course = None  # 真北航向，度（RMC/VTG）
+        self.time = None  # UTC时间，整数hhmmss
+        self.date = None  # UTC日期，整数ddmmyy
+        self.mode = None  # 定位模式 A/D/E/N（RMC/VTG）
+        self.quality = None  # GGA定位质量，0为无效
+        self.satellites = None  # 参与定位的卫星数（GGA）
+        self.fix_type = None  # GSA定位类型，1无定位，2为2D，3为3D
+        self.pdop = None
+        self.hdop = None
+        self.vdop = None
+        self.rmc_count = 0  # 收到的RMC语句数，用于判断本次读取是否有新的定位
+
+
+class GnssParser:
+    """NMEA 流解析器，feed 读到的数据，结果在 fix 中"""
+    def __init__(self):
+        self.fix = GnssFix()
+        self._handlers = {
+            b'RMC': self._rmc,
+            b'GGA': self._gga,
+            b'VTG': self._vtg,
+            b'GSA': self._gsa,
+        }
+        self.tokenizer = NmeaTokenizer(self._handlers)
+        self.field_errors = 0  # 字段数不足的语句数
+
+    def feed(self, data):
+        """解析读到的数据，返回本次解析的语句数"""
+        sentences = self.tokenizer.feed(data)
+        for sentence in sentences:
+            fields = sentence.split(b',')
+            try:
+                self._handlers[sentence[2:5]](fields)
+            except IndexError:
+                self.field_errors += 1
+        return len(sentences)
+
+    def _rmc(self, f):
+        fix = self.fix
+        mode = f[12] if len(f) > 12 else b''  # NMEA 2.3 以前没有模式字段
+        fix.time = _parse_int(f[1])
+        fix.valid = f[2] == b'A'
+        fix.latitude = parse_ddmm(f[3], f[4])
+        fix.longitude = parse_ddmm(f[5], f[6])
+        fix.speed_knots = parse_float(f[7])
+        fix.course = parse_float(f[8])
+        fix.date = _parse_int(f[9])
+        fix.mode = mode.decode() if mode else None
+        fix.rmc_count += 1
+
+    def _gga(self, f):
+        fix = self.fix
+        fix.quality = _parse_int(f[6])
+        fix.satellites = _parse_int(f[7])
+        fix.hdop = parse_float(f[8])
+        fix.altitude = parse_float(f[9])
+
+    def _vtg(self, f):
+        fix = self.fix
+        fix.course = parse_float(f[1])
+        fix.speed_knots = parse_float(f[5])
+        fix.speed_kmh = parse_float(f[7])
+
+    def _gsa(self, f):
+        # 多系统时每个系统一条GSA，DOP相同，取最后一条
+        fix = self.fix
+        fix.fix_type = _parse_int(f[2])
+        fix.pdop = parse_float(f[15])
+        fix.hdop = parse_float(f[16])
+        fix.vdop = parse_float(f[17])
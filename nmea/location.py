@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+定位服务
+- LocationService：独立线程持续读取GNSS更新缓存的定位，GNSS无效时按限定频率回退到基站定位
+- 上报只读取缓存(get_fix)，不会等待GNSS读取或基站定位
+GNSS读取和基站定位由调用方以函数传入，便于在电脑上用桩函数测试。
+"""
+
+import _thread
+
+try:
+    from utime import ticks_ms, ticks_diff, sleep
+except ImportError:
+    import time as _time
+
+    def ticks_ms():
+        return int(_time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    sleep = _time.sleep
+
+
+class LocationService:
+    """
+    缓存的定位及其维护线程
+
+    read_gnss()：读一次GNSS，返回带 valid/longitude/latitude 属性的定位记录（如 GnssFix），没有新数据时返回None
+    locate_by_base()：基站定位（可能阻塞），成功返回(经度, 纬度)，失败返回None
+    """
+
+    def __init__(self, gps_itv_sec, base_itv_sec, max_age_sec, read_gnss, locate_by_base):
+        self.gps_itv_sec = gps_itv_sec    # 读GNSS间隔，单位秒
+        self.base_itv_sec = base_itv_sec  # 两次基站定位的最小间隔，单位秒
+        self.max_age_sec = max_age_sec    # 缓存定位的最长有效时间，单位秒
+        self.read_gnss = read_gnss
+        self.locate_by_base = locate_by_base
+        self.gps_enabled = False          # 由主循环按gps_onoff保持寄存器设置
+        self.fix = None                   # (经度, 纬度, 来源A/B, 定位时的ticks_ms)，整体替换，读取无需加锁
+        self.gps_fail_cnt = 0             # gps连续定位失败次数
+        self.__last_gps_ticks = None
+        self.__last_base_ticks = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        _thread.start_new_thread(self.__run, ())
+
+    def stop(self):
+        self.running = False
+
+    def update_fix(self, longitude, latitude, source):
+        self.fix = (longitude, latitude, source, ticks_ms())
+
+    def get_fix(self):
+        """返回(经度, 纬度, loc_state, 定位时长秒)，没有定位时时长为-1；缓存超过max_age_sec时loc_state为V，保留最后坐标"""
+        fix = self.fix
+        if fix is None:
+            return 0, 0, 'V', -1
+        age = self.__elapsed_sec(fix[3])
+        if age > self.max_age_sec:
+            return fix[0], fix[1], 'V', age
+        return fix[0], fix[1], fix[2], age
+
+    def poll(self):
+        """定位线程的一轮：到读GNSS时间时读取，GNSS无效且到基站定位时间时回退到基站定位"""
+        gnss_ok = False
+        if self.gps_enabled:
+            if self.__last_gps_ticks is not None and self.__elapsed_sec(self.__last_gps_ticks) < self.gps_itv_sec:
+                gnss_ok = True  # 未到读GNSS时间，不触发基站定位
+            else:
+                self.__last_gps_ticks = ticks_ms()
+                gnss_ok = self.__update_by_gnss()
+        if not gnss_ok and self.__base_loc_due():
+            self.__last_base_ticks = ticks_ms()
+            coordinates = self.locate_by_base()
+            if coordinates is not None:
+                self.update_fix(coordinates[0], coordinates[1], 'B')  # B表示基站定位成功
+
+    @staticmethod
+    def __elapsed_sec(ticks):
+        return ticks_diff(ticks_ms(), ticks) // 1000
+
+    def __update_by_gnss(self):
+        gps = self.read_gnss()
+        if gps and gps.valid and gps.longitude is not None and gps.latitude is not None:  # 有合法值
+            self.gps_fail_cnt = 0  # 清除计数器
+            longitude = round(gps.longitude, 8)
+            latitude = round(gps.latitude, 8)
+            self.update_fix(longitude, latitude, 'A')  # A表示GPS定位成功
+            print("GPS经纬度: (", longitude, ", ", latitude, ")")
+            return True
+        self.gps_fail_cnt += 1
+        print("GPS搜星中或定位失败！[{}]".format(self.gps_fail_cnt))
+        return False
+
+    def __base_loc_due(self):
+        """GNSS无效时是否需要基站定位：缓存的定位已不新鲜，且距上次基站定位超过间隔"""
+        fix = self.fix
+        if fix is not None and self.__elapsed_sec(fix[3]) < self.base_itv_sec:
+            return False
+        return self.__last_base_ticks is None or self.__elapsed_sec(self.__last_base_ticks) >= self.base_itv_sec
+
+    def __run(self):
+        while self.running:
+            try:
+                self.poll()
+            except Exception as e:
+                print("location service error: {}".format(e))
+            sleep(1)
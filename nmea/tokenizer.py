@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+NMEA 语句流式切分
+- 每次读到的数据追加到缓冲区，按 '$' 一次切分出语句，到换行为止，不完整的语句留到下次读取时拼接
+- 校验 '*hh' 校验和（'$' 与 '*' 之间所有字节的异或，支持大整数时按整数折半异或计算），校验失败或没有校验和的语句丢弃
+- 可只返回指定类型的语句，其余语句（如大量的GSV）不计算校验和直接跳过
+"""
+
+MAX_SENTENCE_LEN = 120  # 标准为82字节，部分接收机的扩展语句更长，超过此长度仍未结束的数据丢弃
+
+
+def _hex_value(c):
+    if 48 <= c <= 57:
+        return c - 48
+    if 65 <= c <= 70:
+        return c - 55
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+
+try:
+    # 与 stm32_protocol/frame.py 相同的检查：固件不支持大整数（溢出或截断）时用逐字节异或
+    _BIGINT = int.from_bytes(b'\x01' * 9, 'little') >> 64 == 1
+except (OverflowError, ValueError):
+    _BIGINT = False
+
+
+def _xor_bytes(data):
+    """所有字节的异或：支持大整数时转为整数后反复把高半部分异或到低半部分，避免逐字节的解释器循环"""
+    if not _BIGINT:
+        x = 0
+        for b in data:
+            x ^= b
+        return x
+    n = len(data)
+    value = int.from_bytes(data, 'big')
+    while n > 1:
+        low = n >> 1
+        bits = low * 8
+        value = (value >> bits) ^ (value & ((1 << bits) - 1))
+        n -= low
+    return value
+
+
+class NmeaTokenizer:
+    """NMEA 语句切分器"""
+    def __init__(self, types=None, max_len=MAX_SENTENCE_LEN):
+        """
+        :param types: 需要的语句类型（去掉两字节发送方标识后的3字节，如 b'RMC'），None表示全部
+        """
+        self.types = types
+        self.max_len = max_len
+        self.buf = b''  # 未结束的语句，MicroPython 的 bytearray 不支持 find，这里用 bytes
+        self.sentences = 0  # 校验通过的语句数
+        self.checksum_errors = 0  # 校验失败、缺少校验和或被截断的语句数
+        self.skipped = 0  # 类型不需要而跳过的语句数
+        self.overflows = 0  # 超长被丢弃的次数
+
+    def feed(self, data):
+        """
+        追加读到的数据，返回其中完整且校验通过的语句列表。
+
+        :param data: bytes 或 str
+        :return: [语句, ...]，语句为 '$' 与 '*' 之间的内容，如 b'GNRMC,134832.00,A,...'
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        buf = self.buf + data if self.buf else bytes(data)
+        # 按 '$' 一次切分（C实现）：每段为一条语句及其后到下一个 '$' 之前的数据，
+        # 第一段是首个 '$' 之前不完整的语句，丢弃；最后一段没有换行时为未结束的语句，留到下次拼接
+        chunks = buf.split(b'$')
+        buf = b''
+        if len(chunks) > 1 and chunks[-1].find(b'\n') < 0:
+            buf = b'$' + chunks.pop()
+        del chunks[0]
+        types = self.types
+        sentences = []
+        for chunk in chunks:
+            end = chunk.find(b'\n')
+            if end < 0:
+                # 语句被截断（如接收机缓冲区溢出），从下一个 '$' 重新开始
+                self.checksum_errors += 1
+                continue
+            if types is not None and chunk[2:5] not in types:
+                # 不需要的语句只比较类型，不计算校验和
+                self.skipped += 1
+                continue
+            body = self._check(chunk, end)
+            if body is not None:
+                sentences.append(body)
+        if len(buf) > self.max_len:
+            self.overflows += 1
+            buf = b''
+        self.buf = buf
+        return sentences
+
+    def _check(self, chunk, end):
+        star = chunk.find(b'*', 0, end)
+        if star < 0 or star + 3 > end:
+            self.checksum_errors += 1
+            return None
+        body = chunk[:star]
+        high = _hex_value(chunk[star + 1])
+        low = _hex_value(chunk[star + 2])
+        if high < 0 or low < 0 or _xor_bytes(body) != (high << 4) + low:
+            self.checksum_errors += 1
+            return None
+        self.sentences += 1
+        return body
@@ -25,6 +25,16 @@ FIELD_ORDER = [
     'altitude', 'longitude', 'latitude'
 ]
 
+# sensor_data 表中逐样本的列（事件、版本为消息级字段，每批只取一次；imei、接收时间由保存时补充）
+SAMPLE_COLUMNS = [
+    'timestamp', 'packet_order',
+    'accel_x', 'accel_y', 'accel_z',
+    'gyro_x', 'gyro_y', 'gyro_z',
+    'angle_x', 'angle_y', 'angle_z',
+    'attitude1', 'attitude2', 'pressure',
+    'altitude', 'longitude', 'latitude'
+]
+
 # 字段名映射（用于显示）
 FIELD_NAMES = {
     'timestamp': '时间戳',
@@ -5,12 +5,34 @@
 功能：
 - 提供数据库初始化、数据保存、查询和设备列表获取功能
 - 封装SQLite数据库操作，确保数据持久化存储
+- 每批数据（ColumnBatch）按列转为行元组，与消息级字段拼接后一次 executemany 写入
 """
 
+import os
 import sqlite3
+import sys
 from datetime import datetime
 from PySide6.QtCore import QDateTime
-from config import DATABASE_FILE
+from config import DATABASE_FILE, SAMPLE_COLUMNS
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.columnar import ColumnBatch
+
+# 插入列顺序：消息级字段在前，逐样本的列（SAMPLE_COLUMNS）在后
+INSERT_COLUMNS = ['event', 'version', 'imei', 'received_time'] + SAMPLE_COLUMNS
+INSERT_SQL = "INSERT INTO sensor_data (%s) VALUES (%s)" % (", ".join(INSERT_COLUMNS),
+                                                           ", ".join("?" * len(INSERT_COLUMNS)))
+
+# SELECT * 结果中各字段的下标（根据实际表结构，event 为后添加的列）
+DB_FIELD_INDEX = {
+    'timestamp': 1, 'version': 2, 'packet_order': 3, 'event': 21,
+    'accel_x': 4, 'accel_y': 5, 'accel_z': 6,
+    'gyro_x': 7, 'gyro_y': 8, 'gyro_z': 9,
+    'angle_x': 10, 'angle_y': 11, 'angle_z': 12,
+    'attitude1': 13, 'attitude2': 14, 'pressure': 15,
+    'altitude': 16, 'longitude': 17, 'latitude': 18
+}
 
 class DatabaseManager:
     """数据库操作管理器"""
@@ -35,48 +57,14 @@ class DatabaseManager:
         conn.commit()
         conn.close()
     
-    def save_data(self, data_list, imei):
-        """保存数据到数据库"""
+    def save_data(self, batch, imei):
+        """保存一批数据（ColumnBatch）到数据库"""
         conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        for data in data_list:
-            # 准备数据
-            row_data = [
-                data.get('timestamp', ''),
-                data.get('version', ''),
-                data.get('packet_order', ''),
-                data.get('event', ''),
-                data.get('accel_x', ''),
-                data.get('accel_y', ''),
-                data.get('accel_z', ''),
-                data.get('gyro_x', ''),
-                data.get('gyro_y', ''),
-                data.get('gyro_z', ''),
-                data.get('angle_x', ''),
-                data.get('angle_y', ''),
-                data.get('angle_z', ''),
-                data.get('attitude1', ''),
-                data.get('attitude2', ''),
-                data.get('pressure', ''),
-                data.get('altitude', ''),
-                data.get('longitude', ''),
-                data.get('latitude', ''),
-                imei,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-            ]
-            
-            # 插入数据
-            cursor.execute('''
-                INSERT INTO sensor_data (
-                    timestamp, version, packet_order, event, accel_x, accel_y, accel_z,
-                    gyro_x, gyro_y, gyro_z, angle_x, angle_y, angle_z,
-                    attitude1, attitude2, pressure, altitude, longitude, latitude,
-                    imei, received_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', row_data)
         
-        conn.commit()
+        # 事件、版本、IMEI、接收时间每批只取一次
+        head = (batch.event, batch.version, imei, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+        with conn:
+            conn.executemany(INSERT_SQL, [head + row for row in batch.rows(SAMPLE_COLUMNS)])
         conn.close()
     
     def query_data(self, imei, start_time, end_time):
@@ -99,6 +87,10 @@ class DatabaseManager:
         
         return results
 
+    def query_batch(self, imei, start_time, end_time):
+        """查询指定IMEI和时间段的数据，按列返回 ColumnBatch（事件、版本为逐行的列）"""
+        return ColumnBatch.from_rows(DB_FIELD_INDEX, self.query_data(imei, start_time, end_time))
+
     def get_subscribed_devices(self):
         """获取已订阅的设备列表"""
         conn = sqlite3.connect(self.db_file)
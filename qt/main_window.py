@@ -6,6 +6,7 @@
 - 集成各个功能模块，提供完整的用户界面
 - 处理用户交互和事件响应
 - 协调各个模块之间的通信
+- 每批数据（ColumnBatch）整批进入表格模型和图表：曲线保存为 NumPy 数组，整段替换 QLineSeries 的数据
 """
 
 import sys
@@ -15,10 +16,10 @@ from datetime import datetime
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTabWidget, QGroupBox, QLabel, QLineEdit, QPushButton, QComboBox,
-    QTextEdit, QTableWidget, QTableWidgetItem, QDateTimeEdit, QFileDialog,
+    QTextEdit, QTableView, QDateTimeEdit, QFileDialog,
     QMessageBox, QSplitter, QHeaderView, QProgressBar
 )
-from PySide6.QtCore import Qt, QTimer, QDateTime, QUrl
+from PySide6.QtCore import Qt, QTimer, QDateTime, QUrl, QPointF
 from PySide6.QtGui import QFont, QColor, QPainter, QIcon, QPixmap
 from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
 from PySide6.QtWebEngineWidgets import QWebEngineView
@@ -33,8 +34,14 @@ from config import (
 from database_manager import DatabaseManager
 from mqtt_thread import MqttThread
 from log_window import LogWindow
+from table_model import SampleTableModel, EventFilterProxy
 from utils import StreamRedirector
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.codec import MISSING
+from ingest.columnar import RollingSeries, y_axis_range
+
 # =============================================================================
 # 配置参数
 # =============================================================================
@@ -63,6 +70,16 @@ MQTT_RECONNECT_DELAY = 1000  # MQTT重连延迟（毫秒）
 # 其他配置
 WINDOW_GEOMETRY = (100, 100, 1400, 900)  # 窗口几何尺寸（x, y, width, height）
 
+# =============================================================================
+# 图表辅助函数
+# =============================================================================
+def set_series_points(series, points):
+    """用最近的数据点（RollingSeries）整段替换曲线的数据（旧版 PySide6 没有 replaceNp 时逐点构造 QPointF）"""
+    if hasattr(series, 'replaceNp'):
+        series.replaceNp(points.x, points.y)
+    else:
+        series.replace([QPointF(x, y) for x, y in zip(points.x.tolist(), points.y.tolist())])
+
 # =============================================================================
 # 主窗口类
 # =============================================================================
@@ -96,6 +113,9 @@ class MainWindow(QMainWindow):
         # 创建UI
         self.create_ui()
         
+        # 图表曲线对应的字段和最近的数据点
+        self.init_chart_curves()
+        
         # 加载已订阅的设备
         self.load_subscribed_devices()
         
@@ -180,13 +200,18 @@ class MainWindow(QMainWindow):
         overview_tab = QWidget()
         overview_layout = QVBoxLayout(overview_tab)
         
-        self.overview_table = QTableWidget()
-        self.overview_table.setColumnCount(len(FIELD_ORDER))
-        self.overview_table.setHorizontalHeaderLabels([FIELD_NAMES[f] for f in FIELD_ORDER])
+        # 表格模型保存收到的各批数据，代理模型按事件类型筛选
+        self.table_model = SampleTableModel(self)
+        self.table_proxy = EventFilterProxy(self)
+        self.table_proxy.setSourceModel(self.table_model)
+        self.overview_table = QTableView()
+        self.overview_table.setModel(self.table_proxy)
         # 设置列宽调整模式为可交互（支持手动调节）
         self.overview_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         # 设置默认列宽
         self.overview_table.horizontalHeader().setDefaultSectionSize(100)
+        # 按内容调整列宽时只计算可见的行（表格模型按单元格取值，不遍历全部数据）
+        self.overview_table.horizontalHeader().setResizeContentsPrecision(0)
         self.overview_table.setAlternatingRowColors(True)
         # 监听滚动条事件，实现滚动加载更多数据
         self.overview_table.verticalScrollBar().valueChanged.connect(self.on_table_scroll)
@@ -1210,92 +1235,72 @@ class MainWindow(QMainWindow):
     
     def filter_data_by_event(self, event_type):
         """根据事件类型筛选数据"""
-        # 显示所有数据或筛选特定事件类型的数据
-        for row in range(self.overview_table.rowCount()):
-            if event_type == "全部事件":
-                self.overview_table.setRowHidden(row, False)
-            else:
-                event_col = FIELD_ORDER.index('event')
-                item = self.overview_table.item(row, event_col)
-                if item and item.text() != event_type:
-                    self.overview_table.setRowHidden(row, True)
-                else:
-                    self.overview_table.setRowHidden(row, False)
+        # 显示所有数据或筛选特定事件类型的数据（新增的行由代理模型自动筛选）
+        self.table_proxy.set_event_name(event_type)
     
-    def on_sensor_data_received(self, data_list):
-        """处理解析后的传感器数据"""
+    def init_chart_curves(self):
+        """各图表的X/Y轴、Y轴最小范围和曲线（字段、QLineSeries、换算除数、最近的数据点）"""
+        def curves(*items):
+            return [(field, series, divisor, RollingSeries(CHART_MAX_DATA_POINTS))
+                    for field, series, divisor in items]
+        
+        self.chart_curves = [
+            (self.accel_axis_x, self.accel_axis_y, 100,
+             curves(('accel_x', self.accel_series_x, 1), ('accel_y', self.accel_series_y, 1),
+                    ('accel_z', self.accel_series_z, 1))),
+            (self.gyro_axis_x, self.gyro_axis_y, 100,
+             curves(('gyro_x', self.gyro_series_x, 1), ('gyro_y', self.gyro_series_y, 1),
+                    ('gyro_z', self.gyro_series_z, 1))),
+            (self.pitch_axis_x, self.pitch_axis_y, 100, curves(('attitude1', self.pitch_series, 1))),
+            (self.roll_axis_x, self.roll_axis_y, 100, curves(('attitude2', self.roll_series, 1))),
+            # 气压值从Pa转换为kPa
+            (self.pressure_axis_x, self.pressure_axis_y, 10, curves(('pressure', self.pressure_series, 1000.0))),
+            (self.altitude_axis_x, self.altitude_axis_y, 1000, curves(('altitude', self.altitude_series, 1))),
+        ]
+    
+    def on_sensor_data_received(self, batch):
+        """处理解析后的传感器数据（ColumnBatch）"""
         # 保存数据到数据库
         current_imei = self.imei_edit.text().strip()
-        self.db_manager.save_data(data_list, current_imei)
+        self.db_manager.save_data(batch, current_imei)
         
-        # 更新数据总览表
-        for data in data_list:
-            row = self.overview_table.rowCount()
-            self.overview_table.insertRow(row)
-            
-            for col, field in enumerate(FIELD_ORDER):
-                # 处理事件类型字段
-                if field == 'event':
-                    value = EVENT_TYPES.get(data.get(field, ''), data.get(field, ''))
-                elif field == 'pressure':
-                    # 气压参数转换为kPa，处理空值
-                    pressure_value = data.get(field, '')
-                    if pressure_value and pressure_value != '':
-                        try:
-                            value = float(pressure_value) / 1000.0
-                            value = f"{value:.2f}"  # 格式化为两位小数
-                        except ValueError:
-                            value = ''
-                    else:
-                        value = ''
-                else:
-                    # 对于上电包和传感器数据超时事件，除基本字段外，其他字段留空
-                    event_type = data.get('event', '')
-                    if event_type in ['POWER_ON', 'SENSOR_REPORT_TIMEOUT'] and field not in ['timestamp', 'version', 'packet_order', 'event']:
-                        value = ''
-                    else:
-                        value = data.get(field, '')
-                
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.overview_table.setItem(row, col, item)
+        # 更新数据总览表（模型直接保存该批，单元格显示时才取值）
+        self.table_model.append_batch(batch)
         
         # 更新分类展示的实时值
-        if data_list:
-            last_data = data_list[-1]
+        if len(batch):
             for category, fields in FIELD_CATEGORIES.items():
                 # 对所有分类（包括加速度、角速度、角度、姿态、环境）都使用单独的字段标签
                 for field in fields:
                     # 跳过经纬度字段，因为这些信息已在地图上显示
                     if field in ['longitude', 'latitude']:
                         continue
-                        
-                    if field in last_data:
+                    
+                    value = batch.last(field)
+                    if value is not MISSING:
                         try:
                             label = getattr(self, f"{field}_label")
-                            value = float(last_data[field])
+                            value = float(value)
                             # 对于气压字段，需要将Pa转换为kPa
                             if field == 'pressure':
-                                value /= 1000.0
-                            # 格式化显示
-                            if field in ['pressure']:
-                                label.setText(f"{value:.2f}")
+                                label.setText(f"{value / 1000.0:.2f}")
                             else:
                                 label.setText(f"{value:.0f}")
-                        except (ValueError, KeyError, AttributeError) as e:
+                        except (ValueError, TypeError, AttributeError) as e:
                             print(f"更新字段 {field} 标签时出错: {e}")
             
             # 更新地图位置
-            if hasattr(self, 'map_view') and 'latitude' in last_data and 'longitude' in last_data:
+            latitude, longitude = batch.last('latitude'), batch.last('longitude')
+            if hasattr(self, 'map_view') and latitude is not MISSING and longitude is not MISSING:
                 try:
-                    latitude = float(last_data['latitude'])
-                    longitude = float(last_data['longitude'])
+                    latitude = float(latitude)
+                    longitude = float(longitude)
                     # 检查是否是有效的经纬度（合理范围）
                     if -90 <= latitude <= 90 and -180 <= longitude <= 180 and latitude != 0 and longitude != 0:
                         js_code = f"window.updateLocation({latitude}, {longitude})"
                         self.map_view.page().runJavaScript(js_code)
                         # 不再打印坐标更新信息，避免屏幕被占满
-                except (ValueError, KeyError) as e:
+                except (ValueError, TypeError) as e:
                     print(f"更新地图位置时出错: {e}")
         
         # 设置图表显示的时间范围
@@ -1303,103 +1308,30 @@ class MainWindow(QMainWindow):
         current_time = time.time()
         time_diff = current_time - self.start_time
         
-        # 更新加速度图表数据
-        for data in data_list:
-            # 检查是否包含加速度数据
-            if 'accel_x' in data and 'accel_y' in data and 'accel_z' in data:
-                try:
-                    self.accel_series_x.append(time_diff, float(data['accel_x']))
-                    self.accel_series_y.append(time_diff, float(data['accel_y']))
-                    self.accel_series_z.append(time_diff, float(data['accel_z']))
-                except (ValueError, KeyError) as e:
-                    print(f"添加加速度图表数据时出错: {e}")
-        
-        # 更新角速度图表数据
-        for data in data_list:
-            # 检查是否包含角速度数据
-            if 'gyro_x' in data and 'gyro_y' in data and 'gyro_z' in data:
-                try:
-                    self.gyro_series_x.append(time_diff, float(data['gyro_x']))
-                    self.gyro_series_y.append(time_diff, float(data['gyro_y']))
-                    self.gyro_series_z.append(time_diff, float(data['gyro_z']))
-                except (ValueError, KeyError) as e:
-                    print(f"添加角速度图表数据时出错: {e}")
-        
-        # 更新俯仰角图表数据
-        for data in data_list:
-            # 检查是否包含俯仰角数据
-            if 'attitude1' in data:
-                try:
-                    self.pitch_series.append(time_diff, float(data['attitude1']))
-                except (ValueError, KeyError) as e:
-                    print(f"添加俯仰角图表数据时出错: {e}")
-        
-        # 更新翻滚角图表数据
-        for data in data_list:
-            # 检查是否包含翻滚角数据
-            if 'attitude2' in data:
-                try:
-                    self.roll_series.append(time_diff, float(data['attitude2']))
-                except (ValueError, KeyError) as e:
-                    print(f"添加翻滚角图表数据时出错: {e}")
-        
-        # 更新气压图表数据
-        for data in data_list:
-            # 检查是否包含气压数据
-            if 'pressure' in data:
-                try:
-                    # 气压值从Pa转换为kPa
-                    pressure_kpa = float(data['pressure']) / 1000.0
-                    self.pressure_series.append(time_diff, pressure_kpa)
-                except (ValueError, KeyError) as e:
-                    print(f"添加气压图表数据时出错: {e}")
-        
-        # 更新高度图表数据
-        for data in data_list:
-            # 检查是否包含高度数据
-            if 'altitude' in data:
-                try:
-                    self.altitude_series.append(time_diff, float(data['altitude']))
-                except (ValueError, KeyError) as e:
-                    print(f"添加高度图表数据时出错: {e}")
+        # 整批追加各图表的数据点（同一批的点使用相同的时间）；缺失或非数值的样本只在对应曲线上跳过
+        for axis_x, axis_y, min_span, curves in self.chart_curves:
+            for field, series, divisor, points in curves:
+                column = batch.numeric(field)
+                if column is not None:
+                    points.extend_at(time_diff, column / divisor)
         
-        # 自动平移图表
+        # 自动平移图表，移除超出范围的数据点（数据点数量不超过 CHART_MAX_DATA_POINTS）
         if time_diff > display_duration:
             new_x_min = time_diff - display_duration
             new_x_max = time_diff
-            
-            # 平移所有图表的X轴
-            self.accel_axis_x.setRange(new_x_min, new_x_max)
-            self.gyro_axis_x.setRange(new_x_min, new_x_max)
-            self.pitch_axis_x.setRange(new_x_min, new_x_max)
-            self.roll_axis_x.setRange(new_x_min, new_x_max)
-            self.pressure_axis_x.setRange(new_x_min, new_x_max)
-            self.altitude_axis_x.setRange(new_x_min, new_x_max)
-            
-            # 移除超出范围的数据点
-            self.remove_old_data_points(self.accel_series_x, new_x_min)
-            self.remove_old_data_points(self.accel_series_y, new_x_min)
-            self.remove_old_data_points(self.accel_series_z, new_x_min)
-            
-            self.remove_old_data_points(self.gyro_series_x, new_x_min)
-            self.remove_old_data_points(self.gyro_series_y, new_x_min)
-            self.remove_old_data_points(self.gyro_series_z, new_x_min)
-            
-            self.remove_old_data_points(self.pitch_series, new_x_min)
-            self.remove_old_data_points(self.roll_series, new_x_min)
-            self.remove_old_data_points(self.pressure_series, new_x_min)
-            self.remove_old_data_points(self.altitude_series, new_x_min)
-        
-        # 动态调整Y轴范围
-        self.adjust_accel_y_axis_range()
-        self.adjust_gyro_y_axis_range()
-        self.adjust_pitch_y_axis_range()
-        self.adjust_roll_y_axis_range()
-        self.adjust_pressure_y_axis_range()
-        self.adjust_altitude_y_axis_range()
-        
-        # 应用事件类型筛选
-        self.filter_data_by_event(self.event_filter_combo.currentText())
+            for axis_x, axis_y, min_span, curves in self.chart_curves:
+                axis_x.setRange(new_x_min, new_x_max)
+                for field, series, divisor, points in curves:
+                    points.trim(new_x_min)
+        
+        # 整段替换曲线数据，并按当前X轴范围内的数据动态调整Y轴范围
+        for axis_x, axis_y, min_span, curves in self.chart_curves:
+            for field, series, divisor, points in curves:
+                set_series_points(series, points)
+            y_range = y_axis_range([points for _, _, _, points in curves], axis_x.min(), axis_x.max(),
+                                   CHART_Y_AXIS_MARGIN, min_span)
+            if y_range:
+                axis_y.setRange(*y_range)
         
         # 自动调整列宽以适应内容
         self.overview_table.resizeColumnsToContents()
@@ -1408,293 +1340,24 @@ class MainWindow(QMainWindow):
         self.adjust_columns_to_fill_space()
         
         # 自动滚动到最新数据所在的行
-        if data_list:
-            last_row = self.overview_table.rowCount() - 1
-            self.overview_table.scrollToItem(self.overview_table.item(last_row, 0))
-    
-    def adjust_accel_y_axis_range(self):
-        """根据当前X轴范围内的加速度数据动态调整Y轴范围"""
-        current_x_min = self.accel_axis_x.min()
-        current_x_max = self.accel_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for series in [self.accel_series_x, self.accel_series_y, self.accel_series_z]:
-            for i in range(series.count()):
-                point = series.at(i)
-                if current_x_min <= point.x() <= current_x_max:
-                    all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 100:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 50
-                new_y_max = center + 50
-            
-            # 更新Y轴范围
-            self.accel_axis_y.setRange(new_y_min, new_y_max)
-    
-    def adjust_gyro_y_axis_range(self):
-        """根据当前X轴范围内的角速度数据动态调整Y轴范围"""
-        current_x_min = self.gyro_axis_x.min()
-        current_x_max = self.gyro_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for series in [self.gyro_series_x, self.gyro_series_y, self.gyro_series_z]:
-            for i in range(series.count()):
-                point = series.at(i)
-                if current_x_min <= point.x() <= current_x_max:
-                    all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 100:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 50
-                new_y_max = center + 50
-            
-            # 更新Y轴范围
-            self.gyro_axis_y.setRange(new_y_min, new_y_max)
-    
-    def adjust_pitch_y_axis_range(self):
-        """根据当前X轴范围内的俯仰角数据动态调整Y轴范围"""
-        current_x_min = self.pitch_axis_x.min()
-        current_x_max = self.pitch_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for i in range(self.pitch_series.count()):
-            point = self.pitch_series.at(i)
-            if current_x_min <= point.x() <= current_x_max:
-                all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 100:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 50
-                new_y_max = center + 50
-            
-            # 更新Y轴范围
-            self.pitch_axis_y.setRange(new_y_min, new_y_max)
-    
-    def adjust_roll_y_axis_range(self):
-        """根据当前X轴范围内的翻滚角数据动态调整Y轴范围"""
-        current_x_min = self.roll_axis_x.min()
-        current_x_max = self.roll_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for i in range(self.roll_series.count()):
-            point = self.roll_series.at(i)
-            if current_x_min <= point.x() <= current_x_max:
-                all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 100:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 50
-                new_y_max = center + 50
-            
-            # 更新Y轴范围
-            self.roll_axis_y.setRange(new_y_min, new_y_max)
-    
-    def adjust_pressure_y_axis_range(self):
-        """根据当前X轴范围内的气压数据动态调整Y轴范围"""
-        current_x_min = self.pressure_axis_x.min()
-        current_x_max = self.pressure_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for i in range(self.pressure_series.count()):
-            point = self.pressure_series.at(i)
-            if current_x_min <= point.x() <= current_x_max:
-                all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 10:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 5
-                new_y_max = center + 5
-            
-            # 更新Y轴范围
-            self.pressure_axis_y.setRange(new_y_min, new_y_max)
-    
-    def adjust_altitude_y_axis_range(self):
-        """根据当前X轴范围内的高度数据动态调整Y轴范围"""
-        current_x_min = self.altitude_axis_x.min()
-        current_x_max = self.altitude_axis_x.max()
-        
-        # 收集当前X轴范围内所有数据点的Y值
-        all_y_values = []
-        
-        # 检查X轴范围内的点
-        for i in range(self.altitude_series.count()):
-            point = self.altitude_series.at(i)
-            if current_x_min <= point.x() <= current_x_max:
-                all_y_values.append(point.y())
-        
-        if all_y_values:
-            # 计算当前范围内的最小值和最大值
-            y_min = min(all_y_values)
-            y_max = max(all_y_values)
-            
-            # 计算120%的范围
-            range_ = y_max - y_min
-            margin = range_ * CHART_Y_AXIS_MARGIN
-            
-            new_y_min = y_min - margin
-            new_y_max = y_max + margin
-            
-            # 确保范围不会太小（至少有一定的可见区域）
-            if new_y_max - new_y_min < 1000:
-                center = (y_min + y_max) / 2
-                new_y_min = center - 500
-                new_y_max = center + 500
-            
-            # 更新Y轴范围
-            self.altitude_axis_y.setRange(new_y_min, new_y_max)
+        if len(batch):
+            self.overview_table.scrollToBottom()
     
     def load_data_from_db(self):
         """从数据库加载数据并显示"""
         # 清空表格
-        self.overview_table.setRowCount(0)
+        self.table_model.clear()
         
         # 获取当前IMEI和时间范围
         current_imei = self.imei_edit.text().strip()
         if not current_imei:
             return
         
-        # 查询数据库中的最近指定时间范围数据
-        all_data = self.db_manager.query_data(current_imei, 
-            QDateTime.currentDateTime().addSecs(-DATA_LOAD_TIME_RANGE), 
+        # 查询数据库中的最近指定时间范围数据（按列整批放入表格模型）
+        batch = self.db_manager.query_batch(current_imei,
+            QDateTime.currentDateTime().addSecs(-DATA_LOAD_TIME_RANGE),
             QDateTime.currentDateTime())
-        
-        # 优化表格数据插入：先设置行数，再批量插入
-        self.overview_table.setRowCount(len(all_data))
-        
-        # 数据库字段索引映射（根据实际表结构）
-        db_field_index = {
-            'timestamp': 1,
-            'version': 2,
-            'packet_order': 3,
-            'event': 21,
-            'accel_x': 4,
-            'accel_y': 5,
-            'accel_z': 6,
-            'gyro_x': 7,
-            'gyro_y': 8,
-            'gyro_z': 9,
-            'angle_x': 10,
-            'angle_y': 11,
-            'angle_z': 12,
-            'attitude1': 13,
-            'attitude2': 14,
-            'pressure': 15,
-            'altitude': 16,
-            'longitude': 17,
-            'latitude': 18
-        }
-        
-        for row, data in enumerate(all_data):
-            for col, field in enumerate(FIELD_ORDER):
-                # 处理事件类型字段
-                if field == 'event':
-                    value = EVENT_TYPES.get(data[db_field_index[field]], data[db_field_index[field]])
-                elif field == 'pressure':
-                    # 气压参数转换为kPa，处理空值
-                    pressure_value = data[db_field_index[field]]
-                    if pressure_value and pressure_value != '':
-                        try:
-                            value = float(pressure_value) / 1000.0
-                            value = f"{value:.2f}"  # 格式化为两位小数
-                        except ValueError:
-                            value = ''
-                    else:
-                        value = ''
-                else:
-                    # 对于上电包和传感器数据超时事件，除基本字段外，其他字段留空
-                    event_type = data[db_field_index['event']]
-                    if event_type in ['POWER_ON', 'SENSOR_REPORT_TIMEOUT'] and field not in ['timestamp', 'version', 'packet_order', 'event']:
-                        value = ''
-                    else:
-                        value = data[db_field_index[field]]
-                
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.overview_table.setItem(row, col, item)
-        
-        # 应用事件类型筛选
-        self.filter_data_by_event(self.event_filter_combo.currentText())
+        self.table_model.append_batch(batch)
     
     def on_connection_status(self, status):
         """更新连接状态"""
@@ -1822,92 +1485,19 @@ class MainWindow(QMainWindow):
             start_time = end_time.addSecs(-DATA_LOAD_TIME_RANGE)
             
             # 查询数据
-            new_data = self.db_manager.query_data(current_imei, start_time, end_time)
+            new_data = self.db_manager.query_batch(current_imei, start_time, end_time)
             
-            if new_data:
-                # 数据库字段索引映射（根据实际表结构）
-                db_field_index = {
-                    'timestamp': 1,
-                    'version': 2,
-                    'packet_order': 3,
-                    'event': 21,
-                    'accel_x': 4,
-                    'accel_y': 5,
-                    'accel_z': 6,
-                    'gyro_x': 7,
-                    'gyro_y': 8,
-                    'gyro_z': 9,
-                    'angle_x': 10,
-                    'angle_y': 11,
-                    'angle_z': 12,
-                    'attitude1': 13,
-                    'attitude2': 14,
-                    'pressure': 15,
-                    'altitude': 16,
-                    'longitude': 17,
-                    'latitude': 18
-                }
-                
+            if len(new_data):
                 # 在表格顶部插入新数据
-                for row, data in enumerate(new_data):
-                    self.overview_table.insertRow(row)
-                    for col, field in enumerate(FIELD_ORDER):
-                        if field == 'event':
-                            value = EVENT_TYPES.get(data[db_field_index[field]], data[db_field_index[field]])
-                        elif field == 'pressure':
-                            # 气压参数转换为kPa，处理空值
-                            pressure_value = data[db_field_index[field]]
-                            if pressure_value and pressure_value != '':
-                                try:
-                                    value = float(pressure_value) / 1000.0
-                                    value = f"{value:.2f}"  # 格式化为两位小数
-                                except ValueError:
-                                    value = ''
-                            else:
-                                value = ''
-                        else:
-                            event_type = data[db_field_index['event']]
-                            if event_type in ['POWER_ON', 'SENSOR_REPORT_TIMEOUT'] and field not in ['timestamp', 'version', 'packet_order', 'event']:
-                                value = ''
-                            else:
-                                value = data[db_field_index[field]]
-                        
-                        item = QTableWidgetItem(str(value))
-                        item.setTextAlignment(Qt.AlignCenter)
-                        self.overview_table.setItem(row, col, item)
+                self.table_model.prepend_batch(new_data)
                 
                 # 更新已加载的最早时间
                 self.loaded_earliest_time = start_time
                 
-                # 应用事件类型筛选
-                self.filter_data_by_event(self.event_filter_combo.currentText())
-                
                 print(f"已加载更多数据，时间范围: {start_time.toString('yyyy-MM-dd HH:mm:ss')} 到 {end_time.toString('yyyy-MM-dd HH:mm:ss')}")
             else:
                 print("没有更多历史数据可加载")
     
-    def remove_old_data_points(self, series, min_time):
-        """移除图表系列中超出时间范围的数据点（优化：限制最大数据点数量）"""
-        # 限制每个图表系列的最大数据点数量，防止图表渲染卡顿
-        max_points = CHART_MAX_DATA_POINTS
-        
-        # 先移除超出时间范围的数据点
-        points_to_remove = []
-        for i in range(series.count()):
-            point = series.at(i)
-            if point.x() < min_time:
-                points_to_remove.append(i)
-        
-        # 从后往前移除数据点，避免索引偏移
-        for i in reversed(points_to_remove):
-            series.remove(i)
-        
-        # 如果数据点数量仍然超过限制，进一步移除前面的数据点
-        if series.count() > max_points:
-            points_to_remove = list(range(series.count() - max_points))
-            for i in reversed(points_to_remove):
-                series.remove(i)
-    
     def adjust_columns_to_fill_space(self):
         """调整列宽以填充剩余空间"""
         # 获取表格总宽度（减去滚动条和边框）
@@ -1915,7 +1505,7 @@ class MainWindow(QMainWindow):
         
         # 计算各列当前宽度总和
         current_total_width = 0
-        for col in range(self.overview_table.columnCount()):
+        for col in range(self.table_model.columnCount()):
             current_total_width += self.overview_table.columnWidth(col)
         
         # 计算剩余空间
@@ -1923,10 +1513,10 @@ class MainWindow(QMainWindow):
         
         if remaining_width > 0:
             # 平均分配剩余宽度给各列
-            add_width = remaining_width // self.overview_table.columnCount()
-            extra = remaining_width % self.overview_table.columnCount()
+            add_width = remaining_width // self.table_model.columnCount()
+            extra = remaining_width % self.table_model.columnCount()
             
-            for col in range(self.overview_table.columnCount()):
+            for col in range(self.table_model.columnCount()):
                 new_width = self.overview_table.columnWidth(col) + add_width
                 if col < extra:
                     new_width += 1
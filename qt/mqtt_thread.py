@@ -5,20 +5,29 @@
 功能：
 - 封装MQTT连接、订阅、消息接收和处理功能
 - 运行在独立线程中，避免阻塞UI
+- 载荷按字段类型直接解码为 SensorBatch（样本行按 SAMPLE_COLUMNS 排列，事件和版本每批一份），
+  解码实现与 mqtt_listener 共用 ingest/codec.py
+- 每批在本线程内转为一次 ColumnBatch（每个字段一个 NumPy 数组）再发给界面线程，写库、图表和总览表都直接使用
 """
 
+import os
+import sys
 import time
-import json
 from PySide6.QtCore import QThread, Signal
 import paho.mqtt.client as mqtt
-from config import MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD
+from config import MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, SAMPLE_COLUMNS
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.codec import PayloadDecoder, SensorBatch
+from ingest.columnar import ColumnBatch
 
 class MqttThread(QThread):
     """MQTT消息处理线程"""
     
     # 信号定义
     message_received = Signal(str, str)  # 原始数据
-    sensor_data_received = Signal(list)  # 解析后的传感器数据
+    sensor_data_received = Signal(object)  # 解析后的传感器数据（ColumnBatch）
     connection_status = Signal(str)  # 连接状态
     error_occurred = Signal(str)  # 错误信息
     
@@ -28,6 +37,7 @@ class MqttThread(QThread):
         self.client = None
         self.connected = False
         self.running = False
+        self.decoder = PayloadDecoder(SAMPLE_COLUMNS)
     
     def run(self):
         """线程运行函数"""
@@ -94,42 +104,19 @@ class MqttThread(QThread):
             
             # 解析JSON格式消息
             try:
-                data = json.loads(payload)
-                
-                # 解析消息格式 {"event": "SENSOR_DATA", "data": [...]}
-                if isinstance(data, dict) and "data" in data:
-                    if isinstance(data["data"], list):
-                        # 为每个数据项添加事件类型和版本信息
-                        event_type = data.get("event", "")
-                        version = data.get("version", "")
-                        enhanced_data = []
-                        for item in data["data"]:
-                            item_with_event = item.copy()
-                            item_with_event["event"] = event_type
-                            item_with_event["version"] = version
-                            enhanced_data.append(item_with_event)
-                        self.sensor_data_received.emit(enhanced_data)
-                    else:
-                        self.connection_status.emit(f"收到非列表格式数据")
-                elif isinstance(data, list):
-                    # 如果直接是数组格式，为每个数据项添加默认事件类型
-                    enhanced_data = []
-                    for item in data:
-                        if "event" not in item:
-                            item_with_event = item.copy()
-                            item_with_event["event"] = "SENSOR_DATA"
-                            enhanced_data.append(item_with_event)
-                        else:
-                            enhanced_data.append(item)
-                    self.sensor_data_received.emit(enhanced_data)
-                elif isinstance(data, dict) and "event" in data:
-                    # 处理单个JSON对象格式（如上电包、超时包）
-                    self.sensor_data_received.emit([data])
-                else:
-                    self.connection_status.emit(f"收到非预期格式消息")
-                    
-            except json.JSONDecodeError:
+                data = self.decoder.decode(msg.payload)
+            except ValueError:
                 self.connection_status.emit("收到非JSON格式消息")
+                return
+            
+            # {"event": "SENSOR_DATA", "data": [...], "version": ...}、数据数组，
+            # 以及单个JSON对象格式（如上电包、超时包），都解码为 SensorBatch，按列转换后发出
+            if isinstance(data, SensorBatch):
+                self.sensor_data_received.emit(ColumnBatch.from_batch(data, self.imei))
+            elif isinstance(data, dict) and "data" in data:
+                self.connection_status.emit(f"收到非列表格式数据")
+            else:
+                self.connection_status.emit(f"收到非预期格式消息")
                 
         except Exception as e:
             self.error_occurred.emit(f"消息处理失败: {str(e)}")
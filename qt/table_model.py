@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+应急跌落事件监控系统 - 数据总览表格模型
+功能：
+- 总览表的数据直接保存为收到的 ColumnBatch（BatchList），不再为每个单元格创建 QTableWidgetItem
+- 视图只为可见的单元格调用 data()，取值时才格式化（事件类型名称、气压转换为 kPa）
+- EventFilterProxy 按事件类型筛选行
+"""
+
+import os
+import sys
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from config import FIELD_ORDER, FIELD_NAMES, EVENT_TYPES
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.columnar import BatchList
+
+# 上电包和传感器数据超时事件只显示基本字段
+BASIC_EVENTS = ('POWER_ON', 'SENSOR_REPORT_TIMEOUT')
+BASIC_FIELDS = ('timestamp', 'version', 'packet_order', 'event')
+
+# data()/headerData() 对每个可见单元格、每种角色都会调用，角色先转为整数比较
+DISPLAY_ROLE = int(Qt.DisplayRole)
+ALIGNMENT_ROLE = int(Qt.TextAlignmentRole)
+
+
+def display_text(field, value, event):
+    """单元格显示的文本"""
+    if field == 'event':
+        return str(EVENT_TYPES.get(event, event))
+    if field == 'pressure':
+        # 气压参数转换为kPa，处理空值
+        if value and value != '':
+            try:
+                return f"{float(value) / 1000.0:.2f}"
+            except ValueError:
+                return ''
+        return ''
+    if event in BASIC_EVENTS and field not in BASIC_FIELDS:
+        return ''
+    return str(value)
+
+
+class SampleTableModel(QAbstractTableModel):
+    """数据总览表格模型（按 FIELD_ORDER 显示各列）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fields = FIELD_ORDER
+        self.batches = BatchList()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.batches.size
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index, role=DISPLAY_ROLE):
+        if role == DISPLAY_ROLE:
+            batch, position = self.batches.locate(index.row())
+            field = self.fields[index.column()]
+            return display_text(field, batch.value(field, position), batch.value('event', position))
+        if role == ALIGNMENT_ROLE:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=DISPLAY_ROLE):
+        if role == DISPLAY_ROLE:
+            return FIELD_NAMES[self.fields[section]] if orientation == Qt.Horizontal else section + 1
+        return None
+
+    def event_at(self, row):
+        """第 row 行的事件类型"""
+        return self.batches.value(row, 'event')
+
+    def append_batch(self, batch):
+        """在末尾追加一批（实时数据）"""
+        if len(batch):
+            first = len(self.batches)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self.batches.append(batch)
+            self.endInsertRows()
+
+    def prepend_batch(self, batch):
+        """在顶部插入一批（历史数据）"""
+        if len(batch):
+            self.beginInsertRows(QModelIndex(), 0, len(batch) - 1)
+            self.batches.prepend(batch)
+            self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.batches.clear()
+        self.endResetModel()
+
+
+class EventFilterProxy(QSortFilterProxyModel):
+    """按事件类型（显示名称）筛选行，"全部事件"显示所有行"""
+
+    ALL_EVENTS = "全部事件"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.event_name = self.ALL_EVENTS
+
+    def set_event_name(self, event_name):
+        self.event_name = event_name
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.event_name == self.ALL_EVENTS:
+            return True
+        event = self.sourceModel().event_at(source_row)
+        return EVENT_TYPES.get(event, event) == self.event_name
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+STM32 ↔ 4G模块串口协议公共模块
+4G模块程序（device/main.py，QuecPython）与电脑端模拟器、校验脚本、仿真运行器共用，
+只使用 MicroPython 也支持的语法和模块。
+部署到模块时需将 stm32_protocol 目录与 main.py 一起上传到 /usr 下。
+- frame：帧打包、解包、校验和及流式重组
+- sample：47字节传感器样本的打包、解包和切分
+"""
+
+from stm32_protocol.frame import (CMD_UP_DATA_UPLOAD, CMD_UP_CONFIG_REPLY, CMD_UP_HEARTBEAT, CMD_UP_RESET_REPLY,
+                                  CMD_DOWN_CONFIG_SET, CMD_DOWN_HEARTBEAT_REPLY, CMD_DOWN_RESET,
+                                  FRAME_HEADER, FRAME_TAIL, FRAME_OVERHEAD, MAX_DATA_LEN,
+                                  FrameReassembler, checksum, pack_frame, unpack_frame, xor_bytes)
+from stm32_protocol.sample import (SAMPLE_FORMAT, SAMPLE_SIZE, SAMPLE_FIELDS, pack_sample, pack_samples,
+                                   pack_sensor_frame, unpack_sample, unpack_samples, split_samples, sample_to_dict)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+传感器样本批量解码速度对比（电脑端，依赖 NumPy）
+- 数据域：逐样本 unpack 并生成字典（parse_sensor_data 的做法）与 decode_samples
+- 帧流：FrameReassembler 逐帧校验后逐样本生成字典 与 decode_frames（向量化帧定位、校验和样本解码）
+
+用法示例：
+    python -m stm32_protocol.bench_bulk
+    python -m stm32_protocol.bench_bulk --samples 1000000 --per-frame 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stm32_protocol import SAMPLE_FIELDS, FrameReassembler, pack_frame, pack_samples, unpack_samples
+from stm32_protocol.bulk import decode_frames, decode_samples, to_columns
+
+
+def make_samples(count):
+    return [(i % 256, i % 1000 - 500, -2, 72, -10, -14, -5, -10, -14, -5, -3, -409, 96314 + i % 100,
+             425.75, 104.7463432 + i * 1e-7, 31.4627341) for i in range(count)]
+
+
+def per_sample_dicts(data):
+    """原逐样本解码：每个样本一个字典"""
+    return [dict(zip(SAMPLE_FIELDS, values)) for values in unpack_samples(data)]
+
+
+def per_frame_dicts(stream):
+    result = []
+    for cmd, data_len, data in FrameReassembler().feed(stream):
+        result.extend(per_sample_dicts(data))
+    return result
+
+
+def timed(func, arg):
+    start = time.perf_counter()
+    result = func(arg)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器样本批量解码速度对比")
+    parser.add_argument("--samples", type=int, default=1000000, help="样本数")
+    parser.add_argument("--per-frame", type=int, default=20, help="每帧样本数")
+    args = parser.parse_args()
+
+    base = pack_samples(make_samples(1000))
+    data = base * (args.samples // 1000)
+    count = len(data) // 47
+    frame_size = args.per_frame * 47
+    stream = b''.join(pack_frame(0x01, data[i:i + frame_size]) for i in range(0, len(data), frame_size))
+    print("样本 %d 个，数据域 %.1f MB，帧流 %.1f MB（每帧 %d 个样本）" %
+          (count, len(data) / 1e6, len(stream) / 1e6, args.per_frame))
+
+    old, dicts = timed(per_sample_dicts, data)
+    new, samples = timed(decode_samples, data)
+    cols, columns = timed(to_columns, samples)
+    assert dicts[-1]['longitude'] == samples['longitude'][-1] and len(columns['accel_x']) == count
+    print("数据域: 逐样本字典 %.3f s，decode_samples %.4f s（%.0f 倍），再转列 %.4f s（合计 %.0f 倍）" %
+          (old, new, old / new, cols, old / (new + cols)))
+    del dicts
+
+    old, dicts = timed(per_frame_dicts, stream)
+    new, (samples, frames, bad) = timed(decode_frames, stream)
+    assert len(dicts) == len(samples) == count and bad == 0
+    print("帧流:   逐帧校验+逐样本字典 %.3f s，decode_frames %.4f s（%.0f 倍），%d 帧" %
+          (old, new, old / new, frames))
+
+
+if __name__ == "__main__":
+    main()
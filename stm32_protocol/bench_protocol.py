@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+STM32 串口协议编解码速度对比，MicroPython 与 CPython 均可运行
+- 校验和：原各脚本中的逐字节异或 与 xor_bytes
+- 打包：原 pack_frame（逐段 struct.pack 后拼接）与 pack_frame
+- 解包：逐样本切片 unpack 与 unpack_samples
+- 收帧：原 device/main.py read_frame（每次最多读128字节，未收齐的帧随本次读取丢弃）与 FrameReassembler，
+  统计按串口每次可读字节数分块送入时解析出的帧数
+
+用法示例：
+    python -m stm32_protocol.bench_protocol
+    micropython -c "import stm32_protocol.bench_protocol as b; b.main()"
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+from modbus_rtu.ticks import ticks_us, ticks_diff
+from stm32_protocol import (FRAME_HEADER, FRAME_TAIL, SAMPLE_FORMAT, SAMPLE_SIZE, FrameReassembler, checksum,
+                            pack_frame, pack_sensor_frame, unpack_samples)
+
+
+def old_checksum(cmd, data_len, data):
+    checksum = cmd
+    checksum ^= (data_len >> 8) & 0xFF
+    checksum ^= data_len & 0xFF
+    for byte in data:
+        checksum ^= byte
+    return checksum
+
+
+def old_pack_frame(cmd, data=b''):
+    data_len = len(data)
+    return (FRAME_HEADER + struct.pack('B', cmd) + struct.pack('H', data_len) + data +
+            struct.pack('B', old_checksum(cmd, data_len, data)) + FRAME_TAIL)
+
+
+def old_unpack_samples(data):
+    return [struct.unpack(SAMPLE_FORMAT, data[i:i + SAMPLE_SIZE]) for i in range(0, len(data), SAMPLE_SIZE)]
+
+
+def old_read_frame(raw_data):
+    """原 read_frame 对一次读取（最多128字节）的处理"""
+    frames = []
+    buffer = raw_data[:128]
+    while True:
+        header_pos = buffer.find(FRAME_HEADER)
+        if header_pos == -1:
+            break
+        buffer = buffer[header_pos:]
+        if len(buffer) < 8:
+            break
+        data_len = struct.unpack('H', buffer[3:5])[0]
+        total_frame_length = 8 + data_len
+        if len(buffer) < total_frame_length:
+            break
+        if buffer[total_frame_length - 2:total_frame_length] == FRAME_TAIL:
+            frame = buffer[:total_frame_length]
+            data = frame[5:-3]
+            if frame[-3] == old_checksum(frame[2], data_len, data):
+                frames.append((frame[2], data_len, data))
+            buffer = buffer[total_frame_length:]
+        else:
+            buffer = buffer[1:]
+    return frames
+
+
+def make_samples(count):
+    return [(i % 256, 59, -2, 72, -10, -14, -5, -10, -14, -5, -3, -409, 96314, 425.75, 104.7463432, 31.4627341)
+            for i in range(count)]
+
+
+def bench(func, arg, repeat):
+    start = ticks_us()
+    for _ in range(repeat):
+        func(arg)
+    return ticks_diff(ticks_us(), start) / float(repeat)
+
+
+def main():
+    for per_frame, repeat in ((1, 2000), (5, 500), (20, 200)):
+        samples = make_samples(per_frame)
+        data = b''.join(struct.pack(SAMPLE_FORMAT, *s) for s in samples)
+        frame = pack_sensor_frame(samples)
+        assert old_pack_frame(0x01, data) == frame
+        assert old_unpack_samples(data) == unpack_samples(data)
+        print("每帧 %2d 个样本（%4d 字节）:" % (per_frame, len(frame)))
+        old = bench(lambda d: old_checksum(0x01, len(d), d), data, repeat)
+        new = bench(lambda d: checksum(0x01, len(d), d), data, repeat)
+        print("  校验和 %7.1f us -> %7.1f us，%.1f 倍" % (old, new, old / new))
+        old = bench(lambda d: old_pack_frame(0x01, d), data, repeat)
+        new = bench(lambda d: pack_frame(0x01, d), data, repeat)
+        print("  打包   %7.1f us -> %7.1f us，%.1f 倍" % (old, new, old / new))
+        old = bench(old_unpack_samples, data, repeat)
+        new = bench(unpack_samples, data, repeat)
+        print("  解包   %7.1f us -> %7.1f us，%.1f 倍" % (old, new, old / new))
+
+        # 100帧的字节流按每次64字节送入（115200波特率下主循环每轮约可读到的字节数）
+        stream = frame * 100
+        chunks = [stream[i:i + 64] for i in range(0, len(stream), 64)]
+        old_frames = sum(len(old_read_frame(c)) for c in chunks)
+        reassembler = FrameReassembler()
+        start = ticks_us()
+        new_frames = sum(len(reassembler.feed(c)) for c in chunks)
+        elapsed = ticks_diff(ticks_us(), start)
+        print("  收帧   100帧按64字节分块: 原 read_frame 解析 %d 帧，FrameReassembler 解析 %d 帧（%d us）" %
+              (old_frames, new_frames, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+传感器样本批量解码（电脑端离线分析，依赖 NumPy，不在 QuecPython 上使用）
+- SAMPLE_DTYPE：与 SAMPLE_FORMAT（<BhhhhhhhhhhhIfdd）逐字节对应的无对齐小端结构化类型，47字节
+- decode_samples：一个或多个数据域首尾相接的字节直接 np.frombuffer 为结构化数组，不复制
+- decode_frames：帧的字节流（如串口抓包、多个抓包拼接）中定位所有帧，按帧向量化异或校验，
+  取出校验通过的传感器数据上传帧中的全部样本；互相重叠的候选帧只在校验通过的帧之间取舍
+- 等长帧首尾相接时整段看作 (帧数, 帧长) 矩阵，按列校验帧结构、按行异或校验，数据域按列切出
+- to_columns：结构化数组转为 {字段名: 一维数组}
+帧定位、校验和样本解码都是整体的数组运算（仅校验通过的帧互相重叠时逐个循环取舍），不为每个样本创建对象
+"""
+
+import numpy as np
+
+from stm32_protocol.frame import CMD_UP_DATA_UPLOAD, FRAME_HEADER, FRAME_OVERHEAD, MAX_DATA_LEN
+from stm32_protocol.sample import SAMPLE_FIELDS, SAMPLE_SIZE
+
+SAMPLE_DTYPE = np.dtype([
+    ('packet_order', '<u1'),
+    ('accel_x', '<i2'), ('accel_y', '<i2'), ('accel_z', '<i2'),
+    ('gyro_x', '<i2'), ('gyro_y', '<i2'), ('gyro_z', '<i2'),
+    ('angle_x', '<i2'), ('angle_y', '<i2'), ('angle_z', '<i2'),
+    ('attitude1', '<i2'), ('attitude2', '<i2'),
+    ('pressure', '<u4'),
+    ('altitude', '<f4'),
+    ('longitude', '<f8'), ('latitude', '<f8'),
+])
+assert SAMPLE_DTYPE.itemsize == SAMPLE_SIZE and SAMPLE_DTYPE.names == SAMPLE_FIELDS
+
+
+def decode_samples(data):
+    """数据域（或多个数据域拼接）解码为结构化数组，长度不是样本长度的整数倍时抛出 ValueError"""
+    if len(data) % SAMPLE_SIZE != 0:
+        raise ValueError("sensor data length %d is not a multiple of %d" % (len(data), SAMPLE_SIZE))
+    return np.frombuffer(data, dtype=SAMPLE_DTYPE)
+
+
+def _header_positions(u8):
+    """所有 AA 55 的位置：按偶数、奇数起点两次以小端 uint16 比较 0x55AA"""
+    n = len(u8)
+    even = np.flatnonzero(u8[:n - n % 2].view('<u2') == 0x55AA) * 2
+    odd = np.flatnonzero(u8[1:n - 1 + n % 2].view('<u2') == 0x55AA) * 2 + 1
+    return np.sort(np.concatenate((even, odd)))
+
+
+def _regular_frames(buf, u8, max_data_len):
+    """
+    常见情况的快速路径：从第一个帧头起全是等长的帧首尾相接（如固定每帧样本数的抓包），
+    按第一帧长度把这段字节看作 (帧数, 帧长) 的矩阵，按列验证帧头、长度和帧尾。
+    成立时返回 (第一帧的位置, 帧矩阵视图)，不成立时返回 None
+    """
+    n = len(u8)
+    first = bytes(buf[:max_data_len + FRAME_OVERHEAD]).find(FRAME_HEADER)
+    if first < 0 or n - first < FRAME_OVERHEAD:
+        return None
+    period = (int(u8[first + 3]) | (int(u8[first + 4]) << 8)) + FRAME_OVERHEAD
+    count = (n - first) // period
+    tail_start = first + count * period
+    if count < 2 or bytes(buf[tail_start:]).find(FRAME_HEADER) >= 0:
+        return None
+    frames = u8[first:tail_start].reshape(count, period)
+    ok = ((frames[:, 0] == 0xAA) & (frames[:, 1] == 0x55) & (frames[:, 3] == frames[0, 3]) &
+          (frames[:, 4] == frames[0, 4]) & (frames[:, -2] == 0x55) & (frames[:, -1] == 0xAA))
+    if not ok.all():
+        return None
+    return first, frames
+
+
+def _frame_candidates(u8, max_data_len):
+    """帧头、长度和帧尾都正确的候选帧（按位置排序，可能互相重叠）"""
+    n = len(u8)
+    starts = _header_positions(u8)
+    starts = starts[starts <= n - FRAME_OVERHEAD]
+    lengths = u8[starts + 3].astype(np.int64) | (u8[starts + 4].astype(np.int64) << 8)
+    ends = starts + lengths + FRAME_OVERHEAD
+    ok = (lengths <= max_data_len) & (ends <= n)
+    tail = np.clip(ends, 2, n)
+    ok &= (u8[tail - 2] == 0x55) & (u8[tail - 1] == 0xAA)
+    return starts[ok], ends[ok]
+
+
+def _drop_overlaps(starts, ends):
+    """按位置依次保留与前一个保留的帧不重叠的帧"""
+    if np.all(ends[:-1] <= starts[1:]):
+        return starts, ends
+    keep = []
+    pos = 0
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        if start >= pos:
+            keep.append(i)
+            pos = end
+    return starts[keep], ends[keep]
+
+
+def _locate_frames(buf, u8, max_data_len, regular):
+    """
+    定位并校验所有帧，返回 (有效帧起始, 有效帧结束, 校验失败帧起始, 校验失败帧结束)。
+
+    重叠只在校验通过的帧之间取舍：数据域中的 AA 55 可能恰好构成帧头、长度和帧尾都正确的假帧，
+    先按结构取舍会让校验失败的假帧挡住与其重叠的真帧。校验失败的候选只保留不与有效帧重叠的，用于计数
+    """
+    if regular is not None:
+        first, frames = regular
+        starts = np.arange(len(frames), dtype=np.int64) * frames.shape[1] + first
+        ends = starts + frames.shape[1]
+        ok = _matrix_checksums_ok(frames)
+        return starts[ok], ends[ok], starts[~ok], ends[~ok]
+    starts, ends = _frame_candidates(u8, max_data_len)
+    ok = frame_checksums_ok(buf, starts, ends)
+    good_starts, good_ends = _drop_overlaps(starts[ok], ends[ok])
+    bad_starts, bad_ends = starts[~ok], ends[~ok]
+    if len(good_starts) and len(bad_starts):
+        # 有效帧互不重叠且按位置排序，只需检查在失败候选结束之前开始的最后一个有效帧
+        last = np.searchsorted(good_starts, bad_ends, 'left') - 1
+        clear = (last < 0) | (good_ends[np.maximum(last, 0)] <= bad_starts)
+        bad_starts, bad_ends = bad_starts[clear], bad_ends[clear]
+    bad_starts, bad_ends = _drop_overlaps(bad_starts, bad_ends)
+    return good_starts, good_ends, bad_starts, bad_ends
+
+
+def find_frames(buf, max_data_len=MAX_DATA_LEN):
+    """
+    定位字节流中帧头、长度、帧尾和校验和都正确、互不重叠的帧。
+
+    :return: (帧起始位置数组, 帧结束位置数组)，结束位置为帧尾之后
+    """
+    u8 = np.frombuffer(buf, dtype=np.uint8)
+    if len(u8) < FRAME_OVERHEAD:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return _locate_frames(buf, u8, max_data_len, _regular_frames(buf, u8, max_data_len))[:2]
+
+
+def frame_checksums_ok(buf, starts, ends):
+    """对每个帧的命令码、长度和数据域整体做异或归约，与帧中的校验和比较，返回布尔数组"""
+    u8 = np.frombuffer(buf, dtype=np.uint8)
+    if len(starts) == 0:
+        return np.zeros(0, dtype=bool)
+    bounds = np.empty(len(starts) * 2, dtype=np.int64)
+    bounds[0::2] = starts + 2
+    bounds[1::2] = ends - 3
+    xor = np.bitwise_xor.reduceat(u8, bounds)[0::2]
+    return xor == u8[ends - 3]
+
+
+def _matrix_checksums_ok(frames):
+    """等长帧矩阵按行异或归约校验（比 reduceat 按起止位置归约快）"""
+    return np.bitwise_xor.reduce(frames[:, 2:-3], axis=1) == frames[:, -3]
+
+
+def _decode_regular(frames, cmd):
+    """等长帧矩阵全是 cmd 的传感器数据帧时，按列切出数据域解码，返回 (样本, 帧数, 校验失败帧数)，否则返回 None"""
+    size = frames.shape[1] - FRAME_OVERHEAD
+    if size == 0 or size % SAMPLE_SIZE or not np.all(frames[:, 2] == cmd):
+        return None
+    ok = _matrix_checksums_ok(frames)
+    bad = int(len(ok) - np.count_nonzero(ok))
+    if bad:
+        frames = frames[ok]
+    # 数据域各行复制到连续内存后每 47 字节即一个样本
+    data = np.ascontiguousarray(frames[:, 5:5 + size])
+    return data.view('V%d' % SAMPLE_SIZE).reshape(-1).view(SAMPLE_DTYPE), len(frames), bad
+
+
+def decode_frames(buf, cmd=CMD_UP_DATA_UPLOAD, max_data_len=MAX_DATA_LEN):
+    """
+    解码字节流中所有校验通过的传感器数据上传帧。
+
+    :param buf: bytes/bytearray/memoryview，如串口抓包数据
+    :return: (样本结构化数组, 帧数, 校验失败的帧数)，帧数只统计命令码为 cmd 且长度为样本整数倍的帧
+    """
+    u8 = np.frombuffer(buf, dtype=np.uint8)
+    if len(u8) < FRAME_OVERHEAD:
+        return np.zeros(0, dtype=SAMPLE_DTYPE), 0, 0
+    regular = _regular_frames(buf, u8, max_data_len)
+    if regular is not None:
+        result = _decode_regular(regular[1], cmd)
+        if result is not None:
+            return result
+    starts, ends, bad_starts, bad_ends = _locate_frames(buf, u8, max_data_len, regular)
+
+    def wanted(starts, ends):
+        lengths = ends - starts - FRAME_OVERHEAD
+        return (u8[starts + 2] == cmd) & (lengths % SAMPLE_SIZE == 0) & (lengths > 0)
+    bad = int(np.count_nonzero(wanted(bad_starts, bad_ends)))
+    keep = wanted(starts, ends)
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return np.zeros(0, dtype=SAMPLE_DTYPE), 0, bad
+    data_start = starts + 5
+    counts = (ends - starts - FRAME_OVERHEAD) // SAMPLE_SIZE
+    # 每个字节位置都视为一个数据域（或样本）的起点：步长1、元素互相重叠的视图，再按起点一次取出。
+    # 用无字段的 V47 类型取，每个样本整体复制，比按结构化类型逐字段复制快
+    item = 'V%d' % SAMPLE_SIZE
+    per_frame = int(counts[0])
+    if np.all(counts == per_frame):
+        # 各帧样本数相同（常见情况）：按帧取整个数据域
+        size = per_frame * SAMPLE_SIZE
+        rows = np.ndarray((len(u8) - size + 1, per_frame), dtype=item, buffer=u8, strides=(1, SAMPLE_SIZE))
+        return rows[data_start].reshape(-1).view(SAMPLE_DTYPE), len(starts), bad
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = np.repeat(data_start, counts) + (np.arange(len(first)) - first) * SAMPLE_SIZE
+    view = np.ndarray((len(u8) - SAMPLE_SIZE + 1, ), dtype=item, buffer=u8, strides=(1, ))
+    return view[offsets].view(SAMPLE_DTYPE), len(starts), bad
+
+
+def to_columns(samples, copy=False):
+    """结构化数组转为 {字段名: 数组}；copy 为 False 时各列是原数组的视图，为 True 时是连续内存的副本"""
+    if copy:
+        return dict((name, np.ascontiguousarray(samples[name])) for name in SAMPLE_FIELDS)
+    return dict((name, samples[name]) for name in SAMPLE_FIELDS)
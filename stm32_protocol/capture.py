@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+串口原始字节抓包的录制与回放（电脑端，不在 QuecPython 上使用）
+抓包文件格式（小端）：
+- 文件头 16 字节：b'UCAP' | 版本(1) | 保留(3) | 开始时的墙上时间(float64，秒)
+- 记录：相对开始的单调时间(uint64，微秒) | 方向(1) | 长度(uint16) | 数据，
+  方向 DIR_RX 为 STM32 → 4G模块（模块读到的数据），DIR_TX 为 4G模块 → STM32，超过 65535 字节的数据分为多条记录
+- 索引：每 INDEX_INTERVAL 条记录一项 (时间, 记录在文件中的位置)，写在最后一条记录之后，
+  文件末尾 20 字节为 索引位置(uint64) | 索引项数(uint32) | 记录数(uint32) | b'UIDX'
+录制中途中断（没有索引）的文件读取时顺序扫描重建索引，末尾不完整的记录忽略。
+- CaptureWriter / CaptureReader：写入、读取抓包文件
+- CaptureTap：包装 emulator/qpy/machine.py 的串口链路，记录设备每次 read 到的数据块和 write 的数据
+  （只用于仿真运行；模组上 device/main.py 的 UART 抓包没有实现）
+- record_serial：录制串口设备或pty上收到的数据；bridge 模式下新建一个pty，在它与串口之间双向转发并记录两个方向
+- replay：按录制时的块边界把数据交给回调，speed 为 1 按原速、N 为 N 倍速、0 为不等待
+串口/pty 录制和回放到 pty 只支持 POSIX，pty/termios/tty 在用到的函数中导入；
+抓包文件读写、info 和回放到 device/reassembler 在 Windows 上也可用。
+
+用法示例：
+    python -m stm32_protocol.capture record /dev/ttyUSB0 -o field.ucap --baud 115200 --bridge
+    python -m stm32_protocol.capture info field.ucap
+    python -m stm32_protocol.capture replay field.ucap --target device --speed 10
+    python -m stm32_protocol.capture replay field.ucap --target reassembler --speed 0
+    python -m stm32_protocol.capture replay field.ucap --target pty --speed 1
+"""
+
+import argparse
+import os
+import select
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stm32_protocol.frame import CMD_UP_DATA_UPLOAD, FrameReassembler
+
+DIR_RX = 0  # STM32 → 4G模块
+DIR_TX = 1  # 4G模块 → STM32
+DIRECTION_NAMES = {DIR_RX: "rx", DIR_TX: "tx"}
+
+FILE_MAGIC = b'UCAP'
+FILE_VERSION = 1
+HEADER_FORMAT = '<4sB3xd'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = '<QBH'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+INDEX_FORMAT = '<QQ'
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+TRAILER_FORMAT = '<QII4s'
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+TRAILER_MAGIC = b'UIDX'
+MAX_CHUNK = 0xFFFF
+INDEX_INTERVAL = 256  # 每多少条记录一个索引项
+FLUSH_INTERVAL = 1.0  # 录制时每隔多少秒刷新到文件，录制中断时最多丢失这段时间的数据
+
+
+class CaptureWriter:
+    """抓包文件写入"""
+    def __init__(self, path, index_interval=INDEX_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.index_interval = index_interval
+        self.clock = clock
+        self.file = open(path, 'wb')
+        self.start = clock()
+        self.file.write(struct.pack(HEADER_FORMAT, FILE_MAGIC, FILE_VERSION, time.time()))
+        self.offset = HEADER_SIZE
+        self.index = []  # [(时间(微秒), 记录位置)]
+        self.records = 0
+        self.bytes = {DIR_RX: 0, DIR_TX: 0}
+        self.last_flush = self.start
+
+    def write(self, direction, data, timestamp=None):
+        """追加一个数据块，timestamp 为 clock 的读数，缺省为当前时间"""
+        if not data:
+            return
+        now = self.clock() if timestamp is None else timestamp
+        ts_us = max(int(round((now - self.start) * 1000000)), 0)
+        for i in range(0, len(data), MAX_CHUNK):
+            chunk = data[i:i + MAX_CHUNK]
+            if self.records % self.index_interval == 0:
+                self.index.append((ts_us, self.offset))
+            self.file.write(struct.pack(RECORD_FORMAT, ts_us, direction, len(chunk)))
+            self.file.write(chunk)
+            self.offset += RECORD_SIZE + len(chunk)
+            self.records += 1
+            self.bytes[direction] += len(chunk)
+        if now - self.last_flush >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.last_flush = now
+
+    def close(self):
+        """写入索引和文件尾"""
+        if self.file is None:
+            return
+        for ts_us, offset in self.index:
+            self.file.write(struct.pack(INDEX_FORMAT, ts_us, offset))
+        self.file.write(struct.pack(TRAILER_FORMAT, self.offset, len(self.index), self.records, TRAILER_MAGIC))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureReader:
+    """抓包文件读取"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic, version, self.start_time = struct.unpack(HEADER_FORMAT, self.file.read(HEADER_SIZE))
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            self.file.close()
+            raise ValueError("%s is not a UART capture file" % path)
+        self.recovered = False  # 文件没有索引（录制中断），已顺序扫描重建
+        if not self._load_index():
+            self._scan()
+            self.recovered = True
+
+    def _load_index(self):
+        self.file.seek(0, 2)
+        size = self.file.tell()
+        if size < HEADER_SIZE + TRAILER_SIZE:
+            return False
+        self.file.seek(size - TRAILER_SIZE)
+        end, entries, records, magic = struct.unpack(TRAILER_FORMAT, self.file.read(TRAILER_SIZE))
+        if magic != TRAILER_MAGIC or end + entries * INDEX_SIZE + TRAILER_SIZE != size:
+            return False
+        self.file.seek(end)
+        raw = self.file.read(entries * INDEX_SIZE)
+        self.index = [struct.unpack_from(INDEX_FORMAT, raw, i * INDEX_SIZE) for i in range(entries)]
+        self.end = end
+        self.records = records
+        self.duration_us = self._last_timestamp()
+        return True
+
+    def _last_timestamp(self):
+        """从最后一个索引项起读到记录末尾，取最后一条记录的时间"""
+        last = 0
+        for ts_us, _, _ in self._iter_from(self.index[-1][1] if self.index else HEADER_SIZE):
+            last = ts_us
+        return last
+
+    def _scan(self):
+        self.index = []
+        self.records = 0
+        self.duration_us = 0
+        self.end = HEADER_SIZE
+        self.file.seek(HEADER_SIZE)
+        while True:
+            head = self.file.read(RECORD_SIZE)
+            if len(head) < RECORD_SIZE:
+                break
+            ts_us, direction, length = struct.unpack(RECORD_FORMAT, head)
+            if len(self.file.read(length)) < length:
+                break
+            if self.records % INDEX_INTERVAL == 0:
+                self.index.append((ts_us, self.end))
+            self.end += RECORD_SIZE + length
+            self.records += 1
+            self.duration_us = ts_us
+
+    def _iter_from(self, offset):
+        self.file.seek(offset)
+        while offset < self.end:
+            ts_us, direction, length = struct.unpack(RECORD_FORMAT, self.file.read(RECORD_SIZE))
+            data = self.file.read(length)
+            offset += RECORD_SIZE + length
+            yield ts_us, direction, data
+
+    def iter_records(self, start_us=0, end_us=None, direction=None):
+        """
+        按录制顺序读取记录，按索引跳到 start_us 附近开始读。
+
+        :return: 迭代 (时间(微秒), 方向, 数据)
+        """
+        offset = HEADER_SIZE
+        for ts_us, position in self.index:
+            if ts_us >= start_us:
+                break
+            offset = position
+        for ts_us, record_direction, data in self._iter_from(offset):
+            if ts_us < start_us:
+                continue
+            if end_us is not None and ts_us > end_us:
+                break
+            if direction is None or record_direction == direction:
+                yield ts_us, record_direction, data
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureTap:
+    """包装串口链路（需提供 any/read/write），记录经过的数据，其余属性（如 feed/drain）转给原链路"""
+    def __init__(self, link, writer):
+        self.link = link
+        self.writer = writer
+
+    def any(self):
+        return self.link.any()
+
+    def read(self, n=-1):
+        data = self.link.read(n)
+        self.writer.write(DIR_RX, data)
+        return data
+
+    def write(self, data):
+        self.writer.write(DIR_TX, data)
+        return self.link.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.link, name)
+
+
+def open_serial(path, baudrate=None):
+    """以原始、非阻塞方式打开串口设备或pty，baudrate 为 None 时不设置（pty 无需设置），只支持 POSIX"""
+    import termios
+    import tty
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    tty.setraw(fd)
+    if baudrate:
+        speed = getattr(termios, 'B%d' % baudrate)
+        attrs = termios.tcgetattr(fd)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+def _write_all(fd, data):
+    while data:
+        try:
+            data = data[os.write(fd, data):]
+        except BlockingIOError:
+            select.select([], [fd], [], 0.1)
+
+
+def record_serial(path, writer, duration=None, baudrate=None, bridge_fd=None, should_stop=None):
+    """
+    录制 path 上收到的数据（DIR_RX），直到 duration 秒或 should_stop() 返回真。
+    bridge_fd 不为 None 时，收到的数据同时转发到 bridge_fd，bridge_fd 上收到的数据记录为 DIR_TX 并写到串口。
+    串口以文件描述符 select，只支持 POSIX。
+    """
+    fd = open_serial(path, baudrate)
+    deadline = None if duration is None else time.monotonic() + duration
+    fds = [fd] if bridge_fd is None else [fd, bridge_fd]
+    try:
+        while (deadline is None or time.monotonic() < deadline) and not (should_stop and should_stop()):
+            ready, _, _ = select.select(fds, [], [], 0.05)
+            for src in ready:
+                try:
+                    data = os.read(src, 4096)
+                except (BlockingIOError, OSError):
+                    # pty 对端尚未打开或已关闭
+                    continue
+                if not data:
+                    continue
+                if src == fd:
+                    writer.write(DIR_RX, data)
+                    if bridge_fd is not None:
+                        _write_all(bridge_fd, data)
+                else:
+                    writer.write(DIR_TX, data)
+                    _write_all(fd, data)
+    finally:
+        os.close(fd)
+
+
+def replay(records, sink, speed=1.0, clock=time.monotonic, sleep=time.sleep):
+    """
+    按录制时的块边界和时间间隔回放，每个数据块调用一次 sink(数据)。
+
+    :param records: CaptureReader.iter_records() 的结果
+    :param speed: 1 为原速，N 为 N 倍速，0 为不等待
+    :return: (数据块数, 字节数, 回放耗时(秒), 相对计划的最大滞后(秒))
+    """
+    chunks = 0
+    total = 0
+    max_lag = 0.0
+    begin = clock()
+    first_us = None
+    for ts_us, direction, data in records:
+        if speed > 0:
+            if first_us is None:
+                first_us = ts_us
+            due = begin + (ts_us - first_us) / 1000000.0 / speed
+            delay = due - clock()
+            if delay > 0:
+                sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+        sink(data)
+        chunks += 1
+        total += len(data)
+    return chunks, total, clock() - begin, max_lag
+
+
+class DeviceTarget:
+    """把回放数据送入仿真运行的 device/main.py 的 STM32Communication，每块数据后按设备主循环的方式读取"""
+    def __init__(self):
+        from emulator.run_device import load_device_main
+        self.device = load_device_main()
+        import machine
+        self.link = machine.link(machine.UART.UART2)
+        self.stm32 = self.device.STM32Communication(machine.UART.UART2, 115200)
+        self.stm32.connect()
+        self.frames = 0
+        self.samples = 0
+
+    def __call__(self, data):
+        self.link.feed(data)
+        while self.link.any():
+            for cmd, data_len, body in self.stm32.read_frame():
+                self.frames += 1
+                if cmd == CMD_UP_DATA_UPLOAD:
+                    self.samples += len(self.stm32.parse_sensor_data(body) or [])
+
+    def counters(self):
+        return self.stm32.reassembler
+
+
+class ReassemblerTarget:
+    """把回放数据直接送入 FrameReassembler，用于在真实字节流上测量收帧速度"""
+    def __init__(self):
+        self.reassembler = FrameReassembler()
+        self.frames = 0
+
+    def __call__(self, data):
+        self.frames += len(self.reassembler.feed(data))
+
+    def counters(self):
+        return self.reassembler
+
+
+class PtyTarget:
+    """把回放数据写入新建pty的主端，从端路径交给被测程序（如 machine.SerialLink），只支持 POSIX"""
+    def __init__(self):
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.path = os.ttyname(self.slave_fd)
+
+    def __call__(self, data):
+        _write_all(self.master_fd, data)
+
+
+def print_info(reader):
+    counts = {DIR_RX: [0, 0], DIR_TX: [0, 0]}
+    sizes = []
+    for ts_us, direction, data in reader.iter_records():
+        counts[direction][0] += 1
+        counts[direction][1] += len(data)
+        if direction == DIR_RX:
+            sizes.append(len(data))
+    print("文件: %s（%s开始录制）%s" % (reader.path, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(reader.start_time)),
+                                 "，无索引，已扫描重建" if reader.recovered else ""))
+    print("时长: %.3f 秒，记录 %d 条，索引 %d 项" % (reader.duration_us / 1000000.0, reader.records, len(reader.index)))
+    for direction in (DIR_RX, DIR_TX):
+        print("%s: %d 块，%d 字节" % (DIRECTION_NAMES[direction], counts[direction][0], counts[direction][1]))
+    if sizes:
+        sizes.sort()
+        print("rx 块大小: 最小 %d，中位 %d，最大 %d" % (sizes[0], sizes[len(sizes) // 2], sizes[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串口原始字节抓包录制与回放")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+    record = commands.add_parser("record", help="录制串口设备或pty收到的数据")
+    record.add_argument("port", help="串口设备或pty路径")
+    record.add_argument("-o", "--output", required=True, help="抓包文件")
+    record.add_argument("--baud", type=int, default=None, help="波特率，pty 不需要")
+    record.add_argument("--duration", type=float, default=None, help="录制时长（秒），缺省直到 Ctrl+C")
+    record.add_argument("--bridge", action="store_true", help="新建pty并与串口双向转发，录制两个方向")
+    info = commands.add_parser("info", help="显示抓包文件概要")
+    info.add_argument("capture")
+    play = commands.add_parser("replay", help="回放抓包文件中STM32发出的数据")
+    play.add_argument("capture")
+    play.add_argument("--target", choices=("device", "reassembler", "pty"), default="device",
+                      help="device: 仿真运行的 STM32Communication；reassembler: FrameReassembler；pty: 写入新建的pty")
+    play.add_argument("--speed", type=float, default=1.0, help="回放倍速，0为不等待")
+    play.add_argument("--start", type=float, default=0.0, help="从第几秒开始回放")
+    play.add_argument("--end", type=float, default=None, help="回放到第几秒")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        bridge_fd = None
+        if args.bridge:
+            import pty
+            import tty
+            bridge_fd, slave_fd = pty.openpty()
+            tty.setraw(slave_fd)
+            print("转发pty: %s" % os.ttyname(slave_fd))
+        writer = CaptureWriter(args.output)
+        try:
+            record_serial(args.port, writer, args.duration, args.baud, bridge_fd)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
+        print("记录 %d 条，rx %d 字节，tx %d 字节" % (writer.records, writer.bytes[DIR_RX], writer.bytes[DIR_TX]))
+        return
+
+    reader = CaptureReader(args.capture)
+    if args.command == "info":
+        print_info(reader)
+        return
+    if args.target == "device":
+        target = DeviceTarget()
+    elif args.target == "reassembler":
+        target = ReassemblerTarget()
+    else:
+        target = PtyTarget()
+        print("回放pty: %s，回车开始" % target.path)
+        sys.stdin.readline()
+    end_us = None if args.end is None else int(args.end * 1000000)
+    records = reader.iter_records(int(args.start * 1000000), end_us, DIR_RX)
+    chunks, total, elapsed, max_lag = replay(records, target, args.speed)
+    print("回放 %d 块，%d 字节，耗时 %.3f 秒（%.1f MB/s），最大滞后 %.1f ms" %
+          (chunks, total, elapsed, total / 1e6 / max(elapsed, 1e-9), max_lag * 1000))
+    if args.target != "pty":
+        counters = target.counters()
+        print("收帧 %d，校验和错误 %d，重新同步 %d，丢弃字节 %d" %
+              (counters.frames, counters.checksum_errors, counters.resyncs, counters.dropped_bytes))
+    if args.target == "device":
+        print("传感器样本 %d" % target.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+STM32 串口帧编解码
+帧格式：帧头 AA 55 | 命令码(1) | 数据长度(2，小端) | 数据域 | 校验和(1) | 帧尾 55 AA
+校验和为命令码、数据长度两个字节及数据域所有字节的异或
+- FrameReassembler：每次读到的数据追加到缓冲区，切出完整且校验通过的帧，不完整的帧留到下次读取时拼接；
+  帧尾、校验和错误或数据长度超过上限时从帧头的下一个字节重新查找帧头
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+# 上行命令（STM32 → 4G → 云端）
+CMD_UP_DATA_UPLOAD = 0x01  # 传感器数据上传
+CMD_UP_CONFIG_REPLY = 0x03  # 配置参数回复
+CMD_UP_HEARTBEAT = 0x04  # 心跳包
+CMD_UP_RESET_REPLY = 0x07  # 复位命令回复
+
+# 下行命令（云端 → 4G → STM32）
+CMD_DOWN_CONFIG_SET = 0x02  # 配置参数设置
+CMD_DOWN_HEARTBEAT_REPLY = 0x05  # 心跳包回复
+CMD_DOWN_RESET = 0x06  # 复位命令
+
+FRAME_HEADER = b'\xAA\x55'
+FRAME_TAIL = b'\x55\xAA'
+FRAME_OVERHEAD = 8  # 帧头+命令码+长度+校验和+帧尾
+MAX_DATA_LEN = 4096  # 数据长度超过该值视为误判的帧头
+
+try:
+    # 超过80字节的数据域整体转为大整数后对半折叠异或，CPython 下比逐字节异或快数倍；不支持大整数的固件用逐字节异或
+    _BIGINT = int.from_bytes(b'\x01' * 9, 'little') >> 64 == 1
+except (OverflowError, ValueError):
+    _BIGINT = False
+
+
+def xor_bytes(data):
+    """data 所有字节的异或"""
+    if _BIGINT and len(data) > 80:
+        x = int.from_bytes(data, 'little')
+        width = len(data)
+        while width > 1:
+            half = (width + 1) >> 1
+            x = (x >> (half * 8)) ^ (x & ((1 << (half * 8)) - 1))
+            width = half
+        return x
+    x = 0
+    for b in data:
+        x ^= b
+    return x
+
+
+def checksum(cmd, data_len, data):
+    """计算校验和（异或校验）"""
+    return cmd ^ ((data_len >> 8) & 0xFF) ^ (data_len & 0xFF) ^ xor_bytes(data)
+
+
+def pack_frame(cmd, data=b''):
+    """打包数据帧"""
+    data_len = len(data)
+    return b''.join((FRAME_HEADER, struct.pack('<BH', cmd, data_len), data,
+                     bytes((checksum(cmd, data_len, data), )), FRAME_TAIL))
+
+
+def unpack_frame(frame):
+    """解包一个完整数据帧，返回 (命令码, 数据长度, 数据域)，格式或校验错误返回 (None, None, None)"""
+    if len(frame) < FRAME_OVERHEAD or frame[:2] != FRAME_HEADER or frame[-2:] != FRAME_TAIL:
+        return None, None, None
+    cmd = frame[2]
+    data_len = frame[3] | (frame[4] << 8)
+    if data_len != len(frame) - FRAME_OVERHEAD:
+        return None, None, None
+    data = frame[5:5 + data_len]
+    if frame[5 + data_len] != checksum(cmd, data_len, data):
+        return None, None, None
+    return cmd, data_len, data
+
+
+class FrameReassembler:
+    """STM32 串口帧流式重组"""
+    def __init__(self, max_data_len=MAX_DATA_LEN):
+        self.max_data_len = max_data_len
+        self.buf = b''  # 未结束的帧，MicroPython 的 bytearray 不支持 find，这里用 bytes
+        self.frames = 0  # 校验通过的帧数
+        self.checksum_errors = 0  # 帧尾正确但校验和错误的帧数
+        self.resyncs = 0  # 帧尾、校验和或长度错误，重新查找帧头的次数
+        self.dropped_bytes = 0  # 帧头之前丢弃的字节数
+
+    def feed(self, data):
+        """
+        追加读到的数据，返回其中完整且校验通过的帧。
+
+        :return: [(命令码, 数据长度, 数据域), ...]
+        """
+        buf = self.buf + data if self.buf else bytes(data)
+        frames = []
+        pos = 0
+        size = len(buf)
+        while True:
+            start = buf.find(FRAME_HEADER, pos)
+            if start < 0:
+                # 末字节可能是下一帧帧头的第一个字节
+                keep = 1 if size > pos and buf[-1] == 0xAA else 0
+                self.dropped_bytes += size - pos - keep
+                pos = size - keep
+                break
+            self.dropped_bytes += start - pos
+            pos = start
+            if size - start < 5:
+                break
+            data_len = buf[start + 3] | (buf[start + 4] << 8)
+            if data_len > self.max_data_len:
+                self.resyncs += 1
+                pos = start + 1
+                continue
+            end = start + data_len + FRAME_OVERHEAD
+            if size < end:
+                break
+            if buf[end - 2:end] != FRAME_TAIL:
+                self.resyncs += 1
+                pos = start + 1
+                continue
+            cmd = buf[start + 2]
+            body = buf[start + 5:end - 3]
+            if buf[end - 3] != checksum(cmd, data_len, body):
+                self.checksum_errors += 1
+                self.resyncs += 1
+                pos = start + 1
+                continue
+            frames.append((cmd, data_len, body))
+            self.frames += 1
+            pos = end
+        self.buf = buf[pos:]
+        return frames
+
+    def reset(self):
+        self.buf = b''
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+传感器样本编解码
+单个样本为小端无对齐结构 <BhhhhhhhhhhhIfdd，共47字节：
+包序、加速度XYZ、角速度XYZ、角度XYZ、姿态角1/2、气压、高度、经度、纬度
+传感器数据上传帧（0x01）的数据域由若干个样本首尾相接组成
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+from stm32_protocol.frame import CMD_UP_DATA_UPLOAD, pack_frame
+
+SAMPLE_FORMAT = '<BhhhhhhhhhhhIfdd'
+SAMPLE_SIZE = 47
+SAMPLE_FIELDS = ('packet_order', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z',
+                 'angle_x', 'angle_y', 'angle_z', 'attitude1', 'attitude2', 'pressure',
+                 'altitude', 'longitude', 'latitude')
+
+try:
+    # CPython 预编译格式，批量解包用 iter_unpack；ustruct 没有 Struct 类
+    _SAMPLE_STRUCT = struct.Struct(SAMPLE_FORMAT)
+except AttributeError:
+    _SAMPLE_STRUCT = None
+
+
+def pack_sample(sample):
+    """打包一个样本，sample 为按 SAMPLE_FIELDS 顺序的元组/列表或以字段名为键的字典"""
+    if isinstance(sample, dict):
+        sample = [sample[name] for name in SAMPLE_FIELDS]
+    return struct.pack(SAMPLE_FORMAT, *sample)
+
+
+def pack_samples(samples):
+    """打包多个样本为数据域"""
+    return b''.join([pack_sample(s) for s in samples])
+
+
+def pack_sensor_frame(samples):
+    """将多个样本打包为传感器数据上传帧（0x01）"""
+    return pack_frame(CMD_UP_DATA_UPLOAD, pack_samples(samples))
+
+
+def unpack_sample(raw, offset=0):
+    """解包一个样本，返回按 SAMPLE_FIELDS 顺序的元组"""
+    return struct.unpack_from(SAMPLE_FORMAT, raw, offset)
+
+
+def unpack_samples(data):
+    """解包数据域中的所有样本，长度不是样本长度的整数倍时抛出 ValueError"""
+    if len(data) % SAMPLE_SIZE != 0:
+        raise ValueError("sensor data length %d is not a multiple of %d" % (len(data), SAMPLE_SIZE))
+    if _SAMPLE_STRUCT is not None:
+        return list(_SAMPLE_STRUCT.iter_unpack(data))
+    return [struct.unpack_from(SAMPLE_FORMAT, data, i) for i in range(0, len(data), SAMPLE_SIZE)]
+
+
+def split_samples(data):
+    """将数据域按样本切分为原始样本字节列表，长度不是样本长度的整数倍时返回空列表"""
+    if len(data) % SAMPLE_SIZE != 0:
+        return []
+    return [data[i:i + SAMPLE_SIZE] for i in range(0, len(data), SAMPLE_SIZE)]
+
+
+def sample_to_dict(values):
+    """样本元组转为以字段名为键的字典"""
+    return dict(zip(SAMPLE_FIELDS, values))
@@ -6,13 +6,26 @@
 - 电脑串口连接4G模块，模拟STM32发送传感器数据
 - 生成10组模拟传感器数据并轮询发送
 - 支持配置串口参数（COM5，115200波特率）
+- 压测模式（--load）：预先编码多样本帧，按目标样本速率（最高到串口线速）精确限速发送，
+  样本按运动场景（静止、步行、自由落体+撞击）生成，可注入位翻转、丢字节、截断帧、帧间垃圾字节和重复帧，
+  结束时报告注入的故障数和接收端应收到的完整帧数
+
+用法示例：
+    python stm32_simulation_test.py
+    python stm32_simulation_test.py --load --port COM5 --rate 2000 --per-frame 20 --profile walking --duration 30
+    python stm32_simulation_test.py --load --port /dev/pts/3 --rate 0 --bit-flip 0.01 --truncate 0.01 --garbage 0.05
 """
 
+import argparse
+import math
 import serial
-import struct
 import time
 import random
 
+from stm32_protocol import (CMD_UP_DATA_UPLOAD, CMD_DOWN_CONFIG_SET, CMD_UP_CONFIG_REPLY, CMD_UP_HEARTBEAT,
+                            CMD_DOWN_HEARTBEAT_REPLY, CMD_DOWN_RESET, CMD_UP_RESET_REPLY, FRAME_HEADER, FRAME_TAIL,
+                            FRAME_OVERHEAD, SAMPLE_SIZE, checksum, pack_frame, pack_sample, pack_samples)
+
 # =============================================================================
 # 配置参数
 # =============================================================================
@@ -20,23 +33,27 @@ SERIAL_PORT = "COM5"  # 串口设备
 BAUD_RATE = 115200  # 波特率
 DATA_SEND_INTERVAL = 0.1  # 数据发送间隔（秒）
 TEST_DATA_COUNT = 10  # 测试数据组数
+MIN_WRITE_INTERVAL = 0.002  # 压测模式每次写串口的最小间隔（秒），帧间隔更短时合并多帧一次写入
 
-# =============================================================================
-# 命令码定义
-# =============================================================================
-CMD_DATA_UPLOAD = 0x01
-CMD_CONFIG_SET = 0x02
-CMD_CONFIG_REPLY = 0x03
-CMD_HEARTBEAT = 0x04
-CMD_HEARTBEAT_REPLY = 0x05
-CMD_RESET = 0x06
-CMD_RESET_REPLY = 0x07
+# 运动场景的基准值：静止平放时Z轴约1g（1000mg），高度（米）与气压（Pa）按每米约12Pa换算
+BASE_ALTITUDE = 325.49
+BASE_PRESSURE = 101716
+BASE_LONGITUDE = 104.06
+BASE_LATITUDE = 30.66
+MOTION_PROFILES = ("idle", "walking", "freefall")
+PROFILE_PERIOD = 4.0  # 运动场景的周期（秒），压测模式预编码的帧至少覆盖一个周期
 
 # =============================================================================
-# 帧格式常量
+# 命令码定义
 # =============================================================================
-FRAME_HEADER = b'\xAA\x55'
-FRAME_TAIL = b'\x55\xAA'
+# 命令码、帧格式与4G模块程序共用 stm32_protocol 中的定义
+CMD_DATA_UPLOAD = CMD_UP_DATA_UPLOAD
+CMD_CONFIG_SET = CMD_DOWN_CONFIG_SET
+CMD_CONFIG_REPLY = CMD_UP_CONFIG_REPLY
+CMD_HEARTBEAT = CMD_UP_HEARTBEAT
+CMD_HEARTBEAT_REPLY = CMD_DOWN_HEARTBEAT_REPLY
+CMD_RESET = CMD_DOWN_RESET
+CMD_RESET_REPLY = CMD_UP_RESET_REPLY
 
 
 # =============================================================================
@@ -98,49 +115,16 @@ class STM32Simulator:
 
     def calculate_checksum(self, cmd, data_len, data):
         """计算校验和（异或校验）"""
-        checksum = cmd
-        checksum ^= (data_len >> 8) & 0xFF
-        checksum ^= data_len & 0xFF
-        for byte in data:
-            checksum ^= byte
-        return checksum
+        return checksum(cmd, data_len, data)
 
     def pack_frame(self, cmd, data=b''):
         """打包数据帧"""
-        data_len = len(data)
-        checksum = self.calculate_checksum(cmd, data_len, data)
-        frame = (
-            FRAME_HEADER +
-            struct.pack('B', cmd) +
-            struct.pack('H', data_len) +
-            data +
-            struct.pack('B', checksum) +
-            FRAME_TAIL
-        )
-        return frame
+        return pack_frame(cmd, data)
 
     def sensor_data_to_bytes(self, sensor_data):
         """将传感器数据转换为二进制格式"""
         # 按照协议格式打包数据，使用小端无对齐方式，字节长度为47字节 (<BhhhhhhhhhhhIfdd: 1+2*12+4+4+8+8=47字节)
-        data = struct.pack(
-            '<BhhhhhhhhhhhIfdd',
-            sensor_data['packet_order'],
-            sensor_data['accel_x'],
-            sensor_data['accel_y'],
-            sensor_data['accel_z'],
-            sensor_data['gyro_x'],
-            sensor_data['gyro_y'],
-            sensor_data['gyro_z'],
-            sensor_data['angle_x'],
-            sensor_data['angle_y'],
-            sensor_data['angle_z'],
-            sensor_data['attitude1'],
-            sensor_data['attitude2'],
-            sensor_data['pressure'],
-            sensor_data['altitude'],
-            sensor_data['longitude'],
-            sensor_data['latitude']
-        )
+        data = pack_sample(sensor_data)
         return data
 
     def send_frame(self):
@@ -186,9 +170,10 @@ class STM32Simulator:
 # 负责生成模拟的传感器数据
 # =============================================================================
 class SensorDataGenerator:
-    """传感器数据生成器类"""
-    def __init__(self):
+    """传感器数据生成器类，seed 用于独立的随机数生成器，不影响全局 random"""
+    def __init__(self, seed=None):
         self.packet_order = 0
+        self.random = random.Random(seed)
 
     def generate_sensor_data(self):
         """生成传感器数据样本"""
@@ -197,33 +182,33 @@ class SensorDataGenerator:
         self.packet_order += 1
 
         # 加速度数据（mg） - 范围-32768~32767
-        accel_x = random.randint(-32768, 32767)
-        accel_y = random.randint(-32768, 32767)
-        accel_z = random.randint(-32768, 32767)  # 重力加速度
+        accel_x = self.random.randint(-32768, 32767)
+        accel_y = self.random.randint(-32768, 32767)
+        accel_z = self.random.randint(-32768, 32767)  # 重力加速度
 
         # 角速度数据（°/s） - 范围-32768~32767
-        gyro_x = random.randint(-32768, 32767)
-        gyro_y = random.randint(-32768, 32767)
-        gyro_z = random.randint(-32768, 32767)
+        gyro_x = self.random.randint(-32768, 32767)
+        gyro_y = self.random.randint(-32768, 32767)
+        gyro_z = self.random.randint(-32768, 32767)
 
         # 角度数据（°） - 范围-32768~32767
-        angle_x = random.randint(-32768, 32767)
-        angle_y = random.randint(-32768, 32767)
-        angle_z = random.randint(-32768, 32767)
+        angle_x = self.random.randint(-32768, 32767)
+        angle_y = self.random.randint(-32768, 32767)
+        angle_z = self.random.randint(-32768, 32767)
 
         # 姿态数据（°） - 范围-32768~32767
-        attitude1 = random.randint(-32768, 32767)
-        attitude2 = random.randint(-32768, 32767)
+        attitude1 = self.random.randint(-32768, 32767)
+        attitude2 = self.random.randint(-32768, 32767)
 
         # 气压数据（Pa） - 范围0~4294967295
-        pressure = random.randint(0, 4294967295)
+        pressure = self.random.randint(0, 4294967295)
 
         # 海拔数据（米） - 范围-1000~10000米，精度0.01米
-        altitude = random.uniform(-1000, 10000)
+        altitude = self.random.uniform(-1000, 10000)
 
         # 经度和纬度数据
-        longitude = random.uniform(-180, 180)
-        latitude = random.uniform(-90, 90)
+        longitude = self.random.uniform(-180, 180)
+        latitude = self.random.uniform(-90, 90)
 
         return {
             'packet_order': packet_order,
@@ -244,6 +229,66 @@ class SensorDataGenerator:
             'latitude': latitude
         }
 
+    def generate_motion_sample(self, profile, t):
+        """
+        按运动场景生成 t 秒时的样本，包序自增
+        - idle：平放静止，只有小幅噪声
+        - walking：约2步/秒，竖直方向加速度和俯仰角周期变化，缓慢移动经纬度
+        - freefall：每4秒一个周期，1秒静止、0.45秒自由落体（约1米，合加速度接近0）、
+          0.05秒撞击（加速度峰值约8g）、之后侧躺静止
+        """
+        packet_order = self.packet_order % 256
+        self.packet_order += 1
+        noise = lambda scale: self.random.randint(-scale, scale)
+        accel = [noise(8), noise(8), 1000 + noise(8)]
+        gyro = [noise(2), noise(2), noise(2)]
+        angle = [noise(1), noise(1), noise(1)]
+        drop = 0.0
+        longitude, latitude = BASE_LONGITUDE, BASE_LATITUDE
+        if profile == "walking":
+            phase = 2 * math.pi * 2.0 * t
+            accel = [int(150 * math.sin(phase / 2)) + noise(20), int(60 * math.cos(phase)) + noise(20),
+                     1000 + int(300 * math.sin(phase)) + noise(30)]
+            gyro = [int(40 * math.cos(phase)) + noise(5), int(15 * math.sin(phase / 2)) + noise(5), noise(5)]
+            angle = [int(5 * math.sin(phase)), int(3 * math.sin(phase / 2)), int(t * 2) % 360 - 180]
+            longitude += 1.4 * t * 1e-5
+        elif profile == "freefall":
+            cycle = t % 4.0
+            if 1.0 <= cycle < 1.45:
+                fall = cycle - 1.0
+                accel = [noise(30), noise(30), noise(30)]
+                gyro = [int(200 * fall) + noise(10), noise(10), noise(10)]
+                drop = 4.9 * fall * fall
+            elif 1.45 <= cycle < 1.5:
+                decay = 1.0 - (cycle - 1.45) / 0.05
+                accel = [int(6000 * decay) + noise(200), int(3000 * decay) + noise(200), int(5000 * decay) + noise(200)]
+                gyro = [int(800 * decay) + noise(50), int(-500 * decay) + noise(50), noise(50)]
+                drop = 1.0
+            elif cycle >= 1.5:
+                # 撞击后侧躺，重力落在X轴
+                accel = [1000 + noise(8), noise(8), noise(8)]
+                angle = [90 + noise(1), noise(1), noise(1)]
+                drop = 1.0
+        altitude = BASE_ALTITUDE - drop
+        return {
+            'packet_order': packet_order,
+            'accel_x': accel[0],
+            'accel_y': accel[1],
+            'accel_z': accel[2],
+            'gyro_x': gyro[0],
+            'gyro_y': gyro[1],
+            'gyro_z': gyro[2],
+            'angle_x': angle[0],
+            'angle_y': angle[1],
+            'angle_z': angle[2],
+            'attitude1': angle[0],
+            'attitude2': angle[1],
+            'pressure': BASE_PRESSURE + int(drop * 12) + noise(2),
+            'altitude': round(altitude, 2),
+            'longitude': longitude,
+            'latitude': latitude
+        }
+
     def generate_multiple_samples(self, count):
         """生成多个传感器数据样本"""
         samples = []
@@ -254,25 +299,7 @@ class SensorDataGenerator:
     def sensor_data_to_bytes(self, sensor_data):
         """将传感器数据转换为二进制格式"""
         # 按照协议格式打包数据，使用小端无对齐方式，字节长度为47字节 (<BhhhhhhhhhhhIfdd: 1+2*12+4+4+8+8=47字节)
-        data = struct.pack(
-            '<BhhhhhhhhhhhIfdd',
-            sensor_data['packet_order'],
-            sensor_data['accel_x'],
-            sensor_data['accel_y'],
-            sensor_data['accel_z'],
-            sensor_data['gyro_x'],
-            sensor_data['gyro_y'],
-            sensor_data['gyro_z'],
-            sensor_data['angle_x'],
-            sensor_data['angle_y'],
-            sensor_data['angle_z'],
-            sensor_data['attitude1'],
-            sensor_data['attitude2'],
-            sensor_data['pressure'],
-            sensor_data['altitude'],
-            sensor_data['longitude'],
-            sensor_data['latitude']
-        )
+        data = pack_sample(sensor_data)
         print(f"打包后的字节长度: {len(data)} 字节")
         hex_str = ' '.join(f'{byte:02X}' for byte in data)
         print(f"打包后的字节内容: [{hex_str}]")
@@ -280,28 +307,214 @@ class SensorDataGenerator:
 
     def multiple_samples_to_bytes(self, sensor_data_list):
         """将多个传感器数据样本转换为二进制格式"""
-        data = b''
-        for sensor_data in sensor_data_list:
-            data += self.sensor_data_to_bytes(sensor_data)
-        return data
+        return pack_samples(sensor_data_list)
+
+
+# =============================================================================
+# 故障注入类
+# 按概率损坏或复制帧，并统计注入的故障
+# =============================================================================
+class FaultInjector:
+    """
+    故障注入：每帧依次按概率判定
+    - duplicate：整帧重复发送一次（接收端多收到一帧）
+    - bit_flip：帧内随机一位翻转
+    - drop_byte：删除帧内随机一个字节
+    - truncate：只发送帧的前一部分
+    - garbage：帧前插入随机垃圾字节（不含0xAA，不会构成帧头）
+    损坏（位翻转、丢字节、截断）的帧接收端应丢弃，之后的帧应能重新同步收到
+    """
+    def __init__(self, bit_flip=0.0, drop_byte=0.0, truncate=0.0, garbage=0.0, duplicate=0.0, seed=None):
+        self.rates = {'bit_flip': bit_flip, 'drop_byte': drop_byte, 'truncate': truncate,
+                      'garbage': garbage, 'duplicate': duplicate}
+        self.random = random.Random(seed)
+        self.injected = dict((name, 0) for name in self.rates)
+        self.garbage_bytes = 0
+        self.intact_frames = 0  # 完整发出的帧数（含重复的帧），即接收端应收到的帧数
+
+    def apply(self, frame):
+        """返回注入故障后要发送的字节"""
+        rnd = self.random.random
+        rates = self.rates
+        out = b''
+        if rates['garbage'] and rnd() < rates['garbage']:
+            size = self.random.randint(1, 16)
+            out = bytes(self.random.choice(range(0xAA)) for _ in range(size))
+            self.injected['garbage'] += 1
+            self.garbage_bytes += size
+        copies = 1
+        if rates['duplicate'] and rnd() < rates['duplicate']:
+            copies = 2
+            self.injected['duplicate'] += 1
+        damaged = frame
+        if rates['bit_flip'] and rnd() < rates['bit_flip']:
+            pos = self.random.randrange(len(frame))
+            damaged = damaged[:pos] + bytes((damaged[pos] ^ (1 << self.random.randrange(8)), )) + damaged[pos + 1:]
+            self.injected['bit_flip'] += 1
+        elif rates['drop_byte'] and rnd() < rates['drop_byte']:
+            pos = self.random.randrange(len(frame))
+            damaged = damaged[:pos] + damaged[pos + 1:]
+            self.injected['drop_byte'] += 1
+        elif rates['truncate'] and rnd() < rates['truncate']:
+            damaged = damaged[:self.random.randint(2, len(frame) - 1)]
+            self.injected['truncate'] += 1
+        if damaged is frame:
+            self.intact_frames += copies
+            return out + frame * copies
+        # 重复的帧只有第一份损坏
+        self.intact_frames += copies - 1
+        return out + damaged + frame * (copies - 1)
+
+    def report(self):
+        result = dict(self.injected)
+        result['garbage_bytes'] = self.garbage_bytes
+        result['expected_frames'] = self.intact_frames
+        return result
+
+
+# =============================================================================
+# 压测发送类
+# 预先编码一组多样本帧，循环发送并按目标样本速率限速
+# =============================================================================
+class LoadGenerator:
+    """STM32压测发送"""
+    def __init__(self, write, baudrate=BAUD_RATE, sample_rate=1000, per_frame=20, profile="walking",
+                 faults=None, pool_frames=None, seed=None):
+        """
+        :param write: 写串口的函数，如 serial.Serial.write
+        :param sample_rate: 目标样本速率（个/秒），0或超过线速时按线速
+        :param pool_frames: 预编码的帧数，缺省按 PROFILE_PERIOD 和包序（0~255）循环推算
+        """
+        self.write = write
+        self.per_frame = per_frame
+        self.faults = faults or FaultInjector()
+        frame_size = per_frame * SAMPLE_SIZE + FRAME_OVERHEAD
+        # 每字节10位（起始位+8数据位+停止位）
+        self.line_rate = baudrate / 10.0 / frame_size * per_frame
+        self.sample_rate = min(sample_rate, self.line_rate) if sample_rate > 0 else self.line_rate
+        if pool_frames is None:
+            # 覆盖一个运动场景周期，且帧数是包序循环一周所需帧数的整数倍，循环发送时包序连续
+            cycle = 256 // math.gcd(256, per_frame)
+            needed = int(math.ceil(PROFILE_PERIOD * self.sample_rate / per_frame))
+            pool_frames = int(math.ceil(needed / float(cycle))) * cycle
+        generator = SensorDataGenerator(seed)
+        self.pool = []
+        for i in range(pool_frames):
+            samples = [generator.generate_motion_sample(profile, (i * per_frame + j) / self.sample_rate)
+                       for j in range(per_frame)]
+            self.pool.append(pack_frame(CMD_DATA_UPLOAD, pack_samples(samples)))
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.max_lag = 0.0  # 相对计划发送时间的最大滞后（秒）
+        self.elapsed = 0.0
+
+    def next_frames(self, count):
+        """取出接下来 count 帧（已注入故障）的字节"""
+        pool = self.pool
+        out = []
+        for i in range(self.frames_sent, self.frames_sent + count):
+            out.append(self.faults.apply(pool[i % len(pool)]))
+        self.frames_sent += count
+        return b''.join(out)
+
+    def run(self, duration=None, frames=None, clock=time.monotonic, sleep=time.sleep):
+        """发送 duration 秒或 frames 帧，按帧计划时间发送，帧间隔小于 MIN_WRITE_INTERVAL 时合并多帧写入"""
+        interval = self.per_frame / self.sample_rate
+        batch = max(1, int(math.ceil(MIN_WRITE_INTERVAL / interval)))
+        start = clock()
+        sent = 0
+        while True:
+            if frames is not None and sent >= frames:
+                break
+            due = start + sent * interval
+            if duration is not None and due - start >= duration:
+                break
+            delay = due - clock()
+            if delay > 0:
+                sleep(delay)
+            else:
+                self.max_lag = max(self.max_lag, -delay)
+            count = batch if frames is None else min(batch, frames - sent)
+            data = self.next_frames(count)
+            self.write(data)
+            self.bytes_sent += len(data)
+            sent += count
+        self.elapsed = clock() - start
+        return self.report()
+
+    def report(self):
+        result = self.faults.report()
+        result.update({
+            'frames_sent': self.frames_sent,
+            'samples_sent': self.frames_sent * self.per_frame,
+            'bytes_sent': self.bytes_sent,
+            'target_rate': self.sample_rate,
+            'line_rate': self.line_rate,
+            'elapsed': self.elapsed,
+            'max_lag_ms': self.max_lag * 1000,
+        })
+        return result
 
 
 # =============================================================================
 # 主函数
 # 程序入口，负责初始化各种组件并启动主循环
 # =============================================================================
+def run_load(args):
+    """压测模式"""
+    faults = FaultInjector(args.bit_flip, args.drop_byte, args.truncate, args.garbage, args.duplicate, args.seed)
+    ser = serial.Serial(port=args.port, baudrate=args.baud, timeout=1)
+    generator = LoadGenerator(ser.write, args.baud, args.rate, args.per_frame, args.profile, faults,
+                              seed=args.seed)
+    print(f"压测: {args.port} @ {args.baud} bps，场景 {args.profile}，每帧 {args.per_frame} 个样本，"
+          f"目标 {generator.sample_rate:.0f} 样本/秒（线速上限 {generator.line_rate:.0f}）")
+    try:
+        report = generator.run(args.duration)
+    except KeyboardInterrupt:
+        report = generator.report()
+    finally:
+        ser.close()
+    print("=" * 50)
+    print(f"发送 {report['frames_sent']} 帧，{report['samples_sent']} 个样本，{report['bytes_sent']} 字节，"
+          f"实际 {report['samples_sent'] / max(report['elapsed'], 1e-9):.0f} 样本/秒，"
+          f"最大滞后 {report['max_lag_ms']:.1f} ms")
+    print(f"注入: 位翻转 {report['bit_flip']}，丢字节 {report['drop_byte']}，截断 {report['truncate']}，"
+          f"垃圾字节 {report['garbage']} 处（{report['garbage_bytes']} 字节），重复帧 {report['duplicate']}")
+    print(f"接收端应收到完整帧: {report['expected_frames']}")
+    print("=" * 50)
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="STM32模拟器测试程序")
+    parser.add_argument("--load", action="store_true", help="压测模式")
+    parser.add_argument("--port", default=SERIAL_PORT, help="串口设备")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE, help="波特率")
+    parser.add_argument("--rate", type=float, default=1000, help="目标样本速率（个/秒），0为串口线速")
+    parser.add_argument("--per-frame", type=int, default=20, help="每帧样本数")
+    parser.add_argument("--profile", choices=MOTION_PROFILES, default="walking", help="运动场景")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--bit-flip", type=float, default=0.0, help="帧内位翻转的概率")
+    parser.add_argument("--drop-byte", type=float, default=0.0, help="帧内丢一个字节的概率")
+    parser.add_argument("--truncate", type=float, default=0.0, help="截断帧的概率")
+    parser.add_argument("--garbage", type=float, default=0.0, help="帧前插入垃圾字节的概率")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="重复发送帧的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+    if args.load:
+        run_load(args)
+        return
+
     print("=" * 50)
     print("STM32模拟器测试程序")
     print("=" * 50)
-    print(f"串口配置: {SERIAL_PORT} @ {BAUD_RATE} bps")
+    print(f"串口配置: {args.port} @ {args.baud} bps")
     print(f"发送间隔: {DATA_SEND_INTERVAL} 秒")
     print("发送固定数据包")
     print("=" * 50)
 
     # 初始化STM32模拟器
-    stm32 = STM32Simulator(SERIAL_PORT, BAUD_RATE)
+    stm32 = STM32Simulator(args.port, args.baud)
     if not stm32.connect():
         print("无法连接到串口，程序退出")
         return
@@ -4,24 +4,24 @@
 测试修改后的高度参数精度问题
 """
 
-import struct
 import ujson
 
+from stm32_protocol import SAMPLE_FORMAT, SAMPLE_SIZE, pack_sample, unpack_sample
+
 def test_altitude_parsing():
     """测试高度参数的解析和格式化"""
     print("=" * 50)
     print("测试修改后的高度参数精度")
     print("=" * 50)
     
-    # 测试数据结构 '<BhhhhhhhhhhhIfdd'
+    # 测试数据结构 SAMPLE_FORMAT（stm32_protocol.sample）
     # 对应字段: packet_order(1), accel_x(2), accel_y(3), accel_z(4), 
     # gyro_x(5), gyro_y(6), gyro_z(7), angle_x(8), angle_y(9), angle_z(10),
     # attitude1(11), attitude2(12), pressure(13), altitude(14), 
     # longitude(15), latitude(16)
     
     # 测试数据
-    test_data = struct.pack(
-        '<BhhhhhhhhhhhIfdd',
+    test_data = pack_sample((
         1,      # packet_order
         -91,    # accel_x
         0,      # accel_y
@@ -38,15 +38,15 @@ def test_altitude_parsing():
         502.98, # altitude (4字节浮点)
         104.06, # longitude
         30.66   # latitude
-    )
+    ))
     
     print("原始二进制数据长度: {}".format(len(test_data)))
-    print("预期长度: 47字节")
-    assert len(test_data) == 47, "数据长度不符合预期"
+    print("预期长度: {}字节（{}）".format(SAMPLE_SIZE, SAMPLE_FORMAT))
+    assert len(test_data) == SAMPLE_SIZE, "数据长度不符合预期"
     
     # 解析数据
     try:
-        sensor_data = struct.unpack('<BhhhhhhhhhhhIfdd', test_data)
+        sensor_data = unpack_sample(test_data)
         print("解析成功")
         
         print("原始高度值: {}".format(sensor_data[13]))
@@ -91,13 +91,12 @@ def test_multiple_altitudes():
     for altitude in test_altitudes:
         try:
             # 创建测试数据
-            test_data = struct.pack(
-                '<BhhhhhhhhhhhIfdd',
+            test_data = pack_sample((
                 1, -91, 0, 27, -11, 10, -11, -11, 10, -11, 7, 410, 101716,
                 altitude, 104.06, 30.66
-            )
+            ))
             
-            sensor_data = struct.unpack('<BhhhhhhhhhhhIfdd', test_data)
+            sensor_data = unpack_sample(test_data)
             
             # 格式化高度值
             formatted_altitude = float("{0:.2f}".format(sensor_data[13]))
@@ -136,13 +135,12 @@ def test_edge_cases():
     
     for altitude in edge_altitudes:
         try:
-            test_data = struct.pack(
-                '<BhhhhhhhhhhhIfdd',
+            test_data = pack_sample((
                 1, -91, 0, 27, -11, 10, -11, -11, 10, -11, 7, 410, 101716,
                 altitude, 104.06, 30.66
-            )
+            ))
             
-            sensor_data = struct.unpack('<BhhhhhhhhhhhIfdd', test_data)
+            sensor_data = unpack_sample(test_data)
             
             formatted_altitude = float("{0:.2f}".format(sensor_data[13]))
             
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 device/main.py 的上电流程（基于 emulator 仿真模块）
+- 附网期间STM32发来的数据不丢失
+- 对时完成后回填缓存样本的时间戳
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from emulator.run_device import QPY_DIR, STM32Feeder, load_device_main
+
+
+class TestBootSequence(unittest.TestCase):
+    """非阻塞上电流程测试"""
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, QPY_DIR)
+        import sim
+        import checkNet
+        import net
+        import umqtt
+        import machine
+        sim.READY_AFTER_S = 0.5
+        checkNet.CONNECT_AFTER_S = 1.0
+        net.NITZ_AFTER_S = 2.0
+        cls.umqtt = umqtt
+        cls.device = load_device_main()
+        cls.feeder = STM32Feeder(machine.link(machine.UART.UART2), 20, 1)
+        cls.feeder.start()
+        threading.Thread(target=cls.device.main, daemon=True).start()
+        time.sleep(6)
+        cls.feeder.running = False
+        time.sleep(1.5)
+
+    def _sensor_payloads(self):
+        payloads = []
+        for _, _, msg in self.umqtt.MQTTClient.published:
+            payload = json.loads(msg)
+            if payload.get('event') == 'SENSOR_DATA':
+                payloads.append(payload)
+        return payloads
+
+    def test_power_on_published_first(self):
+        """上电事件在传感器数据之前发布"""
+        first = json.loads(self.umqtt.MQTTClient.published[0][2])
+        self.assertEqual(first['event'], 'POWER_ON')
+
+    def test_samples_before_network_kept(self):
+        """附网前收到的样本也被上传"""
+        published = sum(len(p['data']) for p in self._sensor_payloads())
+        # 上电后0~2秒（网络未就绪）约有40个样本，允许少量在途数据
+        self.assertGreaterEqual(published, self.feeder.sent_samples - 5)
+
+    def test_timestamps_backfilled(self):
+        """对时前样本的时间戳不再是RTC默认时间"""
+        for payload in self._sensor_payloads():
+            for sample in payload['data']:
+                self.assertFalse(sample['timestamp'].startswith('2000-'), sample['timestamp'])
+
+    def test_backfill_walks_pending_records(self):
+        """回填遍历仍待上传的全部记录（超过积压上限的较新批次也回填），未记录接收时刻的样本不变"""
+        device = self.device
+        records = [[b'\x00', 0] for _ in range(device.BOOT_BACKLOG_MAX_SAMPLES + 500)]
+        now = device.utime.ticks_ms()
+        rx_ticks = {id(record): now for record in records[:-1]}
+        count = device.backfill_timestamps(rx_ticks, [records[:1000], records[1000:]])
+        self.assertEqual(count, len(records) - 1)
+        self.assertLessEqual(abs(records[-2][1] - device.rtc_epoch()), 1)
+        self.assertEqual(records[-1][1], 0)
+
+    def test_format_epoch(self):
+        """秒数格式化"""
+        self.assertEqual(self.device.format_epoch(0), "1970-01-01 00:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
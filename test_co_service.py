@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试CO传感器帧重组（co_sensor/protocol.py）及多串口采集服务（co_sensor/service.py）
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+import serial
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from co_sensor import CMD_READ, FrameReassembler, decode_frame, make_frame
+from co_sensor.service import CoService, PortConfig, ReadingBatcher, SensorPort
+from co_sensor.simulator import SensorBank
+
+
+class TestFrameReassembler(unittest.TestCase):
+    """FrameReassembler类测试"""
+
+    def test_decode(self):
+        """主动上报帧和读取响应帧的浓度位置不同"""
+        self.assertEqual(decode_frame(make_frame(0x19, [0x04, 0x00, 0x00, 0x2A, 0x13, 0x88])), 42)
+        self.assertEqual(decode_frame(make_frame(0x86, [0, 0, 0, 0, 0x13, 0x88])), 5000)
+        self.assertEqual(make_frame(0x01, [0x86, 0, 0, 0, 0, 0]), CMD_READ)
+        self.assertIsNone(decode_frame(make_frame(0x86, [0, 0, 0, 0, 0, 1])[:-1] + b'\x00'))
+
+    def test_split_frames(self):
+        """帧被任意切分时按顺序还原"""
+        stream = b''.join(make_frame(0x86, [0, 0, 0, 0, 0, ppm]) for ppm in range(1, 11))
+        reassembler = FrameReassembler()
+        readings = []
+        for i in range(0, len(stream), 4):
+            readings.extend(reassembler.feed(stream[i:i + 4]))
+        self.assertEqual(readings, list(range(1, 11)))
+        self.assertEqual((reassembler.resyncs, reassembler.dropped_bytes), (0, 0))
+
+    def test_resync(self):
+        """杂散字节和校验和错误的帧被跳过，之后的帧正常解析"""
+        good = make_frame(0x86, [0, 0, 0, 0, 0x13, 0x88])
+        bad = good[:-1] + b'\x00'
+        reassembler = FrameReassembler()
+        readings = reassembler.feed(b'\x00\x12' + b'\xff\x01' + good + bad + good)
+        self.assertEqual(readings, [5000, 5000])
+        self.assertGreaterEqual(reassembler.resyncs, 2)
+        self.assertEqual(reassembler.frames, 2)
+
+
+class TestReadingBatcher(unittest.TestCase):
+    """ReadingBatcher类测试"""
+
+    def test_batch_size(self):
+        """满一批立即发布，flush 发布剩余读数"""
+        published = []
+        batcher = ReadingBatcher(lambda topic, payload: published.append((topic, payload)), "123", batch_size=3)
+        for i in range(4):
+            batcher.add("ttyUSB0", i, "2025-01-01 00:00:00")
+        self.assertEqual(len(published), 1)
+        batcher.flush()
+        batcher.flush()
+        self.assertEqual([topic for topic, _ in published], ["up/123", "up/123"])
+        message = json.loads(published[0][1])
+        self.assertEqual(message['event'], "CO_DATA")
+        self.assertEqual([r['co_ppm'] for r in message['data']], [0, 1, 2])
+        self.assertEqual(batcher.published_readings, 4)
+
+    def test_port_spec(self):
+        config = PortConfig.parse("/dev/ttyUSB1:passive:0.5")
+        self.assertEqual((config.path, config.mode, config.interval, config.name),
+                         ("/dev/ttyUSB1", "passive", 0.5, "ttyUSB1"))
+        self.assertEqual(PortConfig.parse("COM4").mode, "active")
+        with self.assertRaises(ValueError):
+            PortConfig.parse("COM4:push")
+
+
+@unittest.skipUnless(hasattr(os, "openpty"), "需要 pty")
+class TestCoService(unittest.TestCase):
+    """多串口采集服务与 pty 仿真传感器联调"""
+
+    COUNT = 32
+
+    def run_service(self, noise_rate=0.0, bad_checksum_rate=0.0, duration=2.5):
+        published = []
+        bank = SensorBank(self.COUNT, period=0.1, noise_rate=noise_rate, bad_checksum_rate=bad_checksum_rate, seed=7)
+        configs = [PortConfig(path, 'active' if i % 2 == 0 else 'passive', 0.1, name=f"co{i}")
+                   for i, path in enumerate(bank.paths)]
+        service = CoService(configs, lambda topic, payload: published.append(json.loads(payload)),
+                            site_id="862701086120524", batch_size=100, batch_interval=0.5)
+
+        async def scenario():
+            bank.start()
+            try:
+                await service.run(duration)
+            finally:
+                await bank.stop()
+        asyncio.run(scenario())
+        return bank, service, published
+
+    def test_many_ports(self):
+        """32路传感器（一半主动上报、一半被动查询）在一个进程内同时采集，读数按批发布"""
+        bank, service, published = self.run_service()
+        for i, (name, mode, readings, last_ppm, resyncs, dropped) in enumerate(service.stats()):
+            self.assertEqual(mode, bank.sensors[i].mode)
+            self.assertGreater(readings, 5, name)
+            self.assertLessEqual(abs(last_ppm - bank.sensors[i].ppm), 4)  # 停止采集后仿真器可能又发出一两帧
+            self.assertEqual(resyncs, 0)
+        total = sum(port.readings for port in service.ports)
+        self.assertEqual(sum(len(message['data']) for message in published), total)
+        self.assertTrue(all(len(message['data']) <= 100 for message in published))
+        self.assertEqual(set(r['port'] for message in published for r in message['data']),
+                         set(f"co{i}" for i in range(self.COUNT)))
+
+    def test_noise_resync(self):
+        """注入杂散字节和校验和错误时重新同步，不产生错误读数"""
+        bank, service, published = self.run_service(noise_rate=0.2, bad_checksum_rate=0.1)
+        self.assertGreater(sum(port.reassembler.resyncs for port in service.ports), 0)
+        for port in service.ports:
+            self.assertGreater(port.readings, 3)
+        values = set(r['co_ppm'] for message in published for r in message['data'])
+        self.assertTrue(all(ppm <= 100 for ppm in values))
+
+    def test_disconnect_stops_port(self):
+        """串口断开后停止读取并关闭串口，记录失败，不反复回调"""
+        master, slave = os.openpty()
+        port = SensorPort(PortConfig(os.ttyname(slave), 'active', name="co0"), ReadingBatcher(lambda *a: None, "1"))
+
+        async def scenario():
+            task = asyncio.ensure_future(port.run())
+            await asyncio.sleep(0.7)  # 模式设置后开始监听
+            os.close(master)
+            await asyncio.wait_for(task, 2)
+        try:
+            asyncio.run(scenario())
+        finally:
+            os.close(slave)
+        self.assertEqual(port.errors, 1)
+        self.assertIsInstance(port.failure, serial.SerialException)
+        self.assertIsNone(port.fd)
+        self.assertFalse(port.ser.is_open)
+
+
+if __name__ == '__main__':
+    unittest.main()
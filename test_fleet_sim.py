@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试车队仿真（fleet）：MQTT 编解码、本地代理转发及虚拟设备发布的载荷、事件和速率
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fleet import AsyncMqttClient, decode_publish, encode_publish, read_packet, topic_matches
+from fleet.broker import MiniBroker
+from fleet.simulator import FleetSimulator, make_imei, run_sharded
+
+
+def luhn_ok(number):
+    total = 0
+    for i, ch in enumerate(reversed(number)):
+        digit = int(ch)
+        if i % 2 == 1:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+class TestMqttCodec(unittest.TestCase):
+    """fleet.mqtt 编解码测试"""
+
+    def test_topic_matches(self):
+        self.assertTrue(topic_matches('up/+', 'up/861197060000010'))
+        self.assertTrue(topic_matches('up/#', 'up/a/b'))
+        self.assertTrue(topic_matches('#', 'down/x'))
+        self.assertFalse(topic_matches('up/+', 'up/a/b'))
+        self.assertFalse(topic_matches('up/+', 'down/a'))
+        self.assertFalse(topic_matches('up/a/c', 'up/a'))
+
+    def test_publish_round_trip(self):
+        """剩余长度为1、2、3字节的报文都能读回"""
+        async def read_all(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return [await read_packet(reader) for _ in range(3)]
+        payloads = [b'x', b'y' * 300, b'z' * 20000]
+        packets = asyncio.run(read_all(b''.join(encode_publish('up/1', p) for p in payloads)))
+        self.assertEqual([decode_publish(flags, body) for _, flags, body in packets],
+                         [('up/1', p) for p in payloads])
+
+
+class TestFleetSimulator(unittest.TestCase):
+    """FleetSimulator 经本地代理发布，订阅 up/+ 检查收到的消息"""
+
+    def test_imei(self):
+        imeis = [make_imei(i) for i in range(1000)]
+        self.assertEqual(len(set(imeis)), 1000)
+        self.assertTrue(all(len(imei) == 15 and luhn_ok(imei) for imei in imeis))
+
+    def run_fleet(self, duration, **kwargs):
+        async def scenario():
+            broker = await MiniBroker(port=0).start()
+            received = []
+            monitor = AsyncMqttClient('monitor', on_message=lambda topic, payload: received.append((topic, payload)))
+            await monitor.connect('127.0.0.1', broker.port)
+            await monitor.subscribe([('up/+', 0)])
+            summary = await FleetSimulator(port=broker.port, seed=1, **kwargs).run(duration)
+            await asyncio.sleep(0.2)
+            await monitor.close()
+            await broker.stop()
+            return broker, received, summary
+        return asyncio.run(scenario())
+
+    def test_payloads_and_events(self):
+        broker, received, summary = self.run_fleet(2.0, devices=20, rate=40, heartbeat_interval=0.5,
+                                                   timeout_prob=0.2, stm32_timeout=0.3)
+        self.assertEqual(summary['connected'], 20)
+        self.assertEqual(broker.received, summary['messages'])
+        self.assertEqual(len(received), summary['messages'])
+        events = {}
+        orders = {}
+        for topic, payload in received:
+            message = json.loads(payload)
+            imei = topic.split('/')[1]
+            events.setdefault(message['event'], set()).add(imei)
+            if message['event'] == 'POWER_ON':
+                self.assertEqual(message['imei'], imei)
+            elif message['event'] == 'SENSOR_DATA':
+                self.assertEqual(len(message['data']), 10)
+                self.assertEqual(len(message['data'][0]), 18)
+                for sample in message['data']:
+                    previous = orders.get(imei)
+                    if previous is not None:
+                        self.assertEqual(sample['packet_order'], (previous + 1) % 256)
+                    orders[imei] = sample['packet_order']
+        self.assertEqual(len(events['POWER_ON']), 20)
+        self.assertEqual(len(events['SENSOR_DATA']), 20)
+        self.assertIn('HEARTBEAT', events)
+        self.assertIn('SENSOR_REPORT_TIMEOUT', events)
+        for event in events:
+            self.assertGreater(summary['counts'][event], 0, event)
+
+    def test_rate(self):
+        broker, received, summary = self.run_fleet(3.0, devices=100, rate=200, heartbeat_interval=60)
+        achieved = summary['steady_sensor'] / summary['steady_duration']
+        self.assertAlmostEqual(achieved, 200, delta=20)
+
+    def test_sharded(self):
+        """两个进程分片，合并后的设备数和消息数与代理收到的一致"""
+        loop = asyncio.new_event_loop()
+        broker = loop.run_until_complete(MiniBroker(port=0).start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            summary = run_sharded(2, 31, 62, 1.5, port=broker.port, seed=1, subscribe=False)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        self.assertEqual((summary['processes'], summary['devices'], summary['connected']), (2, 31, 31))
+        self.assertEqual(summary['counts']['POWER_ON'], 31)
+        self.assertEqual(broker.received, summary['messages'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 device/main.py 中的网关日志类 GatewayLogger（基于 emulator 仿真模块）
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from emulator.run_device import load_device_main
+
+device = load_device_main()
+
+
+class TestGatewayLogger(unittest.TestCase):
+    """GatewayLogger类测试"""
+
+    def setUp(self):
+        self.logger = device.GatewayLogger("DEBUG", 4, 60000)
+        self.logger.console = False
+
+    def test_level_filter(self):
+        """低于当前级别的日志不记录"""
+        self.logger.set_level("WARN")
+        self.logger.info("info %d", (1,))
+        self.logger.warn("warn %d", (2,))
+        self.assertEqual([e[2] for e in self.logger.dump()], ["warn 2"])
+
+    def test_invalid_level(self):
+        """无效级别名不改变当前级别"""
+        self.assertFalse(self.logger.set_level("VERBOSE"))
+        self.assertEqual(self.logger.level_name(), "DEBUG")
+
+    def test_rate_limit(self):
+        """同一日志键在限流间隔内只输出一次"""
+        for i in range(10):
+            self.logger.info("publish %d", (i,), key='publish')
+        self.logger.info("other")
+        self.assertEqual([e[2] for e in self.logger.dump()], ["publish 0", "other"])
+        self.assertEqual(self.logger._rate_state['publish'][1], 9)
+
+    def test_ring_buffer(self):
+        """环形缓冲区只保留最近的日志，按时间顺序导出"""
+        for i in range(6):
+            self.logger.info("msg %d", (i,))
+        self.assertEqual([e[2] for e in self.logger.dump()], ["msg 2", "msg 3", "msg 4", "msg 5"])
+        self.assertEqual([e[2] for e in self.logger.dump(2)], ["msg 4", "msg 5"])
+
+    def test_downlink_log_level(self):
+        """下行命令设置日志级别并请求导出日志"""
+        client = device.MyMQTTClient("127.0.0.1", 1883, "", "", "123456789012345")
+        saved = device.logger.level
+        try:
+            client.on_message(b"down/123456789012345", json.dumps({"log_level": "error", "log_dump": 8}).encode())
+            self.assertEqual(device.logger.level, device.LOG_ERROR)
+            self.assertEqual(client.pending_log_dump, 8)
+        finally:
+            device.logger.level = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
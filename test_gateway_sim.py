@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试电池从机 pty 仿真（emulator/modbus_slave.py）及 doc/dc_main.py 仿真运行（emulator/run_gateway.py）
+"""
+
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+sys.path.insert(0, os.path.join(ROOT, "emulator", "qpy"))
+
+import machine
+from emulator.modbus_slave import PtyModbusSlave, DEFAULT_HOLDING, DEFAULT_INPUTS, SLAVE_ID
+from modbus_rtu import RtuReceiver, append_crc
+from modbus_rtu.slave_sim import ModbusSlave
+
+
+class TestPtyModbusSlave(unittest.TestCase):
+    """PtyModbusSlave类测试"""
+
+    def start_slave(self, **faults):
+        server = PtyModbusSlave(ModbusSlave(SLAVE_ID, DEFAULT_HOLDING, DEFAULT_INPUTS), latency_ms=1, seed=1, **faults)
+        server.start()
+        self.addCleanup(server.stop)
+        link = machine.SerialLink(server.path)
+        self.addCleanup(link.close)
+        return server, link, RtuReceiver(link, 115200)
+
+    def request(self, link, receiver, pdu):
+        receiver.flush()
+        link.write(bytes(append_crc(bytearray([SLAVE_ID]) + bytearray(pdu))))
+        return receiver.receive(SLAVE_ID, pdu[0], 200)
+
+    def test_fragmented_read_and_write_multiple(self):
+        """分片发送的响应完整接收，0x10写入后读回"""
+        server, link, receiver = self.start_slave(fragment_size=3, fragment_gap_ms=1)
+        frame = self.request(link, receiver, [0x04, 0x31, 0x00, 0x00, 0x06])
+        self.assertEqual(frame[2], 12)
+        self.assertEqual((frame[3] << 8) | frame[4], DEFAULT_INPUTS[0x3100])
+        self.assertIsNotNone(self.request(link, receiver, [0x10, 0x30, 0x02, 0x00, 0x02, 0x04, 0, 1, 0, 0]))
+        self.assertEqual((server.slave.holding[0x3002], server.slave.holding[0x3003]), (1, 0))
+
+    def test_injected_faults(self):
+        """CRC错误的响应被丢弃，异常响应按异常帧返回"""
+        server, link, receiver = self.start_slave(crc_error_rate=1.0)
+        self.assertIsNone(self.request(link, receiver, [0x03, 0x30, 0x00, 0x00, 0x06]))
+        self.assertEqual(receiver.discarded_frames, 1)
+        server.crc_error_rate = 0.0
+        server.exception_rate = 1.0
+        frame = self.request(link, receiver, [0x03, 0x30, 0x00, 0x00, 0x06])
+        self.assertEqual((frame[1], frame[2]), (0x83, 0x06))
+        server.exception_rate = 0.0
+        frame = self.request(link, receiver, [0x04, 0x31, 0x06, 0x00, 0x01])  # 经纬度寄存器不可读
+        self.assertEqual((frame[1], frame[2]), (0x84, 0x02))
+
+
+class TestRunGateway(unittest.TestCase):
+    """dc_main 仿真运行：开机读寄存器、全量上报、下行命令合并写入"""
+
+    def test_boot_and_downlink(self):
+        output = subprocess.check_output(
+            [sys.executable, os.path.join(ROOT, "emulator", "run_gateway.py"), "--duration", "9", "--quiet",
+             "--downlink", '{"power_onoff_ac": 1, "power_onoff_light": 0}', "--downlink-at", "6"],
+            stderr=subprocess.STDOUT, timeout=60).decode("utf-8")
+        self.assertIn('"0x3002": 1, "0x3003": 0', output)
+        # 开机读3次，下行命令写1次（0x10）读回1次
+        self.assertRegex(output, r"从机: 请求 5，应答事务 5")
+        self.assertRegex(output, r"Modbus事务: 5 次，超时 0 次")
+        self.assertRegex(output, r"MQTT上报: 2 条")
+        self.assertIn('"full": 0', re.search(r"最后一条: (.*)", output).group(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 device/main.py 中的堆内存统计类 HeapStats（基于 emulator 仿真模块的堆模型）
+"""
+
+import gc
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from emulator.run_device import load_device_main
+
+device = load_device_main()
+import _heapmodel
+
+
+class TestHeapStats(unittest.TestCase):
+    """HeapStats类测试"""
+
+    def setUp(self):
+        _heapmodel.garbage = 0
+        self.stats = device.HeapStats()
+
+    def test_below_threshold_no_collect(self):
+        """已分配内存低于阈值时不回收，但更新水位"""
+        _heapmodel.garbage = 1000
+        self.assertFalse(self.stats.collect_if_needed(_heapmodel.LIVE_BYTES + 4096))
+        self.assertEqual(self.stats.collections, 0)
+        self.assertEqual(self.stats.max_alloc, _heapmodel.LIVE_BYTES + 1000)
+        self.assertEqual(self.stats.min_free, _heapmodel.HEAP_SIZE - _heapmodel.LIVE_BYTES - 1000)
+
+    def test_zero_threshold_disabled(self):
+        """阈值为0时不主动回收"""
+        _heapmodel.garbage = 100000
+        self.assertFalse(self.stats.collect_if_needed(0))
+        self.assertEqual(_heapmodel.garbage, 100000)
+
+    def test_collect_and_bytes_per_frame(self):
+        """超过阈值时回收，并按帧数统计每帧分配量"""
+        self.stats.frames = 10
+        _heapmodel.garbage = 20000
+        self.assertTrue(self.stats.collect_if_needed(_heapmodel.LIVE_BYTES + 4096))
+        self.assertEqual(self.stats.collections, 1)
+        self.assertEqual(self.stats.bytes_per_frame, 2000)
+        self.assertEqual(self.stats.frames, 0)
+        self.assertEqual(_heapmodel.garbage, 0)
+        self.assertGreater(self.stats.collect_max_us, 0)
+
+
+    def test_real_gc_untouched(self):
+        """仿真 gc 只绑定到设备程序，CPython 的 gc 模块不被修改"""
+        self.assertIs(sys.modules['gc'], gc)
+        self.assertFalse(hasattr(gc, 'mem_free'))
+        self.assertIsNot(device.gc, gc)
+        self.assertIs(device.gc.collect, _heapmodel.collect)
+
+
+if __name__ == "__main__":
+    unittest.main()
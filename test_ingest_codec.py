@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 ingest/codec.py：各解码后端得到相同的行，消息级事件和版本只存一份，类型不符、裸数组和其他事件回退到通用解析
+"""
+
+import json
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import BACKENDS, DeviceTable, PayloadDecoder, SensorBatch
+from mqtt_listener import FIELD_ORDER
+
+FIELDS = ('timestamp', 'packet_order', 'accel_x', 'altitude')
+
+
+class TestPayloadDecoder(unittest.TestCase):
+    """PayloadDecoder类测试（每个已安装的后端）"""
+
+    def decoders(self, fields=FIELDS):
+        return [PayloadDecoder(fields, backend) for backend in BACKENDS]
+
+    def test_sensor_data(self):
+        payload = (b'{"event":"SENSOR_DATA","data":[{"packet_order":7,"accel_x":-3,"altitude":425.75,'
+                   b'"timestamp":"2026-02-11 10:59:35","extra":1},{"packet_order":8,"accel_x":4,"altitude":426}],'
+                   b'"version":1001}')
+        for decoder in self.decoders():
+            batch = decoder.decode(payload)
+            self.assertIsInstance(batch, SensorBatch)
+            self.assertEqual((batch.event, batch.version, len(batch)), ('SENSOR_DATA', 1001, 2))
+            self.assertEqual(batch.rows, [("2026-02-11 10:59:35", 7, -3, 425.75), ('', 8, 4, 426)])
+            self.assertEqual(batch.column('packet_order'), [7, 8])
+            self.assertEqual(batch[1], {'packet_order': 8, 'accel_x': 4, 'altitude': 426, 'event': 'SENSOR_DATA',
+                                        'version': 1001})
+
+    def test_matches_json(self):
+        """虚拟设备的载荷：各后端与逐字段 .get() 的结果一致"""
+        device = VirtualDevice(0, build_motion_clips(1), random.Random(3), samples_per_upload=10)
+        payloads = [device.sensor_payload("2026-01-16 08:16:11") for _ in range(5)]
+        expected = [[tuple(d.get(f, '') for f in FIELD_ORDER) for d in json.loads(p)['data']] for p in payloads]
+        for decoder in self.decoders(FIELD_ORDER):
+            self.assertEqual([decoder.decode(p).rows for p in payloads], expected)
+
+    def test_fallback(self):
+        for decoder in self.decoders():
+            # 数值以字符串上报：类型不符，回退后保留原值
+            batch = decoder.decode('{"event":"SENSOR_DATA","data":[{"packet_order":"7","accel_x":1.5}]}')
+            self.assertEqual((batch.rows, batch.version), ([('', "7", 1.5, '')], ''))
+            # 裸样本数组
+            batch = decoder.decode(b'[{"packet_order":1},{"packet_order":2}]')
+            self.assertEqual((batch.event, batch.column('packet_order')), ('SENSOR_DATA', [1, 2]))
+            # 上电包：一行，保留原始字典
+            power_on = {"event": "POWER_ON", "timestamp": "2026-02-11 15:53:32", "version": 1001, "imei": "1"}
+            batch = decoder.decode(json.dumps(power_on).encode())
+            self.assertEqual((batch.event, batch.version), ("POWER_ON", 1001))
+            self.assertEqual(batch.rows, [(power_on['timestamp'], '', '', '')])
+            self.assertEqual(list(batch), [power_on])
+            self.assertEqual(decoder.decode(b'{"a":1}'), {"a": 1})
+            self.assertEqual(len(decoder.decode(b'{"event":"SENSOR_DATA","data":[]}')), 0)
+            self.assertEqual(decoder.decode(b'{"event":"SENSOR_DATA","data":5}'), {"event": "SENSOR_DATA", "data": 5})
+            with self.assertRaises(ValueError):
+                decoder.decode(b'\xff')
+
+    def test_bare_array_event_version(self):
+        """裸样本数组：批的事件、版本取自样本，写库的行与原逐样本 .get() 相同"""
+        samples = [{"packet_order": 1, "version": 1001, "accel_x": 3}, {"packet_order": 2, "version": 1001}]
+        expected = [(s.get('event', 'SENSOR_DATA'), s.get('version', '')) + tuple(s.get(f, '') for f in FIELDS)
+                    for s in samples]
+        for decoder in self.decoders():
+            batch = decoder.decode(json.dumps(samples).encode())
+            self.assertEqual([(batch.event, batch.version) + row for row in batch.rows], expected)
+            self.assertEqual(batch[0]['version'], 1001)
+            batch = decoder.decode(b'[{"event":"POWER_ON","version":1002,"timestamp":"t"}]')
+            self.assertEqual((batch.event, batch.version, batch.rows), ('POWER_ON', 1002, [('t', '', '', '')]))
+            self.assertEqual((decoder.decode(b'[]').event, decoder.decode(b'[]').version), ('SENSOR_DATA', ''))
+
+    def test_device_table(self):
+        table = DeviceTable()
+        batch = PayloadDecoder(FIELD_ORDER).decode(b'{"event":"SENSOR_DATA","data":[{"packet_order":1},'
+                                                   b'{"packet_order":3}],"version":1001}')
+        table.update("a", batch, 1.0)
+        stats = table.get("a")
+        self.assertEqual((stats['samples'], stats['lost'], stats['last_order']), (2, 1, 3))
+        self.assertEqual(stats['latest'], {'packet_order': 3, 'event': 'SENSOR_DATA', 'version': 1001})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 ingest/columnar.py：SensorBatch 按列转换后写库的行不变，数值列可直接用于图表，BatchList 按行号定位，
+RollingSeries 的截取和 Y 轴范围与原逐点计算一致
+"""
+
+import json
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import BatchList, ColumnBatch, PayloadDecoder, RollingSeries, y_axis_range
+from ingest.codec import MISSING
+from ingest.columnar import to_array
+
+FIELDS = ('timestamp', 'packet_order', 'accel_x', 'pressure', 'altitude')
+
+
+def old_y_range(points, x_min, x_max, margin, min_span):
+    """原 main_window.adjust_*_y_axis_range 的逐点计算"""
+    values = [y for x, y in points if x_min <= x <= x_max]
+    if not values:
+        return None
+    y_min, y_max = min(values), max(values)
+    low, high = y_min - (y_max - y_min) * margin, y_max + (y_max - y_min) * margin
+    if high - low < min_span:
+        center = (y_min + y_max) / 2
+        low, high = center - min_span / 2, center + min_span / 2
+    return low, high
+
+
+class TestColumnBatch(unittest.TestCase):
+    """ColumnBatch类测试"""
+
+    def test_to_array(self):
+        self.assertEqual(to_array([1, 2]).dtype, np.int64)
+        self.assertEqual(to_array([1, 2.5]).dtype, np.float64)
+        self.assertEqual(to_array([1, MISSING]).dtype, object)
+        self.assertEqual(to_array([1, 2 ** 70]).tolist(), [1, 2 ** 70])
+        self.assertEqual(to_array([]).dtype, np.int64)
+
+    def test_rows_match_sensor_batch(self):
+        """写库的行与 SensorBatch.rows 相同（值为 Python 类型）"""
+        device = VirtualDevice(0, build_motion_clips(1), random.Random(5), samples_per_upload=10)
+        decoder = PayloadDecoder(FIELDS)
+        for payload in [device.sensor_payload("2026-01-16 08:16:11") for _ in range(3)]:
+            batch = decoder.decode(payload)
+            columns = ColumnBatch.from_batch(batch, "1")
+            self.assertEqual((columns.event, columns.imei, len(columns)), ('SENSOR_DATA', "1", len(batch)))
+            rows = list(columns.rows(FIELDS))
+            self.assertEqual(rows, batch.rows)
+            self.assertEqual([type(value) for value in rows[0]], [type(value) for value in batch.rows[0]])
+            self.assertEqual(columns.numeric('accel_x').tolist(), [float(v) for v in batch.column('accel_x')])
+            self.assertEqual(columns.last('altitude'), batch.rows[-1][-1])
+
+    def test_power_on(self):
+        """上电包：缺失的字段为 object 列，转为数值时全为 NaN，不参与图表；批级的事件和版本按行补齐"""
+        payload = json.dumps({"event": "POWER_ON", "timestamp": "2026-02-11 15:53:32", "version": 1001})
+        columns = ColumnBatch.from_batch(PayloadDecoder(FIELDS).decode(payload))
+        self.assertTrue(np.isnan(columns.numeric('accel_x')).all())
+        self.assertIsNone(columns.numeric('gyro_x'))
+        self.assertIs(columns.last('accel_x'), MISSING)
+        self.assertIs(columns.last('gyro_x'), MISSING)
+        self.assertEqual(list(columns.rows(('event', 'version', 'timestamp', 'accel_x'))),
+                         [("POWER_ON", 1001, "2026-02-11 15:53:32", MISSING)])
+        empty = ColumnBatch.from_batch(PayloadDecoder(FIELDS).decode(b'{"event":"SENSOR_DATA","data":[]}'))
+        self.assertEqual((len(empty), list(empty.rows(FIELDS)), empty.last('accel_x')), (0, [], MISSING))
+
+    def test_numeric_per_sample(self):
+        """缺失或非数值的样本为 NaN，以字符串上报的数值照常转换，同批其他样本和字段不受影响"""
+        payload = (b'{"event":"SENSOR_DATA","data":[{"packet_order":1,"accel_x":3,"altitude":"325.49"},'
+                   b'{"packet_order":2,"altitude":"x"},{"packet_order":3,"accel_x":"5","altitude":1}]}')
+        columns = ColumnBatch.from_batch(PayloadDecoder(FIELDS).decode(payload))
+        np.testing.assert_array_equal(columns.numeric('accel_x'), [3.0, np.nan, 5.0])
+        np.testing.assert_array_equal(columns.numeric('altitude'), [325.49, np.nan, 1.0])
+        self.assertEqual(columns.numeric('packet_order').tolist(), [1.0, 2.0, 3.0])
+        rolling = RollingSeries(10)
+        rolling.extend_at(2.0, columns.numeric('accel_x'))
+        rolling.extend_at(3.0, np.array([np.nan, np.inf]))
+        self.assertEqual((rolling.x.tolist(), rolling.y.tolist()), ([2.0, 2.0], [3.0, 5.0]))
+
+    def test_from_rows(self):
+        """查询结果：事件、版本为逐行的列"""
+        rows = [(1, "t1", "SENSOR_DATA", 10), (2, "t2", "POWER_ON", '')]
+        columns = ColumnBatch.from_rows({'timestamp': 1, 'event': 2, 'accel_x': 3}, rows)
+        self.assertEqual([columns.value('event', i) for i in range(2)], ["SENSOR_DATA", "POWER_ON"])
+        self.assertEqual(columns.column('version').tolist(), [None, None])
+        self.assertEqual(columns.value('accel_x', 0), 10)
+
+
+class TestBatchList(unittest.TestCase):
+    """BatchList类测试"""
+
+    def test_locate(self):
+        batches = BatchList()
+        for orders in ([1, 2, 3], [], [4], [5, 6]):
+            batches.append(ColumnBatch('SENSOR_DATA', 1, {'packet_order': np.array(orders, dtype=np.int64)}))
+        batches.prepend(ColumnBatch(None, None, {'packet_order': np.array([-1, 0]), 'event': to_array(['a', 'b'])}))
+        self.assertEqual(len(batches), 8)
+        self.assertEqual([batches.value(row, 'packet_order') for row in range(8)], [-1, 0, 1, 2, 3, 4, 5, 6])
+        self.assertEqual([batches.value(row, 'event') for row in (0, 1, 2, 7)],
+                         ['a', 'b', 'SENSOR_DATA', 'SENSOR_DATA'])
+        batches.clear()
+        self.assertEqual(len(batches), 0)
+
+
+class TestRollingSeries(unittest.TestCase):
+    """RollingSeries类测试：与原 QLineSeries 逐点 append / remove_old_data_points 的结果一致"""
+
+    def test_against_point_list(self):
+        rng = random.Random(1)
+        rolling, points = RollingSeries(50), []
+        for step in range(40):
+            time_diff = step * 0.7
+            y = [rng.uniform(-500, 500) for _ in range(rng.randint(0, 9))]
+            rolling.extend(np.full(len(y), time_diff), np.array(y))
+            points += [(time_diff, value) for value in y]
+            if time_diff > 10:
+                rolling.trim(time_diff - 10)
+                points = [point for point in points if point[0] >= time_diff - 10]
+            points = points[-50:]
+            self.assertEqual(list(zip(rolling.x.tolist(), rolling.y.tolist())), points)
+            x_min, x_max = max(time_diff - 10, 0), max(time_diff, 10)
+            self.assertEqual(y_axis_range([rolling], x_min, x_max, 0.1, 100),
+                             old_y_range(points, x_min, x_max, 0.1, 100))
+
+    def test_y_axis_range(self):
+        first, second = RollingSeries(10), RollingSeries(10)
+        first.extend(np.array([0.0, 1.0, 2.0]), np.array([5.0, 7.0, 100.0]))
+        second.extend(np.array([1.0]), np.array([-20.0]))
+        np.testing.assert_allclose(y_axis_range([first, second], 0, 1, 0.1, 10), (-22.7, 9.7))
+        self.assertEqual(y_axis_range([first], 0, 0, 0.1, 10), (0.0, 10.0))
+        self.assertIsNone(y_axis_range([first, second], 5, 6, 0.1, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
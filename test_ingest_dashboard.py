@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 ingest/dashboard.py 和 ingest/devices.py：显示宽度、按包序统计丢失和乱序、按帧计算速率，以及 mqtt_listener
+仪表盘模式
+"""
+
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import mqtt_listener as listener
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import Dashboard, DeviceTable, PayloadDecoder, RowStore, display_width
+from ingest.dashboard import pad
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def samples(*orders):
+    return [{'packet_order': order, 'accel_z': 1000, 'altitude': 425.5} for order in orders]
+
+
+class TestDisplayWidth(unittest.TestCase):
+
+    def test_width(self):
+        self.assertEqual(display_width("accel 123"), 9)
+        self.assertEqual(display_width("加速度X"), 7)
+        self.assertEqual(display_width("（秒）"), 6)
+        self.assertEqual(pad("高度", 6), "高度  ")
+        self.assertEqual(pad(-16, 5), "-16  ")
+
+
+class TestDeviceTable(unittest.TestCase):
+    """DeviceTable类测试"""
+
+    def test_loss_and_wrap(self):
+        table = DeviceTable()
+        table.update("a", samples(250, 251, 252), 1.0)
+        table.update("a", samples(255, 0, 1), 2.0)  # 丢失 253、254，跨 255→0 不计丢失
+        table.update("a", samples(1), 3.0)  # 重复
+        table.update("a", None, 4.0)  # 非数据消息
+        table.update("b", None, 4.0)
+        stats = table.get("a")
+        self.assertEqual((stats['messages'], stats['samples'], stats['lost'], stats['out_of_order']), (4, 7, 2, 1))
+        self.assertEqual((stats['last_order'], stats['first_seen'], stats['last_seen']), (1, 1.0, 4.0))
+        self.assertEqual(stats['latest']['packet_order'], 1)
+        self.assertIsNone(table.get("b")['last_order'])
+        self.assertIsNone(table.get("c"))
+        self.assertEqual(table.totals(), (2, 5, 7, 2, 1))
+
+    def test_rates(self):
+        table = DeviceTable()
+        table.update_rates(0.0)
+        for i in range(10):
+            table.update(str(i % 2), samples(i // 2), i * 0.1)
+        table.update_rates(2.0)
+        self.assertEqual((table.get("0")['message_rate'], table.get("1")['sample_rate']), (2.5, 2.5))
+        table.update_rates(3.0)
+        self.assertEqual(table.get("0")['message_rate'], 0.0)
+
+
+class TestDashboard(unittest.TestCase):
+    """Dashboard类测试"""
+
+    def test_render(self):
+        clock = FakeClock()
+        dashboard = Dashboard(out=io.StringIO(), max_devices=2, footer=lambda: ["队列 0"], clock=clock)
+        clock.now += 1.0
+        dashboard.render()
+        for device in ("861197060000011", "861197060000029", "861197060000037"):
+            for i in range(4):
+                dashboard.update(device, samples(*range(i * 5, i * 5 + 5)))
+            clock.now += 0.5
+        frame = dashboard.render()
+        lines = frame.split('\n')
+        self.assertIn("设备 3  消息 12（8.0/秒）  样本 60（40.0/秒）", lines[0])
+        self.assertTrue(lines[3].startswith("  861197060000037  4        2.7      13.3     0      0     0.5秒前"))
+        self.assertIn("861197060000029", lines[4])
+        self.assertEqual(lines[5], "  …… 另有 1 台设备")
+        self.assertEqual(lines[-1], "队列 0")
+        # 表头含中文，各列仍与数据行对齐
+        header = lines[2]
+        self.assertEqual(display_width(header[:header.index('消息/秒')]), lines[3].index('2.7'))
+        # 没有新消息时速率归零
+        clock.now += 1.0
+        self.assertIn("（0.0/秒）", dashboard.render().split('\n')[0])
+
+    def test_string_values(self):
+        """数值以字符串上报时最新值按原样显示，不影响整帧"""
+        batch = PayloadDecoder(listener.FIELD_ORDER).decode(
+            b'{"event":"SENSOR_DATA","data":[{"packet_order":1,"altitude":"325.49","longitude":"N/A"}]}')
+        dashboard = Dashboard(out=io.StringIO(), clock=FakeClock())
+        dashboard.update("861197060000011", batch)
+        line = dashboard.render().split('\n')[3]
+        self.assertIn(pad("325.49", 12) + pad("N/A", 12), line)
+        self.assertTrue(line.startswith("  861197060000011"))
+
+    def test_render_while_device_added(self):
+        """工作线程正在加入新设备（只追加了部分列）时，render 等它加完再读取"""
+        table = DeviceTable()
+        table.update("861197060000011", None, 100.0)
+        dashboard = Dashboard(out=io.StringIO(), clock=lambda: 101.0, table=table)
+        update_rates = table.update_rates
+        adding = threading.Event()
+
+        def add_row():
+            with table.lock:
+                table.imeis.append("861197060000029")
+                adding.set()
+                time.sleep(0.05)
+                table.imeis.pop()
+                table._add_row("861197060000029", 101.0)
+
+        def update_rates_then_add(now):
+            update_rates(now)
+            threading.Thread(target=add_row).start()
+            adding.wait()
+
+        table.update_rates = update_rates_then_add
+        lines = dashboard.render().split('\n')
+        self.assertIn("设备 2", lines[0])
+        self.assertTrue(lines[3].startswith("  861197060000029"))
+
+    def test_start_stop(self):
+        out = io.StringIO()
+        dashboard = Dashboard(fps=50, out=out).start()
+        dashboard.update("1", samples(1))
+        dashboard.stop()
+        self.assertGreaterEqual(dashboard.frames, 1)
+        self.assertTrue(out.getvalue().startswith('\x1b[H\x1b[2J'))
+
+
+class TestListenerDashboard(unittest.TestCase):
+    """mqtt_listener 仪表盘模式：按主题中的 IMEI 统计，不逐条打印"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        listener.dashboard = None
+        listener.SHOW_TABLE = True
+
+    def test_handle_batch(self):
+        listener.store = RowStore(self.directory, "data", listener.FIELD_ORDER, export_interval=0)
+        listener.STATS_INTERVAL = 0
+        listener.SHOW_TABLE = False
+        listener.devices = DeviceTable()
+        listener.dashboard = Dashboard(out=io.StringIO(), table=listener.devices)
+        clips = build_motion_clips(1)
+        devices = [VirtualDevice(i, clips, random.Random(i), samples_per_upload=5) for i in range(3)]
+        batch = [("up/" + d.imei, d.sensor_payload("2026-01-16 08:16:11")) for d in devices for _ in range(2)]
+        batch.append(("up/" + devices[0].imei, devices[0].heartbeat_payload()))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            listener.handle_batch(batch)
+        listener.store.close(export=False)
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(listener.store.total_rows, 30)
+        table = listener.dashboard.table
+        self.assertEqual(sorted(table.imeis), sorted(d.imei for d in devices))
+        self.assertEqual((table.get(devices[0].imei)['messages'], table.get(devices[0].imei)['samples']), (3, 10))
+        self.assertEqual(table.get(devices[1].imei)['lost'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 mqtt_listener 车队模式：一个 paho 连接订阅 up/+，FleetSimulator 经本地 MiniBroker 发布，
+按 IMEI 分区写入的行数与各设备发布的数据一致
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import paho.mqtt.client as mqtt
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import mqtt_listener as listener
+from fleet.broker import MiniBroker
+from fleet.simulator import FleetSimulator, VirtualDevice, build_motion_clips
+from ingest import DeviceTable, PartitionedStore
+
+
+class TestFleetMode(unittest.TestCase):
+    """车队模式端到端测试"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.broker = self.loop.run_until_complete(MiniBroker(port=0).start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.broker.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        shutil.rmtree(self.directory)
+        listener.FLEET_MODE = False
+        listener.SHOW_TABLE = True
+
+    def test_fleet_ingest(self):
+        listener.FLEET_MODE = True
+        listener.SHOW_TABLE = False
+        listener.STATS_INTERVAL = 0
+        listener.devices = DeviceTable()
+        listener.store = PartitionedStore(self.directory, "data", listener.FIELD_ORDER, max_open=8,
+                                          export_interval=0)
+        listener.QUEUE_SIZE, listener.QUEUE_POLICY, listener.WORKER_COUNT = 10000, "block", 1
+        listener.init_workers()
+        subscribed = threading.Event()
+        client = mqtt.Client(client_id=listener.FLEET_CLIENT_ID, callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+        client.on_message = listener.on_message
+        client.on_subscribe = lambda *args: subscribed.set()
+        client.connect('127.0.0.1', self.broker.port)
+        client.subscribe(listener.FLEET_TOPIC)
+        client.loop_start()
+        try:
+            self.assertTrue(subscribed.wait(5))
+            simulator = FleetSimulator(30, 60, port=self.broker.port, samples_per_upload=4, heartbeat_interval=0.5,
+                                       subscribe=False, seed=1)
+            summary = asyncio.run_coroutine_threadsafe(simulator.run(2.0), self.loop).result()
+            while listener.message_queue.enqueued < summary['messages']:
+                self.assertTrue(client.is_connected())
+                time.sleep(0.05)
+        finally:
+            client.loop_stop()
+            client.disconnect()
+            with contextlib.redirect_stdout(io.StringIO()):
+                listener.workers.stop()
+            listener.store.close()
+
+        count, messages, samples, lost, out_of_order = listener.devices.totals()
+        self.assertEqual((count, messages), (30, summary['messages']))
+        self.assertEqual(samples, summary['counts']['SENSOR_DATA'] * 4)
+        self.assertEqual((lost, out_of_order, listener.workers.errors), (0, 0, 0))
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(listener.devices.imeis))
+        for imei in listener.devices.imeis:
+            partition = listener.store.stores[imei]
+            self.assertEqual(partition.total_rows, listener.devices.get(imei)['samples'])
+            with open(partition.path, encoding='utf-8-sig') as f:
+                self.assertEqual(sum(1 for _ in f) - 1, partition.total_rows)
+        self.assertGreater(listener.store.suspends, 0)
+
+    def test_topic_not_imei_dropped(self):
+        """主题最后一级不是IMEI（如 up/..）的消息丢弃并计数，不在数据目录之外建文件"""
+        listener.FLEET_MODE = True
+        listener.SHOW_TABLE = False
+        listener.STATS_INTERVAL = 0
+        listener.devices = DeviceTable()
+        listener.rejected_topics = 0
+        data_dir = os.path.join(self.directory, "data")
+        listener.store = PartitionedStore(data_dir, "data", listener.FIELD_ORDER, export_interval=0)
+        device = VirtualDevice(0, build_motion_clips(1), random.Random(1), samples_per_upload=4)
+        payload = device.sensor_payload("2026-01-16 08:16:11")
+        topics = ["up/..", "up/.", "up/", "up/a:b", "up/86119706526869", "up/" + device.imei]
+        with contextlib.redirect_stdout(io.StringIO()):
+            listener.handle_batch([(topic, payload) for topic in topics])
+        listener.store.close()
+        self.assertEqual(listener.rejected_topics, 5)
+        self.assertEqual(listener.devices.imeis, [device.imei])
+        self.assertEqual(os.listdir(self.directory), ["data"])
+        self.assertEqual(os.listdir(data_dir), [device.imei])
+        self.assertEqual(listener.store.total_rows, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
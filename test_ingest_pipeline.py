@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 ingest/pipeline.py 的有界队列、溢出策略和批处理工作线程，以及 mqtt_listener 的入队与批量存储
+"""
+
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import mqtt_listener as listener
+from fleet.simulator import VirtualDevice, build_motion_clips
+from ingest import BoundedQueue, RowStore, WorkerPool
+
+
+class TestBoundedQueue(unittest.TestCase):
+    """BoundedQueue类测试"""
+
+    def test_drop_policies(self):
+        q = BoundedQueue(3, 'drop_oldest')
+        for i in range(5):
+            self.assertTrue(q.put(i))
+        self.assertEqual(q.get_batch(10), [2, 3, 4])
+        q = BoundedQueue(3, 'drop_newest')
+        self.assertEqual([q.put(i) for i in range(5)], [True, True, True, False, False])
+        self.assertEqual(q.get_batch(2), [0, 1])
+        self.assertEqual(q.stats(), {'depth': 1, 'max_depth': 3, 'enqueued': 3, 'dequeued': 2, 'dropped': 2,
+                                     'blocked_time': 0.0})
+        with self.assertRaises(ValueError):
+            BoundedQueue(3, 'spill')
+
+    def test_block(self):
+        """block 策略：消费者取走后放入成功；超时仍满则丢弃"""
+        q = BoundedQueue(1, 'block', block_timeout=0.05)
+        q.put(0)
+        self.assertFalse(q.put(1))
+        self.assertGreaterEqual(q.blocked_time, 0.04)
+        timer = threading.Timer(0.05, q.get_batch, (1, ))
+        timer.start()
+        q.block_timeout = 5
+        self.assertTrue(q.put(2))
+        timer.join()
+        self.assertEqual((q.get_batch(5), q.dropped), ([2], 1))
+
+    def test_get_batch_close(self):
+        q = BoundedQueue(10)
+        self.assertEqual(q.get_batch(5, timeout=0.01), [])
+        q.put(1)
+        q.close()
+        self.assertEqual(q.get_batch(5), [1])
+        self.assertIsNone(q.get_batch(5))
+
+
+class TestWorkerPool(unittest.TestCase):
+    """WorkerPool类测试"""
+
+    def test_batches_and_errors(self):
+        seen = []
+
+        def handler(batch):
+            if batch[0] == 'bad':
+                raise ValueError(batch)
+            seen.append(list(batch))
+
+        q = BoundedQueue(1000)
+        for i in range(250):
+            q.put(i)
+        q.put('bad')
+        pool = WorkerPool(handler, q, workers=1, batch_size=50, batch_timeout=0.01)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.start()
+            pool.stop()
+        self.assertEqual([len(b) for b in seen], [50] * 5)
+        self.assertEqual((pool.processed, pool.batches, pool.errors), (251, 6, 1))
+
+    def test_multiple_workers(self):
+        lock = threading.Lock()
+        seen = []
+
+        def handler(batch):
+            time.sleep(0.001)
+            with lock:
+                seen.extend(batch)
+
+        q = BoundedQueue(10000)
+        pool = WorkerPool(handler, q, workers=3, batch_size=7, batch_timeout=0.01).start()
+        for i in range(500):
+            q.put(i)
+        pool.stop()
+        self.assertEqual(sorted(seen), list(range(500)))
+        self.assertEqual(pool.stats()['processed'], 500)
+
+    def test_ordered_commit(self):
+        """多个工作线程并行处理，commit 按出队顺序执行；处理失败的批跳过 commit"""
+        rng = random.Random(3)
+        delays = [rng.uniform(0, 0.003) for _ in range(500)]
+        committed = []
+
+        def handler(batch):
+            time.sleep(delays[batch[0]])
+            if batch[0] == 70:
+                raise ValueError(batch)
+            return batch
+
+        q = BoundedQueue(10000)
+        for i in range(500):
+            q.put(i)
+        pool = WorkerPool(handler, q, workers=4, batch_size=5, batch_timeout=0.01, commit=committed.extend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.start()
+            pool.stop()
+        self.assertEqual(committed, [i for i in range(500) if not 70 <= i < 75])
+        self.assertEqual((pool.processed, pool.errors), (500, 1))
+
+
+class TestListenerQueue(unittest.TestCase):
+    """mqtt_listener：on_message 只入队，工作线程按批存储"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_on_message_batches(self):
+        listener.store = RowStore(self.directory, "data", listener.FIELD_ORDER, export_interval=0)
+        listener.STATS_INTERVAL = 0
+        listener.message_queue = BoundedQueue(100)
+        device = VirtualDevice(0, build_motion_clips(1), random.Random(1), samples_per_upload=5)
+        topic = "up/" + device.imei
+        for i in range(20):
+            payload = device.sensor_payload("2026-01-16 08:16:11")
+            listener.on_message(None, None, types.SimpleNamespace(topic=topic, payload=payload))
+        listener.on_message(None, None, types.SimpleNamespace(topic="up/1", payload=device.heartbeat_payload()))
+        listener.on_message(None, None, types.SimpleNamespace(topic="up/1", payload=b'\xff'))
+        self.assertEqual(len(listener.message_queue), 22)
+        batch_rows = []
+        save = listener.save_sensor_data
+        listener.save_sensor_data = lambda data: (batch_rows.append(len(data)), save(data))
+        try:
+            listener.workers = WorkerPool(listener.handle_batch, listener.message_queue, 1, 8, 0.01)
+            with contextlib.redirect_stdout(io.StringIO()):
+                listener.workers.start().stop()
+        finally:
+            listener.save_sensor_data = save
+        listener.store.close(export=False)
+        self.assertEqual(batch_rows, [40, 40, 20])
+        self.assertEqual(listener.store.total_rows, 100)
+        self.assertEqual(listener.workers.errors, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
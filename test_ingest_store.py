@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 ingest/store.py：CSV 追加、按行数和日期轮转、续写已有文件、按设备分区及 xlsx 生成
+"""
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from openpyxl import load_workbook
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import PartitionedStore, RowStore, export_all, export_xlsx
+from ingest.store import CSV_ENCODING
+
+HEADER = ['时间戳', '包序', '高度', '经度']
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_rows(count, start=0):
+    return [["2026-01-16 08:16:11", start + i, 425.75, ''] for i in range(count)]
+
+
+def read_csv(path):
+    with open(path, encoding=CSV_ENCODING, newline='') as f:
+        return list(csv.reader(f))
+
+
+class TestRowStore(unittest.TestCase):
+    """RowStore类测试"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # 本地时间某天 12:00
+        self.clock = FakeClock(time.mktime((2026, 10, 19, 12, 0, 0, 0, 0, -1)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_store(self, **kwargs):
+        kwargs.setdefault('export_interval', 0)
+        return RowStore(self.directory, "data", HEADER, clock=self.clock, **kwargs)
+
+    def test_rotate_by_rows(self):
+        store = self.make_store(max_rows=25, export_on_rotate=False)
+        for i in range(6):
+            store.append(make_rows(10, i * 10))
+        store.close()
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(files, ["data_20261019_001.csv", "data_20261019_002.csv"])
+        first = read_csv(os.path.join(self.directory, files[0]))
+        self.assertEqual(first[0], HEADER)
+        self.assertEqual(len(first), 31)
+        self.assertEqual([int(row[1]) for row in first[1:] + read_csv(store.path)[1:]], list(range(60)))
+        self.assertEqual((store.rotations, store.total_rows), (1, 60))
+
+    def test_rotate_by_day_and_export(self):
+        """跨零点轮转，写完的文件和关闭时的当前文件生成 xlsx"""
+        store = self.make_store()
+        store.append(make_rows(3))
+        self.clock.now += 12 * 3600
+        store.append(make_rows(2, 3))
+        store.close()
+        self.assertEqual(os.path.basename(store.path), "data_20261020_001.csv")
+        wb = load_workbook(os.path.join(self.directory, "data_20261019_001.xlsx"))
+        rows = list(wb.active.values)
+        self.assertEqual(list(rows[0]), HEADER)
+        self.assertEqual(rows[1:], [("2026-01-16 08:16:11", i, 425.75, None) for i in range(3)])
+        self.assertEqual(load_workbook(os.path.splitext(store.path)[0] + '.xlsx').active.max_row, 3)
+        self.assertEqual((store.exports, store.export_errors), (2, 0))
+
+    def test_resume_and_scheduled_export(self):
+        """重启后续写当天未满的文件；定时生成只包含已写入的行"""
+        store = self.make_store()
+        store.append(make_rows(4))
+        store.close(export=False)
+        store = self.make_store(export_interval=60)
+        self.assertEqual((os.path.basename(store.path), store.rows), ("data_20261019_001.csv", 4))
+        self.clock.now += 61
+        store.append(make_rows(2, 4))
+        store.wait_exports()
+        xlsx = os.path.splitext(store.path)[0] + '.xlsx'
+        self.assertEqual(load_workbook(xlsx).active.max_row, 7)
+        store.append(make_rows(1, 6))
+        store.export()
+        self.assertEqual(load_workbook(xlsx).active.max_row, 8)
+        store.close(export=False)
+        self.assertEqual(len(read_csv(store.path)), 8)
+
+    def test_export_all(self):
+        store = self.make_store(max_rows=5, export_on_rotate=False)
+        for i in range(3):
+            store.append(make_rows(5, i * 5))
+        store.close(export=False)
+        result = export_all(self.directory, "data")
+        self.assertEqual([rows for _, rows in result], [5, 5, 5])
+        self.assertEqual(export_all(self.directory, "data"), [])
+        self.assertEqual(export_xlsx(store.path, os.path.join(self.directory, "out.xlsx"), limit=0), 0)
+
+
+class TestPartitionedStore(unittest.TestCase):
+    """PartitionedStore类测试"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_partitions_and_max_open(self):
+        """超过 max_open 时关闭最久未写的文件句柄，再次写入时续写同一文件"""
+        store = PartitionedStore(self.directory, "data", HEADER, max_open=2, export_interval=0)
+        for i in range(4):
+            for key in ("861", "862", "863"):
+                store.append(key, make_rows(3, i * 3))
+        self.assertEqual(len(store.opened), 2)
+        self.assertEqual(store.suspends, 10)
+        store.close()
+        self.assertEqual(store.total_rows, 36)
+        for key in ("861", "862", "863"):
+            files = os.listdir(os.path.join(self.directory, key))
+            self.assertEqual(len(files), 1)
+            rows = read_csv(os.path.join(self.directory, key, files[0]))
+            self.assertEqual([int(row[1]) for row in rows[1:]], list(range(12)))
+        self.assertEqual(len(export_all(self.directory, "data")), 3)
+
+    def test_invalid_key(self):
+        """分区键作为目录名，不能跳出数据目录"""
+        store = PartitionedStore(os.path.join(self.directory, "data"), "data", HEADER, export_interval=0)
+        for key in ("..", ".", "", "a/b", "../x"):
+            with self.assertRaises(ValueError):
+                store.append(key, make_rows(1))
+        store.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_rotation_uses_shared_exporter(self):
+        store = PartitionedStore(self.directory, "data", HEADER, max_rows=5, export_interval=0)
+        for key in ("a", "b"):
+            store.append(key, make_rows(5))
+            store.append(key, make_rows(1, 5))
+        store.close(export=True)
+        self.assertEqual(store.exporter.exports, 4)
+        day = os.path.basename(store.stores["a"].path).split('_')[1]
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, "a"))),
+                         ["data_%s_%s" % (day, name) for name in ("001.csv", "001.xlsx", "002.csv", "002.xlsx")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试共享订阅接收：MQTT 5 报文编解码、本地代理的共享订阅分配（round_robin / hash）、各进程数据库合并时按包序
+检出丢失和乱序，以及 ingest.worker 多进程端到端接收
+"""
+
+import asyncio
+import collections
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import paho.mqtt.client as mqtt
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fleet import decode_publish, encode_publish
+from fleet.broker import MiniBroker
+from fleet.mqtt import connect_protocol_level
+from fleet.simulator import FleetSimulator
+from ingest import SqliteSink, merge_databases, worker
+from ingest.codec import PayloadDecoder
+from ingest.worker import SHARED_TOPIC, WorkerGroup, worker_path
+from mqtt_listener import FIELD_ORDER
+
+
+def samples(*orders):
+    """按 FIELD_ORDER 排列的样本行"""
+    return PayloadDecoder(FIELD_ORDER).rows_from([{'packet_order': order, 'accel_z': 1000} for order in orders])
+
+
+class BrokerThread:
+    """在后台线程的事件循环中运行 MiniBroker"""
+    def __init__(self, share_strategy='round_robin'):
+        self.loop = asyncio.new_event_loop()
+        self.broker = self.loop.run_until_complete(MiniBroker(port=0, share_strategy=share_strategy).start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.broker.port
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        self.run(self.broker.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class TestMqtt5Codec(unittest.TestCase):
+
+    def test_publish_v5(self):
+        packet = encode_publish('up/1', b'{}', v5=True)
+        self.assertEqual(packet, b'\x30\x09\x00\x04up/1\x00{}')
+        self.assertEqual(decode_publish(0, packet[2:], v5=True), ('up/1', b'{}'))
+        # 带属性（消息过期间隔）的报文
+        body = b'\x00\x04up/1\x05\x02\x00\x00\x00\x3c{}'
+        self.assertEqual(decode_publish(0, body, v5=True), ('up/1', b'{}'))
+        self.assertEqual(connect_protocol_level(b'\x00\x04MQTT\x05\x02\x00\x3c'), 5)
+
+
+class TestSharedSubscription(unittest.TestCase):
+    """paho MQTTv5 客户端经 MiniBroker 共享订阅"""
+
+    def receive(self, strategy, count=40):
+        broker = BrokerThread(strategy)
+        received = [collections.Counter() for _ in range(3)]
+        clients = []
+        try:
+            for i, topic in enumerate((SHARED_TOPIC % "g", SHARED_TOPIC % "g", "up/+")):
+                subscribed = threading.Event()
+                client = mqtt.Client(client_id="c%d" % i, protocol=mqtt.MQTTv5 if i < 2 else mqtt.MQTTv311,
+                                     callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+                client.on_subscribe = lambda *args, event=subscribed: event.set()
+                client.on_message = lambda c, u, msg, counter=received[i]: counter.update([msg.topic])
+                client.connect('127.0.0.1', broker.port)
+                client.loop_start()
+                client.subscribe(topic)
+                self.assertTrue(subscribed.wait(5))
+                clients.append(client)
+            publisher = clients[2]
+            for i in range(count):
+                publisher.publish("up/86%d" % (i % 4), b'{"event":"HEARTBEAT"}')
+            deadline = time.monotonic() + 5
+            while sum(received[2].values()) < count or sum(received[0].values()) + sum(received[1].values()) < count:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.02)
+        finally:
+            for client in clients:
+                client.loop_stop()
+                client.disconnect()
+            broker.stop()
+        return received
+
+    def test_round_robin(self):
+        first, second, plain = self.receive('round_robin')
+        self.assertEqual((sum(first.values()), sum(second.values()), sum(plain.values())), (20, 20, 40))
+        # 4 个主题轮流发布、2 个成员轮流接收：每个主题只落在一个成员上（其余情况下同一设备会分散）
+        self.assertEqual(set(first) | set(second), set(plain))
+
+    def test_hash(self):
+        first, second, plain = self.receive('hash')
+        self.assertEqual(sum(first.values()) + sum(second.values()), 40)
+        self.assertFalse(set(first) & set(second))
+        for topic in plain:
+            self.assertEqual(first[topic] + second[topic], 10)
+
+
+class TestMerge(unittest.TestCase):
+    """merge_databases：按收到时间展开包序，检出丢失和乱序，按设备采样顺序输出"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge(self):
+        sinks = [SqliteSink(worker_path(self.directory, i), FIELD_ORDER) for i in range(2)]
+        # 设备 a 的消息分到两个进程，第二个进程先处理了后发布的一条（254 早于 252 收到），跨 255→0，丢失 2、3
+        sinks[0].append(sinks[0].rows_from("a", 1.0, samples(250, 251)))
+        sinks[1].append(sinks[1].rows_from("a", 2.0, samples(254, 255)))
+        sinks[0].append(sinks[0].rows_from("a", 3.0, samples(252, 253)))
+        sinks[1].append(sinks[1].rows_from("a", 4.0, samples(0, 1, 4)))
+        sinks[0].append(sinks[0].rows_from("b", 1.5, samples(7, 8, 9)))
+        for sink in sinks:
+            sink.close()
+        out = os.path.join(self.directory, "merged.db")
+        summary = merge_databases([sink.path for sink in sinks], out)
+        self.assertEqual(summary["a"], {'rows': 9, 'lost': 2, 'reordered': 1, 'workers': 2})
+        self.assertEqual(summary["b"], {'rows': 3, 'lost': 0, 'reordered': 0, 'workers': 1})
+        conn = sqlite3.connect(out)
+        rows = conn.execute("SELECT seq, packet_order, worker FROM samples WHERE imei = 'a'").fetchall()
+        conn.close()
+        self.assertEqual([order for _, order, _ in rows], [250, 251, 252, 253, 254, 255, 0, 1, 4])
+        self.assertEqual([seq for seq, _, _ in rows], [250, 251, 252, 253, 254, 255, 256, 257, 260])
+
+    def test_merge_without_databases(self):
+        """目录中没有各进程的数据库：返回空结果，--merge-only 给出提示"""
+        out = os.path.join(self.directory, "merged.db")
+        self.assertEqual(merge_databases([], out), {})
+        self.assertFalse(os.path.exists(out))
+        stdout = io.StringIO()
+        with mock.patch.object(sys, 'argv', ["worker", "--merge-only", "--dir", self.directory]), \
+                contextlib.redirect_stdout(stdout):
+            worker.main()
+        self.assertIn("没有 worker_*.db", stdout.getvalue())
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestWorkerGroup(unittest.TestCase):
+    """两个接收进程共享订阅 up/+，FleetSimulator 发布，合并后的数据与发布的一致"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_group(self, strategy):
+        broker = BrokerThread(strategy)
+        try:
+            group = WorkerGroup(2, '127.0.0.1', broker.port, self.directory, FIELD_ORDER).start()
+            try:
+                simulator = FleetSimulator(20, 40, port=broker.port, samples_per_upload=4, heartbeat_interval=0.5,
+                                           subscribe=False, seed=2)
+                summary = broker.run(simulator.run(1.5))
+                expected = summary['counts']['SENSOR_DATA'] * 4
+                deadline = time.monotonic() + 10
+                while group.rows < expected and time.monotonic() < deadline:
+                    time.sleep(0.05)
+            finally:
+                stats = group.stop()
+        finally:
+            broker.stop()
+        self.assertEqual([item['worker'] for item in stats], [0, 1])
+        self.assertEqual(sum(item['messages'] for item in stats), summary['messages'])
+        self.assertEqual(sum(item['rows'] for item in stats), expected)
+        self.assertTrue(all(item['messages'] > 0 for item in stats))
+        merged = group.merge()
+        self.assertEqual(len(merged), 20)
+        self.assertEqual(sum(item['rows'] for item in merged.values()), expected)
+        self.assertEqual(sum(item['lost'] for item in merged.values()), 0)
+        return stats, merged
+
+    def test_hash_keeps_device_order(self):
+        stats, merged = self.run_group('hash')
+        self.assertEqual({item['workers'] for item in merged.values()}, {1})
+        self.assertEqual(sum(item['reordered'] for item in merged.values()), 0)
+        self.assertEqual(sum(item['out_of_order'] + item['gaps'] for item in stats), 0)
+
+    def test_round_robin_spreads_devices(self):
+        stats, merged = self.run_group('round_robin')
+        self.assertTrue(any(item['workers'] == 2 for item in merged.values()))
+        # 每个进程只看到各设备的部分消息，进程内按包序表现为缺口，合并后补齐
+        self.assertGreater(sum(item['gaps'] for item in stats), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
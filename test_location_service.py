@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 nmea.location 定位服务的缓存与回退（GNSS读取、基站定位为桩函数，时钟为手动推进的 ticks_ms）
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from nmea import GnssFix, LocationService
+from nmea import location as location_module
+
+
+class TestLocationService(unittest.TestCase):
+    """LocationService类测试"""
+
+    def setUp(self):
+        self.now_ms = 1000000
+        patcher = mock.patch.object(location_module, 'ticks_ms', lambda: self.now_ms)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gnss = None
+        self.base = (104.7, 31.4)
+        self.base_calls = 0
+        self.service = LocationService(15, 300, 900, lambda: self.gnss, self.locate_by_base)
+
+    def locate_by_base(self):
+        self.base_calls += 1
+        return self.base
+
+    def advance(self, seconds):
+        self.now_ms += seconds * 1000
+
+    def gnss_fix(self, valid):
+        fix = GnssFix()
+        fix.valid, fix.longitude, fix.latitude = valid, 104.72208517, 31.45541533
+        return fix
+
+    def test_no_fix(self):
+        """从未定位时返回 V 和时长 -1"""
+        self.assertEqual(self.service.get_fix(), (0, 0, 'V', -1))
+
+    def test_base_fallback_rate_limited(self):
+        """GPS关闭时立即基站定位，之后按基站定位间隔重试"""
+        self.service.poll()
+        self.assertEqual(self.base_calls, 1)
+        self.assertEqual(self.service.get_fix(), (104.7, 31.4, 'B', 0))
+        self.advance(299)
+        self.service.poll()
+        self.assertEqual(self.base_calls, 1)
+        self.advance(1)
+        self.base = None
+        self.service.poll()
+        self.assertEqual(self.base_calls, 2)
+        self.assertEqual(self.service.get_fix(), (104.7, 31.4, 'B', 300))
+
+    def test_gnss_replaces_base(self):
+        """GNSS有效时不做基站定位；GNSS失效后等缓存超过基站定位间隔再回退"""
+        self.service.gps_enabled = True
+        self.gnss = self.gnss_fix(True)
+        self.service.poll()
+        self.assertEqual(self.base_calls, 0)
+        self.assertEqual(self.service.get_fix(), (104.72208517, 31.45541533, 'A', 0))
+        self.gnss = self.gnss_fix(False)
+        self.advance(15)
+        self.service.poll()
+        self.assertEqual((self.service.gps_fail_cnt, self.base_calls), (1, 0))
+        self.advance(300)
+        self.service.poll()
+        self.assertEqual(self.base_calls, 1)
+        self.assertEqual(self.service.get_fix()[2], 'B')
+
+    def test_stale_fix(self):
+        """缓存超过 max_age_sec 时 loc_state 为 V，保留最后坐标"""
+        self.service.update_fix(104.7, 31.4, 'A')
+        self.advance(901)
+        self.assertEqual(self.service.get_fix(), (104.7, 31.4, 'V', 901))
+
+
+if __name__ == "__main__":
+    unittest.main()
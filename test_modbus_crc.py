@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 modbus_rtu.crc 查表CRC16/MODBUS实现
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modbus_rtu import crc16, crc16_bytes, append_crc, check_crc
+
+
+def crc16_bitwise(data):
+    """逐位计算的参考实现（原 ModbusInit.calc_crc 的算法）"""
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+class TestModbusCrc(unittest.TestCase):
+    """CRC16/MODBUS测试"""
+
+    def test_known_frames(self):
+        """标准示例帧的CRC"""
+        self.assertEqual(crc16_bytes(bytes([0x01, 0x03, 0x00, 0x00, 0x00, 0x0A])), b'\xC5\xCD')
+        self.assertEqual(crc16_bytes(b"123456789"), b'\x37\x4B')
+
+    def test_matches_bitwise(self):
+        """与逐位算法结果一致，支持 bytes/bytearray/memoryview"""
+        rnd = random.Random(1)
+        for n in (0, 1, 7, 64, 256):
+            data = bytes(rnd.getrandbits(8) for _ in range(n))
+            expected = crc16_bitwise(data)
+            self.assertEqual(crc16(data), expected)
+            self.assertEqual(crc16(bytearray(data)), expected)
+            self.assertEqual(crc16(memoryview(data)), expected)
+
+    def test_incremental(self):
+        """分段计算与整体计算一致"""
+        data = bytes(range(100))
+        self.assertEqual(crc16(data[40:], crc16(data[:40])), crc16(data))
+
+    def test_append_and_check(self):
+        """追加CRC后校验通过，任意字节出错则校验失败"""
+        frame = append_crc(bytearray([0x0F, 0x04, 0x06, 0x03, 0xE8, 0x00, 0x10, 0x00, 0x64]))
+        self.assertTrue(check_crc(frame))
+        self.assertTrue(check_crc(memoryview(frame)))
+        frame[3] ^= 0x01
+        self.assertFalse(check_crc(frame))
+        self.assertFalse(check_crc(b'\x00\x00'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 modbus_rtu.planner 寄存器轮询规划（基于 modbus_rtu.slave_sim 从机仿真）
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modbus_rtu import RtuReceiver, append_crc
+from modbus_rtu.planner import PollScheduler, plan_reads, plan_writes
+from modbus_rtu.slave_sim import ModbusSlave, LoopbackUart
+
+READABLE = ((0x3100, 0x3105), (0x310E, 0x3120))
+
+
+class TestPlanReads(unittest.TestCase):
+    """plan_reads测试"""
+
+    def test_merge_within_gap(self):
+        """间隔不超过 max_gap 的寄存器合并为一次读取"""
+        self.assertEqual(plan_reads([0x310E, 0x3110, 0x3115], READABLE, max_gap=4), [(0x310E, 8)])
+        self.assertEqual(plan_reads([0x310E, 0x3110, 0x3115], READABLE, max_gap=3), [(0x310E, 3), (0x3115, 1)])
+        self.assertEqual(plan_reads([0x310E, 0x3110], READABLE, max_gap=0), [(0x310E, 1), (0x3110, 1)])
+
+    def test_no_merge_across_hole(self):
+        """不跨越不可读区间合并"""
+        self.assertEqual(plan_reads([0x3105, 0x310E], READABLE, max_gap=100), [(0x3105, 1), (0x310E, 1)])
+
+    def test_max_count(self):
+        """单次读取不超过 max_count"""
+        self.assertEqual(plan_reads(range(0x3100, 0x3106), READABLE, max_count=4), [(0x3100, 4), (0x3104, 2)])
+
+    def test_unreadable(self):
+        """不可读地址报错"""
+        with self.assertRaises(ValueError):
+            plan_reads([0x3107], READABLE)
+
+
+class TestPlanWrites(unittest.TestCase):
+    """plan_writes测试"""
+
+    def test_contiguous_runs(self):
+        """只合并地址连续的寄存器"""
+        values = {0x3005: 80, 0x3000: 1, 0x3001: 0, 0x3003: 1}
+        self.assertEqual(plan_writes(values), [(0x3000, [1, 0]), (0x3003, [1]), (0x3005, [80])])
+        self.assertEqual(plan_writes({}), [])
+
+    def test_max_count(self):
+        """单次写入不超过 max_count"""
+        values = dict((0x3000 + i, i) for i in range(5))
+        self.assertEqual(plan_writes(values, max_count=2), [(0x3000, [0, 1]), (0x3002, [2, 3]), (0x3004, [4])])
+
+
+class TestPollScheduler(unittest.TestCase):
+    """PollScheduler测试（对仿真从机读取）"""
+
+    def setUp(self):
+        self.registers = {
+            0x3100: {"name": "firmware_version", "value": 0, "period": 3600},
+            0x3101: {"name": "charging_power", "value": 0, "period": 30},
+            0x310F: {"name": "current_status_bits", "value": 0, "period": 10},
+            0x3110: {"name": "fault_code", "value": 0, "period": 10, "scale": 0.1},
+        }
+        self.scheduler = PollScheduler({0x04: self.registers}, {0x04: READABLE})
+        inputs = dict((addr, addr & 0xFF) for lo, hi in READABLE for addr in range(lo, hi + 1))
+        self.slave = ModbusSlave(0x0F, inputs=inputs)
+        self.receiver = RtuReceiver(LoopbackUart(self.slave, latency_ms=1), 115200)
+
+    def poll(self, requests, now):
+        for fc, start, count in requests:
+            request = append_crc(bytearray([0x0F, fc, start >> 8, start & 0xFF, 0, count]))
+            self.receiver.uart.write(request)
+            frame = self.receiver.receive(0x0F, fc, 200)
+            values = [(frame[3 + i * 2] << 8) | frame[4 + i * 2] for i in range(count)]
+            self.scheduler.update(fc, start, values, now)
+
+    def test_due_by_period(self):
+        """首次全部到期，之后按各自周期到期"""
+        self.poll(self.scheduler.due_requests(0), 0)
+        self.assertEqual(self.slave.transactions, 2)
+        self.assertEqual(self.registers[0x3101]['value'], 0x01)
+        self.assertAlmostEqual(self.registers[0x3110]['value'], 0x10 * 0.1)
+        self.assertEqual(self.scheduler.due_requests(5), [])
+        self.assertEqual(self.scheduler.due_requests(10), [(0x04, 0x310F, 2)])
+        self.assertEqual(self.scheduler.due_requests(30), [(0x04, 0x3101, 1), (0x04, 0x310F, 2)])
+
+    def test_all_requests(self):
+        """all_requests 包含全部寄存器"""
+        self.assertEqual(self.scheduler.all_requests(), [(0x04, 0x3100, 2), (0x04, 0x310F, 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
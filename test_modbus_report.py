@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 modbus_rtu.report 按变化上报
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modbus_rtu.report import ChangeReporter
+
+
+class TestChangeReporter(unittest.TestCase):
+    """ChangeReporter类测试"""
+
+    def setUp(self):
+        self.registers = {
+            0x3101: {"name": "charging_power", "value": 100, "deadband": 5, "deadband_pct": 5},
+            0x3105: {"name": "current_battery_level", "value": 80},
+            0x3110: {"name": "fault_code", "value": 0},
+        }
+        self.reporter = ChangeReporter((self.registers,), full_every=3)
+        self.loc_state = self.reporter.add("loc_state", {"value": 'V'})
+
+    def test_first_full_then_only_changes(self):
+        """首次全量，之后只上报变化值，没有变化时为空"""
+        full, data = self.reporter.collect()
+        self.assertTrue(full)
+        self.assertEqual(data, {"charging_power": 100, "current_battery_level": 80, "fault_code": 0, "loc_state": 'V'})
+        self.registers[0x3110]['value'] = 3
+        self.loc_state['value'] = 'A'
+        self.assertEqual(self.reporter.collect(), (False, {"fault_code": 3, "loc_state": 'A'}))
+        self.assertEqual(self.reporter.collect(), (False, {}))
+
+    def test_deadband(self):
+        """变化不超过绝对死区和百分比死区中较大者时不上报，累计超出后上报"""
+        self.reporter.full_every = 0
+        self.reporter.collect()
+        self.registers[0x3101]['value'] = 104
+        self.assertEqual(self.reporter.collect()[1], {})
+        self.registers[0x3101]['value'] = 106
+        self.assertEqual(self.reporter.collect()[1], {"charging_power": 106})  # 与上次上报值100比较，超出死区5
+        self.registers[0x3101]['value'] = 200
+        self.assertEqual(self.reporter.collect()[1], {"charging_power": 200})
+        self.registers[0x3101]['value'] = 209  # 5% 死区为10
+        self.assertEqual(self.reporter.collect()[1], {})
+        self.registers[0x3101]['value'] = 211
+        self.assertEqual(self.reporter.collect()[1], {"charging_power": 211})
+
+    def test_full_every_and_request(self):
+        """每 full_every 次及请求时全量上报，全量数据为当前值"""
+        self.reporter.collect()
+        self.assertFalse(self.reporter.collect()[0])
+        self.assertFalse(self.reporter.collect()[0])
+        self.registers[0x3101]['value'] = 102
+        full, data = self.reporter.collect()
+        self.assertTrue(full)
+        self.assertEqual(data['charging_power'], 102)
+        self.reporter.request_full()
+        self.assertTrue(self.reporter.collect()[0])
+        self.assertTrue(self.reporter.collect(full=True)[0])
+
+    def test_payload_extras_not_in_snapshot(self):
+        """附带字段只出现在本次上报数据中，不进入快照，不影响变化检测和以后的全量上报"""
+        full, data = self.reporter.collect()
+        message = self.reporter.payload(data, {"full": 1, "pack_sn": 1, "loc_age": 5})
+        self.assertEqual(message["pack_sn"], 1)
+        self.assertEqual(message["charging_power"], 100)
+        self.assertNotIn("pack_sn", self.reporter.snapshot)
+        full, data = self.reporter.collect()
+        self.assertEqual((full, data), (False, {}))
+        self.assertEqual(self.reporter.payload(data, {"pack_sn": 2}), {"pack_sn": 2})
+        full, data = self.reporter.collect(full=True)
+        self.assertEqual(set(data), {"charging_power", "current_battery_level", "fault_code", "loc_state"})
+        self.assertNotIn("loc_age", self.reporter.payload(data, {"pack_sn": 3}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 modbus_rtu.rtu 响应帧接收器
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modbus_rtu import RtuReceiver, append_crc, expected_response_length, silent_interval_us
+
+
+class ScheduledUart:
+    """按时间表到达数据的串口：schedule 为 [(相对创建时刻的毫秒数, 数据), ...]"""
+    def __init__(self, schedule):
+        self.start = time.monotonic()
+        self.pending = list(schedule)
+        self.rx = bytearray()
+
+    def _arrive(self):
+        elapsed_ms = (time.monotonic() - self.start) * 1000
+        while self.pending and self.pending[0][0] <= elapsed_ms:
+            self.rx.extend(self.pending.pop(0)[1])
+
+    def any(self):
+        self._arrive()
+        return len(self.rx)
+
+    def read(self, n):
+        data = bytes(self.rx[:n])
+        del self.rx[:n]
+        return data
+
+
+def read_response(slave, values):
+    """构造读寄存器(0x04)响应帧"""
+    frame = bytearray([slave, 0x04, len(values) * 2])
+    for v in values:
+        frame.extend([v >> 8, v & 0xFF])
+    return bytes(append_crc(frame))
+
+
+class TestModbusRtu(unittest.TestCase):
+    """RtuReceiver测试"""
+
+    def receive(self, schedule, slave=0x0F, cmd=0x04, timeout_ms=500):
+        receiver = RtuReceiver(ScheduledUart(schedule), 115200)
+        start = time.monotonic()
+        frame = receiver.receive(slave, cmd, timeout_ms)
+        return frame, (time.monotonic() - start) * 1000, receiver
+
+    def test_expected_length(self):
+        """由功能码和字节计数推算响应长度"""
+        self.assertEqual(expected_response_length(b'\x0F'), 0)
+        self.assertEqual(expected_response_length(b'\x0F\x04'), 0)
+        self.assertEqual(expected_response_length(b'\x0F\x04\x12'), 23)
+        self.assertEqual(expected_response_length(b'\x0F\x06'), 8)
+        self.assertEqual(expected_response_length(b'\x0F\x84'), 5)
+        self.assertEqual(expected_response_length(b'\x0F\x41'), -1)
+
+    def test_silent_interval(self):
+        """3.5字符时间"""
+        self.assertEqual(silent_interval_us(9600), 4010)
+        self.assertEqual(silent_interval_us(115200), 1750)
+
+    def test_fragmented_frame(self):
+        """分多次到达的响应拼成完整帧后立即返回"""
+        frame = read_response(0x0F, list(range(18)))
+        frame_out, elapsed_ms, _ = self.receive([(5, frame[:4]), (6, frame[4:20]), (8, frame[20:])])
+        self.assertEqual(bytes(frame_out), frame)
+        self.assertLess(elapsed_ms, 100)
+
+    def test_gap_inside_frame(self):
+        """帧头匹配但未收齐时，字符间停顿超过静默间隔也继续等待"""
+        frame = read_response(0x0F, list(range(6)))
+        frame_out, _, receiver = self.receive([(1, frame[:4]), (20, frame[4:9]), (40, frame[9:])])
+        self.assertEqual(bytes(frame_out), frame)
+        self.assertEqual(receiver.discarded_frames, 0)
+
+    def test_exception_response(self):
+        """异常响应按5字节接收"""
+        frame = bytes(append_crc(bytearray([0x0F, 0x84, 0x02])))
+        frame_out, _, _ = self.receive([(2, frame)])
+        self.assertEqual(bytes(frame_out), frame)
+
+    def test_skip_other_slave_and_noise(self):
+        """丢弃其他从机的帧，跳过帧前干扰字节"""
+        other = read_response(0x01, [1, 2])
+        ours = read_response(0x0F, [3, 4])
+        frame_out, _, receiver = self.receive([(1, other), (10, b'\x00' + ours)])
+        self.assertEqual(bytes(frame_out), ours)
+        self.assertEqual(receiver.discarded_frames, 1)
+
+    def test_bad_crc_times_out(self):
+        """CRC错误的帧不返回，超时返回None"""
+        frame = bytearray(read_response(0x0F, [1, 2]))
+        frame[-1] ^= 0xFF
+        frame_out, elapsed_ms, receiver = self.receive([(1, bytes(frame))], timeout_ms=50)
+        self.assertIsNone(frame_out)
+        self.assertGreaterEqual(elapsed_ms, 50)
+        self.assertEqual(receiver.discarded_frames, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 nmea 流式解析（样例数据为 get_gps_coordinates 中的 quecgnss 读取数据）
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from nmea import GnssParser, NmeaTokenizer, parse_ddmm, parse_float
+from nmea.bench_nmea import SAMPLE_STREAM, old_read
+from nmea import tokenizer as tokenizer_module
+from nmea.tokenizer import _xor_bytes
+
+
+class TestNmeaTokenizer(unittest.TestCase):
+    """NmeaTokenizer类测试"""
+
+    def test_sample_sentences(self):
+        """首尾不完整的语句不返回，其余语句校验通过"""
+        tokenizer = NmeaTokenizer()
+        sentences = tokenizer.feed(SAMPLE_STREAM)
+        self.assertEqual(len(sentences), 16)
+        self.assertEqual(sentences[0][:6], b'GPGSV,')
+        self.assertEqual(tokenizer.checksum_errors, 0)
+        self.assertEqual(tokenizer.buf, b'$GBGSV,5,1,1')
+
+    def test_sentence_across_reads(self):
+        """跨读取边界的语句拼接后返回"""
+        rmc = b'$GNRMC,134832.00,A,3127.32492,N,10443.09311,E,0.339,,190824,,,A,V*15\r\n'
+        tokenizer = NmeaTokenizer((b'RMC',))
+        self.assertEqual(tokenizer.feed(rmc[:20]), [])
+        self.assertEqual(tokenizer.feed(rmc[20:]), [rmc[1:-5]])
+
+    def test_checksum_error(self):
+        """校验和错误、缺少校验和或被截断的语句丢弃"""
+        tokenizer = NmeaTokenizer()
+        self.assertEqual(tokenizer.feed(b'$GNVTG,,T,,M,0.199,N,0.368,K,A*30\r\n'), [])
+        self.assertEqual(tokenizer.feed(b'$GNVTG,,T,,M,0.199,N,0.368,K,A\r\n'), [])
+        self.assertEqual(tokenizer.feed(b'$GNVTG,,T,$GNVTG,,T,,M,0.199,N,0.368,K,A*31\r\n'),
+                         [b'GNVTG,,T,,M,0.199,N,0.368,K,A'])
+        self.assertEqual(tokenizer.checksum_errors, 3)
+
+    def test_xor_bytes(self):
+        """折半异或与逐字节异或结果相同；不支持大整数的固件走逐字节异或，切分结果不变"""
+        data = SAMPLE_STREAM.encode()
+        for bigint in (True, False):
+            with mock.patch.object(tokenizer_module, '_BIGINT', bigint):
+                for n in range(0, 130):
+                    expected = 0
+                    for c in data[:n]:
+                        expected ^= c
+                    self.assertEqual(_xor_bytes(data[:n]), expected)
+                tokenizer = NmeaTokenizer()
+                self.assertEqual(len(tokenizer.feed(data)), tokenizer.sentences)
+                self.assertEqual((tokenizer.checksum_errors > 0, tokenizer.sentences > 0), (False, True))
+
+    def test_overflow(self):
+        """没有换行的超长数据丢弃"""
+        tokenizer = NmeaTokenizer()
+        tokenizer.feed(b'$GNRMC,' + b'0' * 200)
+        self.assertEqual(tokenizer.buf, b'')
+        self.assertEqual(tokenizer.overflows, 1)
+
+
+class TestGnssParser(unittest.TestCase):
+    """GnssParser类测试"""
+
+    def test_sample_fix(self):
+        """分块输入与整块输入结果相同，经纬度与原解析方式一致"""
+        for chunk in (1, 7, 64, len(SAMPLE_STREAM)):
+            parser = GnssParser()
+            for i in range(0, len(SAMPLE_STREAM), chunk):
+                parser.feed(SAMPLE_STREAM[i:i + chunk])
+            fix = parser.fix
+            self.assertTrue(fix.valid)
+            self.assertEqual(fix.rmc_count, 1)
+            longitude, latitude = old_read(SAMPLE_STREAM)
+            self.assertAlmostEqual(fix.longitude, longitude, places=9)
+            self.assertAlmostEqual(fix.latitude, latitude, places=9)
+            self.assertEqual((fix.time, fix.date, fix.mode), (134832, 190824, 'A'))
+            self.assertEqual((fix.quality, fix.satellites, fix.altitude), (1, 10, 599.4))
+            self.assertEqual((fix.fix_type, fix.pdop, fix.hdop, fix.vdop), (3, 2.45, 1.45, 1.97))
+            self.assertEqual((fix.speed_knots, fix.speed_kmh, fix.course), (0.339, 0.368, None))  # RMC在VTG之后
+
+    def test_invalid_rmc(self):
+        """未定位的RMC"""
+        parser = GnssParser()
+        parser.feed('$GNRMC,,V,,,,,,,,,,N,V*37\r\n')
+        self.assertFalse(parser.fix.valid)
+        self.assertIsNone(parser.fix.latitude)
+        self.assertEqual(parser.fix.rmc_count, 1)
+
+
+class TestFieldConversion(unittest.TestCase):
+    """字段转换测试"""
+
+    def test_parse_ddmm(self):
+        self.assertAlmostEqual(parse_ddmm(b'3127.32492', b'N'), 31 + 27.32492 / 60, places=12)
+        self.assertAlmostEqual(parse_ddmm(b'10443.09311', b'W'), -(104 + 43.09311 / 60), places=12)
+        self.assertAlmostEqual(parse_ddmm(b'0030.0', b'S'), -0.5)
+        self.assertIsNone(parse_ddmm(b'', b'N'))
+
+    def test_parse_float(self):
+        self.assertEqual(parse_float(b'599.4'), 599.4)
+        self.assertEqual(parse_float(b'-12.5'), -12.5)
+        self.assertEqual(parse_float(b'10'), 10)
+        self.assertIsNone(parse_float(b''))
+        self.assertIsNone(parse_float(b'1x'))
+
+
+if __name__ == "__main__":
+    unittest.main()
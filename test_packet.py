@@ -6,13 +6,11 @@
 
 import struct
 
+from stm32_protocol import FRAME_HEADER, FRAME_TAIL, checksum as calculate_checksum
+
 # 用户提供的数据包
 PACKET_STR = "AA55012700000100F7FFFEFF010000000000FEFFFCFF00005B3A0100000000000000F03F0000000000000040C255AA"
 
-# 帧格式常量
-FRAME_HEADER = b'\xAA\x55'
-FRAME_TAIL = b'\x55\xAA'
-
 def hex_str_to_bytes(hex_str):
     """将十六进制字符串转换为字节数组"""
     if len(hex_str) % 2 != 0:
@@ -25,15 +23,6 @@ def hex_str_to_bytes(hex_str):
     
     return bytes(bytes_data)
 
-def calculate_checksum(cmd, data_len, data):
-    """计算校验和（异或校验）"""
-    checksum = cmd
-    checksum ^= (data_len >> 8) & 0xFF
-    checksum ^= data_len & 0xFF
-    for byte in data:
-        checksum ^= byte
-    return checksum
-
 def parse_sensor_data(data):
     """解析传感器数据上传帧（复制自 main.py）"""
     sensor_data_list = []
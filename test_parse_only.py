@@ -8,14 +8,7 @@ import sys
 import struct
 import time
 
-def calculate_checksum(cmd, data_len, data):
-    """计算校验和（异或校验）"""
-    checksum = cmd
-    checksum ^= (data_len >> 8) & 0xFF
-    checksum ^= data_len & 0xFF
-    for byte in data:
-        checksum ^= byte
-    return checksum
+from stm32_protocol import checksum as calculate_checksum
 
 def parse_sensor_data(data):
     """解析传感器数据上传帧 - 独立版本，不依赖 machine 模块"""
@@ -8,6 +8,8 @@ import sys
 import io
 from unittest.mock import Mock
 import stm32_simulation_test as stm32
+from stm32_protocol import (CMD_UP_DATA_UPLOAD, FRAME_HEADER, FRAME_TAIL, SAMPLE_SIZE, pack_frame, pack_sample,
+                            unpack_frame, unpack_sample)
 
 def test_send_bytes_printing():
     """测试发送字节时的打印功能"""
@@ -29,16 +31,8 @@ def test_send_bytes_printing():
     sys.stdout = captured_output
     
     try:
-        # 创建传感器数据生成器
-        data_generator = stm32.SensorDataGenerator()
-        
-        # 使用 generate_sensor_data 方法生成完整的传感器数据
-        sensor_data = data_generator.generate_sensor_data()
-        
-        data_bytes = data_generator.sensor_data_to_bytes(sensor_data)
-        
-        # 发送帧
-        result = simulator.send_frame(stm32.CMD_DATA_UPLOAD, data_bytes)
+        # 发送帧（固定传感器数据，包序自增）
+        result = simulator.send_frame()
         
         # 恢复标准输出
         sys.stdout = sys.__stdout__
@@ -46,6 +40,14 @@ def test_send_bytes_printing():
         print(f"发送结果: {'成功' if result else '失败'}")
         print()
         
+        # 按 stm32_protocol 解包写入串口的帧，数据域为一个样本
+        frame = mock_ser.write.call_args[0][0]
+        cmd, data_len, data = unpack_frame(frame)
+        assert cmd == CMD_UP_DATA_UPLOAD, "命令码不正确"
+        assert data_len == SAMPLE_SIZE, "数据长度不正确"
+        expected = dict(simulator.fixed_sensor_data, packet_order=0)
+        assert data == pack_sample(expected), "样本内容不正确"
+        
         # 检查是否有发送字节的打印输出
         output = captured_output.getvalue()
         print("捕获到的输出:")
@@ -84,17 +86,20 @@ def test_pack_frame():
         # 使用 generate_sensor_data 方法生成完整的传感器数据
         sensor_data = data_generator.generate_sensor_data()
         
-        data_bytes = data_generator.sensor_data_to_bytes(sensor_data)
+        data_bytes = pack_sample(sensor_data)
         
-        # 打包帧
-        frame = simulator.pack_frame(stm32.CMD_DATA_UPLOAD, data_bytes)
+        # 打包帧，模拟器与 stm32_protocol 的结果相同
+        frame = simulator.pack_frame(CMD_UP_DATA_UPLOAD, data_bytes)
+        assert frame == pack_frame(CMD_UP_DATA_UPLOAD, data_bytes), "帧内容与 stm32_protocol 不一致"
         
         print(f"帧长度: {len(frame)} 字节")
         print(f"帧内容: {' '.join(f'{byte:02X}' for byte in frame)}")
         
         # 验证帧格式
-        assert frame[:2] == stm32.FRAME_HEADER, "帧头不正确"
-        assert frame[-2:] == stm32.FRAME_TAIL, "帧尾不正确"
+        assert frame[:2] == FRAME_HEADER, "帧头不正确"
+        assert frame[-2:] == FRAME_TAIL, "帧尾不正确"
+        cmd, data_len, data = unpack_frame(frame)
+        assert unpack_sample(data)[0] == sensor_data['packet_order'], "包序不正确"
         
         print("✓ 帧打包功能正常")
         return True
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 stm32_protocol.bulk 批量解码（依赖 NumPy）
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from stm32_protocol import SAMPLE_FIELDS, SAMPLE_SIZE, pack_frame, pack_samples, pack_sensor_frame
+from stm32_protocol.bulk import (SAMPLE_DTYPE, decode_frames, decode_samples, find_frames, frame_checksums_ok,
+                                 to_columns)
+
+
+def make_samples(count, base=0):
+    return [((base + i) % 256, i - 100, -2, 72, -10, -14, -5, -10, -14, -5, -3, -409, 96314 + base + i, 425.75 + i,
+             104.7463432 + i * 1e-6, 31.4627341 - i * 1e-6) for i in range(count)]
+
+
+class TestDecodeSamples(unittest.TestCase):
+    """结构化类型与 SAMPLE_FORMAT 逐字段一致"""
+
+    def test_fields(self):
+        samples = make_samples(30)
+        decoded = decode_samples(pack_samples(samples))
+        self.assertEqual(SAMPLE_DTYPE.itemsize, SAMPLE_SIZE)
+        self.assertEqual(len(decoded), 30)
+        self.assertEqual([tuple(s) for s in decoded.tolist()], samples)
+        columns = to_columns(decoded)
+        self.assertEqual(tuple(columns), SAMPLE_FIELDS)
+        self.assertEqual(columns['pressure'].tolist(), [s[12] for s in samples])
+        self.assertTrue(to_columns(decoded, copy=True)['latitude'].flags['C_CONTIGUOUS'])
+        with self.assertRaises(ValueError):
+            decode_samples(pack_samples(samples)[:-1])
+
+
+class TestDecodeFrames(unittest.TestCase):
+    """帧流批量解码：等长帧快速路径与一般路径结果一致"""
+
+    def test_regular_stream(self):
+        """等长帧首尾相接，帧前有干扰字节"""
+        frames = [make_samples(5, base=i * 5) for i in range(40)]
+        stream = b'\x00\x01' + b''.join(pack_sensor_frame(f) for f in frames) + b'\x55'
+        samples, count, bad = decode_frames(stream)
+        self.assertEqual((count, bad), (40, 0))
+        self.assertEqual([tuple(s) for s in samples.tolist()], [s for f in frames for s in f])
+
+    def test_mixed_stream(self):
+        """不同长度的帧、其它命令、校验和错误、截断的帧和数据域中的 AA 55"""
+        first, second, third = make_samples(3), make_samples(1, base=7), make_samples(2, base=9)
+        good = pack_sensor_frame(first)
+        corrupted = bytearray(pack_sensor_frame(make_samples(2)))
+        corrupted[10] ^= 0xFF
+        # 数据域内嵌一个完整的小帧，整体作为帧接受后不应再取出嵌入的帧
+        inner = pack_frame(0x04, b'\x01')
+        fake = pack_frame(0x09, b'\xAA\x55' + inner)
+        stream = (b'\xAA\x55\xFF' + good + pack_frame(0x04, b'\x01') + bytes(corrupted) + fake +
+                  pack_sensor_frame(second) + pack_sensor_frame(third) + pack_sensor_frame(first)[:-5])
+        samples, count, bad = decode_frames(stream)
+        self.assertEqual((count, bad), (3, 1))
+        self.assertEqual([tuple(s) for s in samples.tolist()], first + second + third)
+        starts, ends = find_frames(stream)
+        self.assertTrue(np.all(ends[:-1] <= starts[1:]))
+
+    def test_overlap_with_bad_checksum(self):
+        """结构正确但校验失败的假帧包住真帧时，真帧不被挡住，假帧也不计为校验失败"""
+        samples = make_samples(2, base=3)
+        real = pack_sensor_frame(samples)
+        k = 4
+        data_len = k + len(real) - 3
+        stream = b'\xAA\x55\x01' + bytes((data_len & 0xFF, data_len >> 8)) + b'\x00' * k + real
+        self.assertFalse(frame_checksums_ok(stream, np.array([0]), np.array([len(stream)]))[0])
+        decoded, count, bad = decode_frames(stream)
+        self.assertEqual((count, bad), (1, 0))
+        self.assertEqual([tuple(s) for s in decoded.tolist()], samples)
+        starts, ends = find_frames(stream)
+        self.assertEqual((starts.tolist(), ends.tolist()), ([k + 5], [len(stream)]))
+
+    def test_regular_stream_with_bad_frames(self):
+        """等长帧中有校验失败的帧或其它命令的帧"""
+        frames = [pack_sensor_frame(make_samples(3, base=i * 3)) for i in range(10)]
+        corrupted = bytearray(frames[4])
+        corrupted[20] ^= 0x01
+        stream = b''.join(frames[:4]) + bytes(corrupted) + b''.join(frames[5:])
+        decoded, count, bad = decode_frames(stream)
+        self.assertEqual((count, bad), (9, 1))
+        expected = [s for i in range(10) if i != 4 for s in make_samples(3, base=i * 3)]
+        self.assertEqual([tuple(s) for s in decoded.tolist()], expected)
+        other = pack_frame(0x09, pack_samples(make_samples(3)))
+        stream = b''.join(frames[:4]) + other + b''.join(frames[5:])
+        decoded, count, bad = decode_frames(stream)
+        self.assertEqual((count, bad, len(decoded)), (9, 0, 27))
+        self.assertEqual(len(find_frames(stream)[0]), 10)
+
+    def test_empty(self):
+        for stream in (b'', b'\xAA\x55', b'\x00' * 100):
+            samples, count, bad = decode_frames(stream)
+            self.assertEqual((len(samples), count, bad), (0, 0, 0))
+            self.assertEqual(samples.dtype, SAMPLE_DTYPE)
+
+
+if __name__ == '__main__':
+    unittest.main()
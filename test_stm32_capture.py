@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试串口抓包录制与回放（stm32_protocol/capture.py）
+"""
+
+import os
+import pty
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tty
+import unittest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+sys.path.insert(0, os.path.join(ROOT, "emulator", "qpy"))
+
+import machine
+from stm32_protocol import pack_frame, pack_sensor_frame
+from stm32_protocol.capture import (DIR_RX, DIR_TX, CaptureReader, CaptureTap, CaptureWriter, DeviceTarget,
+                                    ReassemblerTarget, record_serial, replay)
+
+
+def make_samples(count):
+    return [(i % 256, 59, -2, 72, -10, -14, -5, -10, -14, -5, -3, -409, 96314, 425.75, 104.7463432, 31.4627341)
+            for i in range(count)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "uart.ucap")
+
+    def write_capture(self, chunks, index_interval=4):
+        """chunks: [(相对开始的秒数, 方向, 数据)]"""
+        clock = FakeClock()
+        writer = CaptureWriter(self.path, index_interval, clock)
+        for offset, direction, data in chunks:
+            writer.write(direction, data, clock.now + offset)
+        return writer
+
+
+class TestImport(unittest.TestCase):
+    """没有 pty/termios/tty 的平台（Windows）也能导入抓包模块"""
+
+    def test_import_without_posix_tty(self):
+        code = ("import sys; sys.modules.update(pty=None, termios=None, tty=None); "
+                "from stm32_protocol.capture import CaptureReader, CaptureTap, replay")
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+class TestCaptureFile(CaptureTestCase):
+    """抓包文件读写测试"""
+
+    def test_round_trip_and_seek(self):
+        chunks = [(i * 0.01, DIR_TX if i % 5 == 0 else DIR_RX, bytes([i]) * (i + 1)) for i in range(30)]
+        self.write_capture(chunks).close()
+        with CaptureReader(self.path) as reader:
+            self.assertFalse(reader.recovered)
+            self.assertEqual(reader.records, 30)
+            self.assertEqual(len(reader.index), 8)
+            self.assertEqual(reader.duration_us, 290000)
+            records = list(reader.iter_records())
+            self.assertEqual(records, [(i * 10000, d, data) for i, (_, d, data) in enumerate(chunks)])
+            later = list(reader.iter_records(start_us=125000, end_us=200000, direction=DIR_RX))
+            self.assertEqual([r[2][0] for r in later], [13, 14, 16, 17, 18, 19])
+
+    def test_large_chunk_split(self):
+        writer = self.write_capture([(0, DIR_RX, b'\x01' * 70000)])
+        writer.close()
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([len(r[2]) for r in reader.iter_records()], [65535, 4465])
+
+    def test_truncated_file_recovered(self):
+        """录制中断（没有索引、最后一条记录不完整）的文件仍可读取"""
+        writer = self.write_capture([(i * 0.001, DIR_RX, b'abc') for i in range(10)])
+        writer.file.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - 2)
+        with CaptureReader(self.path) as reader:
+            self.assertTrue(reader.recovered)
+            self.assertEqual(reader.records, 9)
+            self.assertEqual(len(list(reader.iter_records(start_us=5000))), 4)
+
+    def test_not_a_capture(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 32)
+        with self.assertRaises(ValueError):
+            CaptureReader(self.path)
+
+
+class TestReplay(CaptureTestCase):
+    """回放测试：块边界、倍速和目标"""
+
+    def test_speed(self):
+        self.write_capture([(i * 0.1, DIR_RX, b'x') for i in range(11)]).close()
+        for speed, expected in ((1, 1.0), (10, 0.1), (0, 0.0)):
+            clock = FakeClock()
+            with CaptureReader(self.path) as reader:
+                chunks, total, elapsed, _ = replay(reader.iter_records(), lambda data: None, speed, clock,
+                                                   clock.sleep)
+            self.assertEqual((chunks, total), (11, 11))
+            self.assertAlmostEqual(elapsed, expected, places=6)
+
+    def test_chunk_boundaries_into_device(self):
+        """帧跨块录制，回放到设备 STM32Communication 与 FrameReassembler 得到相同的帧"""
+        stream = b'\x00\xFF' + b''.join(pack_sensor_frame(make_samples(3)) for _ in range(6)) + pack_frame(0x04)
+        chunks = [(i * 0.001, DIR_RX, stream[i:i + 37]) for i in range(0, len(stream), 37)]
+        self.write_capture(chunks).close()
+        received = []
+        reassembler = ReassemblerTarget()
+        with CaptureReader(self.path) as reader:
+            replay(reader.iter_records(direction=DIR_RX), lambda data: (received.append(data), reassembler(data)), 0)
+            device = DeviceTarget()
+            replay(reader.iter_records(direction=DIR_RX), device, 0)
+        self.assertEqual(received, [c[2] for c in chunks])
+        self.assertEqual(reassembler.frames, 7)
+        self.assertEqual(reassembler.counters().dropped_bytes, 2)
+        self.assertEqual((device.frames, device.samples), (7, 18))
+
+
+class TestRecorders(CaptureTestCase):
+    """CaptureTap 与 record_serial 测试"""
+
+    def test_tap(self):
+        link = machine.MemoryLink()
+        writer = CaptureWriter(self.path)
+        tap = CaptureTap(link, writer)
+        tap.feed(b'\xAA\x55\x04')
+        self.assertEqual(tap.read(2), b'\xAA\x55')
+        self.assertEqual(tap.read(), b'\x04')
+        tap.write(b'reply')
+        self.assertEqual(link.drain(), b'reply')
+        writer.close()
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([(d, data) for _, d, data in reader.iter_records()],
+                             [(DIR_RX, b'\xAA\x55'), (DIR_RX, b'\x04'), (DIR_TX, b'reply')])
+
+    def test_record_pty_bridge(self):
+        """录制pty上的数据，转发到桥接pty，桥接端写入的数据记录为 tx"""
+        stm32_master, stm32_slave = pty.openpty()
+        tty.setraw(stm32_slave)
+        bridge_master, bridge_slave = pty.openpty()
+        tty.setraw(bridge_slave)
+        for fd in (stm32_master, stm32_slave, bridge_master, bridge_slave):
+            self.addCleanup(os.close, fd)
+        writer = CaptureWriter(self.path)
+        stop = threading.Event()
+        recorder = threading.Thread(target=record_serial,
+                                    args=(os.ttyname(stm32_slave), writer, 5, None, bridge_master, stop.is_set))
+        recorder.start()
+        time.sleep(0.1)
+        frame = pack_sensor_frame(make_samples(2))
+        os.write(stm32_master, frame[:50])
+        time.sleep(0.05)
+        os.write(stm32_master, frame[50:])
+        forwarded = b''
+        deadline = time.monotonic() + 2
+        while len(forwarded) < len(frame) and time.monotonic() < deadline:
+            forwarded += os.read(bridge_slave, 4096)
+        os.write(bridge_slave, b'\x05')
+        self.assertEqual(os.read(stm32_master, 16), b'\x05')
+        stop.set()
+        recorder.join()
+        writer.close()
+        self.assertEqual(forwarded, frame)
+        with CaptureReader(self.path) as reader:
+            records = list(reader.iter_records())
+        self.assertEqual(b''.join(r[2] for r in records if r[1] == DIR_RX), frame)
+        self.assertEqual(len([r for r in records if r[1] == DIR_RX]), 2)
+        self.assertEqual([r[2] for r in records if r[1] == DIR_TX], [b'\x05'])
+
+
+if __name__ == '__main__':
+    unittest.main()
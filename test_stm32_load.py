@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 stm32_simulation_test.py 的压测模式：运动场景、限速和故障注入
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stm32_protocol import FrameReassembler, unpack_samples
+from stm32_simulation_test import FaultInjector, LoadGenerator, SensorDataGenerator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def magnitude(sample):
+    return math.sqrt(sample['accel_x'] ** 2 + sample['accel_y'] ** 2 + sample['accel_z'] ** 2)
+
+
+class TestMotionProfiles(unittest.TestCase):
+    """SensorDataGenerator.generate_motion_sample 测试"""
+
+    def test_profiles(self):
+        generator = SensorDataGenerator()
+        idle = [magnitude(generator.generate_motion_sample("idle", i / 100.0)) for i in range(100)]
+        self.assertTrue(all(950 < a < 1050 for a in idle))
+        walking = [generator.generate_motion_sample("walking", i / 100.0)['accel_z'] for i in range(100)]
+        self.assertGreater(max(walking) - min(walking), 400)
+        generator = SensorDataGenerator()
+        fall = [generator.generate_motion_sample("freefall", i / 1000.0) for i in range(4000)]
+        self.assertLess(min(magnitude(s) for s in fall), 100)
+        self.assertGreater(max(magnitude(s) for s in fall), 5000)
+        self.assertAlmostEqual(fall[-1]['altitude'], fall[0]['altitude'] - 1.0, places=2)
+        self.assertEqual([s['packet_order'] for s in fall[254:258]], [254, 255, 0, 1])
+
+
+class TestLoadGenerator(unittest.TestCase):
+    """LoadGenerator类测试"""
+
+    def run_generator(self, generator, **kwargs):
+        chunks = []
+        generator.write = chunks.append
+        clock = FakeClock()
+        report = generator.run(clock=clock, sleep=clock.sleep, **kwargs)
+        return report, chunks
+
+    def test_pacing_and_line_rate(self):
+        generator = LoadGenerator(None, 921600, 1000, 10, "idle", seed=1)
+        report, chunks = self.run_generator(generator, duration=1.0)
+        self.assertEqual((report['frames_sent'], len(chunks)), (100, 100))
+        self.assertAlmostEqual(report['elapsed'], 0.99, places=6)
+        # 帧间隔小于2ms时合并写入，总帧数不变
+        generator = LoadGenerator(None, 3000000, 5000, 5, "idle", seed=1)
+        report, chunks = self.run_generator(generator, duration=0.5)
+        self.assertEqual(report['frames_sent'], 500)
+        self.assertEqual(len(chunks), 250)
+        # 115200 bps 下每帧20个样本（948字节）约243样本/秒
+        generator = LoadGenerator(None, 115200, 0, 20, "idle", seed=1)
+        self.assertAlmostEqual(generator.sample_rate, 115200 / 10.0 / 948 * 20)
+
+    def test_seed_does_not_touch_global_random(self):
+        """同一种子生成相同的帧池，且不重置全局 random"""
+        random.seed(3)
+        expected = [random.random() for _ in range(3)]
+        random.seed(3)
+        first = LoadGenerator(None, 115200, 500, 3, "walking", pool_frames=8, seed=1)
+        second = LoadGenerator(None, 115200, 500, 3, "walking", pool_frames=8, seed=1)
+        self.assertEqual([random.random() for _ in range(3)], expected)
+        self.assertEqual(first.pool, second.pool)
+        self.assertNotEqual(first.pool, LoadGenerator(None, 115200, 500, 3, "walking", pool_frames=8, seed=2).pool)
+
+    def test_packet_order_continuous_across_pool(self):
+        generator = LoadGenerator(None, 115200, 500, 3, "walking", seed=1)
+        self.assertEqual(len(generator.pool) % 256, 0)
+        report, chunks = self.run_generator(generator, frames=len(generator.pool) + 10)
+        frames = FrameReassembler().feed(b''.join(chunks))
+        orders = [s[0] for _, _, data in frames for s in unpack_samples(data)]
+        self.assertEqual(orders, [i % 256 for i in range(len(orders))])
+
+    def test_fault_injection_expected_frames(self):
+        """接收端按64字节分块收帧，收到的帧数与报告的完整帧数一致"""
+        faults = FaultInjector(bit_flip=0.05, drop_byte=0.05, truncate=0.05, garbage=0.1, duplicate=0.05, seed=7)
+        generator = LoadGenerator(None, 921600, 0, 5, "freefall", faults, seed=7)
+        report, chunks = self.run_generator(generator, frames=3000)
+        for name in ('bit_flip', 'drop_byte', 'truncate', 'garbage', 'duplicate'):
+            self.assertGreater(report[name], 50, name)
+        stream = b''.join(chunks)
+        self.assertEqual(report['bytes_sent'], len(stream))
+        reassembler = FrameReassembler()
+        received = 0
+        for i in range(0, len(stream), 64):
+            received += len(reassembler.feed(stream[i:i + 64]))
+        self.assertEqual(received, report['expected_frames'])
+        damaged = report['bit_flip'] + report['drop_byte'] + report['truncate']
+        self.assertEqual(report['expected_frames'], 3000 + report['duplicate'] - damaged)
+
+
+if __name__ == '__main__':
+    unittest.main()
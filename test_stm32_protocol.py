@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 STM32 串口协议公共模块（stm32_protocol）及 device/main.py 的跨读取收帧
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stm32_protocol import (FRAME_HEADER, FRAME_TAIL, SAMPLE_FIELDS, SAMPLE_FORMAT, SAMPLE_SIZE, FrameReassembler,
+                            checksum, pack_frame, pack_sample, pack_samples, pack_sensor_frame, sample_to_dict,
+                            split_samples, unpack_frame, unpack_samples, xor_bytes)
+from stm32_protocol import frame as frame_module
+
+
+def make_samples(count):
+    return [(i % 256, i, -2, 72, -10, -14, -5, -10, -14, -5, -3, -409, 96314 + i, 425.75, 104.7463432, 31.4627341)
+            for i in range(count)]
+
+
+class TestFrameCodec(unittest.TestCase):
+    """帧打包、解包和校验和测试"""
+
+    def test_checksum(self):
+        """折叠异或与逐字节异或结果一致"""
+        for size in (0, 1, 47, 81, 200, 1000):
+            data = bytes((i * 37 + size) & 0xFF for i in range(size))
+            expected = 0
+            for b in data:
+                expected ^= b
+            self.assertEqual(xor_bytes(data), expected, size)
+            self.assertEqual(checksum(0x01, size, data), 0x01 ^ (size >> 8) ^ (size & 0xFF) ^ expected)
+
+    def test_bytewise_fallback(self):
+        """不支持大整数时用逐字节异或"""
+        data = bytes(range(200))
+        fast = xor_bytes(data)
+        bigint = frame_module._BIGINT
+        frame_module._BIGINT = False
+        try:
+            self.assertEqual(xor_bytes(data), fast)
+        finally:
+            frame_module._BIGINT = bigint
+
+    def test_pack_unpack(self):
+        data = b'\x01\x02\x03'
+        frame = pack_frame(0x01, data)
+        self.assertEqual(frame, b'\xAA\x55\x01\x03\x00\x01\x02\x03\x02\x55\xAA')
+        self.assertEqual(unpack_frame(frame), (0x01, 3, data))
+        self.assertEqual(unpack_frame(frame[:-4] + b'\x00' + FRAME_TAIL), (None, None, None))
+        self.assertEqual(unpack_frame(FRAME_HEADER + b'\x05\x00\x00\x05' + FRAME_TAIL), (0x05, 0, b''))
+
+    def test_samples(self):
+        samples = make_samples(3)
+        data = pack_samples(samples)
+        self.assertEqual(len(data), 3 * SAMPLE_SIZE)
+        self.assertEqual(data[:SAMPLE_SIZE], struct.pack(SAMPLE_FORMAT, *samples[0]))
+        self.assertEqual(unpack_samples(data), samples)
+        self.assertEqual(split_samples(data)[2], data[2 * SAMPLE_SIZE:])
+        self.assertEqual(split_samples(data[:-1]), [])
+        with self.assertRaises(ValueError):
+            unpack_samples(data[:-1])
+        as_dict = sample_to_dict(samples[1])
+        self.assertEqual(list(as_dict), list(SAMPLE_FIELDS))
+        self.assertEqual(pack_sample(as_dict), data[SAMPLE_SIZE:2 * SAMPLE_SIZE])
+        self.assertEqual(unpack_frame(pack_sensor_frame(samples))[2], data)
+
+
+class TestFrameReassembler(unittest.TestCase):
+    """FrameReassembler类测试"""
+
+    def test_frames_split_across_reads(self):
+        """每帧5个样本（243字节）按64字节分块送入，全部还原"""
+        frames = [pack_sensor_frame(make_samples(5)) for _ in range(10)]
+        stream = b''.join(frames)
+        reassembler = FrameReassembler()
+        result = []
+        for i in range(0, len(stream), 64):
+            result.extend(reassembler.feed(stream[i:i + 64]))
+        self.assertEqual(len(result), 10)
+        self.assertEqual(result[0], unpack_frame(frames[0]))
+        self.assertEqual(reassembler.buf, b'')
+
+    def test_resync(self):
+        """帧前干扰字节、校验和错误、帧尾错误和超长长度字段后都能找回下一帧"""
+        good = pack_frame(0x04, b'\x01')
+        bad_checksum = good[:6] + b'\x00' + good[7:]
+        bad_tail = good[:-1] + b'\x00'
+        huge = FRAME_HEADER + b'\x01\xFF\xFF'
+        stream = b'\x00\xAA' + good + bad_checksum + bad_tail + huge + good + b'\xAA'
+        reassembler = FrameReassembler()
+        self.assertEqual(reassembler.feed(stream), [(0x04, 1, b'\x01'), (0x04, 1, b'\x01')])
+        self.assertEqual(reassembler.checksum_errors, 1)
+        self.assertEqual(reassembler.resyncs, 3)
+        self.assertEqual(reassembler.buf, b'\xAA')  # 可能是下一帧帧头的第一个字节
+        self.assertEqual(reassembler.feed(b'\x55\x05\x00\x00\x05\x55\xAA'), [(0x05, 0, b'')])
+
+    def test_byte_by_byte(self):
+        frame = pack_frame(0x03, b'\x0a\x00\x3c\x00\x01')
+        reassembler = FrameReassembler()
+        result = []
+        for b in frame * 3:
+            result.extend(reassembler.feed(bytes((b, ))))
+        self.assertEqual(len(result), 3)
+
+
+class TestDeviceReadFrame(unittest.TestCase):
+    """device/main.py 中 STM32Communication.read_frame 跨多次读取收帧"""
+
+    def test_large_frames(self):
+        from emulator.run_device import load_device_main
+        device = load_device_main()
+        import machine
+        stm32 = device.STM32Communication(machine.UART.UART1, 115200)
+        self.assertTrue(stm32.connect())
+        link = machine.link(machine.UART.UART1)
+        samples = make_samples(20)
+        link.feed(pack_sensor_frame(samples) * 2)
+        frames = []
+        for _ in range(10):
+            frames.extend(stm32.read_frame())
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(stm32.split_sensor_samples(frames[1][2])[19], pack_sample(samples[19]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,8 @@
 测试更新后的传感器数据打包和解包功能
 """
 
-import struct
 import random
+from stm32_protocol import SAMPLE_FIELDS, SAMPLE_SIZE, pack_sample, unpack_sample
 from stm32_simulation_test import SensorDataGenerator
 
 
@@ -39,7 +39,7 @@ def test_sensor_data_generator():
     
     # 测试解包
     try:
-        unpacked_data = struct.unpack('<BhhhhhhhhhhhIfdd', data_bytes)
+        unpacked_data = unpack_sample(data_bytes)
         print("解包成功:")
         print(f"  packet_order: {unpacked_data[0]}")
         print(f"  accel_x: {unpacked_data[1]}")
@@ -63,6 +63,8 @@ def test_sensor_data_generator():
     print()
     
     # 验证解包数据是否与原始数据匹配
+    assert data_bytes == pack_sample(sensor_data)
+    assert len(unpacked_data) == len(SAMPLE_FIELDS)
     assert unpacked_data[0] == sensor_data['packet_order']
     assert unpacked_data[1] == sensor_data['accel_x']
     assert unpacked_data[2] == sensor_data['accel_y']
@@ -76,7 +78,8 @@ def test_sensor_data_generator():
     assert unpacked_data[10] == sensor_data['attitude1']
     assert unpacked_data[11] == sensor_data['attitude2']
     assert unpacked_data[12] == sensor_data['pressure']
-    assert abs(unpacked_data[13] - sensor_data['altitude']) < 0.0001
+    # 高度为4字节浮点（SAMPLE_FORMAT 中的 f），相对误差不超过 2**-24
+    assert abs(unpacked_data[13] - sensor_data['altitude']) <= abs(sensor_data['altitude']) * 2 ** -23
     assert abs(unpacked_data[14] - sensor_data['longitude']) < 0.000001
     assert abs(unpacked_data[15] - sensor_data['latitude']) < 0.000001
     
@@ -99,8 +102,7 @@ def test_multiple_samples():
     print(f"打包后的字节长度: {len(data_bytes)} bytes")
     
     # 验证总字节长度是否是单个样本长度的5倍
-    single_length = len(generator.sensor_data_to_bytes(samples[0]))
-    assert len(data_bytes) == single_length * 5
+    assert len(data_bytes) == SAMPLE_SIZE * 5
     
     print("✓ 多个样本打包成功")
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试 device/main.py 中的传感器数据流式编码器 SensorBatchEncoder（基于 emulator 仿真模块）
+"""
+
+import json
+import os
+import struct
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from emulator.run_device import SAMPLE_FORMAT, make_sample, load_device_main
+
+device = load_device_main()
+import umqtt
+
+
+def decode_publish(packet):
+    """解码QoS0 PUBLISH报文，返回 (主题, 载荷)"""
+    pos, remaining, shift = 1, 0, 0
+    while True:
+        byte = packet[pos]
+        pos += 1
+        remaining |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    assert packet[0] == 0x30 and len(packet) - pos == remaining
+    topic_len = (packet[pos] << 8) | packet[pos + 1]
+    return packet[pos + 2:pos + 2 + topic_len], packet[pos + 2 + topic_len:]
+
+
+class TestUplinkEncoder(unittest.TestCase):
+    """SensorBatchEncoder类测试"""
+
+    def setUp(self):
+        self.stm32 = device.STM32Communication(None, 115200)
+        self.epoch = 1760000000
+        self.raws = [struct.pack(SAMPLE_FORMAT, *make_sample(i)) for i in range(500)]
+        self.records = [[raw, self.epoch] for raw in self.raws]
+
+    def test_same_fields_as_parse_sensor_data(self):
+        """编码结果与 parse_sensor_data + ujson 的字段和数值一致"""
+        encoder = device.SensorBatchEncoder("up/123456789012345", 1024)
+        start, payload_start, end = encoder.encode(self.records)
+        topic, payload = decode_publish(bytes(encoder.buf[start:end]))
+        self.assertEqual(topic, b"up/123456789012345")
+        self.assertEqual(payload, bytes(encoder.buf[payload_start:end]))
+        decoded = json.loads(payload)
+        self.assertEqual(decoded['event'], 'SENSOR_DATA')
+        self.assertEqual(decoded['version'], device.APP_VERSION)
+        expected = self.stm32.parse_sensor_data(b''.join(self.raws))
+        for sample in expected:
+            sample['timestamp'] = device.format_epoch(self.epoch)
+            sample['version'] = device.APP_VERSION
+        self.assertEqual(decoded['data'], expected)
+        self.assertGreater(encoder.grow_count, 0)
+
+    def test_non_finite_float(self):
+        """NaN/Inf 编码为 null"""
+        values = list(make_sample(1))
+        values[13] = float('nan')
+        values[15] = float('inf')
+        sample = json.loads(device.encode_sensor_sample(struct.pack(SAMPLE_FORMAT, *values), self.epoch))
+        self.assertIsNone(sample['altitude'])
+        self.assertIsNone(sample['latitude'])
+        self.assertEqual(sample['longitude'], values[14])
+
+    def test_split_sensor_samples(self):
+        """按样本长度切分数据域，长度不符时返回空列表"""
+        data = b''.join(self.raws[:3])
+        self.assertEqual(self.stm32.split_sensor_samples(data), self.raws[:3])
+        self.assertEqual(self.stm32.split_sensor_samples(data[:-1]), [])
+
+    def test_publish_via_socket_and_fallback(self):
+        """有 sock 时直接写入报文，否则退回 publish()"""
+        client = device.MyMQTTClient("127.0.0.1", 1883, "", "", "123456789012345")
+        client.client = umqtt.MQTTClient("123456789012345", "127.0.0.1")
+        client.client.connect()
+        client.is_connected = True
+        published = umqtt.MQTTClient.published
+        count = len(published)
+        self.assertTrue(client.publish_up_sensor_records(self.records[:5]))
+        client.client.sock = None
+        self.assertTrue(client.publish_up_sensor_records(self.records[5:10]))
+        self.assertEqual(len(published), count + 2)
+        via_socket, via_publish = published[-2], published[-1]
+        self.assertEqual(via_socket[1], b"up/123456789012345")
+        self.assertEqual(len(json.loads(via_socket[2])['data']), 5)
+        self.assertEqual(json.loads(via_publish[2])['data'][0]['packet_order'], 5)
+
+    def test_partial_and_blocked_writes(self):
+        """部分写入时继续写剩余字节，发送缓冲区满时重试，超时抛出 OSError"""
+        class SlowSocket:
+            def __init__(self, pattern):
+                self.pattern, self.data = pattern, b''
+
+            def write(self, buf):
+                n = self.pattern.pop(0) if self.pattern else len(buf)
+                if n is None:
+                    return None
+                self.data += bytes(buf[:n])
+                return n
+
+        client = device.MyMQTTClient("127.0.0.1", 1883, "", "", "123456789012345")
+        client.client = umqtt.MQTTClient("123456789012345", "127.0.0.1")
+        start, payload_start, end = client.uplink_encoder.encode(self.records[:5])
+        client.client.sock = SlowSocket([7, None, 100, None])
+        client._write_sensor_packet(start, payload_start, end)
+        self.assertEqual(client.client.sock.data, bytes(client.uplink_encoder.buf[start:end]))
+
+        client.client.sock = SlowSocket([7] + [None] * 1000)
+        timeout = device.SOCKET_WRITE_TIMEOUT_MS
+        device.SOCKET_WRITE_TIMEOUT_MS = 30
+        try:
+            with self.assertRaises(OSError):
+                client._write_sensor_packet(start, payload_start, end)
+        finally:
+            device.SOCKET_WRITE_TIMEOUT_MS = timeout
+        self.assertEqual(len(client.client.sock.data), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,33 +3,9 @@
 
 import struct
 
-# 从 stm32_simulation_test.py 中提取的常量和函数
-CMD_DATA_UPLOAD = 0x01
-FRAME_HEADER = b'\xAA\x55'
-FRAME_TAIL = b'\x55\xAA'
-
-def calculate_checksum(cmd, data_len, data):
-    """计算校验和（异或校验）"""
-    checksum = cmd
-    checksum ^= (data_len >> 8) & 0xFF
-    checksum ^= data_len & 0xFF
-    for byte in data:
-        checksum ^= byte
-    return checksum
-
-def pack_frame(cmd, data=b''):
-    """打包数据帧"""
-    data_len = len(data)
-    checksum = calculate_checksum(cmd, data_len, data)
-    frame = (
-        FRAME_HEADER +
-        struct.pack('<B', cmd) +
-        struct.pack('<H', data_len) +
-        data +
-        struct.pack('<B', checksum) +
-        FRAME_TAIL
-    )
-    return frame
+from stm32_protocol import CMD_UP_DATA_UPLOAD as CMD_DATA_UPLOAD
+from stm32_protocol import FRAME_HEADER, FRAME_TAIL, SAMPLE_SIZE, checksum as calculate_checksum
+from stm32_protocol import sample_to_dict, unpack_sample
 
 def verify_packet(packet_hex):
     """验证数据包是否符合组包逻辑"""
@@ -88,33 +64,10 @@ def verify_packet(packet_hex):
 
 def parse_sensor_data(data):
     """解析传感器数据"""
-    if len(data) != 47:
-        print(f"数据长度错误，应为 47 字节，实际为 {len(data)} 字节")
-        return None
-    
-    try:
-        sensor_data = struct.unpack('<BhhhhhhhhhhhIIdd', data)
-        return {
-            'packet_order': sensor_data[0],
-            'accel_x': sensor_data[1],
-            'accel_y': sensor_data[2],
-            'accel_z': sensor_data[3],
-            'gyro_x': sensor_data[4],
-            'gyro_y': sensor_data[5],
-            'gyro_z': sensor_data[6],
-            'angle_x': sensor_data[7],
-            'angle_y': sensor_data[8],
-            'angle_z': sensor_data[9],
-            'attitude1': sensor_data[10],
-            'attitude2': sensor_data[11],
-            'pressure': sensor_data[12],
-            'altitude': sensor_data[13],
-            'longitude': sensor_data[14],
-            'latitude': sensor_data[15]
-        }
-    except Exception as e:
-        print(f"解析传感器数据失败: {e}")
+    if len(data) != SAMPLE_SIZE:
+        print(f"数据长度错误，应为 {SAMPLE_SIZE} 字节，实际为 {len(data)} 字节")
         return None
+    return sample_to_dict(unpack_sample(data))
 
 if __name__ == "__main__":
     # 用户提供的数据包